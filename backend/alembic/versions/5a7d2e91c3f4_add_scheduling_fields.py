@@ -0,0 +1,49 @@
+"""add scheduling priority, dispatch cursor and app weights
+
+Revision ID: 5a7d2e91c3f4
+Revises: 4f1c2d9a8b7e
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "5a7d2e91c3f4"
+down_revision: Union[str, Sequence[str], None] = "4f1c2d9a8b7e"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "evaluations",
+        sa.Column("priority", sa.Integer(), nullable=False, server_default="0"),
+    )
+    op.add_column(
+        "evaluations",
+        sa.Column("last_dispatched_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.add_column(
+        "apps",
+        sa.Column(
+            "scheduling_weight", sa.Integer(), nullable=False, server_default="1"
+        ),
+    )
+    op.create_index(
+        "ix_test_cases_status_evaluation_id",
+        "test_cases",
+        ["status", "evaluation_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_test_cases_status_evaluation_id", table_name="test_cases")
+    op.drop_column("apps", "scheduling_weight")
+    op.drop_column("evaluations", "last_dispatched_at")
+    op.drop_column("evaluations", "priority")
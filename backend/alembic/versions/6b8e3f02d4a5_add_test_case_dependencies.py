@@ -0,0 +1,48 @@
+"""add test case dependency edges
+
+Revision ID: 6b8e3f02d4a5
+Revises: 5a7d2e91c3f4
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "6b8e3f02d4a5"
+down_revision: Union[str, Sequence[str], None] = "5a7d2e91c3f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "test_case_dependencies",
+        sa.Column("test_case_id", sa.Integer(), nullable=False),
+        sa.Column("depends_on_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["test_case_id"], ["test_cases.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(
+            ["depends_on_id"], ["test_cases.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("test_case_id", "depends_on_id"),
+    )
+    op.create_index(
+        "ix_test_case_dependencies_depends_on_id",
+        "test_case_dependencies",
+        ["depends_on_id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_test_case_dependencies_depends_on_id",
+        table_name="test_case_dependencies",
+    )
+    op.drop_table("test_case_dependencies")
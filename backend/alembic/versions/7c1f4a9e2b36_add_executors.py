@@ -0,0 +1,53 @@
+"""add executors telemetry table
+
+Revision ID: 7c1f4a9e2b36
+Revises: 6b8e3f02d4a5
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1f4a9e2b36"
+down_revision: Union[str, Sequence[str], None] = "6b8e3f02d4a5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "executors",
+        sa.Column("id", sa.String(), nullable=False),
+        sa.Column("current_test_case_id", sa.Integer(), nullable=True),
+        sa.Column("steps_per_minute", sa.Float(), nullable=True),
+        sa.Column("avg_analyze_latency_ms", sa.Float(), nullable=True),
+        sa.Column("capture_width", sa.Integer(), nullable=True),
+        sa.Column("capture_height", sa.Integer(), nullable=True),
+        sa.Column(
+            "total_steps", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("info", sa.JSON(), nullable=True),
+        sa.Column(
+            "first_seen_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column("last_heartbeat_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_executors_last_heartbeat_at"),
+        "executors",
+        ["last_heartbeat_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f("ix_executors_last_heartbeat_at"), table_name="executors")
+    op.drop_table("executors")
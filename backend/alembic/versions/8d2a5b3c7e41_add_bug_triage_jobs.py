@@ -0,0 +1,79 @@
+"""add bug triage jobs
+
+Revision ID: 8d2a5b3c7e41
+Revises: 7c1f4a9e2b36
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+# revision identifiers, used by Alembic.
+revision: str = "8d2a5b3c7e41"
+down_revision: Union[str, Sequence[str], None] = "7c1f4a9e2b36"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'triagejobstatus') THEN
+                CREATE TYPE triagejobstatus AS ENUM (
+                    'PENDING',
+                    'RUNNING',
+                    'COMPLETED',
+                    'FAILED'
+                );
+            END IF;
+        END$$;
+        """)
+    triagejobstatus = pg.ENUM(
+        "PENDING",
+        "RUNNING",
+        "COMPLETED",
+        "FAILED",
+        name="triagejobstatus",
+        create_type=False,
+    )
+
+    op.create_table(
+        "bug_triage_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column(
+            "test_case_id",
+            sa.Integer(),
+            sa.ForeignKey("test_cases.id", ondelete="CASCADE"),
+            nullable=False,
+        ),
+        sa.Column("result_hash", sa.String(length=64), nullable=False),
+        sa.Column("result_payload", sa.JSON(), nullable=False),
+        sa.Column(
+            "status", triagejobstatus, nullable=False, server_default="PENDING"
+        ),
+        sa.Column("attempts", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.UniqueConstraint(
+            "test_case_id", "result_hash", name="uq_bug_triage_jobs_case_result"
+        ),
+    )
+    op.create_index("ix_bug_triage_jobs_id", "bug_triage_jobs", ["id"])
+    op.create_index("ix_bug_triage_jobs_status", "bug_triage_jobs", ["status"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bug_triage_jobs_status", table_name="bug_triage_jobs")
+    op.drop_index("ix_bug_triage_jobs_id", table_name="bug_triage_jobs")
+    op.drop_table("bug_triage_jobs")
+    op.execute("DROP TYPE IF EXISTS triagejobstatus")
@@ -0,0 +1,38 @@
+"""add bug listing indexes
+
+Revision ID: 9e4c6d1f2a57
+Revises: 8d2a5b3c7e41
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9e4c6d1f2a57"
+down_revision: Union[str, Sequence[str], None] = "8d2a5b3c7e41"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_bugs_app_status_severity_id",
+        "bugs",
+        ["app_id", "status", "severity_level", "id"],
+    )
+    # (bug_id, id) serves both bug_id lookups and keyset pages of occurrences.
+    op.create_index(
+        "ix_bug_occurrences_bug_id_id", "bug_occurrences", ["bug_id", "id"]
+    )
+    op.drop_index("ix_bug_occurrences_bug_id", table_name="bug_occurrences")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_bug_occurrences_bug_id", "bug_occurrences", ["bug_id"])
+    op.drop_index("ix_bug_occurrences_bug_id_id", table_name="bug_occurrences")
+    op.drop_index("ix_bugs_app_status_severity_id", table_name="bugs")
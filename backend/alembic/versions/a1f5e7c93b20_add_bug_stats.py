@@ -0,0 +1,124 @@
+"""add bug occurrence counters and stats tables
+
+Revision ID: a1f5e7c93b20
+Revises: 9e4c6d1f2a57
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "a1f5e7c93b20"
+down_revision: Union[str, Sequence[str], None] = "9e4c6d1f2a57"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "bugs",
+        sa.Column(
+            "occurrence_count", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+    op.create_table(
+        "bug_version_stats",
+        sa.Column("bug_id", sa.Integer(), nullable=False),
+        sa.Column("app_version_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "occurrence_count", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("first_seen_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("last_seen_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["bug_id"], ["bugs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["app_version_id"], ["app_versions.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("bug_id", "app_version_id"),
+    )
+    op.create_index(
+        "ix_bug_version_stats_app_version_id", "bug_version_stats", ["app_version_id"]
+    )
+    op.create_table(
+        "bug_evaluation_stats",
+        sa.Column("bug_id", sa.Integer(), nullable=False),
+        sa.Column("evaluation_id", sa.Integer(), nullable=False),
+        sa.Column("is_new", sa.Boolean(), nullable=False),
+        sa.Column(
+            "occurrence_count", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.ForeignKeyConstraint(["bug_id"], ["bugs.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(
+            ["evaluation_id"], ["evaluations.id"], ondelete="CASCADE"
+        ),
+        sa.PrimaryKeyConstraint("bug_id", "evaluation_id"),
+    )
+    op.create_index(
+        "ix_bug_evaluation_stats_evaluation_id",
+        "bug_evaluation_stats",
+        ["evaluation_id"],
+    )
+
+    # Backfill from the existing occurrences. A bug is "new" in the
+    # evaluation that recorded its first occurrence.
+    op.execute("""
+        UPDATE bugs SET occurrence_count = counts.total
+        FROM (
+            SELECT bug_id, COUNT(*) AS total
+            FROM bug_occurrences
+            GROUP BY bug_id
+        ) AS counts
+        WHERE bugs.id = counts.bug_id
+        """)
+    op.execute("""
+        INSERT INTO bug_version_stats
+            (bug_id, app_version_id, occurrence_count, first_seen_at, last_seen_at)
+        SELECT
+            bug_id,
+            app_version_id,
+            COUNT(*),
+            MIN(COALESCE(observed_at, created_at)),
+            MAX(COALESCE(observed_at, created_at))
+        FROM bug_occurrences
+        WHERE app_version_id IS NOT NULL
+        GROUP BY bug_id, app_version_id
+        """)
+    op.execute("""
+        INSERT INTO bug_evaluation_stats
+            (bug_id, evaluation_id, is_new, occurrence_count)
+        SELECT
+            o.bug_id,
+            o.evaluation_id,
+            COALESCE(
+                o.evaluation_id = (
+                    SELECT first.evaluation_id
+                    FROM bug_occurrences AS first
+                    WHERE first.bug_id = o.bug_id
+                    ORDER BY first.id
+                    LIMIT 1
+                ),
+                false
+            ),
+            COUNT(*)
+        FROM bug_occurrences AS o
+        WHERE o.evaluation_id IS NOT NULL
+        GROUP BY o.bug_id, o.evaluation_id
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(
+        "ix_bug_evaluation_stats_evaluation_id", table_name="bug_evaluation_stats"
+    )
+    op.drop_table("bug_evaluation_stats")
+    op.drop_index(
+        "ix_bug_version_stats_app_version_id", table_name="bug_version_stats"
+    )
+    op.drop_table("bug_version_stats")
+    op.drop_column("bugs", "occurrence_count")
@@ -0,0 +1,33 @@
+"""add apps.lineage_revision
+
+Revision ID: b7d3e2a91c64
+Revises: a1f5e7c93b20
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "b7d3e2a91c64"
+down_revision: Union[str, Sequence[str], None] = "a1f5e7c93b20"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "apps",
+        sa.Column(
+            "lineage_revision", sa.Integer(), nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("apps", "lineage_revision")
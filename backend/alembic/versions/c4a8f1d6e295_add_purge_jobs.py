@@ -0,0 +1,74 @@
+"""add purge_jobs
+
+Revision ID: c4a8f1d6e295
+Revises: b7d3e2a91c64
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql as pg
+
+# revision identifiers, used by Alembic.
+revision: str = "c4a8f1d6e295"
+down_revision: Union[str, Sequence[str], None] = "b7d3e2a91c64"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (SELECT 1 FROM pg_type WHERE typname = 'purgejobstatus') THEN
+                CREATE TYPE purgejobstatus AS ENUM (
+                    'PENDING',
+                    'RUNNING',
+                    'COMPLETED',
+                    'FAILED'
+                );
+            END IF;
+        END$$;
+        """)
+    purgejobstatus = pg.ENUM(
+        "PENDING",
+        "RUNNING",
+        "COMPLETED",
+        "FAILED",
+        name="purgejobstatus",
+        create_type=False,
+    )
+
+    op.create_table(
+        "purge_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("target_type", sa.String(), nullable=False),
+        sa.Column("target_id", sa.Integer(), nullable=False),
+        sa.Column("app_id", sa.Integer(), nullable=False),
+        sa.Column("status", purgejobstatus, nullable=False, server_default="PENDING"),
+        sa.Column("phase", sa.String(), nullable=True),
+        sa.Column("total_items", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "processed_items", sa.Integer(), nullable=False, server_default="0"
+        ),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+    )
+    op.create_index("ix_purge_jobs_id", "purge_jobs", ["id"])
+    op.create_index("ix_purge_jobs_status", "purge_jobs", ["status"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_purge_jobs_status", table_name="purge_jobs")
+    op.drop_index("ix_purge_jobs_id", table_name="purge_jobs")
+    op.drop_table("purge_jobs")
+    op.execute("DROP TYPE IF EXISTS purgejobstatus")
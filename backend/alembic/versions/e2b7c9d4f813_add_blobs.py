@@ -0,0 +1,63 @@
+"""add blobs and bug_occurrences.screenshot_hash
+
+Revision ID: e2b7c9d4f813
+Revises: c4a8f1d6e295
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = "e2b7c9d4f813"
+down_revision: Union[str, Sequence[str], None] = "c4a8f1d6e295"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "blobs",
+        sa.Column("digest", sa.String(length=64), primary_key=True),
+        sa.Column("content_type", sa.String(), nullable=True),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False, server_default="0"),
+        sa.Column(
+            "created_at", sa.DateTime(timezone=True), server_default=sa.func.now()
+        ),
+        sa.Column("last_used_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_index(
+        "ix_blobs_ref_count_last_used_at", "blobs", ["ref_count", "last_used_at"]
+    )
+    op.add_column(
+        "bug_occurrences",
+        sa.Column("screenshot_hash", sa.String(length=64), nullable=True),
+    )
+    op.create_foreign_key(
+        "fk_bug_occurrences_screenshot_hash_blobs",
+        "bug_occurrences",
+        "blobs",
+        ["screenshot_hash"],
+        ["digest"],
+    )
+    op.create_index(
+        "ix_bug_occurrences_screenshot_hash", "bug_occurrences", ["screenshot_hash"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_bug_occurrences_screenshot_hash", table_name="bug_occurrences")
+    op.drop_constraint(
+        "fk_bug_occurrences_screenshot_hash_blobs",
+        "bug_occurrences",
+        type_="foreignkey",
+    )
+    op.drop_column("bug_occurrences", "screenshot_hash")
+    op.drop_index("ix_blobs_ref_count_last_used_at", table_name="blobs")
+    op.drop_table("blobs")
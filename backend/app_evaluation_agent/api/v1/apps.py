@@ -1,23 +1,37 @@
 import logging
 from datetime import datetime
-
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from typing import Literal
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Response,
+    UploadFile,
+)
+from fastapi.responses import JSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app_evaluation_agent.schemas.app import AppCreate, AppRead, AppUpdate
 from app_evaluation_agent.schemas.app_version import (
     AppVersionCreate,
     AppVersionGraph,
+    AppVersionGraphCompact,
     AppVersionRead,
     AppVersionUpdate,
 )
-from app_evaluation_agent.schemas.bug import BugRead
+from app_evaluation_agent.schemas.bug import AppBugStatsRead, BugRead
 from app_evaluation_agent.schemas.evaluation import (
     EvaluationForVersionCreate,
     EvaluationRead,
     EvaluationWithTasksRead,
 )
+from app_evaluation_agent.schemas.purge import PurgeJobRead
 from app_evaluation_agent.services import apps as app_service
+from app_evaluation_agent.services import bug_stats
 from app_evaluation_agent.services import bugs as bug_service
 from app_evaluation_agent.services import evaluations as evaluation_service
 from app_evaluation_agent.storage.database import get_db_session
@@ -70,8 +84,26 @@ async def update_app(
     return app
 
 
-@router.delete("/{app_id}", status_code=204)
-async def delete_app(app_id: int, db: AsyncSession = Depends(get_db_session)):
+def _accepted(job) -> JSONResponse:
+    return JSONResponse(
+        status_code=202,
+        content=PurgeJobRead.model_validate(job).model_dump(mode="json"),
+    )
+
+
+@router.delete(
+    "/{app_id}", status_code=204, responses={202: {"model": PurgeJobRead}}
+)
+async def delete_app(
+    app_id: int,
+    background: bool = False,
+    db: AsyncSession = Depends(get_db_session),
+):
+    if background:
+        job = await app_service.schedule_app_deletion(db, app_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="App not found")
+        return _accepted(job)
     deleted = await app_service.delete_app(db, app_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="App not found")
@@ -93,6 +125,7 @@ async def list_app_versions(
 @router.get("/{app_id}/bugs", response_model=list[BugRead])
 async def list_bugs_for_app(
     app_id: int,
+    response: Response,
     status: str | None = None,
     severity_level: str | None = None,
     app_version_id: int | None = None,
@@ -100,13 +133,14 @@ async def list_bugs_for_app(
     test_case_id: int | None = None,
     limit: int = 50,
     offset: int = 0,
+    before_id: int | None = None,
     db: AsyncSession = Depends(get_db_session),
 ):
     app = await app_service.get_app(db, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
     try:
-        return await bug_service.list_bugs_for_app(
+        bugs = await bug_service.list_bugs_for_app(
             db,
             app_id=app_id,
             status=status,
@@ -116,19 +150,91 @@ async def list_bugs_for_app(
             test_case_id=test_case_id,
             limit=limit,
             offset=offset,
+            before_id=before_id,
         )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
+    cursor = bug_service.next_cursor(bugs, limit)
+    if cursor is not None:
+        response.headers[bug_service.NEXT_CURSOR_HEADER] = str(cursor)
+    return bugs
+
+
+@router.get("/{app_id}/bugs/stats", response_model=AppBugStatsRead)
+async def get_bug_stats_for_app(
+    app_id: int,
+    evaluations_limit: int = 20,
+    db: AsyncSession = Depends(get_db_session),
+):
+    app = await app_service.get_app(db, app_id)
+    if not app:
+        raise HTTPException(status_code=404, detail="App not found")
+    return await bug_stats.get_app_bug_stats(
+        db, app_id, evaluations_limit=evaluations_limit
+    )
+
 
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # Weak comparison: W/"x" and "x" name the same representation.
+    return "*" in candidates or etag.removeprefix("W/") in {
+        tag.removeprefix("W/") for tag in candidates
+    }
 
-@router.get("/{app_id}/versions/graph", response_model=AppVersionGraph)
+
+@router.get(
+    "/{app_id}/versions/graph",
+    response_model=AppVersionGraph | AppVersionGraphCompact,
+)
 async def get_app_versions_graph(
-    app_id: int, db: AsyncSession = Depends(get_db_session)
+    app_id: int,
+    response: Response,
+    around: int | None = None,
+    generations: int = 2,
+    branch: int | None = None,
+    since: datetime | None = None,
+    format: Literal["full", "compact"] = "full",
+    if_none_match: str | None = Header(None),
+    db: AsyncSession = Depends(get_db_session),
 ):
+    """
+    Version lineage graph, optionally windowed (`around` + `generations`,
+    `branch`, `since`). Responses carry an ETag; a matching If-None-Match
+    gets 304 without building the graph.
+    """
     app = await app_service.get_app(db, app_id)
     if not app:
         raise HTTPException(status_code=404, detail="App not found")
-    return await app_service.list_app_versions_graph(db=db, app_id=app_id)
+
+    compact = format == "compact"
+    etag = app_service.versions_graph_etag(
+        app.lineage_revision,
+        around_version_id=around,
+        generations=generations if around is not None else None,
+        branch_version_id=branch,
+        since=since,
+        compact=compact,
+    )
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    try:
+        graph = await app_service.list_app_versions_graph(
+            db=db,
+            app_id=app_id,
+            around_version_id=around,
+            generations=generations,
+            branch_version_id=branch,
+            since=since,
+            compact=compact,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    response.headers.update(headers)
+    return graph
 
 
 @router.post("/{app_id}/versions", response_model=AppVersionRead, status_code=201)
@@ -212,10 +318,22 @@ async def update_app_version(
     return version
 
 
-@router.delete("/{app_id}/versions/{version_id}", status_code=204)
+@router.delete(
+    "/{app_id}/versions/{version_id}",
+    status_code=204,
+    responses={202: {"model": PurgeJobRead}},
+)
 async def delete_app_version(
-    app_id: int, version_id: int, db: AsyncSession = Depends(get_db_session)
+    app_id: int,
+    version_id: int,
+    background: bool = False,
+    db: AsyncSession = Depends(get_db_session),
 ):
+    if background:
+        job = await app_service.schedule_app_version_deletion(db, app_id, version_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="App version not found")
+        return _accepted(job)
     deleted = await app_service.delete_app_version(db, app_id, version_id)
     if not deleted:
         raise HTTPException(status_code=404, detail="App version not found")
@@ -12,8 +12,10 @@ from app_evaluation_agent.schemas.bug import (
     BugOccurrenceRead,
     BugRead,
     BugUpdate,
+    TriageMetricsRead,
 )
 from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services.triage_gate import triage_gate
 from app_evaluation_agent.storage.database import get_db_session
 
 router = APIRouter()
@@ -28,6 +30,12 @@ async def create_bug(payload: BugCreate, db: AsyncSession = Depends(get_db_sessi
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@router.get("/triage/metrics", response_model=TriageMetricsRead)
+async def get_triage_metrics():
+    """Pre-triage skip and cache counters for this API process."""
+    return triage_gate.metrics()
+
+
 @router.get("/{bug_id}", response_model=BugRead)
 async def get_bug(bug_id: int, db: AsyncSession = Depends(get_db_session)):
     bug = await bug_service.get_bug(db, bug_id)
@@ -72,17 +80,19 @@ async def create_bug_occurrence(
 @router.get("/{bug_id}/occurrences", response_model=list[BugOccurrenceRead])
 async def list_bug_occurrences(
     bug_id: int,
+    response: Response,
     evaluation_id: Optional[int] = None,
     test_case_id: Optional[int] = None,
     app_version_id: Optional[int] = None,
     limit: int = 50,
     offset: int = 0,
+    before_id: Optional[int] = None,
     db: AsyncSession = Depends(get_db_session),
 ):
     bug = await bug_service.get_bug(db, bug_id)
     if not bug:
         raise HTTPException(status_code=404, detail="Bug not found")
-    return await bug_service.list_bug_occurrences(
+    occurrences = await bug_service.list_bug_occurrences(
         db,
         bug_id=bug_id,
         evaluation_id=evaluation_id,
@@ -90,7 +100,12 @@ async def list_bug_occurrences(
         app_version_id=app_version_id,
         limit=limit,
         offset=offset,
+        before_id=before_id,
     )
+    cursor = bug_service.next_cursor(occurrences, limit)
+    if cursor is not None:
+        response.headers[bug_service.NEXT_CURSOR_HEADER] = str(cursor)
+    return occurrences
 
 
 @router.post("/{bug_id}/fixes", response_model=BugFixRead, status_code=201)
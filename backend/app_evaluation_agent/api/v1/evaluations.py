@@ -2,11 +2,26 @@ import asyncio
 import logging
 from typing import Literal
 
-from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    Form,
+    Header,
+    HTTPException,
+    Response,
+    UploadFile,
+)
 from fastapi.responses import StreamingResponse
 from sqlalchemy.exc import InterfaceError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app_evaluation_agent.realtime import (
+    TERMINAL_STATUS_VALUES,
+    StreamSubscriber,
+    evaluation_status_broadcaster,
+)
+from app_evaluation_agent.schemas.bug import EvaluationRegressionsRead
 from app_evaluation_agent.schemas.evaluation import (
     EvaluationCreate,
     EvaluationRead,
@@ -15,6 +30,7 @@ from app_evaluation_agent.schemas.evaluation import (
     EvaluationWithTasksRead,
 )
 from app_evaluation_agent.services import evaluations as evaluation_service
+from app_evaluation_agent.services import regressions as regression_service
 from app_evaluation_agent.storage.database import AsyncSessionLocal, get_db_session
 
 logger = logging.getLogger(__name__)
@@ -78,6 +94,7 @@ async def request_evaluation_with_upload(
     assigned_executor_id: str | None = Form(None),
     application_path: str | None = Form(None),
     high_level_goal: str | None = Form(None),
+    priority: int = Form(0, description="Higher values are dispatched first."),
     executor_ids: list[str] = Form(
         ..., description="Candidate executor IDs that may be assigned tasks."
     ),
@@ -109,6 +126,7 @@ async def request_evaluation_with_upload(
             app_name=app_name,
             app_version=app_version,
             app_type=app_type,
+            priority=priority,
         )
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
@@ -133,6 +151,7 @@ async def request_evaluation_for_url(
     execution_mode: str = Form(..., description="'cloud' or 'local'"),
     assigned_executor_id: str | None = Form(None),
     high_level_goal: str | None = Form(None),
+    priority: int = Form(0, description="Higher values are dispatched first."),
     executor_ids: list[str] = Form(
         ..., description="Candidate executor IDs that may be assigned tasks."
     ),
@@ -165,6 +184,7 @@ async def request_evaluation_for_url(
         execution_mode=execution_mode,
         assigned_executor_id=assigned_executor_id,
         high_level_goal=goal,
+        priority=priority,
         executor_ids=executor_ids,
     )
     try:
@@ -196,6 +216,7 @@ async def request_live_screen_evaluation(
         "desktop_app", description="Type of app currently in view."
     ),
     high_level_goal: str | None = Form(None),
+    priority: int = Form(0, description="Higher values are dispatched first."),
     executor_ids: list[str] = Form(
         ..., description="Candidate executor IDs that may be assigned tasks."
     ),
@@ -223,6 +244,7 @@ async def request_live_screen_evaluation(
         assigned_executor_id=assigned_executor_id,
         high_level_goal=goal,
         run_on_current_screen=True,
+        priority=priority,
         executor_ids=executor_ids,
     )
     try:
@@ -327,6 +349,42 @@ async def regenerate_evaluation_summary(
     return regenerated
 
 
+@router.get("/{evaluation_id}/regressions", response_model=EvaluationRegressionsRead)
+async def get_evaluation_regressions(
+    evaluation_id: int, db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Compare the bugs this evaluation hit with fixes and open bugs in its
+    version's lineage, without changing anything.
+    """
+    try:
+        report = await regression_service.analyze_evaluation(db, evaluation_id)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if report is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    return report
+
+
+@router.post("/{evaluation_id}/regressions", response_model=EvaluationRegressionsRead)
+async def apply_evaluation_regressions(
+    evaluation_id: int, db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Re-run the regression analysis and apply it: reopen regressed bugs and
+    record verified fixes. Runs automatically once an evaluation completes.
+    """
+    try:
+        report = await regression_service.apply_evaluation_regressions(
+            db, evaluation_id
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if report is None:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    return report
+
+
 @router.delete("/{evaluation_id}", status_code=204)
 async def delete_evaluation(
     evaluation_id: int, db: AsyncSession = Depends(get_db_session)
@@ -336,77 +394,132 @@ async def delete_evaluation(
     """
     logger.debug("Deleting evaluation id=%s", evaluation_id)
     deleted = await evaluation_service.delete_evaluation(db, evaluation_id)
+    evaluation_status_broadcaster.forget_status(evaluation_id)
     if not deleted:
         logger.debug("Delete failed because evaluation %s was not found", evaluation_id)
         raise HTTPException(status_code=404, detail="Evaluation not found")
     return Response(status_code=204)
 
 
+def _sse_status(payload: dict) -> str:
+    return f"id: {payload['seq']}\nevent: status\ndata: {payload['status']}\n\n"
+
+
+async def _load_status(evaluation_id: int) -> str | None:
+    async with AsyncSessionLocal() as db:
+        evaluation = await evaluation_service.get_evaluation(db, evaluation_id)
+    if not evaluation:
+        return None
+    return getattr(evaluation.status, "value", str(evaluation.status))
+
+
+async def _current_status(evaluation_id: int) -> dict | None:
+    """
+    The evaluation's status, read from the database on connect. It carries
+    the `seq` of the last published status only when that status matches,
+    since the broadcaster's copy can be stale (events missed while the Redis
+    listener was down, or published by a process that is not listening).
+    """
+    status = await _load_status(evaluation_id)
+    if status is None:
+        evaluation_status_broadcaster.forget_status(evaluation_id)
+        return None
+    latest = evaluation_status_broadcaster.latest_status(evaluation_id)
+    if latest is not None and latest["status"] == status:
+        return latest
+    return {"seq": 0, "status": status}
+
+
+def _client_has_status(evaluation_id: int, current: dict, cursor: int | None) -> bool:
+    # Event IDs are journal sequence numbers; one past the journal's newest
+    # comes from before a restart and proves nothing.
+    if cursor is None or current["seq"] == 0:
+        return False
+    return current["seq"] <= cursor <= evaluation_status_broadcaster.last_seq(
+        evaluation_id
+    )
+
+
 @router.get("/{evaluation_id}/events")
 async def stream_evaluation_events(
     evaluation_id: int,
-    poll_interval_seconds: float = 2.0,
+    keepalive_seconds: float = 15.0,
     max_seconds: int = 300,
+    since: int | None = None,
+    max_rate: float | None = None,
+    last_event_id: str | None = Header(default=None, alias="Last-Event-ID"),
 ):
     """
     Server-Sent Events stream for evaluation status updates.
 
-    Emits `status` events whenever the evaluation status changes.
-    Closes once a terminal status is reached or the timeout elapses.
+    Subscribes to the status broadcaster, so changes are pushed as they are
+    published; the database is read once, on connect. Emits the
+    current status (unless `Last-Event-ID`, or `since` for clients that
+    cannot set headers, shows the client already has it), then every change
+    (at most `max_rate` per second), with keep-alive comments in between.
+    Closes once a terminal status is sent or the timeout elapses.
     """
+    cursor = since
+    if last_event_id is not None and last_event_id.isdigit():
+        cursor = int(last_event_id)
 
     async def event_generator():
-        last_status = None
-        elapsed = 0.0
-        terminal_statuses = {"FAILED"}
-
-        while elapsed <= max_seconds:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_seconds
+        subscriber = StreamSubscriber()
+        # Subscribe before reading the current status so no change is missed.
+        await evaluation_status_broadcaster.subscribe(
+            subscriber, evaluation_id, max_rate=max_rate
+        )
+        try:
             try:
-                async with AsyncSessionLocal() as db:
-                    evaluation = await evaluation_service.get_evaluation(
-                        db, evaluation_id
-                    )
-                    if not evaluation:
-                        logger.debug("SSE: evaluation %s not found", evaluation_id)
-                        yield "event: error\ndata: Evaluation not found\n\n"
-                        return
-
-                    try:
-                        await db.refresh(evaluation)
-                    except Exception:
-                        logger.debug(
-                            "Could not refresh evaluation %s during SSE polling",
-                            evaluation_id,
-                        )
-
-                    status = getattr(evaluation.status, "value", str(evaluation.status))
-                    if status != last_status:
-                        logger.debug(
-                            "SSE: evaluation %s status change %s -> %s",
-                            evaluation_id,
-                            last_status,
-                            status,
-                        )
-                        yield f"event: status\ndata: {status}\n\n"
-                        last_status = status
-                        if status in terminal_statuses:
-                            return
+                current = await _current_status(evaluation_id)
             except InterfaceError:
                 logger.exception(
-                    "SSE: database connection error while polling evaluation %s",
+                    "SSE: database connection error while loading evaluation %s",
                     evaluation_id,
                 )
                 yield "event: error\ndata: Database connection closed\n\n"
                 return
-            except Exception:
-                logger.exception(
-                    "SSE: unexpected error while polling evaluation %s",
-                    evaluation_id,
-                )
-                yield "event: error\ndata: Unexpected server error\n\n"
+            if current is None:
+                logger.debug("SSE: evaluation %s not found", evaluation_id)
+                yield "event: error\ndata: Evaluation not found\n\n"
                 return
 
-            await asyncio.sleep(poll_interval_seconds)
-            elapsed += poll_interval_seconds
+            last_seq, last_status = current["seq"], current["status"]
+            if not _client_has_status(evaluation_id, current, cursor):
+                yield _sse_status(current)
+            if current["status"] in TERMINAL_STATUS_VALUES:
+                return
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return
+                try:
+                    payload = await asyncio.wait_for(
+                        subscriber.queue.get(), min(keepalive_seconds, remaining)
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if payload.get("type") != "status" or payload["seq"] <= last_seq:
+                    continue
+                last_seq = payload["seq"]
+                if payload["status"] == last_status:
+                    continue
+                last_status = payload["status"]
+                logger.debug(
+                    "SSE: evaluation %s status %s", evaluation_id, payload["status"]
+                )
+                yield _sse_status(payload)
+                if payload["status"] in TERMINAL_STATUS_VALUES:
+                    return
+        finally:
+            await evaluation_status_broadcaster.unsubscribe(subscriber, evaluation_id)
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
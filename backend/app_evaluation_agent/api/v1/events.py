@@ -5,26 +5,44 @@ from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 
 from app_evaluation_agent.realtime import (
     CHANNEL_EVALUATION_STATUS,
+    CHANNEL_EXECUTOR_TELEMETRY,
+    SCOPED_CHANNELS,
     evaluation_status_broadcaster,
 )
+from app_evaluation_agent.services.executors import executor_registry
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
 
-def _parse_evaluation_id(payload: dict[str, Any]) -> int | None:
-    evaluation_id = payload.get("evaluation_id")
-    if evaluation_id is None:
+def _parse_id(payload: dict[str, Any], key: str) -> int | None:
+    value = payload.get(key)
+    if value is None:
         return None
-    if isinstance(evaluation_id, bool):
+    if isinstance(value, bool):
         return None
     try:
-        return int(evaluation_id)
+        return int(value)
     except (TypeError, ValueError):
         return None
 
 
+def _parse_evaluation_id(payload: dict[str, Any]) -> int | None:
+    return _parse_id(payload, "evaluation_id")
+
+
+def _parse_rate(payload: dict[str, Any]) -> float | None:
+    value = payload.get("max_rate")
+    if value is None or isinstance(value, bool):
+        return None
+    try:
+        rate = float(value)
+    except (TypeError, ValueError):
+        return None
+    return rate if rate > 0 else None
+
+
 async def _send_error(
     websocket: WebSocket,
     code: str,
@@ -38,6 +56,83 @@ async def _send_error(
     logger.debug("WebSocket sent: %s", payload)
 
 
+def _resync_payload(
+    channel: str, scope: dict[str, int], since: int | None
+) -> dict[str, Any]:
+    # Sent when the journal no longer holds every event after `since`.
+    return {"type": "resync", "channel": channel, **scope, "since": since}
+
+
+async def _handle_executor_channel(websocket: WebSocket, action: str) -> None:
+    if action == "subscribe":
+        await evaluation_status_broadcaster.subscribe_channel(
+            websocket, CHANNEL_EXECUTOR_TELEMETRY
+        )
+        payload = {"type": "subscribed", "channel": CHANNEL_EXECUTOR_TELEMETRY}
+        await websocket.send_json(payload)
+        logger.debug("WebSocket sent: %s", payload)
+        # Start the subscriber off with the current fleet.
+        payload = {
+            "type": "snapshot",
+            "channel": CHANNEL_EXECUTOR_TELEMETRY,
+            "executors": [
+                state.to_payload() for state in executor_registry.list_executors()
+            ],
+        }
+        await websocket.send_json(payload)
+        logger.debug("WebSocket sent executor snapshot")
+    else:
+        await evaluation_status_broadcaster.unsubscribe_channel(
+            websocket, CHANNEL_EXECUTOR_TELEMETRY
+        )
+        payload = {"type": "unsubscribed", "channel": CHANNEL_EXECUTOR_TELEMETRY}
+        await websocket.send_json(payload)
+        logger.debug("WebSocket sent: %s", payload)
+
+
+async def _handle_scoped_channel(
+    websocket: WebSocket, action: str, channel: str, message: dict[str, Any]
+) -> None:
+    evaluation_id = _parse_evaluation_id(message)
+    app_id = _parse_id(message, "app_id")
+    if evaluation_id is None and app_id is None:
+        await _send_error(
+            websocket,
+            code="invalid_request",
+            message="evaluation_id or app_id must be an integer.",
+        )
+        return
+
+    # An evaluation scope wins if both are given; app_id is the wildcard over
+    # every evaluation of the app.
+    if evaluation_id is not None:
+        app_id = None
+        scope = {"evaluation_id": evaluation_id}
+    else:
+        scope = {"app_id": app_id}
+
+    if action == "subscribe":
+        since = _parse_id(message, "since")
+        # The ack and any resync are queued ahead of the replay, so the
+        # client sees them first.
+        await evaluation_status_broadcaster.subscribe_scoped(
+            websocket,
+            channel,
+            evaluation_id=evaluation_id,
+            app_id=app_id,
+            since=since,
+            ack={"type": "subscribed", "channel": channel, **scope},
+            resync=_resync_payload(channel, scope, since),
+        )
+    else:
+        await evaluation_status_broadcaster.unsubscribe_scoped(
+            websocket, channel, evaluation_id=evaluation_id, app_id=app_id
+        )
+        payload = {"type": "unsubscribed", "channel": channel, **scope}
+        await websocket.send_json(payload)
+        logger.debug("WebSocket sent: %s", payload)
+
+
 @router.websocket("/ws")
 async def events_websocket(websocket: WebSocket) -> None:
     await websocket.accept()
@@ -64,6 +159,12 @@ async def events_websocket(websocket: WebSocket) -> None:
                 continue
 
             channel = message.get("channel")
+            if channel == CHANNEL_EXECUTOR_TELEMETRY:
+                await _handle_executor_channel(websocket, action)
+                continue
+            if channel in SCOPED_CHANNELS:
+                await _handle_scoped_channel(websocket, action, channel, message)
+                continue
             if channel != CHANNEL_EVALUATION_STATUS:
                 await _send_error(
                     websocket,
@@ -82,15 +183,21 @@ async def events_websocket(websocket: WebSocket) -> None:
                 continue
 
             if action == "subscribe":
-                await evaluation_status_broadcaster.subscribe(websocket, evaluation_id)
+                since = _parse_id(message, "since")
+                scope = {"evaluation_id": evaluation_id}
+                await evaluation_status_broadcaster.subscribe(
+                    websocket,
+                    evaluation_id,
+                    since=since,
+                    max_rate=_parse_rate(message),
+                    ack={
+                        "type": "subscribed",
+                        "channel": CHANNEL_EVALUATION_STATUS,
+                        **scope,
+                    },
+                    resync=_resync_payload(CHANNEL_EVALUATION_STATUS, scope, since),
+                )
                 subscriptions.add(evaluation_id)
-                payload = {
-                    "type": "subscribed",
-                    "channel": CHANNEL_EVALUATION_STATUS,
-                    "evaluation_id": evaluation_id,
-                }
-                await websocket.send_json(payload)
-                logger.debug("WebSocket sent: %s", payload)
                 logger.debug(
                     "WebSocket subscribed to evaluation %s status updates",
                     evaluation_id,
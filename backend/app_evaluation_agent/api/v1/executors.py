@@ -0,0 +1,46 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException
+
+from app_evaluation_agent.schemas.executor import (
+    ExecutorHeartbeat,
+    ExecutorLiveness,
+    ExecutorRead,
+)
+from app_evaluation_agent.services.executors import executor_registry
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/", response_model=list[ExecutorRead])
+async def list_executors(status: Optional[ExecutorLiveness] = None):
+    """
+    List known executors with their live telemetry, optionally filtered by
+    liveness (online / stale / offline).
+    """
+    return executor_registry.list_executors(status=status)
+
+
+@router.get("/{executor_id}", response_model=ExecutorRead)
+async def get_executor(executor_id: str):
+    state = executor_registry.get(executor_id)
+    if not state:
+        raise HTTPException(status_code=404, detail="Executor not found")
+    return state
+
+
+@router.post("/{executor_id}/heartbeat", response_model=ExecutorRead)
+async def executor_heartbeat(executor_id: str, payload: ExecutorHeartbeat):
+    """
+    Record a runner heartbeat. Runners should call this every few seconds;
+    polling /testcases/next and calling /vision/analyze also count as activity.
+    """
+    return await executor_registry.heartbeat(
+        executor_id,
+        current_test_case_id=payload.current_test_case_id,
+        capture_width=payload.capture_width,
+        capture_height=payload.capture_height,
+        info=payload.info,
+    )
@@ -0,0 +1,19 @@
+import logging
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.schemas.purge import PurgeJobRead
+from app_evaluation_agent.services import purge as purge_service
+from app_evaluation_agent.storage.database import get_db_session
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+@router.get("/{job_id}", response_model=PurgeJobRead)
+async def get_purge_job(job_id: int, db: AsyncSession = Depends(get_db_session)):
+    job = await purge_service.get_purge_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Purge job not found")
+    return job
@@ -0,0 +1,261 @@
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi import APIRouter, HTTPException, Response, WebSocket, WebSocketDisconnect
+from pydantic import BaseModel, ValidationError
+
+from app_evaluation_agent.api.v1 import evaluations as evaluations_api
+from app_evaluation_agent.api.v1 import executors as executors_api
+from app_evaluation_agent.api.v1 import testcases as testcases_api
+from app_evaluation_agent.api.v1 import vision as vision_api
+from app_evaluation_agent.schemas.agent import AgentContext
+from app_evaluation_agent.schemas.evaluation import EvaluationWithTasksRead
+from app_evaluation_agent.schemas.executor import ExecutorHeartbeat, ExecutorRead
+from app_evaluation_agent.schemas.testcase import TestCaseRead, TestCaseUpdate
+from app_evaluation_agent.storage.database import AsyncSessionLocal
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+# Requests of one session handled at the same time; reading further frames
+# waits until one finishes.
+MAX_IN_FLIGHT = 8
+
+
+def _dump(model: type[BaseModel], value: Any) -> Any:
+    return model.model_validate(value).model_dump(mode="json")
+
+
+def _executor_id(session: "_RunnerSession", params: dict) -> str:
+    executor_id = params.get("executor_id") or session.executor_id
+    if not executor_id:
+        raise HTTPException(status_code=400, detail="executor_id is required")
+    return executor_id
+
+
+def _int_param(params: dict, key: str) -> int:
+    value = params.get(key)
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise HTTPException(status_code=400, detail=f"{key} must be an integer")
+    return value
+
+
+# Each op runs the handler of its HTTP route, so validation, status codes and
+# side effects (telemetry, realtime events) are identical.
+
+
+async def _analyze(session: "_RunnerSession", params: dict, image: Optional[bytes]):
+    try:
+        context = AgentContext.model_validate(params.get("context"))
+    except ValidationError as exc:
+        raise HTTPException(status_code=400, detail=f"Invalid context JSON: {exc}")
+    result = await vision_api.analyze_context(
+        context,
+        image,
+        params.get("executor_id") or session.executor_id,
+        params.get("frame_encoding") or vision_api.FRAME_ENCODING_FULL,
+    )
+    return result.model_dump(mode="json")
+
+
+async def _next_test_case(
+    session: "_RunnerSession", params: dict, image: Optional[bytes]
+):
+    async with AsyncSessionLocal() as db:
+        case = await testcases_api.get_next_test_case(
+            _executor_id(session, params), db
+        )
+        if isinstance(case, Response):
+            return None
+        return _dump(TestCaseRead, case)
+
+
+async def _update_test_case(
+    session: "_RunnerSession", params: dict, image: Optional[bytes]
+):
+    case_id = _int_param(params, "case_id")
+    update = TestCaseUpdate.model_validate(
+        {key: value for key, value in params.items() if key != "case_id"}
+    )
+    async with AsyncSessionLocal() as db:
+        case = await testcases_api.update_test_case(case_id, update, db)
+        return _dump(TestCaseRead, case)
+
+
+async def _get_evaluation(
+    session: "_RunnerSession", params: dict, image: Optional[bytes]
+):
+    evaluation_id = _int_param(params, "evaluation_id")
+    async with AsyncSessionLocal() as db:
+        evaluation = await evaluations_api.get_evaluation_status(evaluation_id, db)
+        return _dump(EvaluationWithTasksRead, evaluation)
+
+
+async def _heartbeat(session: "_RunnerSession", params: dict, image: Optional[bytes]):
+    executor_id = _executor_id(session, params)
+    payload = ExecutorHeartbeat.model_validate(
+        {key: value for key, value in params.items() if key != "executor_id"}
+    )
+    state = await executors_api.executor_heartbeat(executor_id, payload)
+    return _dump(ExecutorRead, state)
+
+
+async def _ping(session: "_RunnerSession", params: dict, image: Optional[bytes]):
+    return "pong"
+
+
+Op = Callable[["_RunnerSession", dict, Optional[bytes]], Awaitable[Any]]
+
+_OPS: dict[str, Op] = {
+    "analyze": _analyze,
+    "next": _next_test_case,
+    "update_test_case": _update_test_case,
+    "get_evaluation": _get_evaluation,
+    "heartbeat": _heartbeat,
+    "ping": _ping,
+}
+
+
+class _RunnerSession:
+    """
+    One runner connection. Requests run concurrently (up to
+    `MAX_IN_FLIGHT`), each with its own DB session; responses are sent as
+    they complete and matched to requests by `id`.
+    """
+
+    def __init__(self, websocket: WebSocket, executor_id: Optional[str]) -> None:
+        self.websocket = websocket
+        self.executor_id = executor_id
+        self._send_lock = asyncio.Lock()
+        self._slots = asyncio.Semaphore(MAX_IN_FLIGHT)
+        self._tasks: set[asyncio.Task] = set()
+
+    async def send(self, payload: dict) -> None:
+        async with self._send_lock:
+            await self.websocket.send_json(payload)
+
+    async def error(self, request_id: Any, status: int, detail: Any) -> None:
+        await self.send(
+            {"id": request_id, "ok": False, "status": status, "error": detail}
+        )
+
+    async def dispatch(
+        self, request_id: Any, op: str, params: dict, image: Optional[bytes]
+    ) -> None:
+        await self._slots.acquire()
+        task = asyncio.create_task(self._run(request_id, op, params, image))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(
+        self, request_id: Any, op: str, params: dict, image: Optional[bytes]
+    ) -> None:
+        try:
+            handler = _OPS.get(op)
+            if handler is None:
+                raise HTTPException(status_code=400, detail=f"Unknown op: {op}")
+            result = await handler(self, params, image)
+            response = {"id": request_id, "ok": True, "result": result}
+        except HTTPException as exc:
+            response = {
+                "id": request_id,
+                "ok": False,
+                "status": exc.status_code,
+                "error": exc.detail,
+            }
+        except ValidationError as exc:
+            response = {
+                "id": request_id,
+                "ok": False,
+                "status": 400,
+                "error": f"Invalid params: {exc}",
+            }
+        except Exception:  # noqa: BLE001
+            logger.exception("Runner op %s failed", op)
+            response = {
+                "id": request_id,
+                "ok": False,
+                "status": 500,
+                "error": "Internal server error",
+            }
+        finally:
+            self._slots.release()
+        try:
+            await self.send(response)
+        except Exception:  # noqa: BLE001
+            logger.debug("Runner disconnected before response %s", request_id)
+
+    async def close(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+def _parse_request(text: Optional[str]) -> Optional[dict]:
+    if text is None:
+        return None
+    try:
+        request = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(request, dict) or not isinstance(request.get("op"), str):
+        return None
+    if not isinstance(request.get("params", {}), dict):
+        return None
+    return request
+
+
+@router.websocket("/ws")
+async def runner_websocket(websocket: WebSocket, executor_id: Optional[str] = None):
+    """
+    Persistent session for the runner's per-step calls (analyze, next test
+    case, test case updates, evaluation fetch, heartbeat) over one
+    connection, instead of one HTTP request each.
+
+    Requests are JSON text frames `{"id", "op", "params"}`; a request with
+    `"image": true` is followed by one binary frame holding the screenshot.
+    Responses are `{"id", "ok": true, "result"}` or
+    `{"id", "ok": false, "status", "error"}` with the HTTP route's status
+    code, and may arrive out of order.
+    """
+    await websocket.accept()
+    session = _RunnerSession(websocket, executor_id)
+    logger.debug("Runner session opened (executor=%s)", executor_id)
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            request = _parse_request(message.get("text"))
+            if request is None:
+                await session.error(
+                    None,
+                    400,
+                    "Expected a JSON request frame with an op"
+                    if message.get("bytes") is None
+                    else "Unexpected binary frame",
+                )
+                continue
+
+            request_id = request.get("id")
+            image = None
+            if request.get("image"):
+                frame = await websocket.receive()
+                if frame["type"] == "websocket.disconnect":
+                    break
+                image = frame.get("bytes")
+                if image is None:
+                    await session.error(
+                        request_id, 400, "Expected a binary screenshot frame"
+                    )
+                    continue
+            await session.dispatch(
+                request_id, request["op"], request.get("params", {}), image
+            )
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await session.close()
+        logger.debug("Runner session closed (executor=%s)", executor_id)
@@ -5,6 +5,8 @@ from fastapi import APIRouter, Depends, HTTPException, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app_evaluation_agent.schemas.testcase import (
+    TestCaseBulkCreate,
+    TestCaseBulkUpdate,
     TestCaseCreate,
     TestCaseRead,
     TestCaseUpdate,
@@ -48,12 +50,43 @@ async def create_test_case(
             input_data=payload.input_data,
             execution_order=payload.execution_order,
             assigned_executor_id=payload.assigned_executor_id,
+            depends_on_ids=payload.depends_on_ids,
         )
         return case
     except ValueError as exc:
         raise HTTPException(status_code=400, detail=str(exc)) from exc
 
 
+@router.post("/bulk", response_model=list[TestCaseRead], status_code=201)
+async def create_test_cases_bulk(
+    payload: TestCaseBulkCreate, db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Create many test cases in one transaction (e.g. importing a regression
+    suite). Nothing is created if any case is invalid. `depends_on_ids` may
+    only reference existing cases; link cases of the same batch afterwards
+    with PATCH /bulk.
+    """
+    try:
+        return await testcase_service.create_test_cases_bulk(db, payload.cases)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
+@router.patch("/bulk", response_model=list[TestCaseRead])
+async def update_test_cases_bulk(
+    payload: TestCaseBulkUpdate, db: AsyncSession = Depends(get_db_session)
+):
+    """
+    Update many test cases in one transaction. Plans are checked for
+    completion once each.
+    """
+    try:
+        return await testcase_service.update_test_cases_bulk(db, payload.updates)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+
+
 @router.patch("/{case_id}", response_model=TestCaseRead)
 async def update_test_case(
     case_id: int, update: TestCaseUpdate, db: AsyncSession = Depends(get_db_session)
@@ -65,17 +98,21 @@ async def update_test_case(
     if isinstance(status, str):
         status = TestCaseStatus(status)
 
-    updated = await testcase_service.update_test_case(
-        db,
-        case_id=case_id,
-        status=status,
-        result_payload=update.result,
-        assigned_executor_id=update.assigned_executor_id,
-        name=update.name,
-        description=update.description,
-        input_data=update.input_data,
-        execution_order=update.execution_order,
-    )
+    try:
+        updated = await testcase_service.update_test_case(
+            db,
+            case_id=case_id,
+            status=status,
+            result_payload=update.result,
+            assigned_executor_id=update.assigned_executor_id,
+            name=update.name,
+            description=update.description,
+            input_data=update.input_data,
+            execution_order=update.execution_order,
+            depends_on_ids=update.depends_on_ids,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
     if not updated:
         raise HTTPException(status_code=404, detail="Test case not found")
     return updated
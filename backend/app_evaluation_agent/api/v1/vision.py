@@ -1,19 +1,52 @@
-import io
+import asyncio
 import json
 import logging
-from typing import Optional
+import struct
+import time
+from typing import Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, Form, HTTPException, UploadFile
+from fastapi import (
+    APIRouter,
+    Depends,
+    Form,
+    Header,
+    HTTPException,
+    Request,
+    Response,
+    UploadFile,
+)
 from pydantic import ValidationError
-from PIL import Image
+from PIL import ImageFile
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app_evaluation_agent.api.dependencies import get_optional_file
 from app_evaluation_agent.schemas.agent import AgentContext, VisionAnalysisResponse
+from app_evaluation_agent.services import live_events
 from app_evaluation_agent.services.agents.analyzer import AnalyzerAgent
+from app_evaluation_agent.services.blob_store import blob_store
+from app_evaluation_agent.services.executors import executor_registry
+from app_evaluation_agent.services.frame_cache import (
+    FRAME_ENCODING_DELTA,
+    FRAME_ENCODING_FULL,
+    FRAME_ENCODINGS,
+    StaleFrameError,
+    frame_cache,
+)
+from app_evaluation_agent.storage.database import get_db_session
+from app_evaluation_agent.utils.config import settings
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+# Body of /analyze/raw when the context travels in the body: a 4-byte
+# big-endian context length, the context JSON (UTF-8), then the image.
+RAW_FRAME_MEDIA_TYPE = "application/vnd.evalagent.analyze-frame"
+_FRAME_PREFIX = struct.Struct(">I")
+# Header probes for the image size are fed in chunks of this size.
+_PROBE_CHUNK = 16384
+
+ImageData = Union[bytes, memoryview]
+
 _IMAGE_KEYS = {
     "image",
     "image_bytes",
@@ -35,6 +68,45 @@ def _redact_images(payload: dict) -> dict:
     return out
 
 
+def _image_size(image_bytes: ImageData) -> Optional[Tuple[int, int]]:
+    """Width and height from the image header, without copying the buffer."""
+    parser = ImageFile.Parser()
+    view = memoryview(image_bytes)
+    try:
+        for offset in range(0, len(view), _PROBE_CHUNK):
+            parser.feed(view[offset : offset + _PROBE_CHUNK])
+            if parser.image is not None:
+                return parser.image.size
+    except Exception:  # noqa: BLE001
+        pass
+    return None
+
+
+def _parse_context(raw: Union[str, bytes]) -> AgentContext:
+    try:
+        context_data = json.loads(raw)
+        logger.debug(
+            "Received analyze request with context keys=%s",
+            list(context_data.keys()),
+        )
+        return AgentContext.model_validate(context_data)
+    except (ValueError, AttributeError, ValidationError) as e:
+        logger.warning("Context JSON validation failed: %s", e)
+        raise HTTPException(status_code=400, detail=f"Invalid context JSON: {e}")
+
+
+def _split_frame(view: memoryview) -> Tuple[bytes, memoryview]:
+    if len(view) < _FRAME_PREFIX.size:
+        raise HTTPException(status_code=400, detail="Frame is missing its prefix")
+    (context_length,) = _FRAME_PREFIX.unpack_from(view)
+    image_offset = _FRAME_PREFIX.size + context_length
+    if image_offset > len(view):
+        raise HTTPException(
+            status_code=400, detail="Frame context length exceeds the body"
+        )
+    return bytes(view[_FRAME_PREFIX.size : image_offset]), view[image_offset:]
+
+
 @router.post("/analyze", response_model=VisionAnalysisResponse)
 async def analyze_agent_context(
     context_json: str = Form(
@@ -42,43 +114,146 @@ async def analyze_agent_context(
         description="A JSON string representing the agent's current context (goal, history, etc.).",
     ),
     image: Optional[UploadFile] = Depends(get_optional_file),
+    executor_id: Optional[str] = Form(
+        None,
+        description="Runner reporting this step; used for fleet telemetry.",
+    ),
+    frame_encoding: str = Form(
+        FRAME_ENCODING_FULL,
+        description='"delta" if the image is a tile delta against the previous frame.',
+    ),
 ):
     """Receives the agent context + optional screenshot and returns LLM thought/action."""
-    try:
-        context_data = json.loads(context_json)
-        logger.debug(
-            "Received analyze request with context keys=%s image_supplied=%s",
-            list(context_data.keys()),
-            image is not None,
-        )
-        context = AgentContext.model_validate(context_data)
-    except (json.JSONDecodeError, ValidationError) as e:
-        logger.warning("Context JSON validation failed: %s", e)
-        raise HTTPException(status_code=400, detail=f"Invalid context JSON: {e}")
+    context = _parse_context(context_json)
 
     image_bytes = None
-    image_size = None
     if image:
         image_bytes = await image.read()
         logger.debug("Read %s bytes from uploaded image", len(image_bytes))
+    return await analyze_context(context, image_bytes, executor_id, frame_encoding)
+
+
+@router.post("/analyze/raw", response_model=VisionAnalysisResponse)
+async def analyze_agent_context_raw(
+    request: Request,
+    x_agent_context: Optional[str] = Header(
+        None,
+        description="AgentContext JSON (ASCII) when the body is just the image.",
+    ),
+    x_executor_id: Optional[str] = Header(
+        None, description="Runner reporting this step; used for fleet telemetry."
+    ),
+    x_frame_encoding: str = Header(
+        FRAME_ENCODING_FULL,
+        description='"delta" if the image is a tile delta against the previous frame.',
+    ),
+):
+    """
+    `/analyze` without multipart: the body is the raw screenshot with the
+    context in `X-Agent-Context`, or (with Content-Type
+    `application/vnd.evalagent.analyze-frame`) a length-prefixed context
+    followed by the screenshot. The body is read into one buffer and handed
+    to the analyzer as is, without temp files or re-encoding.
+    """
+    view = memoryview(await request.body())
+    media_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if media_type.lower() == RAW_FRAME_MEDIA_TYPE:
+        context_raw, image_bytes = _split_frame(view)
+    elif x_agent_context is not None:
+        context_raw, image_bytes = x_agent_context, view
+    else:
+        raise HTTPException(
+            status_code=400,
+            detail="Send the context in X-Agent-Context or as a framed body",
+        )
+    context = _parse_context(context_raw)
+    logger.debug("Read %s bytes of raw image body", len(image_bytes))
+    return await analyze_context(
+        context,
+        image_bytes if len(image_bytes) else None,
+        x_executor_id,
+        x_frame_encoding,
+    )
+
+
+async def analyze_context(
+    context: AgentContext,
+    image_bytes: Optional[ImageData],
+    executor_id: Optional[str] = None,
+    frame_encoding: str = FRAME_ENCODING_FULL,
+) -> VisionAnalysisResponse:
+    """
+    One analyze step: run the analyzer on a validated context and optional
+    screenshot, then record fleet telemetry. Shared by `/analyze`,
+    `/analyze/raw` and the runner WebSocket.
+
+    With `frame_encoding="delta"` the image is a tile delta against the
+    case's previous frame, rebuilt here; 409 means that frame is gone and
+    the runner should send a full one.
+
+    The screenshot is kept in the blob store while the analyzer runs; its
+    key is returned as `screenshot_hash`.
+    """
+    if frame_encoding not in FRAME_ENCODINGS:
+        raise HTTPException(
+            status_code=400, detail=f"Unknown frame encoding: {frame_encoding}"
+        )
+    if image_bytes is not None and frame_encoding == FRAME_ENCODING_DELTA:
         try:
-            with Image.open(io.BytesIO(image_bytes)) as img:
-                image_size = img.size
-        except Exception:
+            image_bytes = await asyncio.to_thread(
+                frame_cache.apply_delta, context.test_case_id, image_bytes
+            )
+        except StaleFrameError as exc:
+            raise HTTPException(status_code=409, detail=str(exc))
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=f"Invalid frame delta: {exc}")
+
+    image_size = None
+    if image_bytes is not None:
+        image_size = _image_size(image_bytes)
+        if image_size is None:
             logger.warning(
                 "Invalid image supplied to analyze endpoint (bytes=%s)",
                 len(image_bytes),
             )
             raise HTTPException(status_code=400, detail="Invalid image data")
+        if frame_encoding == FRAME_ENCODING_FULL:
+            frame_cache.store(context.test_case_id, image_bytes)
 
     logger.debug(
         "Analyze endpoint context payload: %s", _redact_images(context.model_dump())
     )
 
+    screenshot = None
+    if image_bytes is not None and settings.blobs.store_screenshots:
+        screenshot = asyncio.create_task(blob_store.store_screenshot(image_bytes))
+
     try:
+        started = time.perf_counter()
         result = await AnalyzerAgent.process_context_and_image(
             context=context, image_bytes=image_bytes, image_size=image_size
         )
+        latency_ms = (time.perf_counter() - started) * 1000
+        if screenshot is not None:
+            result.screenshot_hash = await screenshot
+        reporter = executor_id or executor_registry.executor_for_case(
+            context.test_case_id
+        )
+        if reporter:
+            await executor_registry.record_step(
+                reporter,
+                analyze_latency_ms=latency_ms,
+                test_case_id=context.test_case_id,
+                image_size=image_size,
+            )
+        live_events.schedule_analyze_step(
+            context.test_case_id,
+            reporter,
+            result.action.tool_name,
+            latency_ms,
+            step_index=len(context.action_history),
+            screenshot_hash=result.screenshot_hash,
+        )
         logger.debug(
             "Vision analysis completed; action=%s description=%s response=%s",
             result.action.tool_name,
@@ -91,3 +266,18 @@ async def analyze_agent_context(
         raise HTTPException(
             status_code=500, detail=f"An error occurred during VLLM processing: {e}"
         )
+
+
+@router.get("/screenshots/{digest}")
+async def get_screenshot(digest: str, db: AsyncSession = Depends(get_db_session)):
+    """A stored screenshot by its `screenshot_hash`."""
+    blob = await blob_store.open(db, digest)
+    if blob is None:
+        raise HTTPException(status_code=404, detail="Screenshot not found")
+    data, content_type = blob
+    return Response(
+        content=data,
+        media_type=content_type or "application/octet-stream",
+        # Content-addressed: the bytes behind a digest never change.
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
@@ -6,18 +6,31 @@ from arq import create_pool
 
 from app_evaluation_agent.api.v1 import evaluations as eval_api
 from app_evaluation_agent.api.v1 import events as events_api
+from app_evaluation_agent.api.v1 import executors as executors_api
 from app_evaluation_agent.api.v1 import apps as apps_api
 from app_evaluation_agent.api.v1 import bugs as bugs_api
 from app_evaluation_agent.api.v1 import vision as vision_api
 from app_evaluation_agent.api.v1 import logs as logs_api
+from app_evaluation_agent.api.v1 import purges as purges_api
+from app_evaluation_agent.api.v1 import runner as runner_api
 from app_evaluation_agent.api.v1 import testplans as testplans_api
 from app_evaluation_agent.api.v1 import testcases as testcases_api
 from app_evaluation_agent.logging_utils import configure_logging
+from app_evaluation_agent.realtime import evaluation_status_broadcaster
+from app_evaluation_agent.services.blob_store import blob_store
+from app_evaluation_agent.services.bug_stats import check_upsert_support
 from app_evaluation_agent.services.evaluations import (
     resume_pending_generations,
     resume_pending_summaries,
 )
-from app_evaluation_agent.worker import WorkerSettings, arq_pool
+from app_evaluation_agent.services.executors import executor_registry
+from app_evaluation_agent.services.purge import resume_pending_purges
+from app_evaluation_agent.services.ready_queue import ready_queue
+from app_evaluation_agent.services.triage import resume_pending_triage, triage_queue
+from app_evaluation_agent.storage.database import AsyncSessionLocal, engine
+from app_evaluation_agent.utils.config import settings
+from app_evaluation_agent import worker
+from app_evaluation_agent.worker import WorkerSettings
 
 # Configure log persistence for uvicorn/FastAPI early in the import cycle.
 configure_logging()
@@ -26,12 +39,19 @@ logger = logging.getLogger(__name__)
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # On startup, create the Redis connection pool
-    global arq_pool
+    # Bug stats, triage and blobs rely on dialect upserts; refuse to start
+    # on a database without them instead of failing on the first write.
+    check_upsert_support(engine.dialect.name)
+
+    # On startup, create the Redis connection pool. It is stored on the worker
+    # module so services can enqueue jobs through it.
     logger.debug("Creating Redis connection pool for ARQ worker")
-    arq_pool = await create_pool(WorkerSettings.redis_settings)
+    worker.arq_pool = await create_pool(WorkerSettings.redis_settings)
     logger.info("Redis connection pool created for ARQ worker")
 
+    # Receive status/telemetry events published by other processes
+    await evaluation_status_broadcaster.start()
+
     # Resume any evaluations that were left in SUMMARIZING
     try:
         await resume_pending_summaries()
@@ -44,10 +64,55 @@ async def lifespan(app: FastAPI):
     except Exception:
         logger.exception("Failed to resume pending generations on startup")
 
+    # Mirror pending test cases in memory for /testcases/next
+    if settings.scheduling.ready_queue:
+        try:
+            async with AsyncSessionLocal() as db:
+                await ready_queue.rebuild(db)
+        except Exception:
+            logger.exception("Failed to build the test case ready queue on startup")
+
+    # Restore last known executor telemetry and start the periodic flush
+    try:
+        async with AsyncSessionLocal() as db:
+            await executor_registry.load(db)
+    except Exception:
+        logger.exception("Failed to load executor telemetry on startup")
+    executor_registry.start(AsyncSessionLocal)
+
+    # Refuse to start with screenshots on but no usable blob store, and
+    # delete stored screenshots no bug references once their TTL has passed
+    if settings.blobs.store_screenshots:
+        blob_store.check_backend()
+    blob_store.start(AsyncSessionLocal)
+
+    # Run bug triage off the request path and pick up unfinished jobs
+    if settings.triage.backend != "arq":
+        triage_queue.start(AsyncSessionLocal)
+    try:
+        async with AsyncSessionLocal() as db:
+            await resume_pending_triage(db)
+    except Exception:
+        logger.exception("Failed to resume bug triage jobs on startup")
+
+    # Finish app/version deletions interrupted by the last shutdown
+    try:
+        async with AsyncSessionLocal() as db:
+            await resume_pending_purges(db)
+    except Exception:
+        logger.exception("Failed to resume purge jobs on startup")
+
     yield
+    await triage_queue.stop()
+    await blob_store.stop()
+    await evaluation_status_broadcaster.stop()
+    try:
+        await executor_registry.stop(AsyncSessionLocal)
+    except Exception:
+        logger.exception("Failed to flush executor telemetry on shutdown")
     # On shutdown, close the pool
     logger.debug("Shutting down Redis connection pool for ARQ worker")
-    await arq_pool.close()
+    await worker.arq_pool.close()
     logger.info("Redis connection pool closed")
 
 
@@ -65,9 +130,20 @@ app.include_router(eval_api.router, prefix="/api/v1/evaluations", tags=["Evaluat
 # Include the log export router
 app.include_router(logs_api.router, prefix="/api/v1/logs", tags=["Logs"])
 
+# Include the purge job router
+app.include_router(purges_api.router, prefix="/api/v1/purges", tags=["Purges"])
+
 # Include the events router
 app.include_router(events_api.router, prefix="/api/v1/events", tags=["Events"])
 
+# Include the runner session router (WebSocket RPC for the runner hot loop)
+app.include_router(runner_api.router, prefix="/api/v1/runner", tags=["Runner"])
+
+# Include the executor fleet router
+app.include_router(
+    executors_api.router, prefix="/api/v1/executors", tags=["Executors"]
+)
+
 # Include test plan router
 app.include_router(
     testplans_api.router, prefix="/api/v1/testplans", tags=["Test Plans"]
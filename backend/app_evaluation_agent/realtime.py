@@ -1,46 +1,871 @@
 import asyncio
+import bisect
+import json
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, Set
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
 
+import redis.asyncio as aioredis
 from fastapi import WebSocket
 
 from app_evaluation_agent.storage.models import EvaluationStatus
+from app_evaluation_agent.utils.config import settings
 
 import logging
 
 logger = logging.getLogger(__name__)
 
 CHANNEL_EVALUATION_STATUS = "evaluation.status"
+CHANNEL_EXECUTOR_TELEMETRY = "executor.telemetry"
+# Channels scoped to one evaluation, or to every evaluation of an app.
+CHANNEL_TEST_CASE_STATUS = "testcase.status"
+CHANNEL_ANALYZE_STEP = "analyze.step"
+CHANNEL_BUGS = "bugs"
+SCOPED_CHANNELS = {CHANNEL_TEST_CASE_STATUS, CHANNEL_ANALYZE_STEP, CHANNEL_BUGS}
+JOURNALED_CHANNELS = (CHANNEL_EVALUATION_STATUS, *sorted(SCOPED_CHANNELS))
 TERMINAL_STATUSES = {EvaluationStatus.COMPLETED, EvaluationStatus.FAILED}
+TERMINAL_STATUS_VALUES = {status.value for status in TERMINAL_STATUSES}
+
+# Evaluations whose last status event is remembered for new SSE streams.
+LATEST_STATUS_CAPACITY = 4096
+# Evaluations whose recent events are kept in memory for replay.
+JOURNAL_EVALUATIONS = 1024
+
+
+class StreamSubscriber:
+    """
+    Subscriber for in-process consumers such as SSE streams. Plugs into the
+    broadcaster like a WebSocket; payloads land in a bounded queue, and when
+    the consumer falls behind the oldest queued payload is dropped (status
+    events are state, so the latest one is what matters).
+    """
+
+    def __init__(self, maxsize: int = 32) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+
+    async def send_json(self, payload: dict) -> None:
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(payload)
+
+
+Deliver = Callable[[dict], Awaitable[None]]
+
+
+def scoped_topic(
+    channel: str, evaluation_id: Optional[int] = None, app_id: Optional[int] = None
+) -> str:
+    """Subscription key of a scoped channel for one evaluation or a whole app."""
+    if evaluation_id is not None:
+        return f"{channel}:evaluation:{evaluation_id}"
+    return f"{channel}:app:{app_id}"
+
+
+def _coalesce_key(payload: dict) -> Optional[tuple]:
+    """Payloads with the same key describe the same thing; the newest wins."""
+    if payload.get("type") == "status":
+        return ("status", payload.get("evaluation_id"))
+    if payload.get("type") == "executor":
+        return ("executor", (payload.get("executor") or {}).get("executor_id"))
+    if payload.get("type") == "testcase":
+        return ("testcase", payload.get("test_case_id"))
+    return None
+
+
+def _journal_key(event: dict) -> Optional[int]:
+    """The evaluation whose journal an event belongs to, if any."""
+    if event.get("evaluation_id") is not None:
+        return event["evaluation_id"]
+    if event.get("topics"):
+        return event["payload"].get("evaluation_id")
+    return None
+
+
+def _close_payload(evaluation_id: int) -> dict:
+    return {
+        "type": "close",
+        "channel": CHANNEL_EVALUATION_STATUS,
+        "evaluation_id": evaluation_id,
+    }
+
+
+class _Connection:
+    """
+    The outbound side of one subscriber: a bounded queue drained by its own
+    writer task, so a broadcast only enqueues and a slow client delays
+    nobody else. A queued payload describing the same thing as a new one
+    (an evaluation's status, an executor's telemetry) is replaced by it;
+    past `maxsize` the oldest payload is dropped. A send that fails or
+    exceeds `send_timeout` drops the subscriber.
+
+    `min_intervals` caps the status rate per evaluation: a status arriving
+    sooner is held back and queued when the interval is up, replaced by
+    any newer one meanwhile. Terminal statuses are never held back.
+    """
+
+    def __init__(
+        self,
+        subscriber: Any,
+        maxsize: int,
+        send_timeout: float,
+        on_failure: Callable[[Any], Awaitable[None]],
+    ) -> None:
+        self.subscriber = subscriber
+        self.evaluation_ids: Set[int] = set()
+        self.channels: Set[str] = set()
+        self.min_intervals: Dict[int, float] = {}
+        self.dropped = 0
+        self._last_status_at: Dict[int, float] = {}
+        self._held: Dict[int, dict] = {}
+        self._release_timers: Dict[int, asyncio.TimerHandle] = {}
+        self._pending: Deque[dict] = deque()
+        self._maxsize = max(1, maxsize)
+        self._send_timeout = send_timeout
+        self._on_failure = on_failure
+        self._wakeup = asyncio.Event()
+        self._closed = False
+        self._task = asyncio.create_task(self._drain())
+
+    @property
+    def idle(self) -> bool:
+        return not self.evaluation_ids and not self.channels
+
+    def enqueue(self, payload: dict) -> None:
+        if self._hold(payload):
+            return
+        self._queue(payload)
+
+    def _queue(self, payload: dict) -> None:
+        if not self._supersede(payload) and len(self._pending) >= self._maxsize:
+            self._pending.popleft()
+            self.dropped += 1
+        self._pending.append(payload)
+        self._wakeup.set()
+
+    def replay(self, payloads: List[dict]) -> None:
+        """Queue missed payloads; unlike live ones they are not capped."""
+        for payload in payloads:
+            self._supersede(payload)
+            self._pending.append(payload)
+        if payloads:
+            self._wakeup.set()
+
+    def _hold(self, payload: dict) -> bool:
+        if payload.get("type") != "status":
+            return False
+        evaluation_id = payload["evaluation_id"]
+        interval = self.min_intervals.get(evaluation_id)
+        if not interval:
+            return False
+        if self._held.pop(evaluation_id, None) is not None:
+            self.dropped += 1
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        if payload["status"] in TERMINAL_STATUS_VALUES:
+            self._cancel_release(evaluation_id)
+            self._last_status_at[evaluation_id] = now
+            return False
+        if evaluation_id in self._release_timers:
+            self._held[evaluation_id] = payload
+            return True
+        wait = self._last_status_at.get(evaluation_id, now - interval) + interval - now
+        if wait <= 0:
+            self._last_status_at[evaluation_id] = now
+            return False
+        self._held[evaluation_id] = payload
+        self._release_timers[evaluation_id] = loop.call_later(
+            wait, self._release, evaluation_id
+        )
+        return True
+
+    def _release(self, evaluation_id: int) -> None:
+        self._release_timers.pop(evaluation_id, None)
+        payload = self._held.pop(evaluation_id, None)
+        if payload is None or self._closed:
+            return
+        self._last_status_at[evaluation_id] = asyncio.get_running_loop().time()
+        self._queue(payload)
+
+    def _cancel_release(self, evaluation_id: int) -> None:
+        timer = self._release_timers.pop(evaluation_id, None)
+        if timer is not None:
+            timer.cancel()
+
+    def forget(self, evaluation_id: int) -> None:
+        """Drop the rate limit (and any held status) of an evaluation."""
+        self.min_intervals.pop(evaluation_id, None)
+        self._last_status_at.pop(evaluation_id, None)
+        self._held.pop(evaluation_id, None)
+        self._cancel_release(evaluation_id)
+
+    def _supersede(self, payload: dict) -> bool:
+        key = _coalesce_key(payload)
+        if key is None or not self._pending:
+            return False
+        superseded = next(
+            (item for item in self._pending if _coalesce_key(item) == key), None
+        )
+        if superseded is None:
+            return False
+        self._pending.remove(superseded)
+        self.dropped += 1
+        return True
+
+    async def _drain(self) -> None:
+        while not self._closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending and not self._closed:
+                payload = self._pending.popleft()
+                try:
+                    await asyncio.wait_for(
+                        self.subscriber.send_json(payload), self._send_timeout
+                    )
+                except Exception:  # noqa: BLE001
+                    logger.debug("Dropping subscriber after failed send", exc_info=True)
+                    await self._on_failure(self.subscriber)
+                    return
+                logger.debug("WebSocket sent: %s", payload)
+
+    def close(self) -> asyncio.Task:
+        # The flag also stops the loop if wait_for swallows the cancellation.
+        self._closed = True
+        self._pending.clear()
+        for evaluation_id in list(self._release_timers):
+            self._cancel_release(evaluation_id)
+        self._held.clear()
+        self._wakeup.set()
+        if self._task is not asyncio.current_task():
+            self._task.cancel()
+        return self._task
+
+
+class LocalBroadcastBackend:
+    """Events reach the subscribers of this process only."""
+
+    async def start(self, deliver: Deliver) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def publish(self, event: dict) -> bool:
+        # Nothing is sent elsewhere; the broadcaster delivers locally.
+        return False
+
+
+class RedisBroadcastBackend:
+    """
+    Fans events out to every process through one Redis pub/sub channel.
+
+    Publishing is a single PUBLISH. Processes that called `start` (the API
+    workers) run a listener that hands each received event to their local
+    subscribers, including events they published themselves. A process that
+    is not listening, such as the arq worker, or that cannot reach Redis,
+    delivers its own events locally instead. Pub/sub is fire-and-forget:
+    events published while a listener reconnects are not replayed.
+    """
+
+    def __init__(
+        self,
+        channel: str,
+        client: Optional[aioredis.Redis] = None,
+        reconnect_max_seconds: float = 30.0,
+    ) -> None:
+        self.channel = channel
+        self._client = client
+        self._reconnect_max_seconds = reconnect_max_seconds
+        self._deliver: Optional[Deliver] = None
+        self._listener: Optional[asyncio.Task] = None
+        self._subscribed = asyncio.Event()
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            self._client = aioredis.Redis(
+                host=settings.redis.host, port=settings.redis.port
+            )
+        return self._client
+
+    async def start(self, deliver: Deliver) -> None:
+        if self._listener is not None:
+            return
+        self._deliver = deliver
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        self._subscribed.clear()
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def wait_until_subscribed(self, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._subscribed.wait(), timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def publish(self, event: dict) -> bool:
+        try:
+            await self.client.publish(self.channel, json.dumps(event))
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to publish realtime event to Redis")
+            return False
+        return self._subscribed.is_set()
+
+    async def _listen(self) -> None:
+        delay = 1.0
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                self._subscribed.set()
+                delay = 1.0
+                logger.info("Listening for realtime events on %s", self.channel)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        event = json.loads(message["data"])
+                        await self._deliver(event)
+                    except Exception:  # noqa: BLE001
+                        logger.exception("Failed to deliver realtime event")
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # noqa: BLE001
+                logger.exception(
+                    "Realtime listener lost Redis; retrying in %.0fs", delay
+                )
+            finally:
+                self._subscribed.clear()
+                try:
+                    await pubsub.aclose()
+                except Exception:  # noqa: BLE001
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._reconnect_max_seconds)
+
+
+def backend_from_settings():
+    if settings.realtime.backend == "redis":
+        return RedisBroadcastBackend(settings.realtime.redis_channel)
+    return LocalBroadcastBackend()
+
+
+class _EvaluationLog:
+    """
+    One evaluation's journaled events, bounded per channel so a busy
+    channel (analyze steps) cannot push out a quiet one's (status).
+    """
+
+    __slots__ = ("size", "events", "dropped", "last_seq")
+
+    def __init__(self, size: int) -> None:
+        self.size = size
+        self.events: Dict[str, Deque[dict]] = {}
+        # Per channel, the newest seq evicted to respect `size`.
+        self.dropped: Dict[str, int] = {}
+        self.last_seq = 0
+
+    def add(self, payload: dict) -> None:
+        seq, channel = payload["seq"], payload.get("channel")
+        events = self.events.setdefault(channel, deque())
+        if events and events[-1]["seq"] > seq:
+            # Numbered in Redis but delivered out of order by another publisher.
+            index = bisect.bisect([item["seq"] for item in events], seq)
+            events.insert(index, payload)
+        else:
+            events.append(payload)
+        self.last_seq = max(self.last_seq, seq)
+        while len(events) > self.size:
+            evicted = events.popleft()["seq"]
+            self.dropped[channel] = max(self.dropped.get(channel, 0), evicted)
+
+    def since(self, seq: int, channel: str) -> Optional[List[dict]]:
+        if self.dropped.get(channel, 0) > seq:
+            return None
+        events = self.events.get(channel, ())
+        return [payload for payload in events if payload["seq"] > seq]
+
+
+class RedisJournalStream:
+    """
+    Journal storage shared by every process: a counter per evaluation and
+    a capped stream per evaluation and channel. All of them expire
+    `ttl_seconds` after the evaluation's last event.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        size: int,
+        ttl_seconds: int,
+        client: Optional[aioredis.Redis] = None,
+    ) -> None:
+        self.prefix = prefix
+        self.size = size
+        self.ttl_seconds = ttl_seconds
+        self._client = client
+
+    @property
+    def client(self) -> aioredis.Redis:
+        if self._client is None:
+            self._client = aioredis.Redis(
+                host=settings.redis.host, port=settings.redis.port
+            )
+        return self._client
+
+    def _seq_key(self, evaluation_id: int) -> str:
+        return f"{self.prefix}:{evaluation_id}:seq"
+
+    def _stream_key(self, evaluation_id: int, channel: str) -> str:
+        return f"{self.prefix}:{evaluation_id}:events:{channel}"
+
+    async def append(self, evaluation_id: int, payload: dict) -> dict:
+        seq_key = self._seq_key(evaluation_id)
+        payload = {**payload, "seq": await self.client.incr(seq_key)}
+        pipe = self.client.pipeline(transaction=False)
+        pipe.xadd(
+            self._stream_key(evaluation_id, payload.get("channel")),
+            {"payload": json.dumps(payload)},
+            maxlen=self.size,
+            approximate=True,
+        )
+        # Every key of the evaluation expires together, so a quiet channel's
+        # stream never disappears while the counter lives on.
+        pipe.expire(seq_key, self.ttl_seconds)
+        for channel in JOURNALED_CHANNELS:
+            pipe.expire(self._stream_key(evaluation_id, channel), self.ttl_seconds)
+        await pipe.execute()
+        return payload
+
+    async def since(
+        self, evaluation_id: int, seq: int, channel: str
+    ) -> Optional[List[dict]]:
+        last = int(await self.client.get(self._seq_key(evaluation_id)) or 0)
+        if seq > last:
+            return None
+        if seq == last:
+            return []
+        events = sorted(
+            (
+                json.loads(fields.get(b"payload") or fields["payload"])
+                for _, fields in await self.client.xrange(
+                    self._stream_key(evaluation_id, channel)
+                )
+            ),
+            key=lambda item: item["seq"],
+        )
+        # Only a full stream can have been trimmed; then a gap before its
+        # oldest event may hide dropped events of this channel.
+        if len(events) >= self.size and events[0]["seq"] > seq + 1:
+            return None
+        return [event for event in events if event["seq"] > seq]
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class EventJournal:
+    """
+    Bounded, append-only log of evaluation-scoped events (status, test case,
+    step and bug events) so a client that reconnects can ask for what it
+    missed (`since=<seq>`) instead of reloading the evaluation. The events
+    of one evaluation share one sequence across channels.
+
+    The last `size` events per channel of the `evaluations` most recently
+    active evaluations are kept in memory, numbered as they are delivered.
+    Bounding each channel separately keeps a stream of analyze steps from
+    evicting the status events a reconnecting client needs. With a
+    `store`, numbers are allocated in Redis when an event is published, so
+    every process agrees on them, and replays reach back past what this
+    process has seen.
+    """
+
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        evaluations: int = JOURNAL_EVALUATIONS,
+        store: Optional[RedisJournalStream] = None,
+    ) -> None:
+        self._size = max(1, size or settings.realtime.journal_size)
+        self._evaluations = evaluations
+        self._store = store
+        self._logs: "OrderedDict[int, _EvaluationLog]" = OrderedDict()
+
+    def clear(self) -> None:
+        self._logs.clear()
+
+    def last_seq(self, evaluation_id: int) -> int:
+        log = self._logs.get(evaluation_id)
+        return log.last_seq if log else 0
+
+    async def sequence(self, evaluation_id: int, payload: dict) -> dict:
+        """Number an event before it is published (only with a store)."""
+        if self._store is None:
+            return payload
+        try:
+            return await self._store.append(evaluation_id, payload)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to append realtime event to the journal")
+            return payload
+
+    def record(self, evaluation_id: int, payload: dict) -> dict:
+        """Keep a delivered event, numbering it if it was not numbered yet."""
+        log = self._logs.pop(evaluation_id, None) or _EvaluationLog(self._size)
+        self._logs[evaluation_id] = log
+        while len(self._logs) > self._evaluations:
+            self._logs.popitem(last=False)
+        if "seq" not in payload:
+            payload = {**payload, "seq": log.last_seq + 1}
+        log.add(payload)
+        return payload
+
+    def recorded_since(
+        self, evaluation_id: int, seq: int, channel: str
+    ) -> Optional[List[dict]]:
+        """
+        `channel` events after `seq` held in memory; None if some are no
+        longer held.
+        """
+        log = self._logs.get(evaluation_id)
+        last = log.last_seq if log else 0
+        if seq > last:
+            # Numbering restarted (or the evaluation was evicted).
+            return None
+        if seq == last:
+            return []
+        return log.since(seq, channel)
+
+    async def since(
+        self, evaluation_id: int, seq: int, channel: str
+    ) -> Optional[List[dict]]:
+        """
+        `channel` events after `seq`, or None if the journal no longer has
+        them all.
+        """
+        events = self.recorded_since(evaluation_id, seq, channel)
+        if events is not None or self._store is None:
+            return events
+        try:
+            return await self._store.since(evaluation_id, seq, channel)
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to read the realtime journal from Redis")
+            return None
+
+    async def close(self) -> None:
+        if self._store is not None:
+            await self._store.close()
+
+
+def journal_from_settings() -> EventJournal:
+    store = None
+    if settings.realtime.journal_stream:
+        store = RedisJournalStream(
+            f"{settings.realtime.redis_channel}:journal",
+            settings.realtime.journal_size,
+            settings.realtime.journal_ttl_seconds,
+        )
+    return EventJournal(store=store)
 
 
 class EvaluationStatusBroadcaster:
-    def __init__(self) -> None:
-        self._subscriptions: Dict[int, Set[WebSocket]] = {}
+    def __init__(
+        self,
+        backend=None,
+        send_queue_size: Optional[int] = None,
+        send_timeout_seconds: Optional[float] = None,
+        journal: Optional[EventJournal] = None,
+        status_debounce_seconds: Optional[float] = None,
+    ) -> None:
+        self._backend = backend or LocalBroadcastBackend()
+        self._journal = journal or EventJournal()
+        self._debounce = (
+            settings.realtime.status_debounce_seconds
+            if status_debounce_seconds is None
+            else status_debounce_seconds
+        )
+        # Debounced statuses waiting for their window to close (`notify_status`).
+        self._pending_statuses: Dict[int, Tuple[Any, Optional[datetime]]] = {}
+        self._debounce_timers: Dict[
+            int, Tuple[asyncio.AbstractEventLoop, asyncio.TimerHandle]
+        ] = {}
+        self._flushing: Set[asyncio.Task] = set()
+        self._send_queue_size = send_queue_size or settings.realtime.send_queue_size
+        self._send_timeout = (
+            send_timeout_seconds or settings.realtime.send_timeout_seconds
+        )
+        self._subscriptions: Dict[int, Set[_Connection]] = {}
+        # Fleet-wide channels that are not scoped to an evaluation.
+        self._channel_subscriptions: Dict[str, Set[_Connection]] = {}
+        # Reverse index: subscriber -> its connection and subscriptions.
+        self._connections: Dict[Any, _Connection] = {}
+        # Writer tasks cancelled but not finished yet (awaited by `stop`).
+        self._closing: Set[asyncio.Task] = set()
+        # Last status payload per evaluation (LRU), carrying its journal `seq`
+        # that SSE uses as the event ID.
+        self._latest: "OrderedDict[int, dict]" = OrderedDict()
         self._lock = asyncio.Lock()
 
-    async def subscribe(self, websocket: WebSocket, evaluation_id: int) -> None:
+    async def start(self) -> None:
+        await self._backend.start(self.deliver)
+
+    async def stop(self) -> None:
+        await self.flush_statuses()
+        await self._backend.stop()
+        async with self._lock:
+            connections = list(self._connections.values())
+            self._connections.clear()
+            self._subscriptions.clear()
+            self._channel_subscriptions.clear()
+        for connection in connections:
+            self._close(connection)
+        await asyncio.gather(*self._closing, return_exceptions=True)
+        await self._journal.close()
+
+    def _close(self, connection: _Connection) -> None:
+        task = connection.close()
+        if not task.done():
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    def latest_status(self, evaluation_id: int) -> Optional[dict]:
+        """The last status payload published for the evaluation, if known."""
+        return self._latest.get(evaluation_id)
+
+    def forget_status(self, evaluation_id: int) -> None:
+        """Drop the remembered status, e.g. once the evaluation is deleted."""
+        self._latest.pop(evaluation_id, None)
+
+    def last_seq(self, evaluation_id: int) -> int:
+        """Sequence number of the evaluation's newest journaled event (0: none)."""
+        return self._journal.last_seq(evaluation_id)
+
+    def _remember(self, evaluation_id: int, payload: dict) -> None:
+        previous = self._latest.pop(evaluation_id, None)
+        if previous is not None and previous["seq"] > payload["seq"]:
+            payload = previous
+        self._latest[evaluation_id] = payload
+        while len(self._latest) > LATEST_STATUS_CAPACITY:
+            self._latest.popitem(last=False)
+
+    def _connection(self, websocket: WebSocket) -> _Connection:
+        connection = self._connections.get(websocket)
+        if connection is None:
+            connection = _Connection(
+                websocket, self._send_queue_size, self._send_timeout, self.remove
+            )
+            self._connections[websocket] = connection
+        return connection
+
+    def _release_if_idle(self, connection: _Connection) -> None:
+        if connection.idle:
+            self._connections.pop(connection.subscriber, None)
+            self._close(connection)
+
+    async def subscribe(
+        self,
+        websocket: WebSocket,
+        evaluation_id: int,
+        since: Optional[int] = None,
+        max_rate: Optional[float] = None,
+        ack: Optional[dict] = None,
+        resync: Optional[dict] = None,
+    ) -> bool:
+        """
+        Subscribe to an evaluation's status events. With `since`, the status
+        events journaled after that `seq` are sent first; returns False if
+        the journal no longer has all of them (the client should reload).
+        `max_rate` caps status updates per second for this subscriber.
+
+        `ack` is sent before anything else, and `resync` instead of the
+        replay when it is incomplete. Both go through the subscriber's queue,
+        so live events can never overtake them.
+        """
+        backlog = await self._backlog(evaluation_id, since, CHANNEL_EVALUATION_STATUS)
         async with self._lock:
-            self._subscriptions.setdefault(evaluation_id, set()).add(websocket)
+            connection = self._connection(websocket)
+            connection.evaluation_ids.add(evaluation_id)
+            if max_rate and max_rate > 0:
+                connection.min_intervals[evaluation_id] = 1 / max_rate
+            else:
+                connection.forget(evaluation_id)
+            self._subscriptions.setdefault(evaluation_id, set()).add(connection)
+            return self._replay(
+                connection,
+                evaluation_id,
+                since,
+                backlog,
+                CHANNEL_EVALUATION_STATUS,
+                ack,
+                resync,
+            )
 
     async def unsubscribe(self, websocket: WebSocket, evaluation_id: int) -> None:
         async with self._lock:
-            subscribers = self._subscriptions.get(evaluation_id)
-            if not subscribers:
+            connection = self._connections.get(websocket)
+            if connection is None or evaluation_id not in connection.evaluation_ids:
+                return
+            connection.evaluation_ids.discard(evaluation_id)
+            connection.forget(evaluation_id)
+            self._discard(self._subscriptions, evaluation_id, connection)
+            self._release_if_idle(connection)
+
+    async def subscribe_channel(self, websocket: WebSocket, channel: str) -> None:
+        async with self._lock:
+            connection = self._connection(websocket)
+            connection.channels.add(channel)
+            self._channel_subscriptions.setdefault(channel, set()).add(connection)
+
+    async def unsubscribe_channel(self, websocket: WebSocket, channel: str) -> None:
+        async with self._lock:
+            connection = self._connections.get(websocket)
+            if connection is None or channel not in connection.channels:
                 return
-            subscribers.discard(websocket)
-            if not subscribers:
-                self._subscriptions.pop(evaluation_id, None)
+            connection.channels.discard(channel)
+            self._discard(self._channel_subscriptions, channel, connection)
+            self._release_if_idle(connection)
+
+    async def subscribe_scoped(
+        self,
+        websocket: WebSocket,
+        channel: str,
+        evaluation_id: Optional[int] = None,
+        app_id: Optional[int] = None,
+        since: Optional[int] = None,
+        ack: Optional[dict] = None,
+        resync: Optional[dict] = None,
+    ) -> bool:
+        """
+        Subscribe to a scoped channel for one evaluation or a whole app. Like
+        `subscribe`, `since` replays journaled events first (after `ack`);
+        only evaluation scopes are journaled, so an app scope with `since`
+        returns False.
+        """
+        topic = scoped_topic(channel, evaluation_id=evaluation_id, app_id=app_id)
+        backlog = None
+        if evaluation_id is not None:
+            backlog = await self._backlog(evaluation_id, since, channel)
+        async with self._lock:
+            connection = self._connection(websocket)
+            connection.channels.add(topic)
+            self._channel_subscriptions.setdefault(topic, set()).add(connection)
+            return self._replay(
+                connection, evaluation_id, since, backlog, channel, ack, resync
+            )
+
+    async def unsubscribe_scoped(
+        self,
+        websocket: WebSocket,
+        channel: str,
+        evaluation_id: Optional[int] = None,
+        app_id: Optional[int] = None,
+    ) -> None:
+        await self.unsubscribe_channel(
+            websocket, scoped_topic(channel, evaluation_id=evaluation_id, app_id=app_id)
+        )
+
+    async def _backlog(
+        self, evaluation_id: int, since: Optional[int], channel: str
+    ) -> Optional[List[dict]]:
+        # Read before taking the lock: this may be a Redis round trip.
+        if since is None:
+            return None
+        return await self._journal.since(evaluation_id, since, channel)
+
+    def _replay(
+        self,
+        connection: _Connection,
+        evaluation_id: Optional[int],
+        since: Optional[int],
+        backlog: Optional[List[dict]],
+        channel: str,
+        ack: Optional[dict] = None,
+        resync: Optional[dict] = None,
+    ) -> bool:
+        """
+        Queue `ack`, then the journaled `channel` events after `since`, or
+        `resync` if the journal no longer has them all. Runs under the lock
+        right after subscribing, so live events queue up behind them.
+        """
+        if ack is not None:
+            connection.replay([ack])
+        if since is None:
+            return True
+        if backlog is None:
+            if resync is not None:
+                connection.replay([resync])
+            return False
+        # Events delivered while the backlog was being read.
+        after = backlog[-1]["seq"] if backlog else since
+        events = backlog + (
+            self._journal.recorded_since(evaluation_id, after, channel) or []
+        )
+        if (
+            channel == CHANNEL_EVALUATION_STATUS
+            and events
+            and events[-1]["status"] in TERMINAL_STATUS_VALUES
+        ):
+            events.append(_close_payload(evaluation_id))
+        connection.replay(events)
+        return True
+
+    async def publish_channel(self, channel: str, payload: dict) -> None:
+        await self._publish({"channel": channel, "payload": payload})
+
+    async def publish_scoped(
+        self,
+        channel: str,
+        payload: dict,
+        evaluation_id: Optional[int] = None,
+        app_id: Optional[int] = None,
+    ) -> None:
+        """
+        Publish on a scoped channel to subscribers of the evaluation and to
+        app-wide subscribers; a client subscribed to both receives it once.
+        """
+        topics = []
+        if evaluation_id is not None:
+            topics.append(scoped_topic(channel, evaluation_id=evaluation_id))
+        if app_id is not None:
+            topics.append(scoped_topic(channel, app_id=app_id))
+        if not topics:
+            return
+        payload = {**payload, "evaluation_id": evaluation_id, "app_id": app_id}
+        await self._publish({"channel": channel, "topics": topics, "payload": payload})
 
     async def remove(self, websocket: WebSocket) -> None:
+        """Drop every subscription of `websocket`; cost is its own count."""
         async with self._lock:
-            for evaluation_id in list(self._subscriptions.keys()):
-                subscribers = self._subscriptions.get(evaluation_id)
-                if not subscribers:
-                    continue
-                subscribers.discard(websocket)
-                if not subscribers:
-                    self._subscriptions.pop(evaluation_id, None)
+            connection = self._connections.pop(websocket, None)
+            if connection is None:
+                return
+            for evaluation_id in connection.evaluation_ids:
+                self._discard(self._subscriptions, evaluation_id, connection)
+            for channel in connection.channels:
+                self._discard(self._channel_subscriptions, channel, connection)
+            connection.evaluation_ids.clear()
+            connection.channels.clear()
+            self._close(connection)
+
+    @staticmethod
+    def _discard(index: dict, key, connection: _Connection) -> None:
+        connections = index.get(key)
+        if not connections:
+            return
+        connections.discard(connection)
+        if not connections:
+            index.pop(key, None)
 
     async def publish_status(
         self,
@@ -57,51 +882,118 @@ class EvaluationStatusBroadcaster:
         }
         if updated_at is not None:
             payload["updated_at"] = updated_at.isoformat()
-        await self._broadcast(evaluation_id, payload)
-        if status in TERMINAL_STATUSES or status_value in {
-            s.value for s in TERMINAL_STATUSES
-        }:
-            await self._broadcast(
-                evaluation_id,
-                {
-                    "type": "close",
-                    "channel": CHANNEL_EVALUATION_STATUS,
-                    "evaluation_id": evaluation_id,
-                },
-            )
+        await self._publish({"evaluation_id": evaluation_id, "payload": payload})
 
-    async def _broadcast(self, evaluation_id: int, payload: dict) -> None:
-        async with self._lock:
-            subscribers = list(self._subscriptions.get(evaluation_id, set()))
+    async def notify_status(
+        self,
+        evaluation_id: int,
+        status: EvaluationStatus | str,
+        updated_at: datetime | None = None,
+    ) -> None:
+        """
+        Debounced `publish_status`: statuses notified within the debounce
+        window of the first one are merged and only the latest is published
+        when the window closes. Terminal statuses are published at once
+        (superseding anything pending), so closing is never delayed.
+        """
+        status_value = getattr(status, "value", status)
+        if self._debounce <= 0 or status_value in TERMINAL_STATUS_VALUES:
+            self._pending_statuses.pop(evaluation_id, None)
+            self._cancel_debounce(evaluation_id)
+            await self.publish_status(evaluation_id, status, updated_at)
+            return
+        loop = asyncio.get_running_loop()
+        self._pending_statuses[evaluation_id] = (status, updated_at)
+        timer = self._debounce_timers.get(evaluation_id)
+        # A timer left behind on another (closed) loop will never fire.
+        if timer is None or timer[0] is not loop:
+            self._debounce_timers[evaluation_id] = (
+                loop,
+                loop.call_later(self._debounce, self._flush_status, evaluation_id),
+            )
 
-        if not subscribers:
+    def _flush_status(self, evaluation_id: int) -> None:
+        self._debounce_timers.pop(evaluation_id, None)
+        pending = self._pending_statuses.pop(evaluation_id, None)
+        if pending is None:
             return
+        task = asyncio.create_task(self.publish_status(evaluation_id, *pending))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
 
-        stale: list[WebSocket] = []
-        for websocket in subscribers:
-            try:
-                await websocket.send_json(payload)
-                logger.debug("WebSocket sent: %s", payload)
-            except Exception:  # noqa: BLE001
-                stale.append(websocket)
+    def _cancel_debounce(self, evaluation_id: int) -> None:
+        timer = self._debounce_timers.pop(evaluation_id, None)
+        if timer is not None:
+            timer[1].cancel()
 
-        if stale:
+    async def flush_statuses(self) -> None:
+        """Publish every debounced status now (used on shutdown)."""
+        for evaluation_id in list(self._pending_statuses):
+            self._cancel_debounce(evaluation_id)
+            self._flush_status(evaluation_id)
+        await asyncio.gather(*self._flushing, return_exceptions=True)
+
+    async def _publish(self, event: dict) -> None:
+        evaluation_id = _journal_key(event)
+        if evaluation_id is not None:
+            # Journal the payload as subscribers receive it.
+            payload = event["payload"]
+            if "channel" in event:
+                payload = {"channel": event["channel"], **payload}
+            payload = await self._journal.sequence(evaluation_id, payload)
+            event = {**event, "payload": payload}
+        if not await self._backend.publish(event):
+            await self.deliver(event)
+
+    async def deliver(self, event: dict) -> None:
+        """
+        Hand an event to this process's subscribers. Events are
+        `{"evaluation_id": ..., "payload": ...}` for evaluation status, or
+        `{"channel": ..., "payload": ...}` with optional `topics` (scoped
+        subscription keys; defaults to the channel itself) for the others.
+        Evaluation-scoped events are journaled (and numbered, unless the
+        journal numbered them when they were published).
+        """
+        journal_key = _journal_key(event)
+        evaluation_id = event.get("evaluation_id")
+        if evaluation_id is None:
+            channel = event["channel"]
+            payload = {"channel": channel, **event["payload"]}
+            if journal_key is not None:
+                payload = self._journal.record(journal_key, payload)
             async with self._lock:
-                for websocket in stale:
-                    for eval_id, subs in list(self._subscriptions.items()):
-                        if websocket in subs:
-                            subs.discard(websocket)
-                        if not subs:
-                            self._subscriptions.pop(eval_id, None)
+                connections = set()
+                for key in event.get("topics") or (channel,):
+                    connections.update(self._channel_subscriptions.get(key, ()))
+            self._send(list(connections), payload)
+            return
+
+        payload = self._journal.record(evaluation_id, event["payload"])
+        self._remember(evaluation_id, payload)
+        await self._broadcast(evaluation_id, payload)
+        if payload["status"] in TERMINAL_STATUS_VALUES:
+            await self._broadcast(evaluation_id, _close_payload(evaluation_id))
+
+    async def _broadcast(self, evaluation_id: int, payload: dict) -> None:
+        async with self._lock:
+            connections = list(self._subscriptions.get(evaluation_id, ()))
+        self._send(connections, payload)
+
+    @staticmethod
+    def _send(connections: list[_Connection], payload: dict) -> None:
+        for connection in connections:
+            connection.enqueue(payload)
 
 
-evaluation_status_broadcaster = EvaluationStatusBroadcaster()
+evaluation_status_broadcaster = EvaluationStatusBroadcaster(
+    backend_from_settings(), journal=journal_from_settings()
+)
 
 
 async def notify_evaluation_status(evaluation) -> None:
     if not evaluation:
         return
-    await evaluation_status_broadcaster.publish_status(
+    await evaluation_status_broadcaster.notify_status(
         evaluation_id=evaluation.id,
         status=evaluation.status,
         updated_at=getattr(evaluation, "updated_at", None),
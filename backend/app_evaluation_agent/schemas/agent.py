@@ -89,3 +89,7 @@ class VisionAnalysisResponse(BaseModel):
         default=None,
         description="Optional natural-language summary of what the action accomplished.",
     )
+    screenshot_hash: Optional[str] = Field(
+        default=None,
+        description="Blob store key of the analyzed screenshot, for bug evidence.",
+    )
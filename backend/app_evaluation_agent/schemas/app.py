@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Literal, Optional
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from app_evaluation_agent.storage.models import AppType
 
@@ -11,6 +11,9 @@ AppTypeLiteral = Literal["desktop_app", "web_app"]
 class AppBase(BaseModel):
     name: str
     app_type: AppTypeLiteral = "desktop_app"
+    scheduling_weight: int = Field(
+        1, ge=1, description="Relative executor share under fair-share scheduling."
+    )
 
     @field_validator("app_type", mode="before")
     def _normalize_app_type(cls, v):
@@ -26,6 +29,7 @@ class AppCreate(AppBase):
 class AppUpdate(BaseModel):
     name: Optional[str] = None
     app_type: Optional[AppTypeLiteral] = None
+    scheduling_weight: Optional[int] = Field(None, ge=1)
 
     @field_validator("app_type", mode="before")
     def _normalize_app_type(cls, v):
@@ -45,6 +45,7 @@ class AppVersionGraphNode(BaseModel):
     previous_version_ids: list[int] = Field(default_factory=list)
     release_date: Optional[datetime] = None
     change_log: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
 
 class AppVersionGraphEdge(BaseModel):
@@ -56,3 +57,23 @@ class AppVersionGraph(BaseModel):
     nodes: list[AppVersionGraphNode]
     edges: list[AppVersionGraphEdge]
     warnings: list[str] = []
+    revision: int = 0
+    total_nodes: int = 0
+
+
+class AppVersionGraphCompactNode(BaseModel):
+    id: int
+    version: str
+    release_date: Optional[datetime] = None
+    change_log: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+
+class AppVersionGraphCompact(BaseModel):
+    """Graph with edges as `[from_id, to_id]` pairs and no per-node parent lists."""
+
+    nodes: list[AppVersionGraphCompactNode]
+    edges: list[tuple[int, int]]
+    warnings: list[str] = []
+    revision: int = 0
+    total_nodes: int = 0
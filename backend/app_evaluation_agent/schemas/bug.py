@@ -53,6 +53,7 @@ class BugUpdate(BaseModel):
 
 class BugRead(BugBase):
     id: int
+    occurrence_count: int = 0
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -69,6 +70,9 @@ class BugOccurrenceBase(BaseModel):
     actual: Optional[str] = None
     result_snapshot: Optional[dict] = None
     screenshot_uri: Optional[str] = None
+    # `screenshot_hash` of a /vision/analyze step, served by
+    # GET /api/v1/vision/screenshots/{hash}.
+    screenshot_hash: Optional[str] = None
     log_uri: Optional[str] = None
     raw_model_coords: Optional[dict] = None
     observed_at: Optional[datetime] = None
@@ -100,3 +104,69 @@ class BugFixRead(BugFixCreate):
     created_at: datetime
 
     model_config = ConfigDict(from_attributes=True, use_enum_values=True)
+
+
+class TriageMetricsRead(BaseModel):
+    total: int
+    skipped: int
+    skipped_by_reason: dict[str, int]
+    cache_hits: int
+    cache_misses: int
+    cache_entries: int
+    cache_hit_rate: float
+    llm_calls_avoided_rate: float
+
+
+class BugVersionStatsRead(BaseModel):
+    app_version_id: int
+    version: str
+    bug_count: int
+    occurrence_count: int
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+
+
+class BugEvaluationStatsRead(BaseModel):
+    evaluation_id: int
+    new_bugs: int
+    recurring_bugs: int
+    occurrence_count: int
+
+
+class AppBugStatsRead(BaseModel):
+    app_id: int
+    total_bugs: int
+    total_occurrences: int
+    first_seen_at: Optional[datetime] = None
+    last_seen_at: Optional[datetime] = None
+    by_status: dict[str, int]
+    by_severity: dict[str, int]
+    versions: list[BugVersionStatsRead]
+    evaluations: list[BugEvaluationStatsRead]
+
+
+class BugRegressionRead(BaseModel):
+    bug_id: int
+    fix_id: int
+    fixed_in_version_id: int
+    previous_status: str
+
+
+class BugFixVerificationRead(BaseModel):
+    bug_id: int
+    fix_id: int
+    fixed_in_version_id: int
+
+
+class BugNotReproducedRead(BaseModel):
+    bug_id: int
+    status: str
+
+
+class EvaluationRegressionsRead(BaseModel):
+    evaluation_id: int
+    app_version_id: int
+    analyzed_at: datetime
+    regressions: list[BugRegressionRead]
+    verified_fixes: list[BugFixVerificationRead]
+    not_reproduced: list[BugNotReproducedRead]
@@ -60,6 +60,9 @@ class EvaluationCreate(BaseModel):
     # Use the client's current screen (skip app launch/upload).
     run_on_current_screen: bool = False
 
+    # Higher values are dispatched to executors first.
+    priority: int = 0
+
     # Executor IDs that may be selected when assigning test cases.
     executor_ids: List[str] = Field(
         ...,
@@ -80,6 +83,7 @@ class EvaluationRead(EvaluationBase):
     app_url: Optional[str] = None
     app_version: Optional[AppVersionRead] = None
     app_name: Optional[str] = None
+    priority: int = 0
 
     # This ensures the client receives the local path when it polls for a job.
     local_application_path: Optional[str] = None
@@ -106,6 +110,7 @@ class EvaluationForVersionCreate(BaseModel):
     local_application_path: Optional[str] = None
     high_level_goal: Optional[str] = None
     run_on_current_screen: bool = False
+    priority: int = 0
     executor_ids: List[str] = Field(
         ...,
         min_items=1,
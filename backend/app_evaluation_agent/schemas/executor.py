@@ -0,0 +1,30 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+ExecutorLiveness = Literal["online", "stale", "offline"]
+
+
+class ExecutorHeartbeat(BaseModel):
+    current_test_case_id: Optional[int] = None
+    capture_width: Optional[int] = Field(None, ge=1)
+    capture_height: Optional[int] = Field(None, ge=1)
+    # Free-form runner details (hostname, OS, runner version, ...).
+    info: Optional[dict] = None
+
+
+class ExecutorRead(BaseModel):
+    executor_id: str
+    status: ExecutorLiveness
+    current_test_case_id: Optional[int] = None
+    steps_per_minute: float = 0.0
+    avg_analyze_latency_ms: Optional[float] = None
+    capture_width: Optional[int] = None
+    capture_height: Optional[int] = None
+    total_steps: int = 0
+    info: Optional[dict] = None
+    first_seen_at: datetime
+    last_heartbeat_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
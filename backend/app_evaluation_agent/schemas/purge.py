@@ -0,0 +1,23 @@
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict
+
+from app_evaluation_agent.storage.models import PurgeJobStatus
+
+
+class PurgeJobRead(BaseModel):
+    id: int
+    target_type: str
+    target_id: int
+    app_id: int
+    status: PurgeJobStatus
+    phase: Optional[str] = None
+    total_items: int
+    processed_items: int
+    last_error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True)
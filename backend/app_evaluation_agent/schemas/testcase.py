@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, Field, field_validator
 
 from app_evaluation_agent.storage.models import TestCaseStatus
 
@@ -16,6 +16,8 @@ class TestCaseBase(BaseModel):
     result: Optional[dict] = None
     execution_order: Optional[int] = None
     assigned_executor_id: Optional[str] = None
+    # IDs of cases in the same plan that must COMPLETE before this one is dispatched.
+    depends_on_ids: list[int] = Field(default_factory=list)
 
     @field_validator("status", mode="before")
     def _normalize_status(cls, v):
@@ -44,3 +46,16 @@ class TestCaseUpdate(BaseModel):
     description: Optional[str] = None
     input_data: Optional[dict] = None
     execution_order: Optional[int] = None
+    depends_on_ids: Optional[list[int]] = None
+
+
+class TestCaseBulkCreate(BaseModel):
+    cases: list[TestCaseCreate] = Field(..., min_length=1, max_length=1000)
+
+
+class TestCaseBulkUpdateItem(TestCaseUpdate):
+    id: int
+
+
+class TestCaseBulkUpdate(BaseModel):
+    updates: list[TestCaseBulkUpdateItem] = Field(..., min_length=1, max_length=1000)
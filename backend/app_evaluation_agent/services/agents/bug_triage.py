@@ -44,6 +44,7 @@ class BugDraft:
     raw_model_coords: Optional[dict]
     step_index: Optional[int]
     observed_at: datetime
+    screenshot_hash: Optional[str] = None
 
 
 class BugTriageAgent:
@@ -138,6 +139,9 @@ class BugTriageAgent:
             raw_model_coords=draft.get("raw_model_coords"),
             step_index=draft.get("step_index"),
             observed_at=observed_at,
+            # Default to the screenshot the runner reported with the result.
+            screenshot_hash=draft.get("screenshot_hash")
+            or result_payload.get("screenshot_hash"),
         )
 
     @staticmethod
@@ -149,13 +153,18 @@ class BugTriageAgent:
         case_status: str,
         result_payload: Dict[str, Any],
         evaluation_context: Dict[str, Any],
-    ) -> List[BugDraft]:
+    ) -> Optional[List[BugDraft]]:
+        """
+        Ask the model for bug drafts. Returns [] when it reports no bugs and
+        None when triage could not run (missing prompts, failed call or
+        unparseable output), so callers can tell the two apart.
+        """
         system_prompt = load_agent_prompt("bug_triage", "system_prompt.md")
         user_template = load_agent_prompt("bug_triage", "user_prompt.md")
 
         if not system_prompt or not user_template:
             logger.warning("Bug triage prompts missing; skipping triage.")
-            return []
+            return None
 
         user_prompt = user_template.format(
             case_name=case_name or "",
@@ -175,7 +184,12 @@ class BugTriageAgent:
         elif isinstance(parsed, list):
             raw_bugs = parsed
         else:
-            raw_bugs = []
+            logger.warning(
+                "Bug triage output for case=%s is not usable: %r",
+                case_name,
+                (llm_content or "")[:200],
+            )
+            return None
 
         observed_at = datetime.now(timezone.utc)
         drafts: List[BugDraft] = []
@@ -11,6 +11,9 @@ from app_evaluation_agent.storage.models import (
     TestCase,
     TestCaseStatus,
 )
+from app_evaluation_agent.services import case_dependencies
+from app_evaluation_agent.services.ready_queue import ready_queue
+
 from .prompt_loader import load_agent_prompt, safe_json_loads, extract_case_dicts
 from .llm_client import call_llm
 
@@ -101,6 +104,33 @@ class PlannerAgent:
         )
         return plan
 
+    @staticmethod
+    def _dependency_edges(
+        plan: TestPlan,
+        test_cases: List[TestCase],
+        depends_on_orders: List[List[Any]],
+    ) -> List[case_dependencies.Edge]:
+        """
+        Map the LLM's execution_order references onto case IDs. Unknown
+        references and edges that would close a cycle are dropped.
+        """
+        by_order = {tc.execution_order: tc.id for tc in test_cases}
+        edges: List[case_dependencies.Edge] = []
+        for tc, orders in zip(test_cases, depends_on_orders):
+            for order in orders:
+                dep_id = by_order.get(order) if isinstance(order, int) else None
+                if dep_id is not None and dep_id != tc.id:
+                    edges.append((tc.id, dep_id))
+
+        kept, dropped = case_dependencies.split_acyclic_edges(edges)
+        if dropped:
+            logger.warning(
+                "Dropped cyclic test case dependencies for plan %s: %s",
+                plan.id,
+                dropped,
+            )
+        return kept
+
     @staticmethod
     async def generate_test_cases(
         db: AsyncSession,
@@ -150,6 +180,7 @@ class PlannerAgent:
         )
 
         test_cases: List[TestCase] = []
+        depends_on_orders: List[List[Any]] = []
 
         for idx, case in enumerate(case_dicts, start=1):
             tc = TestCase(
@@ -167,10 +198,18 @@ class PlannerAgent:
             )
             db.add(tc)
             test_cases.append(tc)
+            depends_on = case.get("depends_on")
+            depends_on_orders.append(depends_on if isinstance(depends_on, list) else [])
+
+        await db.flush()
+        await case_dependencies.insert_edges(
+            db, PlannerAgent._dependency_edges(plan, test_cases, depends_on_orders)
+        )
 
         await db.commit()
         for tc in test_cases:
             await db.refresh(tc)
+        await ready_queue.track_many(db, test_cases)
 
         logger.info(
             "Generated %s test cases for plan %s (evaluation %s)",
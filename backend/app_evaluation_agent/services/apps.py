@@ -1,9 +1,11 @@
+import json
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
+from hashlib import sha256
 from typing import Sequence
 
 from fastapi import UploadFile
-from sqlalchemy import delete, insert, select, update, or_, text
+from sqlalchemy import delete, insert, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -12,6 +14,8 @@ from app_evaluation_agent.schemas.app import AppCreate, AppUpdate
 from app_evaluation_agent.schemas.app_version import (
     AppVersionCreate,
     AppVersionGraph,
+    AppVersionGraphCompact,
+    AppVersionGraphCompactNode,
     AppVersionGraphEdge,
     AppVersionGraphNode,
     AppVersionUpdate,
@@ -21,13 +25,15 @@ from app_evaluation_agent.schemas.evaluation import (
     EvaluationForVersionCreate,
 )
 from app_evaluation_agent.services import evaluations as evaluation_service
+from app_evaluation_agent.services import purge as purge_service
+from app_evaluation_agent.services.ready_queue import ready_queue
+from app_evaluation_agent.services.version_lineage import lineage_cache
 from app_evaluation_agent.storage.models import (
     App,
     AppType,
     AppVersion,
     Evaluation,
-    TestCase,
-    TestPlan,
+    PurgeJob,
     app_version_lineage,
 )
 
@@ -59,7 +65,11 @@ async def create_app(db: AsyncSession, payload: AppCreate) -> App:
     existing = await db.execute(select(App).where(App.name == payload.name))
     if existing.scalars().first():
         raise ValueError("App name already exists")
-    app = App(name=payload.name, app_type=AppType(payload.app_type))
+    app = App(
+        name=payload.name,
+        app_type=AppType(payload.app_type),
+        scheduling_weight=payload.scheduling_weight,
+    )
     db.add(app)
     await db.commit()
     await db.refresh(app)
@@ -84,9 +94,12 @@ async def update_app(db: AsyncSession, app_id: int, payload: AppUpdate) -> App |
         app.name = payload.name
     if payload.app_type is not None:
         app.app_type = AppType(payload.app_type)
+    if payload.scheduling_weight is not None:
+        app.scheduling_weight = payload.scheduling_weight
 
     await db.commit()
     await db.refresh(app)
+    ready_queue.set_app_weight(app.id, app.scheduling_weight)
     return app
 
 
@@ -107,72 +120,128 @@ async def list_app_versions(
     return result.scalars().all()
 
 
-async def list_app_versions_graph(db: AsyncSession, app_id: int) -> AppVersionGraph:
-    stmt = (
-        select(AppVersion)
-        .where(AppVersion.app_id == app_id)
-        .options(selectinload(AppVersion.previous_versions))
+GRAPH_MAX_GENERATIONS = 50
+
+
+def versions_graph_etag(
+    revision: int,
+    around_version_id: int | None = None,
+    generations: int | None = None,
+    branch_version_id: int | None = None,
+    since: datetime | None = None,
+    compact: bool = False,
+) -> str:
+    """
+    Weak ETag for a version graph view. The app's lineage revision changes on
+    every version write, so it only needs combining with the query.
+    """
+    window = json.dumps(
+        [around_version_id, generations, branch_version_id, since, compact],
+        default=str,
     )
-    result = await db.execute(stmt)
-    versions = result.scalars().all()
-    nodes = [
-        AppVersionGraphNode(
-            id=version.id,
-            version=version.version,
-            previous_version_id=version.previous_version_id,
-            previous_version_ids=version.previous_version_ids,
-            release_date=version.release_date,
-            change_log=version.change_log,
-        )
-        for version in versions
-    ]
-    edges: list[AppVersionGraphEdge] = []
-    warnings: list[str] = []
-    node_ids = {version.id for version in versions}
-    for version in versions:
-        for previous_version in version.previous_versions:
-            if previous_version.id not in node_ids:
-                warnings.append(
-                    f"Version {version.id} references missing previous_version_id={previous_version.id}."
-                )
-                continue
-            edges.append(
-                AppVersionGraphEdge(
-                    from_id=previous_version.id,
-                    to_id=version.id,
-                )
-            )
-    warnings.extend(_detect_version_cycles(versions))
-    return AppVersionGraph(nodes=nodes, edges=edges, warnings=warnings)
+    digest = sha256(window.encode("utf-8")).hexdigest()[:16]
+    return f'W/"{revision}-{digest}"'
 
 
-def _detect_version_cycles(versions: Sequence[AppVersion]) -> list[str]:
-    visited: set[int] = set()
-    stack: set[int] = set()
-    warnings: list[str] = []
-    version_map = {version.id: version for version in versions}
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
 
-    def visit(node_id: int) -> None:
-        if node_id in stack:
-            warnings.append(
-                f"Cycle detected at version {node_id} in app_versions lineage."
-            )
-            return
-        if node_id in visited:
-            return
-        visited.add(node_id)
-        stack.add(node_id)
-        version = version_map.get(node_id)
-        if version:
-            for previous_version in version.previous_versions:
-                if previous_version.id in version_map:
-                    visit(previous_version.id)
-        stack.remove(node_id)
 
-    for version in versions:
-        visit(version.id)
+async def list_app_versions_graph(
+    db: AsyncSession,
+    app_id: int,
+    around_version_id: int | None = None,
+    generations: int = 2,
+    branch_version_id: int | None = None,
+    since: datetime | None = None,
+    compact: bool = False,
+) -> AppVersionGraph | AppVersionGraphCompact:
+    """
+    The app's version graph, optionally narrowed to a window. Filters combine:
+    `around_version_id` keeps `generations` levels of parents and children
+    around a version, `branch_version_id` keeps a version's ancestors and
+    descendants, and `since` keeps versions created or updated after it.
+    Edges are kept when both ends are in the window.
+    """
+    lineage = await lineage_cache.get(db, app_id)
+    selected: set[int] = set(lineage.nodes)
+    if around_version_id is not None:
+        if around_version_id not in lineage.nodes:
+            raise ValueError("around version does not belong to this app")
+        generations = max(0, min(generations, GRAPH_MAX_GENERATIONS))
+        selected &= lineage.within_generations(around_version_id, generations)
+    if branch_version_id is not None:
+        if branch_version_id not in lineage.nodes:
+            raise ValueError("branch version does not belong to this app")
+        selected &= lineage.branch(branch_version_id)
+    if since is not None:
+        since = _as_utc(since)
+        selected = {
+            version_id
+            for version_id in selected
+            if _as_utc(
+                lineage.nodes[version_id].updated_at
+                or lineage.nodes[version_id].created_at
+                or since
+            )
+            > since
+        }
 
-    return warnings
+    nodes: list = []
+    edges: list = []
+    warnings: list[str] = []
+    for version_id in sorted(selected):
+        node = lineage.nodes[version_id]
+        previous_ids = sorted(lineage.parents.get(version_id, ()))
+        changed_at = node.updated_at or node.created_at
+        if compact:
+            nodes.append(
+                AppVersionGraphCompactNode(
+                    id=node.id,
+                    version=node.version,
+                    release_date=node.release_date,
+                    change_log=node.change_log,
+                    updated_at=changed_at,
+                )
+            )
+        else:
+            nodes.append(
+                AppVersionGraphNode(
+                    id=node.id,
+                    version=node.version,
+                    previous_version_id=node.previous_version_id,
+                    previous_version_ids=previous_ids,
+                    release_date=node.release_date,
+                    change_log=node.change_log,
+                    updated_at=changed_at,
+                )
+            )
+        for previous_id in previous_ids:
+            if previous_id not in lineage.nodes:
+                warnings.append(
+                    f"Version {version_id} references missing "
+                    f"previous_version_id={previous_id}."
+                )
+                continue
+            if previous_id not in selected:
+                continue
+            if compact:
+                edges.append((previous_id, version_id))
+            else:
+                edges.append(AppVersionGraphEdge(from_id=previous_id, to_id=version_id))
+    warnings.extend(
+        f"Cycle detected at version {version_id} in app_versions lineage."
+        for version_id in lineage.cycle_nodes()
+        if version_id in selected
+    )
+    graph_cls = AppVersionGraphCompact if compact else AppVersionGraph
+    return graph_cls(
+        nodes=nodes,
+        edges=edges,
+        warnings=warnings,
+        revision=lineage.revision,
+        total_nodes=len(lineage.nodes),
+    )
 
 
 def _coalesce_previous_version_ids(
@@ -258,7 +327,7 @@ async def create_app_version(
     )
     db.add(version)
     await db.flush()
-    if previous_version_ids is not None:
+    if previous_versions:
         await db.execute(
             insert(app_version_lineage),
             [
@@ -269,6 +338,7 @@ async def create_app_version(
                 for previous_version in previous_versions
             ],
         )
+    await lineage_cache.bump_revision(db, app_id)
     await db.commit()
     refreshed = await get_app_version(db, app_id, version.id)
     if refreshed is None:
@@ -348,7 +418,7 @@ async def update_app_version(
         payload.previous_version_id, payload.previous_version_ids
     )
     if previous_version_ids is not None:
-        await _ensure_no_lineage_cycle(db, version_id, previous_version_ids)
+        await _ensure_no_lineage_cycle(db, app_id, version_id, previous_version_ids)
         previous_versions = await _resolve_previous_versions(
             db, app_id, previous_version_ids, current_version_id=version_id
         )
@@ -376,6 +446,7 @@ async def update_app_version(
     if payload.change_log is not None:
         version.change_log = payload.change_log
 
+    await lineage_cache.bump_revision(db, app_id)
     await db.commit()
     refreshed = await get_app_version(db, app_id, version_id)
     if refreshed is None:
@@ -384,42 +455,22 @@ async def update_app_version(
 
 
 async def _ensure_no_lineage_cycle(
-    db: AsyncSession, version_id: int, previous_version_ids: Sequence[int]
+    db: AsyncSession, app_id: int, version_id: int, previous_version_ids: Sequence[int]
 ) -> None:
     if not previous_version_ids:
         return
     if version_id in previous_version_ids:
         raise ValueError("previous_version_ids cannot include the version itself")
 
-    stmt = text("""
-        WITH RECURSIVE ancestors(id) AS (
-            SELECT previous_version_id
-            FROM app_version_lineage
-            WHERE app_version_id = ANY(:parent_ids)
-            UNION
-            SELECT avl.previous_version_id
-            FROM app_version_lineage avl
-            JOIN ancestors a ON avl.app_version_id = a.id
-        )
-        SELECT 1
-        FROM ancestors
-        WHERE id = :version_id
-        LIMIT 1
-        """)
-    result = await db.execute(
-        stmt,
-        {
-            "parent_ids": list(previous_version_ids),
-            "version_id": version_id,
-        },
-    )
-    if result.scalar_one_or_none() is not None:
+    lineage = await lineage_cache.get(db, app_id)
+    if lineage.would_create_cycle(version_id, previous_version_ids):
         raise ValueError("previous_version_ids would create a lineage cycle")
 
 
 async def delete_app_version(db: AsyncSession, app_id: int, version_id: int) -> bool:
     """
-    Deletes an app version and its evaluations, plans, and cases.
+    Deletes an app version and its evaluations, plans, and cases in
+    committed chunks (see `services.purge`).
     """
     version = await get_app_version(db, app_id, version_id)
     if not version:
@@ -430,67 +481,9 @@ async def delete_app_version(db: AsyncSession, app_id: int, version_id: int) ->
         )
         return False
 
-    affected_result = await db.execute(
-        select(app_version_lineage.c.app_version_id).where(
-            app_version_lineage.c.previous_version_id == version_id
-        )
-    )
-    affected_version_ids = [row[0] for row in affected_result.all()]
-
-    await db.execute(
-        delete(app_version_lineage).where(
-            or_(
-                app_version_lineage.c.app_version_id == version_id,
-                app_version_lineage.c.previous_version_id == version_id,
-            )
-        )
+    await purge_service.purge_now(
+        db, purge_service.TARGET_APP_VERSION, version_id, app_id
     )
-
-    await db.execute(
-        update(AppVersion)
-        .where(AppVersion.previous_version_id == version_id)
-        .values(previous_version_id=None)
-    )
-
-    if affected_version_ids:
-        remaining_result = await db.execute(
-            select(
-                app_version_lineage.c.app_version_id,
-                app_version_lineage.c.previous_version_id,
-            )
-            .where(app_version_lineage.c.app_version_id.in_(affected_version_ids))
-            .order_by(
-                app_version_lineage.c.app_version_id,
-                app_version_lineage.c.previous_version_id,
-            )
-        )
-        replacement_map: dict[int, int] = {}
-        for app_version_id, previous_version_id in remaining_result.all():
-            if app_version_id not in replacement_map:
-                replacement_map[app_version_id] = previous_version_id
-        for app_version_id, previous_version_id in replacement_map.items():
-            await db.execute(
-                update(AppVersion)
-                .where(AppVersion.id == app_version_id)
-                .values(previous_version_id=previous_version_id)
-            )
-
-    eval_result = await db.execute(
-        select(Evaluation.id).where(Evaluation.app_version_id == version_id)
-    )
-    evaluation_ids = [row[0] for row in eval_result.all()]
-
-    if evaluation_ids:
-        await db.execute(
-            delete(TestCase).where(TestCase.evaluation_id.in_(evaluation_ids))
-        )
-        await db.execute(
-            delete(TestPlan).where(TestPlan.evaluation_id.in_(evaluation_ids))
-        )
-        await db.execute(delete(Evaluation).where(Evaluation.id.in_(evaluation_ids)))
-
-    await db.execute(delete(AppVersion).where(AppVersion.id == version_id))
-    await db.commit()
     logger.info(
         "Deleted app version %s for app %s and associated evaluations",
         version_id,
@@ -499,6 +492,21 @@ async def delete_app_version(db: AsyncSession, app_id: int, version_id: int) ->
     return True
 
 
+async def schedule_app_version_deletion(
+    db: AsyncSession, app_id: int, version_id: int
+) -> PurgeJob | None:
+    """
+    Queue a background purge of an app version; poll the returned job at
+    /api/v1/purges/{id}.
+    """
+    version = await get_app_version(db, app_id, version_id)
+    if not version:
+        return None
+    return await purge_service.start_purge_job(
+        db, purge_service.TARGET_APP_VERSION, version_id, app_id
+    )
+
+
 async def list_evaluations_for_version(
     db: AsyncSession, app_version_id: int, limit: int = 50, offset: int = 0
 ) -> list[Evaluation]:
@@ -543,6 +551,7 @@ async def create_evaluation_for_version(
         local_application_path=payload.local_application_path,
         high_level_goal=payload.high_level_goal,
         run_on_current_screen=payload.run_on_current_screen,
+        priority=payload.priority,
         executor_ids=list(payload.executor_ids),
     )
     return await evaluation_service.create_evaluation(db, evaluation_payload)
@@ -550,38 +559,24 @@ async def create_evaluation_for_version(
 
 async def delete_app(db: AsyncSession, app_id: int) -> bool:
     """
-    Deletes an app and all associated versions, evaluations, plans, and cases.
+    Deletes an app and all associated versions, evaluations, plans, cases,
+    and bugs in committed chunks (see `services.purge`).
     """
     app = await db.get(App, app_id)
     if not app:
         logger.debug("App %s not found during delete", app_id)
         return False
 
-    versions_result = await db.execute(
-        select(AppVersion.id).where(AppVersion.app_id == app_id)
-    )
-    version_ids = [row[0] for row in versions_result.all()]
-
-    if version_ids:
-        eval_result = await db.execute(
-            select(Evaluation.id).where(Evaluation.app_version_id.in_(version_ids))
-        )
-        evaluation_ids = [row[0] for row in eval_result.all()]
-
-        if evaluation_ids:
-            await db.execute(
-                delete(TestCase).where(TestCase.evaluation_id.in_(evaluation_ids))
-            )
-            await db.execute(
-                delete(TestPlan).where(TestPlan.evaluation_id.in_(evaluation_ids))
-            )
-            await db.execute(
-                delete(Evaluation).where(Evaluation.id.in_(evaluation_ids))
-            )
-
-        await db.execute(delete(AppVersion).where(AppVersion.id.in_(version_ids)))
-
-    await db.execute(delete(App).where(App.id == app_id))
-    await db.commit()
+    await purge_service.purge_now(db, purge_service.TARGET_APP, app_id, app_id)
     logger.info("Deleted app %s and associated versions/evaluations", app_id)
     return True
+
+
+async def schedule_app_deletion(db: AsyncSession, app_id: int) -> PurgeJob | None:
+    """Queue a background purge of an app and everything under it."""
+    app = await db.get(App, app_id)
+    if not app:
+        return None
+    return await purge_service.start_purge_job(
+        db, purge_service.TARGET_APP, app_id, app_id
+    )
@@ -0,0 +1,262 @@
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.services.bug_stats import upsert_insert
+from app_evaluation_agent.storage.blobs import (
+    BlobBackend,
+    BlobData,
+    backend_from_settings,
+    blob_digest,
+    is_digest,
+    sniff_content_type,
+)
+from app_evaluation_agent.storage.database import AsyncSessionLocal
+from app_evaluation_agent.storage.models import Blob, BugOccurrence
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Digests whose last use this process recorded recently; repeats of the same
+# screenshot within a tenth of the TTL skip the write and the DB round trip.
+RECENT_DIGESTS = 4096
+# Expired blobs deleted per sweep transaction.
+SWEEP_BATCH = 500
+
+
+class BlobStore:
+    """
+    Content-addressed store for screenshots and other evidence. Blobs are
+    keyed by the SHA-256 of their content, so a frame sent many times is
+    stored once. The `blobs` table counts the bug occurrences referencing
+    each blob; unreferenced blobs are deleted `ttl_seconds` after their last
+    use by a periodic sweep.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BlobBackend] = None,
+        ttl_seconds: Optional[int] = None,
+    ) -> None:
+        self._backend = backend
+        self.ttl_seconds = (
+            settings.blobs.ttl_seconds if ttl_seconds is None else ttl_seconds
+        )
+        self._recent: "OrderedDict[str, float]" = OrderedDict()
+        self._sweep_task: Optional[asyncio.Task] = None
+
+    @property
+    def backend(self) -> BlobBackend:
+        if self._backend is None:
+            self._backend = backend_from_settings()
+        return self._backend
+
+    def check_backend(self) -> None:
+        """Build the configured backend now; ValueError if it is unusable."""
+        if self._backend is None:
+            self._backend = backend_from_settings()
+
+    def clear(self) -> None:
+        self._recent.clear()
+
+    def _recently_used(self, digest: str) -> bool:
+        used_at = self._recent.get(digest)
+        return used_at is not None and (
+            time.monotonic() - used_at < self.ttl_seconds / 10
+        )
+
+    def _remember(self, digest: str) -> None:
+        self._recent[digest] = time.monotonic()
+        self._recent.move_to_end(digest)
+        while len(self._recent) > RECENT_DIGESTS:
+            self._recent.popitem(last=False)
+
+    async def put(
+        self,
+        db: AsyncSession,
+        data: BlobData,
+        content_type: Optional[str] = None,
+        digest: Optional[str] = None,
+    ) -> str:
+        """
+        Store `data` unless a blob with the same content exists, and mark it
+        used now. Returns its digest. Does not commit.
+
+        The row is upserted before the content is written: a sweep that has
+        not deleted the row yet then sees it as recently used and keeps it.
+        """
+        if digest is None:
+            digest = await asyncio.to_thread(blob_digest, data)
+        content_type = content_type or sniff_content_type(data)
+        now = datetime.now(timezone.utc)
+        insert = upsert_insert(db)
+        stmt = insert(Blob).values(
+            digest=digest,
+            content_type=content_type,
+            size=len(data),
+            ref_count=0,
+            last_used_at=now,
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[Blob.digest], set_={"last_used_at": now}
+            )
+        )
+        await asyncio.to_thread(self.backend.write, digest, data, content_type)
+        return digest
+
+    async def store_screenshot(self, data: BlobData) -> Optional[str]:
+        """
+        Keep an analyzed screenshot; returns its digest, or None if it could
+        not be stored (the analyze step does not fail for it).
+        """
+        try:
+            digest = await asyncio.to_thread(blob_digest, data)
+            if self._recently_used(digest):
+                return digest
+            async with AsyncSessionLocal() as db:
+                await self.put(db, data, digest=digest)
+                await db.commit()
+            self._remember(digest)
+            return digest
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to store screenshot")
+            return None
+
+    async def known(self, db: AsyncSession, digests: Iterable[str]) -> Set[str]:
+        """The digests among `digests` that are stored."""
+        wanted = {digest for digest in digests if is_digest(digest)}
+        if not wanted:
+            return set()
+        result = await db.execute(select(Blob.digest).where(Blob.digest.in_(wanted)))
+        return set(result.scalars().all())
+
+    async def _adjust(self, db: AsyncSession, digests: Iterable[str], sign: int):
+        now = datetime.now(timezone.utc)
+        for digest, count in Counter(d for d in digests if d).items():
+            await db.execute(
+                update(Blob)
+                .where(Blob.digest == digest)
+                .values(ref_count=Blob.ref_count + sign * count, last_used_at=now)
+            )
+
+    async def acquire(self, db: AsyncSession, digests: Iterable[str]) -> None:
+        """Count one reference per digest occurrence. Does not commit."""
+        await self._adjust(db, digests, 1)
+
+    async def release(self, db: AsyncSession, digests: Iterable[str]) -> None:
+        """
+        Drop one reference per digest occurrence; the TTL of blobs left
+        unreferenced starts now. Does not commit.
+        """
+        await self._adjust(db, digests, -1)
+
+    async def release_occurrences(self, db: AsyncSession, *criteria) -> None:
+        """Release the screenshots of the bug occurrences about to be deleted."""
+        result = await db.execute(
+            select(BugOccurrence.screenshot_hash).where(
+                BugOccurrence.screenshot_hash.is_not(None), *criteria
+            )
+        )
+        await self.release(db, result.scalars().all())
+
+    async def open(
+        self, db: AsyncSession, digest: str
+    ) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Content and content type of a stored blob, None if unknown."""
+        if not is_digest(digest):
+            return None
+        blob = await db.get(Blob, digest)
+        if blob is None:
+            return None
+        try:
+            data = await asyncio.to_thread(self.backend.read, digest)
+        except FileNotFoundError:
+            logger.warning("Blob %s is recorded but missing from storage", digest)
+            return None
+        return data, blob.content_type
+
+    async def sweep(self, db: AsyncSession, now: Optional[datetime] = None) -> int:
+        """
+        Delete up to SWEEP_BATCH unreferenced blobs unused for `ttl_seconds`.
+        Commits; returns how many were deleted.
+
+        Rows are deleted and committed before their content. A `put` of the
+        same content in between re-creates the row, and its write may be
+        skipped because the content still existed. So once the content is
+        gone the rows are checked again, and any that came back without
+        content are dropped while nothing references them.
+        """
+        cutoff = (now or datetime.now(timezone.utc)) - timedelta(
+            seconds=self.ttl_seconds
+        )
+        expired = (Blob.ref_count <= 0, Blob.last_used_at < cutoff)
+        result = await db.execute(
+            select(Blob.digest).where(*expired).limit(SWEEP_BATCH)
+        )
+        removed = []
+        for digest in result.scalars().all():
+            # Re-checked per row: the blob may have been used again meanwhile.
+            deleted = await db.execute(
+                delete(Blob).where(Blob.digest == digest, *expired)
+            )
+            if deleted.rowcount:
+                removed.append(digest)
+        await db.commit()
+        for digest in removed:
+            self._recent.pop(digest, None)
+            try:
+                await asyncio.to_thread(self.backend.delete, digest)
+            except Exception:  # noqa: BLE001
+                logger.exception("Failed to delete blob %s", digest)
+        if removed:
+            await self._drop_revived(db, removed)
+            logger.info("Deleted %s expired blobs", len(removed))
+        return len(removed)
+
+    async def _drop_revived(self, db: AsyncSession, digests: List[str]) -> None:
+        """Drop rows re-created by a concurrent `put` whose content is gone."""
+        for digest in await self.known(db, digests):
+            if await asyncio.to_thread(self.backend.exists, digest):
+                continue
+            self._recent.pop(digest, None)
+            result = await db.execute(
+                delete(Blob).where(Blob.digest == digest, Blob.ref_count <= 0)
+            )
+            if result.rowcount:
+                logger.warning("Dropped blob %s re-added during a sweep", digest)
+            else:
+                logger.error("Blob %s is referenced but its content is gone", digest)
+        await db.commit()
+
+    def start(self, session_factory: Callable[[], AsyncSession]) -> None:
+        if self._sweep_task is None or self._sweep_task.done():
+            self._sweep_task = asyncio.create_task(self._sweep_loop(session_factory))
+
+    async def stop(self) -> None:
+        if self._sweep_task is not None:
+            self._sweep_task.cancel()
+            try:
+                await self._sweep_task
+            except asyncio.CancelledError:
+                pass
+            self._sweep_task = None
+
+    async def _sweep_loop(self, session_factory: Callable[[], AsyncSession]) -> None:
+        while True:
+            await asyncio.sleep(settings.blobs.sweep_interval_seconds)
+            try:
+                async with session_factory() as db:
+                    while await self.sweep(db) == SWEEP_BATCH:
+                        pass
+            except Exception:
+                logger.exception("Failed to sweep expired blobs")
+
+
+blob_store = BlobStore()
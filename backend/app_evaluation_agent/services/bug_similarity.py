@@ -0,0 +1,325 @@
+import logging
+import re
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.storage.models import Bug, BugOccurrence
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be but by does did do for from has have in into is it "
+    "its not of on or so that the then there this to was were when which while "
+    "with".split()
+)
+
+Signature = Tuple[int, ...]
+
+
+def shingles(*texts: Optional[str]) -> Set[str]:
+    """Word unigrams and bigrams of the normalized text, minus stopwords."""
+    tokens = [
+        token
+        for text in texts
+        if text
+        for token in _TOKEN_RE.findall(text.lower())
+        if token not in _STOPWORDS
+    ]
+    grams = set(tokens)
+    grams.update(f"{a} {b}" for a, b in zip(tokens, tokens[1:]))
+    return grams
+
+
+def _stable_hash(value: str) -> int:
+    # hash() is salted per process; signatures must match across workers.
+    digest = blake2b(value.encode("utf-8"), digest_size=4).digest()
+    return int.from_bytes(digest, "big")
+
+
+class MinHasher:
+    """
+    Classic MinHash: `num_perm` universal hash functions
+    h(x) = (a * x + b) mod p, keeping the minimum per function.
+    """
+
+    def __init__(self, num_perm: int = 64, seed: int = 1) -> None:
+        self.num_perm = num_perm
+        params: List[Tuple[int, int]] = []
+        for idx in range(num_perm):
+            digest = blake2b(f"{seed}:{idx}".encode(), digest_size=16).digest()
+            a = int.from_bytes(digest[:8], "big") % (_MERSENNE_PRIME - 1) + 1
+            b = int.from_bytes(digest[8:], "big") % _MERSENNE_PRIME
+            params.append((a, b))
+        self._params = params
+
+    def signature(self, grams: Iterable[str]) -> Optional[Signature]:
+        hashes = [_stable_hash(gram) for gram in grams]
+        if not hashes:
+            return None
+        return tuple(
+            min(((a * h + b) % _MERSENNE_PRIME) & _MAX_HASH for h in hashes)
+            for a, b in self._params
+        )
+
+
+def estimate_similarity(left: Signature, right: Signature) -> float:
+    """Fraction of agreeing slots, an unbiased estimate of Jaccard similarity."""
+    return sum(1 for x, y in zip(left, right) if x == y) / len(left)
+
+
+@dataclass
+class _AppIndex:
+    # Highest bug id loaded from the database; newer rows are caught up lazily.
+    watermark: int = 0
+    loaded: bool = False
+    signatures: Dict[int, Signature] = field(default_factory=dict)
+    fingerprints: Dict[int, str] = field(default_factory=dict)
+    buckets: Dict[Tuple[int, Signature], Set[int]] = field(default_factory=dict)
+
+
+class BugSimilarityIndex:
+    """
+    Per-app MinHash/LSH index over bug title + expected/actual text.
+
+    Triage drafts whose exact fingerprint is unknown are matched against it
+    so that paraphrases of an existing bug are folded into that bug instead
+    of creating a new row. Signatures are split into `bands` bands; only bugs
+    sharing a band bucket with the draft are compared, so a lookup costs a
+    few dictionary probes regardless of how many bugs an app has.
+
+    The index is rebuilt lazily per app and kept current incrementally: the
+    bug service adds bugs once they are committed and drops them on delete,
+    and each lookup first loads any rows newer than the last one seen
+    (covering bugs created by other processes). Deletes made by other
+    processes are not seen; the bug service drops such bugs when a match
+    points at a fingerprint that no longer exists.
+
+    Memory is about `num_perm` integers per indexed bug. Only the `max_apps`
+    most recently used apps are kept; an evicted app is rebuilt from the
+    database on its next lookup.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, max_apps: int = 256):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.hasher = MinHasher(num_perm)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_apps = max_apps
+        self._apps: "OrderedDict[int, _AppIndex]" = OrderedDict()
+
+    def clear(self) -> None:
+        self._apps.clear()
+
+    def forget_app(self, app_id: int) -> None:
+        self._apps.pop(app_id, None)
+
+    def signature_for(self, *texts: Optional[str]) -> Optional[Signature]:
+        return self.hasher.signature(shingles(*texts))
+
+    def _band_keys(self, signature: Signature) -> List[Tuple[int, Signature]]:
+        return [
+            (band, signature[band * self.rows : (band + 1) * self.rows])
+            for band in range(self.bands)
+        ]
+
+    def add(
+        self,
+        app_id: int,
+        bug_id: int,
+        fingerprint: Optional[str],
+        *texts: Optional[str],
+    ) -> None:
+        """Index a bug. Bugs without a fingerprint cannot absorb drafts."""
+        if not fingerprint:
+            return
+        signature = self.signature_for(*texts)
+        if signature is None:
+            return
+        index = self._apps.setdefault(app_id, _AppIndex())
+        self._remove(index, bug_id)
+        index.signatures[bug_id] = signature
+        index.fingerprints[bug_id] = fingerprint
+        for key in self._band_keys(signature):
+            index.buckets.setdefault(key, set()).add(bug_id)
+
+    def discard(self, app_id: int, bug_id: int) -> None:
+        index = self._apps.get(app_id)
+        if index is not None:
+            self._remove(index, bug_id)
+
+    def discard_fingerprints(self, app_id: int, fingerprints: Set[str]) -> None:
+        """Drop the bugs with these fingerprints, e.g. deleted elsewhere."""
+        index = self._apps.get(app_id)
+        if index is None:
+            return
+        stale = [
+            bug_id
+            for bug_id, fingerprint in index.fingerprints.items()
+            if fingerprint in fingerprints
+        ]
+        for bug_id in stale:
+            self._remove(index, bug_id)
+
+    def _remove(self, index: _AppIndex, bug_id: int) -> None:
+        signature = index.signatures.pop(bug_id, None)
+        index.fingerprints.pop(bug_id, None)
+        if signature is None:
+            return
+        for key in self._band_keys(signature):
+            bucket = index.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(bug_id)
+                if not bucket:
+                    del index.buckets[key]
+
+    def match(
+        self, app_id: int, signature: Optional[Signature], threshold: float
+    ) -> Optional[Tuple[int, str, float]]:
+        """Best (bug_id, fingerprint, similarity) at or above `threshold`."""
+        index = self._apps.get(app_id)
+        if index is None or signature is None:
+            return None
+        candidates: Set[int] = set()
+        for key in self._band_keys(signature):
+            candidates |= index.buckets.get(key, set())
+        best: Optional[Tuple[int, str, float]] = None
+        for bug_id in sorted(candidates):
+            similarity = estimate_similarity(signature, index.signatures[bug_id])
+            if similarity >= threshold and (best is None or similarity > best[2]):
+                best = (bug_id, index.fingerprints[bug_id], similarity)
+        return best
+
+    @staticmethod
+    def _bug_texts_query():
+        # Bugs only store a title; expected/actual come from the first
+        # occurrence, which is the draft the bug was created from.
+        first_occurrence = (
+            select(func.min(BugOccurrence.id))
+            .where(BugOccurrence.bug_id == Bug.id)
+            .correlate(Bug)
+            .scalar_subquery()
+        )
+        return (
+            select(
+                Bug.id,
+                Bug.fingerprint,
+                Bug.title,
+                BugOccurrence.expected,
+                BugOccurrence.actual,
+            )
+            .outerjoin(BugOccurrence, BugOccurrence.id == first_occurrence)
+            .where(Bug.fingerprint.is_not(None))
+        )
+
+    async def sync(self, db: AsyncSession, app_id: int) -> None:
+        """Load bugs of `app_id` created since the last sync."""
+        index = self._apps.setdefault(app_id, _AppIndex())
+        self._apps.move_to_end(app_id)
+        while len(self._apps) > max(self.max_apps, 1):
+            self._apps.popitem(last=False)
+        result = await db.execute(
+            self._bug_texts_query()
+            .where(Bug.app_id == app_id, Bug.id > index.watermark)
+            .order_by(Bug.id)
+        )
+        rows = result.all()
+        for bug_id, fingerprint, title, expected, actual in rows:
+            self.add(app_id, bug_id, fingerprint, title, expected, actual)
+        if rows:
+            index.watermark = max(index.watermark, rows[-1][0])
+        if not index.loaded:
+            index.loaded = True
+            logger.info(
+                "Built bug similarity index for app %s with %s bugs",
+                app_id,
+                len(index.signatures),
+            )
+
+    def track(
+        self,
+        app_id: int,
+        bug_id: int,
+        fingerprint: Optional[str],
+        *texts: Optional[str],
+    ) -> None:
+        """
+        Index a bug this process created, after its transaction committed.
+        Apps that have not been synced yet are skipped; their first sync
+        loads every row anyway.
+        """
+        index = self._apps.get(app_id)
+        if index is None or not index.loaded:
+            return
+        self.add(app_id, bug_id, fingerprint, *texts)
+
+    async def reindex_bug(self, db: AsyncSession, app_id: int, bug_id: int) -> None:
+        """Refresh one bug after its title or fingerprint changed."""
+        index = self._apps.get(app_id)
+        if index is None or not index.loaded:
+            return
+        self._remove(index, bug_id)
+        result = await db.execute(self._bug_texts_query().where(Bug.id == bug_id))
+        row = result.first()
+        if row is not None:
+            self.add(app_id, *row)
+
+    def resolve_fingerprints(
+        self,
+        app_id: int,
+        drafts: Sequence[Tuple[str, Sequence[Optional[str]]]],
+        known: Set[str],
+        threshold: float,
+    ) -> Dict[str, str]:
+        """
+        Map unknown draft fingerprints to the fingerprint of a similar bug.
+
+        `drafts` are (fingerprint, texts) pairs; fingerprints in `known`
+        already exist and are left alone. New drafts are also matched against
+        each other so paraphrases within one triage run collapse to the first.
+        """
+        mapping: Dict[str, str] = {}
+        pending: List[Tuple[str, Signature]] = []
+        for fingerprint, texts in drafts:
+            if fingerprint in known or fingerprint in mapping:
+                continue
+            signature = self.signature_for(*texts)
+            if signature is None:
+                continue
+            match = self.match(app_id, signature, threshold)
+            if match is not None:
+                bug_id, target, similarity = match
+                if target != fingerprint:
+                    logger.info(
+                        "Folding bug draft %s into bug %s (similarity %.2f)",
+                        fingerprint[:12],
+                        bug_id,
+                        similarity,
+                    )
+                    mapping[fingerprint] = target
+                continue
+            for other, other_signature in pending:
+                if other == fingerprint:
+                    break
+                if estimate_similarity(signature, other_signature) >= threshold:
+                    mapping[fingerprint] = other
+                    break
+            else:
+                pending.append((fingerprint, signature))
+        return mapping
+
+
+bug_similarity_index = BugSimilarityIndex(
+    num_perm=settings.triage.similarity_num_perm,
+    bands=settings.triage.similarity_bands,
+    max_apps=settings.triage.similarity_max_apps,
+)
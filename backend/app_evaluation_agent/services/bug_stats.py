@@ -0,0 +1,250 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from sqlalchemy import Integer, bindparam, case, cast, func, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.storage.models import (
+    AppVersion,
+    Bug,
+    BugEvaluationStats,
+    BugVersionStats,
+    Evaluation,
+)
+
+logger = logging.getLogger(__name__)
+
+
+_UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+
+def check_upsert_support(dialect: str) -> None:
+    """Raise ValueError unless `dialect` has an INSERT with ON CONFLICT."""
+    if dialect not in _UPSERT_INSERTS:
+        raise ValueError(
+            f"Upserts are not supported on {dialect}; "
+            f"use one of {sorted(_UPSERT_INSERTS)}"
+        )
+
+
+def upsert_insert(db: AsyncSession):
+    """Dialect-specific INSERT that supports ON CONFLICT."""
+    dialect = db.get_bind().dialect.name
+    check_upsert_support(dialect)
+    return _UPSERT_INSERTS[dialect]
+
+
+def _earliest(current, incoming):
+    return case(
+        (or_(current.is_(None), incoming < current), incoming), else_=current
+    )
+
+
+def _latest(current, incoming):
+    return case(
+        (or_(current.is_(None), incoming > current), incoming), else_=current
+    )
+
+
+async def record_occurrences(
+    db: AsyncSession,
+    occurrences: Iterable[Dict[str, Any]],
+    new_bug_ids: Set[int] = frozenset(),
+) -> None:
+    """
+    Fold newly inserted occurrences into the bug counters and the per-version
+    and per-evaluation stats. `occurrences` are the row dicts that were
+    inserted (bug_id, app_version_id, evaluation_id, observed_at);
+    `new_bug_ids` are bugs first observed by these occurrences. Runs in the
+    caller's transaction and does not commit.
+    """
+    now = datetime.now(timezone.utc)
+    per_bug: Dict[int, int] = {}
+    per_version: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    per_evaluation: Dict[Tuple[int, int], int] = {}
+    for row in occurrences:
+        bug_id = row["bug_id"]
+        observed_at = row.get("observed_at") or now
+        if observed_at.tzinfo is None:
+            observed_at = observed_at.replace(tzinfo=timezone.utc)
+        per_bug[bug_id] = per_bug.get(bug_id, 0) + 1
+        if row.get("app_version_id") is not None:
+            stats = per_version.setdefault(
+                (bug_id, row["app_version_id"]),
+                {"count": 0, "first": observed_at, "last": observed_at},
+            )
+            stats["count"] += 1
+            stats["first"] = min(stats["first"], observed_at)
+            stats["last"] = max(stats["last"], observed_at)
+        if row.get("evaluation_id") is not None:
+            key = (bug_id, row["evaluation_id"])
+            per_evaluation[key] = per_evaluation.get(key, 0) + 1
+    if not per_bug:
+        return
+
+    bugs = Bug.__table__
+    await db.execute(
+        update(bugs)
+        .where(bugs.c.id == bindparam("b_id"))
+        .values(occurrence_count=bugs.c.occurrence_count + bindparam("delta")),
+        [{"b_id": bug_id, "delta": count} for bug_id, count in per_bug.items()],
+    )
+
+    insert = upsert_insert(db)
+    if per_version:
+        table = BugVersionStats.__table__
+        stmt = insert(table).values(
+            [
+                {
+                    "bug_id": bug_id,
+                    "app_version_id": version_id,
+                    "occurrence_count": stats["count"],
+                    "first_seen_at": stats["first"],
+                    "last_seen_at": stats["last"],
+                }
+                for (bug_id, version_id), stats in per_version.items()
+            ]
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.bug_id, table.c.app_version_id],
+                set_={
+                    "occurrence_count": table.c.occurrence_count
+                    + stmt.excluded.occurrence_count,
+                    "first_seen_at": _earliest(
+                        table.c.first_seen_at, stmt.excluded.first_seen_at
+                    ),
+                    "last_seen_at": _latest(
+                        table.c.last_seen_at, stmt.excluded.last_seen_at
+                    ),
+                },
+            )
+        )
+
+    if per_evaluation:
+        table = BugEvaluationStats.__table__
+        stmt = insert(table).values(
+            [
+                {
+                    "bug_id": bug_id,
+                    "evaluation_id": evaluation_id,
+                    "is_new": bug_id in new_bug_ids,
+                    "occurrence_count": count,
+                }
+                for (bug_id, evaluation_id), count in per_evaluation.items()
+            ]
+        )
+        await db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=[table.c.bug_id, table.c.evaluation_id],
+                set_={
+                    "occurrence_count": table.c.occurrence_count
+                    + stmt.excluded.occurrence_count
+                },
+            )
+        )
+
+
+async def get_app_bug_stats(
+    db: AsyncSession, app_id: int, evaluations_limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Bug counts for an app, read from the bug rows and the stats tables only;
+    the occurrences table is never scanned.
+    """
+    evaluations_limit = max(1, min(evaluations_limit, 200))
+
+    by_status: Dict[str, int] = {}
+    by_severity: Dict[str, int] = {}
+    total_bugs = total_occurrences = 0
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    result = await db.execute(
+        select(
+            Bug.status,
+            Bug.severity_level,
+            func.count(Bug.id),
+            func.coalesce(func.sum(Bug.occurrence_count), 0),
+            func.min(Bug.first_seen_at),
+            func.max(Bug.last_seen_at),
+        )
+        .where(Bug.app_id == app_id)
+        .group_by(Bug.status, Bug.severity_level)
+    )
+    for status, severity, bugs, occurrences, first, last in result.all():
+        status = getattr(status, "value", status)
+        severity = getattr(severity, "value", severity)
+        by_status[status] = by_status.get(status, 0) + bugs
+        by_severity[severity] = by_severity.get(severity, 0) + bugs
+        total_bugs += bugs
+        total_occurrences += occurrences
+        if first is not None and (first_seen is None or first < first_seen):
+            first_seen = first
+        if last is not None and (last_seen is None or last > last_seen):
+            last_seen = last
+
+    versions = await db.execute(
+        select(
+            BugVersionStats.app_version_id,
+            AppVersion.version,
+            func.count(BugVersionStats.bug_id),
+            func.sum(BugVersionStats.occurrence_count),
+            func.min(BugVersionStats.first_seen_at),
+            func.max(BugVersionStats.last_seen_at),
+        )
+        .join(AppVersion, AppVersion.id == BugVersionStats.app_version_id)
+        .where(AppVersion.app_id == app_id)
+        .group_by(BugVersionStats.app_version_id, AppVersion.version)
+        .order_by(BugVersionStats.app_version_id)
+    )
+
+    evaluations = await db.execute(
+        select(
+            BugEvaluationStats.evaluation_id,
+            func.sum(cast(BugEvaluationStats.is_new, Integer)),
+            func.count(BugEvaluationStats.bug_id),
+            func.sum(BugEvaluationStats.occurrence_count),
+        )
+        .join(Evaluation, Evaluation.id == BugEvaluationStats.evaluation_id)
+        .join(AppVersion, AppVersion.id == Evaluation.app_version_id)
+        .where(AppVersion.app_id == app_id)
+        .group_by(BugEvaluationStats.evaluation_id)
+        .order_by(BugEvaluationStats.evaluation_id.desc())
+        .limit(evaluations_limit)
+    )
+
+    return {
+        "app_id": app_id,
+        "total_bugs": total_bugs,
+        "total_occurrences": total_occurrences,
+        "first_seen_at": first_seen,
+        "last_seen_at": last_seen,
+        "by_status": by_status,
+        "by_severity": by_severity,
+        "versions": [
+            {
+                "app_version_id": version_id,
+                "version": version,
+                "bug_count": bug_count,
+                "occurrence_count": occurrence_count,
+                "first_seen_at": first,
+                "last_seen_at": last,
+            }
+            for version_id, version, bug_count, occurrence_count, first, last in (
+                versions.all()
+            )
+        ],
+        "evaluations": [
+            {
+                "evaluation_id": evaluation_id,
+                "new_bugs": new_bugs or 0,
+                "recurring_bugs": bug_count - (new_bugs or 0),
+                "occurrence_count": occurrence_count,
+            }
+            for evaluation_id, new_bugs, bug_count, occurrence_count in (
+                evaluations.all()
+            )
+        ],
+    }
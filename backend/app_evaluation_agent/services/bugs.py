@@ -1,7 +1,9 @@
 import logging
-from typing import Optional
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timezone
+from typing import Optional, Sequence
 
-from sqlalchemy import delete, select
+from sqlalchemy import case, delete, exists, func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app_evaluation_agent.schemas.bug import (
@@ -14,16 +16,39 @@ from app_evaluation_agent.storage.models import (
     App,
     AppVersion,
     Bug,
+    BugEvaluationStats,
     BugFix,
     BugOccurrence,
     BugSeverity,
     BugStatus,
+    BugVersionStats,
     Evaluation,
     TestCase,
 )
+from app_evaluation_agent.services import bug_stats
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.services.blob_store import blob_store
+from app_evaluation_agent.services.bug_stats import upsert_insert
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
+MAX_PAGE_SIZE = 200
+# Response header carrying the `before_id` of the next page.
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def next_cursor(items: Sequence, limit: int) -> Optional[int]:
+    """`before_id` for the following page, or None on the last page."""
+    if items and len(items) >= clamp_page_size(limit):
+        return items[-1].id
+    return None
+
 
 async def list_bugs_for_app(
     db: AsyncSession,
@@ -35,8 +60,13 @@ async def list_bugs_for_app(
     test_case_id: Optional[int] = None,
     limit: int = 50,
     offset: int = 0,
+    before_id: Optional[int] = None,
 ) -> list[Bug]:
-    limit = max(1, min(limit, 200))
+    """
+    Newest bugs first. Pass the last ID of a page as `before_id` to fetch the
+    next one; unlike `offset` this stays an index range scan on deep pages.
+    """
+    limit = clamp_page_size(limit)
     offset = max(0, offset)
 
     stmt = select(Bug).where(Bug.app_id == app_id)
@@ -45,16 +75,20 @@ async def list_bugs_for_app(
     if severity_level:
         stmt = stmt.where(Bug.severity_level == BugSeverity(severity_level))
 
-    if app_version_id or evaluation_id or test_case_id:
-        stmt = stmt.join(BugOccurrence)
-        if app_version_id:
-            stmt = stmt.where(BugOccurrence.app_version_id == app_version_id)
-        if evaluation_id:
-            stmt = stmt.where(BugOccurrence.evaluation_id == evaluation_id)
-        if test_case_id:
-            stmt = stmt.where(BugOccurrence.test_case_id == test_case_id)
-        # Use DISTINCT ON to avoid JSON equality requirements in Postgres.
-        stmt = stmt.distinct(Bug.id)
+    occurrence_filters = []
+    if app_version_id:
+        occurrence_filters.append(BugOccurrence.app_version_id == app_version_id)
+    if evaluation_id:
+        occurrence_filters.append(BugOccurrence.evaluation_id == evaluation_id)
+    if test_case_id:
+        occurrence_filters.append(BugOccurrence.test_case_id == test_case_id)
+    if occurrence_filters:
+        # A semi-join keeps one row per bug without DISTINCT over JSON columns.
+        stmt = stmt.where(
+            exists().where(BugOccurrence.bug_id == Bug.id, *occurrence_filters)
+        )
+    if before_id is not None:
+        stmt = stmt.where(Bug.id < before_id)
 
     stmt = stmt.order_by(Bug.id.desc()).limit(limit).offset(offset)
     result = await db.execute(stmt)
@@ -97,6 +131,11 @@ async def create_bug(db: AsyncSession, payload: BugCreate) -> Bug:
     db.add(bug)
     await db.commit()
     await db.refresh(bug)
+    # No occurrence yet, hence no expected/actual text; the first occurrence
+    # re-indexes the bug with it (see create_bug_occurrence).
+    bug_similarity_index.track(
+        bug.app_id, bug.id, bug.fingerprint, bug.title, None, None
+    )
     logger.info("Created bug %s for app %s", bug.id, bug.app_id)
     return bug
 
@@ -157,6 +196,8 @@ async def update_bug(db: AsyncSession, bug_id: int, payload: BugUpdate) -> Bug |
 
     await db.commit()
     await db.refresh(bug)
+    if payload.title is not None or payload.fingerprint is not None:
+        await bug_similarity_index.reindex_bug(db, bug.app_id, bug.id)
     return bug
 
 
@@ -164,10 +205,16 @@ async def delete_bug(db: AsyncSession, bug_id: int) -> bool:
     bug = await db.get(Bug, bug_id)
     if not bug:
         return False
+    await blob_store.release_occurrences(db, BugOccurrence.bug_id == bug_id)
     await db.execute(delete(BugOccurrence).where(BugOccurrence.bug_id == bug_id))
     await db.execute(delete(BugFix).where(BugFix.bug_id == bug_id))
+    await db.execute(delete(BugVersionStats).where(BugVersionStats.bug_id == bug_id))
+    await db.execute(
+        delete(BugEvaluationStats).where(BugEvaluationStats.bug_id == bug_id)
+    )
     await db.execute(delete(Bug).where(Bug.id == bug_id))
     await db.commit()
+    bug_similarity_index.discard(bug.app_id, bug_id)
     logger.info("Deleted bug %s", bug_id)
     return True
 
@@ -180,10 +227,13 @@ async def list_bug_occurrences(
     app_version_id: Optional[int] = None,
     limit: int = 50,
     offset: int = 0,
+    before_id: Optional[int] = None,
 ) -> list[BugOccurrence]:
-    limit = max(1, min(limit, 200))
+    limit = clamp_page_size(limit)
     offset = max(0, offset)
     stmt = select(BugOccurrence).where(BugOccurrence.bug_id == bug_id)
+    if before_id is not None:
+        stmt = stmt.where(BugOccurrence.id < before_id)
     if evaluation_id:
         stmt = stmt.where(BugOccurrence.evaluation_id == evaluation_id)
     if test_case_id:
@@ -227,6 +277,11 @@ async def create_bug_occurrence(
         if evaluation and evaluation.app_version_id != version.id:
             raise ValueError("App version does not match evaluation")
 
+    if payload.screenshot_hash is not None:
+        if not await blob_store.known(db, [payload.screenshot_hash]):
+            raise ValueError("Screenshot not found")
+        await blob_store.acquire(db, [payload.screenshot_hash])
+
     occurrence = BugOccurrence(
         bug_id=bug_id,
         evaluation_id=payload.evaluation_id,
@@ -238,14 +293,38 @@ async def create_bug_occurrence(
         actual=payload.actual,
         result_snapshot=payload.result_snapshot,
         screenshot_uri=payload.screenshot_uri,
+        screenshot_hash=payload.screenshot_hash,
         log_uri=payload.log_uri,
         raw_model_coords=payload.raw_model_coords,
         observed_at=payload.observed_at,
         executor_id=payload.executor_id,
     )
     db.add(occurrence)
+    first_occurrence = not bug.occurrence_count
+    await bug_stats.record_occurrences(
+        db,
+        [
+            {
+                "bug_id": bug_id,
+                "app_version_id": payload.app_version_id,
+                "evaluation_id": payload.evaluation_id,
+                "observed_at": payload.observed_at,
+            }
+        ],
+        new_bug_ids={bug_id} if first_occurrence else set(),
+    )
     await db.commit()
     await db.refresh(occurrence)
+    if first_occurrence:
+        # The similarity index reads expected/actual from the first occurrence.
+        bug_similarity_index.track(
+            bug.app_id,
+            bug.id,
+            bug.fingerprint,
+            bug.title,
+            payload.expected,
+            payload.actual,
+        )
     logger.info("Created bug occurrence %s for bug %s", occurrence.id, bug_id)
     return occurrence
 
@@ -304,3 +383,212 @@ async def delete_bug_fix(db: AsyncSession, bug_id: int, fix_id: int) -> bool:
     await db.commit()
     logger.info("Deleted bug fix %s for bug %s", fix_id, bug_id)
     return True
+
+
+@dataclass
+class TriagePersistResult:
+    # fingerprint -> bug id, for every draft that was persisted
+    bug_ids: dict[str, int] = field(default_factory=dict)
+    # bugs that did not exist before this call
+    created_bug_ids: set[int] = field(default_factory=set)
+    occurrence_count: int = 0
+    # first draft of each created bug, for `track_created_bugs`
+    created_drafts: dict[int, BugDraft] = field(default_factory=dict)
+
+
+def track_created_bugs(app_id: int, result: TriagePersistResult) -> None:
+    """
+    Add the bugs a triage run created to the similarity index. Call once
+    the run's transaction has committed, so a rollback never leaves
+    phantom bugs in the index.
+    """
+    for bug_id, draft in result.created_drafts.items():
+        bug_similarity_index.track(
+            app_id, bug_id, draft.fingerprint, draft.title, draft.expected, draft.actual
+        )
+
+
+async def _fold_near_duplicates(
+    db: AsyncSession, app_id: int, drafts: Sequence[BugDraft]
+) -> Sequence[BugDraft]:
+    threshold = settings.triage.similarity_threshold
+    if threshold <= 0:
+        return drafts
+    fingerprints = {draft.fingerprint for draft in drafts}
+    known = await db.execute(
+        select(Bug.fingerprint).where(
+            Bug.app_id == app_id, Bug.fingerprint.in_(list(fingerprints))
+        )
+    )
+    known_fingerprints = set(known.scalars().all())
+    await bug_similarity_index.sync(db, app_id)
+    texts = [
+        (draft.fingerprint, (draft.title, draft.expected, draft.actual))
+        for draft in drafts
+    ]
+    while True:
+        aliases = bug_similarity_index.resolve_fingerprints(
+            app_id, texts, known=known_fingerprints, threshold=threshold
+        )
+        # Bugs deleted by another process are still indexed here; drop
+        # them and match again rather than fold into a missing bug.
+        targets = set(aliases.values()) - fingerprints
+        if not targets:
+            break
+        found = await db.execute(
+            select(Bug.fingerprint).where(
+                Bug.app_id == app_id, Bug.fingerprint.in_(list(targets))
+            )
+        )
+        missing = targets - set(found.scalars().all())
+        if not missing:
+            break
+        bug_similarity_index.discard_fingerprints(app_id, missing)
+    if not aliases:
+        return drafts
+    return [
+        replace(draft, fingerprint=aliases.get(draft.fingerprint, draft.fingerprint))
+        for draft in drafts
+    ]
+
+
+async def persist_triage_drafts(
+    db: AsyncSession,
+    *,
+    app_id: int,
+    app_version_id: Optional[int],
+    evaluation_id: Optional[int],
+    test_case_id: Optional[int],
+    executor_id: Optional[str],
+    drafts: Sequence[BugDraft],
+) -> TriagePersistResult:
+    """
+    Persist the output of one triage run: upsert a bug per fingerprint and
+    record one occurrence per draft. Uses an INSERT .. ON CONFLICT DO
+    NOTHING for new fingerprints, an INSERT .. ON CONFLICT DO UPDATE for
+    the ones that already existed and one executemany, so concurrent runs
+    reporting the same fingerprint converge on one bug.
+
+    Drafts with an unknown fingerprint that closely resemble an existing bug
+    (see services/bug_similarity.py) take over that bug's fingerprint, so
+    LLM paraphrases are recorded as occurrences rather than new bugs.
+    Screenshot hashes that are not in the blob store are dropped. The
+    caller is expected to have validated the IDs. Does not commit; pass the
+    result to `track_created_bugs` once committed.
+    """
+    result = TriagePersistResult()
+    if not drafts:
+        return result
+
+    drafts = await _fold_near_duplicates(db, app_id, drafts)
+    now = datetime.now(timezone.utc)
+    first_by_fingerprint: dict[str, BugDraft] = {}
+    last_seen: dict[str, datetime] = {}
+    for draft in drafts:
+        observed_at = draft.observed_at or now
+        first_by_fingerprint.setdefault(draft.fingerprint, draft)
+        previous = last_seen.get(draft.fingerprint)
+        if previous is None or observed_at > previous:
+            last_seen[draft.fingerprint] = observed_at
+
+    bugs = Bug.__table__
+    insert = upsert_insert(db)
+
+    def _values(fingerprints):
+        return [
+            {
+                "app_id": app_id,
+                "title": draft.title,
+                "description": draft.description,
+                "severity_level": BugSeverity(draft.severity_level),
+                "priority": draft.priority,
+                "status": BugStatus(draft.status),
+                "discovered_version_id": app_version_id,
+                "fingerprint": fingerprint,
+                "environment": draft.environment,
+                "reproduction_steps": draft.reproduction_steps,
+                "first_seen_at": draft.observed_at or now,
+                "last_seen_at": last_seen[fingerprint],
+            }
+            for fingerprint, draft in first_by_fingerprint.items()
+            if fingerprint in fingerprints
+        ]
+
+    # New bugs are exactly the rows this INSERT .. DO NOTHING returns, so a
+    # concurrent run inserting the same fingerprint is never counted twice.
+    created = await db.execute(
+        insert(bugs)
+        .values(_values(first_by_fingerprint))
+        .on_conflict_do_nothing(index_elements=[bugs.c.app_id, bugs.c.fingerprint])
+        .returning(bugs.c.id, bugs.c.fingerprint)
+    )
+    result.bug_ids = {fingerprint: bug_id for bug_id, fingerprint in created.all()}
+    result.created_bug_ids = set(result.bug_ids.values())
+
+    seen = set(first_by_fingerprint) - set(result.bug_ids)
+    if seen:
+        stmt = insert(bugs).values(_values(seen))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[bugs.c.app_id, bugs.c.fingerprint],
+            set_={
+                "last_seen_at": case(
+                    (
+                        or_(
+                            bugs.c.last_seen_at.is_(None),
+                            stmt.excluded.last_seen_at > bugs.c.last_seen_at,
+                        ),
+                        stmt.excluded.last_seen_at,
+                    ),
+                    else_=bugs.c.last_seen_at,
+                ),
+                "updated_at": func.now(),
+            },
+        ).returning(bugs.c.id, bugs.c.fingerprint)
+        for bug_id, fingerprint in (await db.execute(stmt)).all():
+            result.bug_ids[fingerprint] = bug_id
+    result.created_drafts = {
+        bug_id: first_by_fingerprint[fingerprint]
+        for fingerprint, bug_id in result.bug_ids.items()
+        if bug_id in result.created_bug_ids
+    }
+
+    screenshots = await blob_store.known(
+        db, {draft.screenshot_hash for draft in drafts if draft.screenshot_hash}
+    )
+    occurrences = [
+        {
+            "bug_id": result.bug_ids[draft.fingerprint],
+            "evaluation_id": evaluation_id,
+            "test_case_id": test_case_id,
+            "app_version_id": app_version_id,
+            "step_index": draft.step_index,
+            "action": draft.action,
+            "expected": draft.expected,
+            "actual": draft.actual,
+            "result_snapshot": draft.result_snapshot,
+            "screenshot_uri": draft.screenshot_uri,
+            "screenshot_hash": (
+                draft.screenshot_hash if draft.screenshot_hash in screenshots else None
+            ),
+            "log_uri": draft.log_uri,
+            "raw_model_coords": draft.raw_model_coords,
+            "observed_at": draft.observed_at or now,
+            "executor_id": executor_id,
+        }
+        for draft in drafts
+    ]
+    await db.execute(BugOccurrence.__table__.insert(), occurrences)
+    await blob_store.acquire(
+        db, [occurrence["screenshot_hash"] for occurrence in occurrences]
+    )
+    await bug_stats.record_occurrences(db, occurrences, result.created_bug_ids)
+    result.occurrence_count = len(occurrences)
+
+    logger.info(
+        "Persisted %s bug occurrences for app %s (%s new bugs, %s existing)",
+        len(occurrences),
+        app_id,
+        len(result.created_bug_ids),
+        len(result.bug_ids) - len(result.created_bug_ids),
+    )
+    return result
@@ -0,0 +1,259 @@
+import logging
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.storage.models import (
+    TestCase,
+    TestCaseStatus,
+    test_case_dependencies,
+)
+
+logger = logging.getLogger(__name__)
+
+# (test_case_id, depends_on_id)
+Edge = Tuple[int, int]
+
+
+def _reaches(graph: Dict[int, Set[int]], start: int, target: int) -> bool:
+    stack = [start]
+    seen: Set[int] = set()
+    while stack:
+        node = stack.pop()
+        if node == target:
+            return True
+        if node in seen:
+            continue
+        seen.add(node)
+        stack.extend(graph.get(node, ()))
+    return False
+
+
+def split_acyclic_edges(edges: Iterable[Edge]) -> Tuple[List[Edge], List[Edge]]:
+    """
+    Keep edges in order as long as they leave the graph acyclic.
+    Returns (kept, dropped).
+    """
+    graph: Dict[int, Set[int]] = {}
+    kept: List[Edge] = []
+    dropped: List[Edge] = []
+    for case_id, depends_on_id in edges:
+        if case_id == depends_on_id or _reaches(graph, depends_on_id, case_id):
+            dropped.append((case_id, depends_on_id))
+            continue
+        graph.setdefault(case_id, set()).add(depends_on_id)
+        kept.append((case_id, depends_on_id))
+    return kept, dropped
+
+
+async def load_plan_edges(db: AsyncSession, plan_id: int) -> List[Edge]:
+    return (await load_edges_by_plan(db, [plan_id])).get(plan_id, [])
+
+
+async def load_edges_by_plan(
+    db: AsyncSession, plan_ids: Iterable[int]
+) -> Dict[int, List[Edge]]:
+    """Dependency edges of the given plans, one query for all of them."""
+    result = await db.execute(
+        select(
+            TestCase.plan_id,
+            test_case_dependencies.c.test_case_id,
+            test_case_dependencies.c.depends_on_id,
+        )
+        .join(TestCase, TestCase.id == test_case_dependencies.c.test_case_id)
+        .where(TestCase.plan_id.in_(list(plan_ids)))
+    )
+    edges: Dict[int, List[Edge]] = {}
+    for plan_id, case_id, depends_on_id in result.all():
+        edges.setdefault(plan_id, []).append((case_id, depends_on_id))
+    return edges
+
+
+async def _load_prerequisites(
+    db: AsyncSession, case_ids: Iterable[int]
+) -> Dict[int, Tuple[int, TestCaseStatus]]:
+    """Map case id -> (plan id, status) for the given cases."""
+    result = await db.execute(
+        select(TestCase.id, TestCase.plan_id, TestCase.status).where(
+            TestCase.id.in_(list(case_ids))
+        )
+    )
+    return {row[0]: (row[1], row[2]) for row in result.all()}
+
+
+def _check_prerequisites(
+    unique_ids: List[int],
+    found: Dict[int, Tuple[int, TestCaseStatus]],
+    plan_id: int,
+    case_id: int | None,
+) -> None:
+    if case_id is not None and case_id in unique_ids:
+        raise ValueError("A test case cannot depend on itself")
+    missing = [dep_id for dep_id in unique_ids if dep_id not in found]
+    if missing:
+        raise ValueError(f"Prerequisite test cases not found: {missing}")
+    foreign = [dep_id for dep_id in unique_ids if found[dep_id][0] != plan_id]
+    if foreign:
+        raise ValueError(
+            f"Prerequisite test cases {foreign} do not belong to plan {plan_id}"
+        )
+    failed = [
+        dep_id for dep_id in unique_ids if found[dep_id][1] == TestCaseStatus.FAILED
+    ]
+    if failed:
+        raise ValueError(f"Prerequisite test cases already failed: {failed}")
+
+
+def _replace_edges(
+    edges: List[Edge], case_id: int, depends_on_ids: List[int]
+) -> List[Edge]:
+    """The plan's edges with those of `case_id` replaced; rejects cycles."""
+    kept = [edge for edge in edges if edge[0] != case_id]
+    _, dropped = split_acyclic_edges(
+        kept + [(case_id, dep_id) for dep_id in depends_on_ids]
+    )
+    if dropped:
+        raise ValueError("depends_on_ids would create a dependency cycle")
+    return kept + [(case_id, dep_id) for dep_id in depends_on_ids]
+
+
+async def validate_dependencies(
+    db: AsyncSession,
+    plan_id: int,
+    depends_on_ids: Sequence[int],
+    case_id: int | None = None,
+) -> List[int]:
+    """
+    Check that prerequisites exist, belong to the same plan, have not
+    already FAILED (the dependent could never run) and (for an existing
+    case) do not close a cycle. Returns the de-duplicated IDs.
+    """
+    unique_ids = list(dict.fromkeys(depends_on_ids))
+    if not unique_ids:
+        return []
+    found = await _load_prerequisites(db, unique_ids)
+    _check_prerequisites(unique_ids, found, plan_id, case_id)
+    if case_id is not None:
+        _replace_edges(await load_plan_edges(db, plan_id), case_id, unique_ids)
+    return unique_ids
+
+
+async def validate_dependency_updates(
+    db: AsyncSession, changes: Sequence[Tuple[TestCase, Optional[Sequence[int]]]]
+) -> List[Optional[List[int]]]:
+    """
+    Bulk form of `validate_dependencies` for existing cases; a None entry
+    leaves that case's prerequisites alone. Prerequisites are fetched with
+    one query and each plan's edges loaded once, then the changes are
+    checked in memory in order, as if applied one by one. Errors name the
+    offending index (`updates[3]: ...`). Returns the de-duplicated IDs.
+    """
+    wanted = [
+        (case, None if ids is None else list(dict.fromkeys(ids)))
+        for case, ids in changes
+    ]
+    dep_ids = {dep_id for _, ids in wanted if ids for dep_id in ids}
+    plan_ids = {case.plan_id for case, ids in wanted if ids is not None}
+    if not plan_ids:
+        return [ids for _, ids in wanted]
+    found = await _load_prerequisites(db, dep_ids) if dep_ids else {}
+    edges = await load_edges_by_plan(db, plan_ids)
+
+    for idx, (case, ids) in enumerate(wanted):
+        if ids is None:
+            continue
+        try:
+            _check_prerequisites(ids, found, case.plan_id, case.id)
+            edges[case.plan_id] = _replace_edges(
+                edges.get(case.plan_id, []), case.id, ids
+            )
+        except ValueError as exc:
+            raise ValueError(f"updates[{idx}]: {exc}") from None
+    return [ids for _, ids in wanted]
+
+
+async def replace_dependencies(
+    db: AsyncSession, case_id: int, depends_on_ids: Sequence[int]
+) -> None:
+    """Replace the prerequisites of a case. Does not commit."""
+    await replace_dependencies_many(db, {case_id: depends_on_ids})
+
+
+async def replace_dependencies_many(
+    db: AsyncSession, prerequisites: Dict[int, Sequence[int]]
+) -> None:
+    """
+    Replace the prerequisites of several cases with one DELETE and one
+    INSERT. Does not commit.
+    """
+    if not prerequisites:
+        return
+    await db.execute(
+        delete(test_case_dependencies).where(
+            test_case_dependencies.c.test_case_id.in_(list(prerequisites))
+        )
+    )
+    await insert_edges(
+        db,
+        [
+            (case_id, dep_id)
+            for case_id, depends_on_ids in prerequisites.items()
+            for dep_id in depends_on_ids
+        ],
+    )
+
+
+async def insert_edges(db: AsyncSession, edges: Sequence[Edge]) -> None:
+    if not edges:
+        return
+    await db.execute(
+        insert(test_case_dependencies),
+        [
+            {"test_case_id": case_id, "depends_on_id": depends_on_id}
+            for case_id, depends_on_id in edges
+        ],
+    )
+
+
+async def fail_blocked_dependents(
+    db: AsyncSession, failed_case_ids: Iterable[int]
+) -> List[TestCase]:
+    """
+    A failed prerequisite means its dependents can never become ready.
+    Fail every pending case downstream of `failed_case_ids` so the plan can
+    still finish. Does not commit.
+    """
+    frontier = set(failed_case_ids)
+    blocked: List[TestCase] = []
+    while frontier:
+        result = await db.execute(
+            select(TestCase, test_case_dependencies.c.depends_on_id)
+            .join(
+                test_case_dependencies,
+                test_case_dependencies.c.test_case_id == TestCase.id,
+            )
+            .where(test_case_dependencies.c.depends_on_id.in_(frontier))
+            .where(TestCase.status == TestCaseStatus.PENDING)
+        )
+        rows = result.all()
+        frontier = set()
+        for case, depends_on_id in rows:
+            if case.status != TestCaseStatus.PENDING:
+                continue
+            case.status = TestCaseStatus.FAILED
+            case.result = {
+                "status": "failed",
+                "failure_type": "blocked_by_dependency",
+                "blocked_by": depends_on_id,
+            }
+            blocked.append(case)
+            frontier.add(case.id)
+
+    if blocked:
+        logger.info(
+            "Failed %s test case(s) blocked by failed prerequisites: %s",
+            len(blocked),
+            [case.id for case in blocked],
+        )
+    return blocked
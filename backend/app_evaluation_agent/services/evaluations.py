@@ -3,7 +3,7 @@ import logging
 from typing import Sequence
 
 from fastapi import UploadFile
-from sqlalchemy import delete, select
+from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -11,6 +11,9 @@ from app_evaluation_agent.integrations import s3_client, virus_scanner
 from app_evaluation_agent.services.agents.coordinator import CoordinatorAgent
 from app_evaluation_agent.services.agents.planner import PlannerAgent
 from app_evaluation_agent.services.agents.summarizer import SummarizerAgent
+from app_evaluation_agent.services import purge as purge_service
+from app_evaluation_agent.services import regressions as regression_service
+from app_evaluation_agent.services.version_lineage import lineage_cache
 from app_evaluation_agent.schemas.evaluation import (
     EvaluationCreate,
     EvaluationUpdate,
@@ -107,6 +110,7 @@ async def _get_or_create_app_version(
             existing.app_url = app_url
             updated = True
         if updated:
+            await lineage_cache.bump_revision(db, app.id)
             await db.commit()
             await db.refresh(existing)
         return existing
@@ -118,6 +122,7 @@ async def _get_or_create_app_version(
         app_url=app_url,
     )
     db.add(app_version)
+    await lineage_cache.bump_revision(db, app.id)
     await db.commit()
     await db.refresh(app_version)
     logger.info("Created app version %s for app %s", app_version.id, app.id)
@@ -160,6 +165,7 @@ async def create_evaluation(
         local_application_path=evaluation.local_application_path,
         high_level_goal=evaluation.high_level_goal,
         run_on_current_screen=evaluation.run_on_current_screen,
+        priority=evaluation.priority,
     )
     db.add(db_evaluation)
     await db.commit()
@@ -187,6 +193,7 @@ async def create_evaluation_from_upload(
     app_name: str,
     app_version: str,
     app_type: str,
+    priority: int = 0,
 ) -> Evaluation:
     """
     Handles the full upload workflow: scan, store, and create a record.
@@ -220,6 +227,7 @@ async def create_evaluation_from_upload(
         assigned_executor_id=executor_id,
         local_application_path=local_path,
         high_level_goal=high_level_goal,
+        priority=priority,
         executor_ids=list(executor_ids),
     )
 
@@ -251,6 +259,7 @@ async def get_evaluation_with_tasks(
     stmt = (
         select(TestCase)
         .where(TestCase.evaluation_id == evaluation.id)
+        .options(selectinload(TestCase.prerequisites))
         .order_by(TestCase.execution_order, TestCase.id)
     )
     result = await db.execute(stmt)
@@ -322,6 +331,8 @@ async def update_evaluation(
     await db.commit()
     await db.refresh(evaluation)
     await notify_evaluation_status(evaluation)
+    if evaluation.status == EvaluationStatus.COMPLETED:
+        await regression_service.analyze_when_settled(db, evaluation_id)
 
     # If an external caller marks this evaluation as SUMMARIZING without results,
     # start summarization in the background.
@@ -417,6 +428,9 @@ async def _run_summarization_for_plan(evaluation_id: int, plan_id: int) -> None:
                     evaluation_id,
                     plan_id,
                 )
+                await regression_service.analyze_when_settled(
+                    session, target_evaluation.id
+                )
         except Exception:
             logger.exception("Failed to summarize evaluation %s", evaluation_id)
             evaluation = await session.get(Evaluation, evaluation_id)
@@ -509,6 +523,7 @@ async def resume_pending_summaries() -> None:
                         evaluation.id,
                         plan.id,
                     )
+                    await regression_service.analyze_when_settled(db, evaluation.id)
             except Exception:
                 logger.exception(
                     "Failed to resume summarization for plan %s (evaluation %s)",
@@ -579,9 +594,7 @@ async def delete_evaluation(db: AsyncSession, evaluation_id: int) -> bool:
         logger.debug("Evaluation %s not found during delete", evaluation_id)
         return False
 
-    await db.execute(delete(TestCase).where(TestCase.evaluation_id == evaluation_id))
-    await db.execute(delete(TestPlan).where(TestPlan.evaluation_id == evaluation_id))
-    await db.execute(delete(Evaluation).where(Evaluation.id == evaluation_id))
+    await purge_service.purge_evaluations(db, [evaluation_id])
     await db.commit()
     logger.info("Deleted evaluation %s and associated plans/cases", evaluation_id)
     return True
@@ -0,0 +1,342 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Deque, Dict, List, Optional, Set
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.realtime import (
+    CHANNEL_EXECUTOR_TELEMETRY,
+    evaluation_status_broadcaster,
+)
+from app_evaluation_agent.services.bug_stats import upsert_insert
+from app_evaluation_agent.storage.models import Executor
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+STEP_WINDOW_SECONDS = 60.0
+# Weight of the newest sample in the analyze latency moving average.
+LATENCY_EWMA_ALPHA = 0.2
+
+
+@dataclass
+class ExecutorState:
+    executor_id: str
+    first_seen_at: datetime
+    last_heartbeat_at: Optional[datetime] = None
+    current_test_case_id: Optional[int] = None
+    capture_width: Optional[int] = None
+    capture_height: Optional[int] = None
+    avg_analyze_latency_ms: Optional[float] = None
+    total_steps: int = 0
+    info: Optional[dict] = None
+    # Rate read from the database on `load`, reported until one step window
+    # has passed (monotonic `loaded_at`) or a step is recorded.
+    persisted_steps_per_minute: Optional[float] = None
+    loaded_at: Optional[float] = None
+    # Part of `total_steps` already written to the database.
+    flushed_steps: int = 0
+    step_times: Deque[float] = field(default_factory=deque, repr=False)
+
+    @property
+    def steps_per_minute(self) -> float:
+        now = time.monotonic()
+        if self.persisted_steps_per_minute is not None:
+            if (
+                not self.step_times
+                and self.loaded_at is not None
+                and now - self.loaded_at < STEP_WINDOW_SECONDS
+            ):
+                return self.persisted_steps_per_minute
+            self.persisted_steps_per_minute = None
+        cutoff = now - STEP_WINDOW_SECONDS
+        while self.step_times and self.step_times[0] < cutoff:
+            self.step_times.popleft()
+        return float(len(self.step_times))
+
+    @property
+    def status(self) -> str:
+        if self.last_heartbeat_at is None:
+            return "offline"
+        age = (datetime.now(timezone.utc) - self.last_heartbeat_at).total_seconds()
+        if age <= settings.executors.stale_after_seconds:
+            return "online"
+        if age <= settings.executors.offline_after_seconds:
+            return "stale"
+        return "offline"
+
+    def to_payload(self) -> dict[str, Any]:
+        return {
+            "executor_id": self.executor_id,
+            "status": self.status,
+            "current_test_case_id": self.current_test_case_id,
+            "steps_per_minute": self.steps_per_minute,
+            "avg_analyze_latency_ms": self.avg_analyze_latency_ms,
+            "capture_width": self.capture_width,
+            "capture_height": self.capture_height,
+            "total_steps": self.total_steps,
+            "last_heartbeat_at": (
+                self.last_heartbeat_at.isoformat() if self.last_heartbeat_at else None
+            ),
+        }
+
+
+class ExecutorRegistry:
+    """
+    Live view of the runner fleet.
+
+    Runners report through heartbeats, `/testcases/next` and the analyze
+    endpoint; state is kept in memory, pushed on the `executor.telemetry`
+    WebSocket channel and flushed to the `executors` table periodically.
+
+    With several API workers each one only sees the reports it received
+    itself, so reads are per worker. Flushes merge instead of overwriting:
+    step counts are added, and the other fields come from whichever worker
+    saw the most recent heartbeat.
+    """
+
+    def __init__(self) -> None:
+        self._executors: Dict[str, ExecutorState] = {}
+        self._dirty: Set[str] = set()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def get(self, executor_id: str) -> Optional[ExecutorState]:
+        return self._executors.get(executor_id)
+
+    def list_executors(self, status: Optional[str] = None) -> List[ExecutorState]:
+        states = sorted(self._executors.values(), key=lambda s: s.executor_id)
+        if status:
+            states = [state for state in states if state.status == status]
+        return states
+
+    def executor_for_case(self, test_case_id: int) -> Optional[str]:
+        for state in self._executors.values():
+            if state.current_test_case_id == test_case_id:
+                return state.executor_id
+        return None
+
+    def clear(self) -> None:
+        self._executors.clear()
+        self._dirty.clear()
+
+    def _touch(self, executor_id: str) -> ExecutorState:
+        now = datetime.now(timezone.utc)
+        state = self._executors.get(executor_id)
+        if state is None:
+            state = ExecutorState(executor_id=executor_id, first_seen_at=now)
+            self._executors[executor_id] = state
+            logger.info("Registered executor %s", executor_id)
+        state.last_heartbeat_at = now
+        self._dirty.add(executor_id)
+        return state
+
+    async def heartbeat(
+        self,
+        executor_id: str,
+        current_test_case_id: Optional[int] = None,
+        capture_width: Optional[int] = None,
+        capture_height: Optional[int] = None,
+        info: Optional[dict] = None,
+    ) -> ExecutorState:
+        state = self._touch(executor_id)
+        if current_test_case_id is not None:
+            state.current_test_case_id = current_test_case_id
+        if capture_width is not None and capture_height is not None:
+            state.capture_width = capture_width
+            state.capture_height = capture_height
+        if info is not None:
+            state.info = info
+        await self._publish(state)
+        return state
+
+    async def record_assignment(self, executor_id: str, test_case_id: int) -> None:
+        state = self._touch(executor_id)
+        state.current_test_case_id = test_case_id
+        await self._publish(state)
+
+    async def record_poll(self, executor_id: str) -> None:
+        """An empty `/testcases/next` poll still proves the runner is alive."""
+        self._touch(executor_id)
+
+    async def record_step(
+        self,
+        executor_id: str,
+        analyze_latency_ms: float,
+        test_case_id: Optional[int] = None,
+        image_size: Optional[tuple[int, int]] = None,
+    ) -> None:
+        state = self._touch(executor_id)
+        state.persisted_steps_per_minute = None
+        state.step_times.append(time.monotonic())
+        state.total_steps += 1
+        if state.avg_analyze_latency_ms is None:
+            state.avg_analyze_latency_ms = analyze_latency_ms
+        else:
+            state.avg_analyze_latency_ms += LATENCY_EWMA_ALPHA * (
+                analyze_latency_ms - state.avg_analyze_latency_ms
+            )
+        if test_case_id is not None:
+            state.current_test_case_id = test_case_id
+        if image_size is not None:
+            state.capture_width, state.capture_height = image_size
+        await self._publish(state)
+
+    async def release_case(self, test_case_id: int) -> None:
+        """Clear the current case of whichever executor was running it."""
+        executor_id = self.executor_for_case(test_case_id)
+        if executor_id is None:
+            return
+        state = self._executors[executor_id]
+        state.current_test_case_id = None
+        self._dirty.add(executor_id)
+        await self._publish(state)
+
+    async def _publish(self, state: ExecutorState) -> None:
+        try:
+            await evaluation_status_broadcaster.publish_channel(
+                CHANNEL_EXECUTOR_TELEMETRY,
+                {"type": "executor", "executor": state.to_payload()},
+            )
+        except Exception:  # noqa: BLE001
+            logger.exception("Failed to publish telemetry for %s", state.executor_id)
+
+    # -- persistence -----------------------------------------------------
+
+    async def load(self, db: AsyncSession) -> None:
+        """Seed the registry with the last persisted telemetry."""
+        result = await db.execute(select(Executor))
+        for row in result.scalars().all():
+            if row.id in self._executors:
+                continue
+            self._executors[row.id] = ExecutorState(
+                executor_id=row.id,
+                first_seen_at=row.first_seen_at or datetime.now(timezone.utc),
+                last_heartbeat_at=(
+                    row.last_heartbeat_at.replace(tzinfo=timezone.utc)
+                    if row.last_heartbeat_at and row.last_heartbeat_at.tzinfo is None
+                    else row.last_heartbeat_at
+                ),
+                current_test_case_id=row.current_test_case_id,
+                capture_width=row.capture_width,
+                capture_height=row.capture_height,
+                avg_analyze_latency_ms=row.avg_analyze_latency_ms,
+                total_steps=row.total_steps or 0,
+                info=row.info,
+                persisted_steps_per_minute=row.steps_per_minute,
+                loaded_at=time.monotonic(),
+                flushed_steps=row.total_steps or 0,
+            )
+        logger.info("Loaded %s executors from the database", len(self._executors))
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Write executors that changed since the last flush. Returns the count."""
+        dirty, self._dirty = self._dirty, set()
+        if not dirty:
+            return 0
+        flushed: Dict[str, int] = {}
+        try:
+            for executor_id in dirty:
+                state = self._executors.get(executor_id)
+                if state is None:
+                    continue
+                flushed[executor_id] = state.total_steps
+                await db.execute(self._upsert(db, state))
+            await db.commit()
+        except Exception:
+            self._dirty |= dirty
+            raise
+        for executor_id, total_steps in flushed.items():
+            self._executors[executor_id].flushed_steps = total_steps
+        logger.debug("Flushed telemetry for %s executors", len(dirty))
+        return len(dirty)
+
+    @staticmethod
+    def _upsert(db: AsyncSession, state: ExecutorState):
+        """
+        Merge one executor's telemetry into its row. Steps are added as the
+        delta since the last flush, so flushes from several workers add up;
+        point-in-time fields are only taken from the newer heartbeat.
+        """
+        insert = upsert_insert(db)
+        stmt = insert(Executor).values(
+            id=state.executor_id,
+            current_test_case_id=state.current_test_case_id,
+            steps_per_minute=state.steps_per_minute,
+            avg_analyze_latency_ms=state.avg_analyze_latency_ms,
+            capture_width=state.capture_width,
+            capture_height=state.capture_height,
+            total_steps=state.total_steps - state.flushed_steps,
+            info=state.info,
+            first_seen_at=state.first_seen_at,
+            last_heartbeat_at=state.last_heartbeat_at,
+        )
+        incoming = stmt.excluded
+        newer = or_(
+            Executor.last_heartbeat_at.is_(None),
+            incoming.last_heartbeat_at >= Executor.last_heartbeat_at,
+        )
+
+        def latest(column: str):
+            return case(
+                (newer, getattr(incoming, column)),
+                else_=getattr(Executor, column),
+            )
+
+        return stmt.on_conflict_do_update(
+            index_elements=[Executor.id],
+            set_={
+                "total_steps": Executor.total_steps + incoming.total_steps,
+                "first_seen_at": case(
+                    (
+                        incoming.first_seen_at < Executor.first_seen_at,
+                        incoming.first_seen_at,
+                    ),
+                    else_=Executor.first_seen_at,
+                ),
+                **{
+                    column: latest(column)
+                    for column in (
+                        "current_test_case_id",
+                        "steps_per_minute",
+                        "avg_analyze_latency_ms",
+                        "capture_width",
+                        "capture_height",
+                        "info",
+                        "last_heartbeat_at",
+                    )
+                },
+                "updated_at": func.now(),
+            },
+        )
+
+    def start(self, session_factory: Callable[[], AsyncSession]) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop(session_factory))
+
+    async def stop(self, session_factory: Callable[[], AsyncSession]) -> None:
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        async with session_factory() as db:
+            await self.flush(db)
+
+    async def _flush_loop(self, session_factory: Callable[[], AsyncSession]) -> None:
+        while True:
+            await asyncio.sleep(settings.executors.flush_interval_seconds)
+            try:
+                async with session_factory() as db:
+                    await self.flush(db)
+            except Exception:
+                logger.exception("Failed to flush executor telemetry")
+
+
+executor_registry = ExecutorRegistry()
@@ -0,0 +1,222 @@
+import hashlib
+import io
+import json
+import logging
+import struct
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple, Union
+
+from PIL import Image
+
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+FRAME_ENCODING_FULL = "full"
+FRAME_ENCODING_DELTA = "delta"
+FRAME_ENCODINGS = {FRAME_ENCODING_FULL, FRAME_ENCODING_DELTA}
+
+# A delta is a 4-byte big-endian manifest length, the manifest JSON, then
+# the changed tiles' encoded images back to back.
+_MANIFEST_PREFIX = struct.Struct(">I")
+
+FrameData = Union[bytes, memoryview]
+
+
+class StaleFrameError(ValueError):
+    """The delta was made against a frame other than the one cached."""
+
+
+def tile_boxes(
+    width: int, height: int, tile_size: int
+) -> List[Tuple[int, int, int, int]]:
+    """Tile rectangles in row-major order; edge tiles are cropped to the frame."""
+    return [
+        (left, top, min(left + tile_size, width), min(top + tile_size, height))
+        for top in range(0, height, tile_size)
+        for left in range(0, width, tile_size)
+    ]
+
+
+def tile_hash(tile: Image.Image) -> bytes:
+    """SHA-256 of a tile's 8-bit RGB pixels, row by row."""
+    return hashlib.sha256(tile.tobytes()).digest()
+
+
+def frame_digest(tile_hashes: List[bytes]) -> str:
+    """Identifies a frame: SHA-256 over its tile hashes in row-major order."""
+    return hashlib.sha256(b"".join(tile_hashes)).hexdigest()
+
+
+class _Frame:
+    __slots__ = ("data", "image", "tile_size", "tile_hashes")
+
+    def __init__(
+        self,
+        data: Optional[FrameData] = None,
+        image: Optional[Image.Image] = None,
+        tile_size: Optional[int] = None,
+        tile_hashes: Optional[List[bytes]] = None,
+    ) -> None:
+        self.data = data
+        self.image = image
+        self.tile_size = tile_size
+        self.tile_hashes = tile_hashes
+
+    def decoded(self) -> Image.Image:
+        # Full uploads are kept encoded until a delta needs the pixels.
+        if self.image is None:
+            with Image.open(io.BytesIO(self.data)) as img:
+                self.image = img.convert("RGB")
+            self.data = None
+        return self.image
+
+    def hashes(self, tile_size: int) -> List[bytes]:
+        if self.tile_size != tile_size or self.tile_hashes is None:
+            image = self.decoded()
+            self.tile_hashes = [
+                tile_hash(image.crop(box))
+                for box in tile_boxes(image.width, image.height, tile_size)
+            ]
+            self.tile_size = tile_size
+        return self.tile_hashes
+
+
+def _parse_delta(delta: FrameData) -> Tuple[dict, memoryview]:
+    view = memoryview(delta)
+    if len(view) < _MANIFEST_PREFIX.size:
+        raise ValueError("delta is missing its manifest")
+    (manifest_length,) = _MANIFEST_PREFIX.unpack_from(view)
+    tiles_offset = _MANIFEST_PREFIX.size + manifest_length
+    if tiles_offset > len(view):
+        raise ValueError("manifest length exceeds the delta")
+    try:
+        manifest = json.loads(bytes(view[_MANIFEST_PREFIX.size : tiles_offset]))
+    except ValueError as exc:
+        raise ValueError(f"manifest is not valid JSON: {exc}") from exc
+    if not isinstance(manifest, dict):
+        raise ValueError("manifest must be an object")
+    for key in ("width", "height", "tile_size"):
+        value = manifest.get(key)
+        if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+            raise ValueError(f"{key} must be a positive integer")
+    if not isinstance(manifest.get("base"), str):
+        raise ValueError("base must be the previous frame's digest")
+    tiles = manifest.get("tiles")
+    if not isinstance(tiles, list):
+        raise ValueError("tiles must be a list")
+    total = 0
+    for tile in tiles:
+        if not isinstance(tile, dict):
+            raise ValueError("each tile must be an object")
+        for key in ("index", "length"):
+            value = tile.get(key)
+            if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+                raise ValueError(f"tile {key} must be a non-negative integer")
+        if not isinstance(tile.get("hash"), str):
+            raise ValueError("tile hash must be a hex string")
+        total += tile["length"]
+    if total != len(view) - tiles_offset:
+        raise ValueError("tile lengths do not add up to the delta size")
+    return manifest, view[tiles_offset:]
+
+
+class FrameCache:
+    """
+    Last full frame of recently active test cases (LRU), so runners can
+    upload a screenshot as the tiles that changed since their previous one.
+    Methods are synchronous and thread-safe; callers run `apply_delta` off
+    the event loop since it decodes and re-encodes the frame.
+    """
+
+    def __init__(self, capacity: Optional[int] = None) -> None:
+        self.capacity = capacity or settings.vision.frame_cache_size
+        self._frames: "OrderedDict[int, _Frame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._frames.clear()
+
+    def discard(self, test_case_id: int) -> None:
+        with self._lock:
+            self._frames.pop(test_case_id, None)
+
+    def _put(self, test_case_id: int, frame: _Frame) -> None:
+        with self._lock:
+            self._frames[test_case_id] = frame
+            self._frames.move_to_end(test_case_id)
+            while len(self._frames) > self.capacity:
+                self._frames.popitem(last=False)
+
+    def store(self, test_case_id: int, data: FrameData) -> None:
+        """Remember a full upload (still encoded) as the case's latest frame."""
+        self._put(test_case_id, _Frame(data=data))
+
+    def apply_delta(self, test_case_id: int, delta: FrameData) -> bytes:
+        """
+        Rebuild the case's frame from `delta` and return it as PNG. Raises
+        StaleFrameError if the cached frame is missing or is not the delta's
+        base (the runner should send a full frame), ValueError if the delta
+        is malformed.
+        """
+        manifest, blobs = _parse_delta(delta)
+        with self._lock:
+            frame = self._frames.get(test_case_id)
+        if frame is None:
+            raise StaleFrameError(f"No previous frame for test case {test_case_id}")
+
+        base = frame.decoded()
+        size = (manifest["width"], manifest["height"])
+        if base.size != size:
+            raise StaleFrameError(
+                f"Frame size changed from {base.size[0]}x{base.size[1]}"
+            )
+        tile_size = manifest["tile_size"]
+        hashes = list(frame.hashes(tile_size))
+        if frame_digest(hashes) != manifest["base"]:
+            raise StaleFrameError("Delta base does not match the cached frame")
+
+        boxes = tile_boxes(size[0], size[1], tile_size)
+        image = base.copy()
+        offset = 0
+        for tile in manifest["tiles"]:
+            index = tile["index"]
+            if index >= len(boxes):
+                raise ValueError(f"tile {index} is outside the frame")
+            box = boxes[index]
+            blob = blobs[offset : offset + tile["length"]]
+            offset += tile["length"]
+            try:
+                with Image.open(io.BytesIO(blob)) as img:
+                    pixels = img.convert("RGB")
+            except Exception as exc:  # noqa: BLE001
+                raise ValueError(f"tile {index} is not a valid image") from exc
+            if pixels.size != (box[2] - box[0], box[3] - box[1]):
+                raise ValueError(f"tile {index} has the wrong size")
+            digest = tile_hash(pixels)
+            if digest.hex() != tile["hash"].lower():
+                raise ValueError(f"tile {index} does not match its hash")
+            image.paste(pixels, box[:2])
+            hashes[index] = digest
+
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", compress_level=1)
+        self._put(
+            test_case_id,
+            _Frame(image=image, tile_size=tile_size, tile_hashes=hashes),
+        )
+        logger.debug(
+            "Rebuilt frame for test case %s from %s changed tiles of %s",
+            test_case_id,
+            len(manifest["tiles"]),
+            len(boxes),
+        )
+        return buffer.getvalue()
+
+
+frame_cache = FrameCache()
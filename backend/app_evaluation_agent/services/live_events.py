@@ -0,0 +1,223 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.realtime import (
+    CHANNEL_ANALYZE_STEP,
+    CHANNEL_BUGS,
+    CHANNEL_TEST_CASE_STATUS,
+    evaluation_status_broadcaster,
+)
+from app_evaluation_agent.storage.database import AsyncSessionLocal
+from app_evaluation_agent.storage.models import (
+    AppVersion,
+    Evaluation,
+    TestCase,
+    TestCaseStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+SCOPE_CACHE_SIZE = 4096
+
+
+class _ScopeCache:
+    """
+    Which evaluation a test case belongs to and which app an evaluation
+    belongs to. Neither ever changes, so entries are only evicted (LRU).
+    """
+
+    def __init__(self, capacity: int = SCOPE_CACHE_SIZE) -> None:
+        self.capacity = capacity
+        self.cases: "OrderedDict[int, int]" = OrderedDict()
+        self.evaluations: "OrderedDict[int, int]" = OrderedDict()
+
+    def clear(self) -> None:
+        self.cases.clear()
+        self.evaluations.clear()
+
+    def _put(self, entries: "OrderedDict[int, int]", key: int, value: int) -> None:
+        entries[key] = value
+        entries.move_to_end(key)
+        while len(entries) > self.capacity:
+            entries.popitem(last=False)
+
+    def remember_case(self, case_id: int, evaluation_id: int) -> None:
+        self._put(self.cases, case_id, evaluation_id)
+
+    def cached_case_scope(self, case_id: int) -> Optional[Tuple[int, int]]:
+        evaluation_id = self.cases.get(case_id)
+        if evaluation_id is None or evaluation_id not in self.evaluations:
+            return None
+        return evaluation_id, self.evaluations[evaluation_id]
+
+    async def evaluation_apps(
+        self, db: AsyncSession, evaluation_ids: Iterable[int]
+    ) -> Dict[int, int]:
+        wanted = set(evaluation_ids)
+        found = {
+            evaluation_id: self.evaluations[evaluation_id]
+            for evaluation_id in wanted
+            if evaluation_id in self.evaluations
+        }
+        missing = wanted - set(found)
+        if missing:
+            result = await db.execute(
+                select(Evaluation.id, AppVersion.app_id)
+                .join(AppVersion, AppVersion.id == Evaluation.app_version_id)
+                .where(Evaluation.id.in_(missing))
+            )
+            for evaluation_id, app_id in result.all():
+                self._put(self.evaluations, evaluation_id, app_id)
+                found[evaluation_id] = app_id
+        return found
+
+    async def case_scope(
+        self, db: AsyncSession, case_id: int
+    ) -> Optional[Tuple[int, Optional[int]]]:
+        evaluation_id = self.cases.get(case_id)
+        if evaluation_id is None:
+            evaluation_id = await db.scalar(
+                select(TestCase.evaluation_id).where(TestCase.id == case_id)
+            )
+            if evaluation_id is None:
+                return None
+            self.remember_case(case_id, evaluation_id)
+        apps = await self.evaluation_apps(db, [evaluation_id])
+        return evaluation_id, apps.get(evaluation_id)
+
+
+scope_cache = _ScopeCache()
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+def _value(status) -> Optional[str]:
+    return getattr(status, "value", status)
+
+
+async def publish_test_case_changes(
+    db: AsyncSession,
+    changes: Sequence[Tuple[TestCase, Optional[TestCaseStatus]]],
+) -> None:
+    """Publish a `testcase.status` event for every case whose status changed."""
+    changed = [
+        (case, previous) for case, previous in changes if case.status != previous
+    ]
+    if not changed:
+        return
+    try:
+        apps = await scope_cache.evaluation_apps(
+            db, {case.evaluation_id for case, _ in changed}
+        )
+        for case, previous in changed:
+            scope_cache.remember_case(case.id, case.evaluation_id)
+            await evaluation_status_broadcaster.publish_scoped(
+                CHANNEL_TEST_CASE_STATUS,
+                {
+                    "type": "testcase",
+                    "test_case_id": case.id,
+                    "status": _value(case.status),
+                    "previous_status": _value(previous),
+                    "assigned_executor_id": case.assigned_executor_id,
+                },
+                evaluation_id=case.evaluation_id,
+                app_id=apps.get(case.evaluation_id),
+            )
+    except Exception:  # noqa: BLE001
+        logger.exception("Failed to publish test case status events")
+
+
+async def publish_analyze_step(
+    test_case_id: int,
+    executor_id: Optional[str],
+    action: Optional[str],
+    latency_ms: float,
+    step_index: Optional[int] = None,
+    screenshot_hash: Optional[str] = None,
+) -> None:
+    """Publish an `analyze.step` event for one /vision/analyze call."""
+    try:
+        scope = scope_cache.cached_case_scope(test_case_id)
+        if scope is None:
+            async with AsyncSessionLocal() as db:
+                scope = await scope_cache.case_scope(db, test_case_id)
+            if scope is None:
+                return
+        evaluation_id, app_id = scope
+        await evaluation_status_broadcaster.publish_scoped(
+            CHANNEL_ANALYZE_STEP,
+            {
+                "type": "step",
+                "test_case_id": test_case_id,
+                "executor_id": executor_id,
+                "step_index": step_index,
+                "action": action,
+                "latency_ms": round(latency_ms, 1),
+                "screenshot_hash": screenshot_hash,
+            },
+            evaluation_id=evaluation_id,
+            app_id=app_id,
+        )
+    except Exception:  # noqa: BLE001
+        logger.exception("Failed to publish analyze step for case %s", test_case_id)
+
+
+def schedule_analyze_step(
+    test_case_id: int,
+    executor_id: Optional[str],
+    action: Optional[str],
+    latency_ms: float,
+    step_index: Optional[int] = None,
+    screenshot_hash: Optional[str] = None,
+) -> None:
+    """
+    `publish_analyze_step` in the background, so the analyze response does
+    not wait for the scope lookup or the journal's Redis round trips.
+    """
+    task = asyncio.create_task(
+        publish_analyze_step(
+            test_case_id,
+            executor_id,
+            action,
+            latency_ms,
+            step_index=step_index,
+            screenshot_hash=screenshot_hash,
+        )
+    )
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def publish_bugs(
+    app_id: int,
+    bug_ids: Iterable[int],
+    new_bug_ids: Iterable[int] = (),
+    occurrence_count: int = 0,
+    evaluation_id: Optional[int] = None,
+    test_case_id: Optional[int] = None,
+) -> None:
+    """
+    Publish a `bugs` event after bugs or occurrences were committed:
+    `new_bug_ids` were just created, `bug_ids` received `occurrence_count`
+    new occurrences between them.
+    """
+    try:
+        await evaluation_status_broadcaster.publish_scoped(
+            CHANNEL_BUGS,
+            {
+                "type": "bugs",
+                "test_case_id": test_case_id,
+                "bug_ids": sorted(set(bug_ids)),
+                "new_bug_ids": sorted(set(new_bug_ids)),
+                "occurrence_count": occurrence_count,
+            },
+            evaluation_id=evaluation_id,
+            app_id=app_id,
+        )
+    except Exception:  # noqa: BLE001
+        logger.exception("Failed to publish bug events for app %s", app_id)
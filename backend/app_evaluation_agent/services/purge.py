@@ -0,0 +1,341 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional, Sequence, Set, Tuple
+
+from sqlalchemy import delete, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.services.blob_store import blob_store
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.services.version_lineage import lineage_cache
+from app_evaluation_agent.storage.database import AsyncSessionLocal
+from app_evaluation_agent.storage.models import (
+    App,
+    AppVersion,
+    Bug,
+    BugEvaluationStats,
+    BugFix,
+    BugOccurrence,
+    BugTriageJob,
+    BugVersionStats,
+    Evaluation,
+    PurgeJob,
+    PurgeJobStatus,
+    TestCase,
+    TestPlan,
+    app_version_lineage,
+    test_case_dependencies,
+)
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+TARGET_APP = "app"
+TARGET_APP_VERSION = "app_version"
+
+PHASE_EVALUATIONS = "evaluations"
+PHASE_BUGS = "bugs"
+PHASE_FINALIZE = "finalize"
+
+
+async def purge_evaluations(db: AsyncSession, evaluation_ids: Sequence[int]) -> None:
+    """
+    Delete evaluations with their plans, cases, case dependencies and triage
+    jobs, one statement per table. Bug occurrences and fixes keep their rows
+    (and the bug counters stay true) but lose the link to the evaluation and
+    its cases. Does not commit.
+    """
+    if not evaluation_ids:
+        return
+    ids = list(evaluation_ids)
+    case_ids = select(TestCase.id).where(TestCase.evaluation_id.in_(ids))
+
+    await db.execute(
+        update(BugOccurrence)
+        .where(BugOccurrence.evaluation_id.in_(ids))
+        .values(evaluation_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(BugOccurrence)
+        .where(BugOccurrence.test_case_id.in_(case_ids))
+        .values(test_case_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(BugFix)
+        .where(BugFix.verified_by_evaluation_id.in_(ids))
+        .values(verified_by_evaluation_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(BugEvaluationStats).where(BugEvaluationStats.evaluation_id.in_(ids))
+    )
+    await db.execute(
+        delete(BugTriageJob)
+        .where(BugTriageJob.test_case_id.in_(case_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(test_case_dependencies).where(
+            or_(
+                test_case_dependencies.c.test_case_id.in_(case_ids),
+                test_case_dependencies.c.depends_on_id.in_(case_ids),
+            )
+        )
+    )
+    await db.execute(delete(TestCase).where(TestCase.evaluation_id.in_(ids)))
+    await db.execute(delete(TestPlan).where(TestPlan.evaluation_id.in_(ids)))
+    await db.execute(delete(Evaluation).where(Evaluation.id.in_(ids)))
+
+
+async def purge_bugs(db: AsyncSession, app_id: int, bug_ids: Sequence[int]) -> None:
+    """Delete bugs with their occurrences, fixes and stats. Does not commit."""
+    if not bug_ids:
+        return
+    ids = list(bug_ids)
+    await blob_store.release_occurrences(db, BugOccurrence.bug_id.in_(ids))
+    for model in (BugOccurrence, BugFix, BugVersionStats, BugEvaluationStats):
+        await db.execute(delete(model).where(model.bug_id.in_(ids)))
+    await db.execute(delete(Bug).where(Bug.id.in_(ids)))
+    for bug_id in ids:
+        bug_similarity_index.discard(app_id, bug_id)
+
+
+async def purge_versions(db: AsyncSession, app_id: int, version_ids) -> None:
+    """
+    Delete app versions whose evaluations are already gone. `version_ids` is
+    a list or a select of IDs. Children's legacy `previous_version_id` is
+    re-pointed at their lowest remaining lineage parent with one correlated
+    UPDATE. Does not commit.
+    """
+    lineage = app_version_lineage
+    remaining_parent = (
+        select(func.min(lineage.c.previous_version_id))
+        .where(
+            lineage.c.app_version_id == AppVersion.id,
+            lineage.c.previous_version_id.not_in(version_ids),
+        )
+        .scalar_subquery()
+    )
+    await db.execute(
+        update(AppVersion)
+        .where(
+            AppVersion.previous_version_id.in_(version_ids),
+            AppVersion.id.not_in(version_ids),
+        )
+        .values(previous_version_id=remaining_parent)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(lineage).where(
+            or_(
+                lineage.c.app_version_id.in_(version_ids),
+                lineage.c.previous_version_id.in_(version_ids),
+            )
+        )
+    )
+    await db.execute(
+        update(BugOccurrence)
+        .where(BugOccurrence.app_version_id.in_(version_ids))
+        .values(app_version_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(Bug)
+        .where(Bug.discovered_version_id.in_(version_ids))
+        .values(discovered_version_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        delete(BugVersionStats).where(BugVersionStats.app_version_id.in_(version_ids))
+    )
+    await db.execute(
+        delete(BugFix)
+        .where(BugFix.fixed_in_version_id.in_(version_ids))
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(delete(AppVersion).where(AppVersion.id.in_(version_ids)))
+    await lineage_cache.bump_revision(db, app_id)
+
+
+def _evaluations_of(target_type: str, target_id: int):
+    if target_type == TARGET_APP_VERSION:
+        return select(Evaluation.id).where(Evaluation.app_version_id == target_id)
+    return (
+        select(Evaluation.id)
+        .join(AppVersion, AppVersion.id == Evaluation.app_version_id)
+        .where(AppVersion.app_id == target_id)
+    )
+
+
+async def count_items(db: AsyncSession, target_type: str, target_id: int) -> int:
+    """Evaluations (plus bugs, for an app) a purge of the target will delete."""
+    total = await db.scalar(
+        select(func.count()).select_from(
+            _evaluations_of(target_type, target_id).subquery()
+        )
+    )
+    if target_type == TARGET_APP:
+        total += await db.scalar(
+            select(func.count(Bug.id)).where(Bug.app_id == target_id)
+        )
+    return total or 0
+
+
+async def purge_in_chunks(
+    db: AsyncSession,
+    target_type: str,
+    target_id: int,
+    app_id: int,
+    batch_size: Optional[int] = None,
+) -> AsyncIterator[Tuple[str, int]]:
+    """
+    Delete an app or app version chunk by chunk, committing after each chunk
+    so no transaction holds locks on more than `batch_size` evaluations (or
+    bugs). Yields (phase, rows in chunk) after each commit. Safe to re-run:
+    every chunk re-selects what is left.
+    """
+    batch_size = max(1, batch_size or settings.purge.batch_size)
+    evaluations = _evaluations_of(target_type, target_id).order_by(Evaluation.id)
+    while True:
+        result = await db.execute(evaluations.limit(batch_size))
+        ids = result.scalars().all()
+        if not ids:
+            break
+        await purge_evaluations(db, ids)
+        await db.commit()
+        yield PHASE_EVALUATIONS, len(ids)
+
+    if target_type == TARGET_APP:
+        bugs = select(Bug.id).where(Bug.app_id == target_id).order_by(Bug.id)
+        while True:
+            result = await db.execute(bugs.limit(batch_size))
+            ids = result.scalars().all()
+            if not ids:
+                break
+            await purge_bugs(db, target_id, ids)
+            await db.commit()
+            yield PHASE_BUGS, len(ids)
+
+    if target_type == TARGET_APP:
+        await purge_versions(
+            db, app_id, select(AppVersion.id).where(AppVersion.app_id == target_id)
+        )
+        await db.execute(delete(App).where(App.id == target_id))
+    else:
+        await purge_versions(db, app_id, [target_id])
+    await db.commit()
+    if target_type == TARGET_APP:
+        bug_similarity_index.forget_app(target_id)
+        lineage_cache.invalidate(target_id)
+    yield PHASE_FINALIZE, 0
+
+
+async def purge_now(
+    db: AsyncSession, target_type: str, target_id: int, app_id: int
+) -> None:
+    """Run a chunked purge to completion in the caller's task."""
+    async for _ in purge_in_chunks(db, target_type, target_id, app_id):
+        pass
+
+
+async def start_purge_job(
+    db: AsyncSession, target_type: str, target_id: int, app_id: int
+) -> PurgeJob:
+    """Record a purge job for an existing target and run it in the background."""
+    job = PurgeJob(
+        target_type=target_type,
+        target_id=target_id,
+        app_id=app_id,
+        status=PurgeJobStatus.PENDING,
+        total_items=await count_items(db, target_type, target_id),
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    logger.info(
+        "Queued purge job %s for %s %s (%s items)",
+        job.id,
+        target_type,
+        target_id,
+        job.total_items,
+    )
+    launch_purge_job(job.id)
+    return job
+
+
+async def get_purge_job(db: AsyncSession, job_id: int) -> Optional[PurgeJob]:
+    return await db.get(PurgeJob, job_id)
+
+
+async def run_purge_job(db: AsyncSession, job_id: int) -> Optional[PurgeJob]:
+    """Run a purge job, recording progress after every committed chunk."""
+    job = await db.get(PurgeJob, job_id)
+    if not job or job.status == PurgeJobStatus.COMPLETED:
+        return job
+
+    job.status = PurgeJobStatus.RUNNING
+    job.last_error = None
+    await db.commit()
+    try:
+        async for phase, count in purge_in_chunks(
+            db, job.target_type, job.target_id, job.app_id
+        ):
+            job.phase = phase
+            job.processed_items += count
+            # Rows added to the target after the job was counted.
+            job.total_items = max(job.total_items, job.processed_items)
+            await db.commit()
+    except Exception as exc:  # noqa: BLE001
+        await db.rollback()
+        job = await db.get(PurgeJob, job_id, populate_existing=True)
+        if not job:
+            return None
+        job.status = PurgeJobStatus.FAILED
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        await db.commit()
+        logger.exception("Purge job %s failed", job_id)
+        return job
+
+    job.status = PurgeJobStatus.COMPLETED
+    job.processed_items = job.total_items
+    job.finished_at = datetime.now(timezone.utc)
+    await db.commit()
+    logger.info(
+        "Purge job %s completed (%s %s)", job_id, job.target_type, job.target_id
+    )
+    return job
+
+
+_background_tasks: Set[asyncio.Task] = set()
+
+
+async def _run_in_background(job_id: int) -> None:
+    try:
+        async with AsyncSessionLocal() as db:
+            await run_purge_job(db, job_id)
+    except Exception:  # noqa: BLE001
+        logger.exception("Purge worker crashed on job %s", job_id)
+
+
+def launch_purge_job(job_id: int) -> None:
+    task = asyncio.create_task(_run_in_background(job_id))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+
+async def resume_pending_purges(db: AsyncSession) -> int:
+    """Restart purge jobs that were queued or running when the API stopped."""
+    result = await db.execute(
+        select(PurgeJob.id)
+        .where(PurgeJob.status.in_((PurgeJobStatus.PENDING, PurgeJobStatus.RUNNING)))
+        .order_by(PurgeJob.id)
+    )
+    job_ids = result.scalars().all()
+    for job_id in job_ids:
+        launch_purge_job(job_id)
+    if job_ids:
+        logger.info("Resumed %s purge jobs", len(job_ids))
+    return len(job_ids)
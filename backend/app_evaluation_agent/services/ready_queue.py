@@ -0,0 +1,611 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app_evaluation_agent.services.scheduling import (
+    IN_FLIGHT_STATUSES,
+    QueuedEvaluation,
+    SchedulingPolicy,
+    executor_affinity_clause,
+    prerequisites_met_clause,
+)
+from app_evaluation_agent.storage.models import (
+    App,
+    AppVersion,
+    Evaluation,
+    TestCase,
+    TestCaseStatus,
+    test_case_dependencies,
+)
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# (evaluation_id, pinned executor or None for "any executor")
+QueueKey = Tuple[int, Optional[str]]
+# (nulls-last flag, execution_order, case_id, generation)
+HeapEntry = Tuple[bool, int, int, int]
+# (time the pin lapses, case_id, generation)
+PinEntry = Tuple[float, int, int]
+# (rank of the heap's head under a policy, stamp, queue key)
+HeadEntry = Tuple[Tuple, int, QueueKey]
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _pin_deadline(pending_since: Optional[float]) -> float:
+    return (pending_since or time.time()) + (
+        settings.scheduling.affinity_fallback_seconds
+    )
+
+
+def _pinned_executors(assigned_executor_id: Optional[str]) -> List[Optional[str]]:
+    """
+    Executors a pending case may go to; [None] means any executor, which is
+    always the case without `[scheduling] executor_affinity`. Legacy rows may
+    store the assignment as a stringified JSON list.
+    """
+    if not assigned_executor_id or not settings.scheduling.executor_affinity:
+        return [None]
+    if assigned_executor_id.startswith("["):
+        try:
+            parsed = json.loads(assigned_executor_id)
+        except ValueError:
+            parsed = None
+        if isinstance(parsed, list) and parsed:
+            return [str(item) for item in parsed]
+    return [assigned_executor_id]
+
+
+@dataclass
+class _QueuedCase:
+    case_id: int
+    evaluation_id: int
+    execution_order: Optional[int]
+    executors: List[Optional[str]]
+    blocked_on: Set[int] = field(default_factory=set)
+    # Wall-clock time after which a pinned case is open to every executor.
+    pinned_until: Optional[float] = None
+
+
+class ReadyQueue:
+    """
+    In-process mirror of PENDING test cases for `/testcases/next`.
+
+    Ready cases sit in one heap per (evaluation, pinned executor) ordered by
+    execution_order; cases waiting on prerequisites are parked until those
+    complete. Pinned cases (only with `[scheduling] executor_affinity`) move
+    to the shared heap once their pin lapses.
+
+    The heads of those heaps are kept in a second level of heaps, one per
+    (policy, pinned executor), ordered by the policy's rank, so a pick pops
+    the winner in O(log n). Head entries are re-ranked when a head changes
+    or an evaluation's rank improves (an app's in-flight count drops or its
+    weight grows); ranks that only got worse are corrected lazily when the
+    entry reaches the top.
+
+    The database stays the source of truth: the claim is a conditional
+    UPDATE, and stale entries are dropped or re-tracked when it fails. The
+    queue is inactive (callers use the SQL path) until `rebuild` runs, and
+    it is rebuilt periodically so writes from other processes show up.
+    """
+
+    def __init__(self) -> None:
+        self.active = False
+        self._last_sync = float("-inf")
+        self._generation = 0
+        self._stamp = 0
+        self._cases: Dict[int, _QueuedCase] = {}
+        self._ready: Dict[int, int] = {}  # case_id -> live heap generation
+        self._heaps: Dict[QueueKey, List[HeapEntry]] = {}
+        self._pins: List[PinEntry] = []
+        self._dependents: Dict[int, Set[int]] = {}
+        self._evaluations: Dict[int, QueuedEvaluation] = {}
+        self._in_flight: Dict[int, int] = {}
+        self._weights: Dict[int, int] = {}
+        # (policy name, pinned executor) -> heap of heap heads
+        self._heads: Dict[Tuple[str, Optional[str]], List[HeadEntry]] = {}
+        self._stamps: Dict[QueueKey, int] = {}  # key -> live head stamp
+        self._app_keys: Dict[Optional[int], Set[QueueKey]] = {}
+        self._policies: Dict[str, SchedulingPolicy] = {}
+        self._rebuild_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._ready)
+
+    def clear(self) -> None:
+        """Forget every case and deactivate the queue."""
+        self.active = False
+        self._last_sync = float("-inf")
+        for mapping in (
+            self._cases,
+            self._ready,
+            self._heaps,
+            self._dependents,
+            self._evaluations,
+            self._in_flight,
+            self._weights,
+            self._heads,
+            self._stamps,
+            self._app_keys,
+        ):
+            mapping.clear()
+        self._pins.clear()
+
+    def request_resync(self) -> None:
+        """Rebuild on the next claim, e.g. after a miss the SQL path served."""
+        self._last_sync = float("-inf")
+
+    # -- rebuild -------------------------------------------------------
+
+    async def rebuild(self, db: AsyncSession) -> None:
+        """
+        Reload every pending case, blocking edge and in-flight count. One
+        rebuild runs at a time; the current state keeps serving claims until
+        the new one is swapped in without an intervening await.
+        """
+        async with self._rebuild_lock:
+            await self._rebuild(db)
+
+    async def _rebuild(self, db: AsyncSession) -> None:
+        eval_rows = await db.execute(
+            select(
+                Evaluation.id,
+                AppVersion.app_id,
+                Evaluation.priority,
+                Evaluation.created_at,
+                Evaluation.last_dispatched_at,
+            )
+            .join(AppVersion, AppVersion.id == Evaluation.app_version_id, isouter=True)
+            .where(
+                Evaluation.id.in_(
+                    select(TestCase.evaluation_id).where(
+                        TestCase.status.in_(
+                            (TestCaseStatus.PENDING, *IN_FLIGHT_STATUSES)
+                        )
+                    )
+                )
+            )
+        )
+        evaluations = eval_rows.all()
+
+        weight_rows = await db.execute(select(App.id, App.scheduling_weight))
+        weights = {row[0]: row[1] for row in weight_rows.all()}
+
+        in_flight_rows = await db.execute(
+            select(AppVersion.app_id, func.count(TestCase.id))
+            .select_from(TestCase)
+            .join(Evaluation, Evaluation.id == TestCase.evaluation_id)
+            .join(AppVersion, AppVersion.id == Evaluation.app_version_id)
+            .where(TestCase.status.in_(IN_FLIGHT_STATUSES))
+            .group_by(AppVersion.app_id)
+        )
+        in_flight = {row[0]: row[1] for row in in_flight_rows.all()}
+
+        blocked = await self._load_blocking(db)
+        case_rows = await db.execute(
+            select(
+                TestCase.id,
+                TestCase.evaluation_id,
+                TestCase.execution_order,
+                TestCase.assigned_executor_id,
+                func.coalesce(TestCase.updated_at, TestCase.created_at),
+            ).where(TestCase.status == TestCaseStatus.PENDING)
+        )
+        cases = case_rows.all()
+
+        self.clear()
+        for row in evaluations:
+            self._remember_evaluation(*row)
+        self._weights.update(weights)
+        self._in_flight.update(in_flight)
+        for case_id, evaluation_id, order, assigned, since in cases:
+            self._add(
+                _QueuedCase(
+                    case_id=case_id,
+                    evaluation_id=evaluation_id,
+                    execution_order=order,
+                    executors=_pinned_executors(assigned),
+                    blocked_on=blocked.get(case_id, set()),
+                    pinned_until=_pin_deadline(_timestamp(since)),
+                )
+            )
+
+        self.active = True
+        self._last_sync = time.monotonic()
+        logger.info(
+            "Ready queue rebuilt: %s ready, %s waiting on prerequisites",
+            len(self._ready),
+            len(self._cases) - len(self._ready),
+        )
+
+    async def _load_blocking(
+        self, db: AsyncSession, case_ids: Optional[Iterable[int]] = None
+    ) -> Dict[int, Set[int]]:
+        """Map pending case -> prerequisites that have not completed yet."""
+        dependent = aliased(TestCase)
+        prerequisite = aliased(TestCase)
+        stmt = (
+            select(
+                test_case_dependencies.c.test_case_id,
+                test_case_dependencies.c.depends_on_id,
+            )
+            .join(dependent, dependent.id == test_case_dependencies.c.test_case_id)
+            .join(
+                prerequisite,
+                prerequisite.id == test_case_dependencies.c.depends_on_id,
+            )
+            .where(dependent.status == TestCaseStatus.PENDING)
+            .where(prerequisite.status != TestCaseStatus.COMPLETED)
+        )
+        if case_ids is not None:
+            stmt = stmt.where(
+                test_case_dependencies.c.test_case_id.in_(list(case_ids))
+            )
+        blocked: Dict[int, Set[int]] = {}
+        for case_id, depends_on_id in (await db.execute(stmt)).all():
+            blocked.setdefault(case_id, set()).add(depends_on_id)
+        return blocked
+
+    def _remember_evaluation(
+        self,
+        evaluation_id: int,
+        app_id: Optional[int],
+        priority: Optional[int],
+        created_at: Optional[datetime],
+        last_dispatched_at: Optional[datetime],
+    ) -> None:
+        self._evaluations[evaluation_id] = QueuedEvaluation(
+            evaluation_id=evaluation_id,
+            app_id=app_id,
+            priority=priority or 0,
+            created_at=_timestamp(created_at) or 0.0,
+            last_dispatched_at=_timestamp(last_dispatched_at),
+        )
+
+    # -- incremental maintenance ----------------------------------------
+
+    async def track(self, db: AsyncSession, case: TestCase) -> None:
+        """Mirror a case that was inserted as, or moved back to, PENDING."""
+        await self.track_many(db, [case])
+
+    async def track_many(self, db: AsyncSession, cases: Iterable[TestCase]) -> None:
+        """Batch form of `track`: one query for evaluations, one for edges."""
+        if not self.active:
+            return
+        pending: List[TestCase] = []
+        for case in cases:
+            self.discard(case.id)
+            if case.status == TestCaseStatus.PENDING:
+                pending.append(case)
+        if not pending:
+            return
+
+        unknown = {
+            case.evaluation_id
+            for case in pending
+            if case.evaluation_id not in self._evaluations
+        }
+        if unknown:
+            rows = await db.execute(
+                select(
+                    Evaluation.id,
+                    AppVersion.app_id,
+                    Evaluation.priority,
+                    Evaluation.created_at,
+                    Evaluation.last_dispatched_at,
+                )
+                .join(
+                    AppVersion,
+                    AppVersion.id == Evaluation.app_version_id,
+                    isouter=True,
+                )
+                .where(Evaluation.id.in_(unknown))
+            )
+            for row in rows.all():
+                self._remember_evaluation(*row)
+
+        blocked = await self._load_blocking(db, [case.id for case in pending])
+        for case in pending:
+            if case.evaluation_id not in self._evaluations:
+                continue
+            self._add(
+                _QueuedCase(
+                    case_id=case.id,
+                    evaluation_id=case.evaluation_id,
+                    execution_order=case.execution_order,
+                    executors=_pinned_executors(case.assigned_executor_id),
+                    blocked_on=blocked.get(case.id, set()),
+                    pinned_until=_pin_deadline(time.time()),
+                )
+            )
+
+    async def on_status_change(
+        self,
+        db: AsyncSession,
+        case: TestCase,
+        previous: Optional[TestCaseStatus],
+    ) -> None:
+        """Keep ready entries, in-flight counts and blocked cases in sync."""
+        if not self.active:
+            return
+        current = case.status
+        app_id = self._app_of(case.evaluation_id)
+        if app_id is not None:
+            was_in_flight = previous in IN_FLIGHT_STATUSES
+            is_in_flight = current in IN_FLIGHT_STATUSES
+            if was_in_flight and not is_in_flight:
+                self._in_flight[app_id] = max(0, self._in_flight.get(app_id, 0) - 1)
+                self._refresh_app(app_id)
+            elif is_in_flight and not was_in_flight:
+                self._in_flight[app_id] = self._in_flight.get(app_id, 0) + 1
+
+        if current == TestCaseStatus.PENDING:
+            await self.track(db, case)
+        else:
+            self.discard(case.id)
+        if current == TestCaseStatus.COMPLETED:
+            self._release_dependents(case.id)
+
+    def discard(self, case_id: int) -> None:
+        """Forget a case; its heap entries become stale and are skipped."""
+        queued = self._cases.pop(case_id, None)
+        self._ready.pop(case_id, None)
+        if queued is None:
+            return
+        for depends_on_id in queued.blocked_on:
+            dependents = self._dependents.get(depends_on_id)
+            if dependents:
+                dependents.discard(case_id)
+                if not dependents:
+                    self._dependents.pop(depends_on_id, None)
+
+    def set_app_weight(self, app_id: int, weight: int) -> None:
+        self._weights[app_id] = weight
+        self._refresh_app(app_id)
+
+    def _add(self, queued: _QueuedCase) -> None:
+        self._cases[queued.case_id] = queued
+        if queued.blocked_on:
+            for depends_on_id in queued.blocked_on:
+                self._dependents.setdefault(depends_on_id, set()).add(
+                    queued.case_id
+                )
+            return
+        self._push(queued)
+
+    def _push(self, queued: _QueuedCase) -> None:
+        self._generation += 1
+        self._ready[queued.case_id] = self._generation
+        order = queued.execution_order
+        entry: HeapEntry = (
+            order is None,
+            order or 0,
+            queued.case_id,
+            self._generation,
+        )
+        for executor in queued.executors:
+            key = (queued.evaluation_id, executor)
+            heap = self._heaps.get(key)
+            if heap is None:
+                heap = self._heaps[key] = []
+                self._app_keys.setdefault(
+                    self._app_of(queued.evaluation_id), set()
+                ).add(key)
+            heapq.heappush(heap, entry)
+            if heap[0] is entry:
+                self._refresh(key)
+        if queued.executors != [None]:
+            heapq.heappush(
+                self._pins,
+                (queued.pinned_until or 0.0, queued.case_id, self._generation),
+            )
+
+    def _expire_pins(self, now: float) -> None:
+        """Open pinned cases whose pin lapsed to every executor."""
+        while self._pins and self._pins[0][0] <= now:
+            _, case_id, generation = heapq.heappop(self._pins)
+            queued = self._cases.get(case_id)
+            if queued is None or self._ready.get(case_id) != generation:
+                continue
+            queued.executors = [None]
+            self._push(queued)
+
+    def _release_dependents(self, completed_id: int) -> None:
+        for case_id in self._dependents.pop(completed_id, set()):
+            queued = self._cases.get(case_id)
+            if queued is None:
+                continue
+            queued.blocked_on.discard(completed_id)
+            if not queued.blocked_on:
+                self._push(queued)
+
+    def _app_of(self, evaluation_id: int) -> Optional[int]:
+        evaluation = self._evaluations.get(evaluation_id)
+        return evaluation.app_id if evaluation else None
+
+    # -- picking and claiming ------------------------------------------
+
+    def _peek(self, key: QueueKey) -> Optional[HeapEntry]:
+        heap = self._heaps.get(key)
+        while heap:
+            entry = heap[0]
+            if self._ready.get(entry[2]) == entry[3]:
+                return entry
+            heapq.heappop(heap)
+        if key in self._heaps:
+            del self._heaps[key]
+            self._stamps.pop(key, None)
+            app_keys = self._app_keys.get(self._app_of(key[0]))
+            if app_keys is not None:
+                app_keys.discard(key)
+        return None
+
+    def _rank(
+        self, policy: SchedulingPolicy, key: QueueKey, entry: HeapEntry
+    ) -> Optional[Tuple]:
+        evaluation = self._evaluations.get(key[0])
+        if evaluation is None:
+            return None
+        if evaluation.app_id is not None:
+            evaluation.share = self._in_flight.get(evaluation.app_id, 0) / max(
+                self._weights.get(evaluation.app_id) or 1, 1
+            )
+        return (policy.queue_rank(evaluation), entry[:3])
+
+    def _refresh(self, key: QueueKey) -> None:
+        """Re-rank the head of `key` for every policy seen so far."""
+        entry = self._peek(key)
+        if entry is None:
+            return
+        self._stamp += 1
+        self._stamps[key] = self._stamp
+        for policy in self._policies.values():
+            rank = self._rank(policy, key, entry)
+            if rank is not None:
+                heapq.heappush(
+                    self._heads.setdefault((policy.name, key[1]), []),
+                    (rank, self._stamp, key),
+                )
+
+    def _refresh_app(self, app_id: int) -> None:
+        for key in list(self._app_keys.get(app_id, ())):
+            self._refresh(key)
+
+    def _best_head(
+        self, policy: SchedulingPolicy, pinned: Optional[str]
+    ) -> Optional[Tuple[Tuple, HeapEntry]]:
+        heads = self._heads.get((policy.name, pinned))
+        while heads:
+            rank, stamp, key = heads[0]
+            if self._stamps.get(key) != stamp:
+                heapq.heappop(heads)
+                continue
+            entry = self._peek(key)
+            current = None if entry is None else self._rank(policy, key, entry)
+            if current != rank:
+                # The head moved on or its rank got worse since it was
+                # pushed: re-rank it and look again.
+                heapq.heappop(heads)
+                self._refresh(key)
+                continue
+            return rank, entry
+        return None
+
+    def _pick(self, executor_id: str, policy: SchedulingPolicy) -> Optional[int]:
+        self._expire_pins(time.time())
+        if policy.name not in self._policies:
+            self._policies[policy.name] = policy
+            for key in list(self._heaps):
+                self._refresh(key)
+        best: Optional[Tuple[Tuple, HeapEntry]] = None
+        for pinned in (None, executor_id):
+            head = self._best_head(policy, pinned)
+            if head is not None and (best is None or head[0] < best[0]):
+                best = head
+        if best is None:
+            return None
+        case_id = best[1][2]
+        # Stop serving the case before the first await so concurrent pollers
+        # in this process cannot pick it as well.
+        self._ready.pop(case_id, None)
+        queued = self._cases.get(case_id)
+        if queued is not None:
+            for executor in queued.executors:
+                self._refresh((queued.evaluation_id, executor))
+        return case_id
+
+    async def claim(
+        self, db: AsyncSession, executor_id: str, policy: SchedulingPolicy
+    ) -> Optional[int]:
+        """
+        Pop the best ready case for `executor_id` and claim it in the
+        database. Returns the claimed case id (uncommitted) or None.
+        """
+        stale = time.monotonic() - self._last_sync >= (
+            settings.scheduling.ready_queue_resync_seconds
+        )
+        # Claims arriving while a rebuild is in flight use the current state.
+        if stale and not self._rebuild_lock.locked():
+            await self.rebuild(db)
+
+        # Cases that are ready by our books but failed to claim; served again
+        # once this poll is over instead of waiting for the next resync.
+        skipped: List[int] = []
+        try:
+            while True:
+                case_id = self._pick(executor_id, policy)
+                if case_id is None:
+                    return None
+                queued = self._cases.get(case_id)
+                stmt = (
+                    update(TestCase)
+                    .where(TestCase.id == case_id)
+                    .where(TestCase.status == TestCaseStatus.PENDING)
+                    .where(prerequisites_met_clause())
+                )
+                if queued is not None and queued.executors != [None]:
+                    stmt = stmt.where(executor_affinity_clause(executor_id))
+                result = await db.execute(
+                    stmt.values(
+                        status=TestCaseStatus.ASSIGNED,
+                        assigned_executor_id=executor_id,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                if result.rowcount == 1:
+                    self.discard(case_id)
+                    if queued is not None:
+                        self._mark_dispatched(queued.evaluation_id)
+                    return case_id
+
+                # The mirror was stale: re-read the row and track it again if
+                # it is still pending (e.g. a prerequisite was reopened
+                # elsewhere).
+                self.discard(case_id)
+                case = await db.get(TestCase, case_id, populate_existing=True)
+                if case is not None and case.status == TestCaseStatus.PENDING:
+                    await self.track(db, case)
+                    if self._ready.pop(case_id, None) is not None:
+                        skipped.append(case_id)
+        finally:
+            self._restore(skipped)
+
+    def _restore(self, case_ids: Iterable[int]) -> None:
+        """Serve cases skipped during a poll again, if still ready."""
+        for case_id in case_ids:
+            queued = self._cases.get(case_id)
+            if (
+                queued is not None
+                and not queued.blocked_on
+                and case_id not in self._ready
+            ):
+                self._push(queued)
+
+    def _mark_dispatched(self, evaluation_id: int) -> None:
+        evaluation = self._evaluations.get(evaluation_id)
+        if evaluation is None:
+            return
+        evaluation.last_dispatched_at = time.time()
+        if evaluation.app_id is not None:
+            self._in_flight[evaluation.app_id] = (
+                self._in_flight.get(evaluation.app_id, 0) + 1
+            )
+
+
+ready_queue = ReadyQueue()
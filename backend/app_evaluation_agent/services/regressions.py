@@ -0,0 +1,241 @@
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app_evaluation_agent.services.version_lineage import lineage_cache
+from app_evaluation_agent.storage.models import (
+    Bug,
+    BugEvaluationStats,
+    BugFix,
+    BugOccurrence,
+    BugStatus,
+    BugTriageJob,
+    BugVersionStats,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TriageJobStatus,
+)
+
+logger = logging.getLogger(__name__)
+
+OPEN_STATUSES = (BugStatus.NEW, BugStatus.IN_PROGRESS, BugStatus.REOPENED)
+FIXED_STATUSES = (BugStatus.PENDING_VERIFICATION, BugStatus.CLOSED)
+EXECUTED_CASE_STATUSES = (TestCaseStatus.COMPLETED, TestCaseStatus.FAILED)
+
+
+async def analyze_evaluation(
+    db: AsyncSession, evaluation_id: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Compare the bugs an evaluation observed with the fixes and open bugs of
+    its version's lineage (the version and all of its ancestors):
+
+    * regressions: observed bugs with a fix recorded in the lineage
+    * verified_fixes: unverified fixes in the lineage whose bug was not
+      observed although a test case that hit it before ran again
+    * not_reproduced: open bugs seen in the lineage that were not observed
+      although a test case that hit them before ran again
+
+    Read-only; see `apply_evaluation_regressions` to act on the result.
+    """
+    evaluation = await db.get(
+        Evaluation, evaluation_id, options=[selectinload(Evaluation.app_version)]
+    )
+    if not evaluation:
+        return None
+    version = evaluation.app_version
+    if version is None:
+        raise ValueError("Evaluation has no app version")
+
+    lineage = await lineage_cache.lineage_of(db, version.app_id, version.id)
+
+    observed_result = await db.execute(
+        select(BugEvaluationStats.bug_id).where(
+            BugEvaluationStats.evaluation_id == evaluation_id
+        )
+    )
+    observed: Set[int] = set(observed_result.scalars().all())
+
+    # Fixes for observed bugs (regression candidates) and fixes still waiting
+    # for verification; lineage membership is checked per fix in Python.
+    fix_filter = BugFix.verified_by_evaluation_id.is_(None)
+    if observed:
+        fix_filter = or_(fix_filter, BugFix.bug_id.in_(observed))
+    fixes_result = await db.execute(
+        select(BugFix.id, BugFix.bug_id, BugFix.fixed_in_version_id)
+        .join(Bug, Bug.id == BugFix.bug_id)
+        .where(Bug.app_id == version.app_id, fix_filter)
+        .order_by(BugFix.id)
+    )
+    regression_fixes: Dict[int, Dict[str, Any]] = {}
+    pending_fixes: Dict[int, Dict[str, Any]] = {}
+    for fix_id, bug_id, fixed_in_version_id in fixes_result.all():
+        if fixed_in_version_id not in lineage:
+            continue
+        fix = {
+            "bug_id": bug_id,
+            "fix_id": fix_id,
+            "fixed_in_version_id": fixed_in_version_id,
+        }
+        if bug_id in observed:
+            # Ordered by id, so the most recent fix wins.
+            regression_fixes[bug_id] = fix
+        else:
+            pending_fixes[fix_id] = fix
+
+    open_result = await db.execute(
+        select(BugVersionStats.bug_id, BugVersionStats.app_version_id, Bug.status)
+        .join(Bug, Bug.id == BugVersionStats.bug_id)
+        .where(Bug.app_id == version.app_id, Bug.status.in_(OPEN_STATUSES))
+    )
+    open_candidates: Dict[int, BugStatus] = {
+        bug_id: status
+        for bug_id, version_id, status in open_result.all()
+        if version_id in lineage and bug_id not in observed
+    }
+
+    candidates = {fix["bug_id"] for fix in pending_fixes.values()}
+    candidates.update(open_candidates)
+    covered = await _covered_bugs(db, evaluation_id, candidates)
+
+    statuses: Dict[int, BugStatus] = {}
+    if regression_fixes:
+        status_result = await db.execute(
+            select(Bug.id, Bug.status).where(Bug.id.in_(regression_fixes))
+        )
+        statuses = dict(status_result.all())
+
+    return {
+        "evaluation_id": evaluation_id,
+        "app_version_id": version.id,
+        "analyzed_at": datetime.now(timezone.utc),
+        "regressions": [
+            {**fix, "previous_status": statuses[bug_id].value}
+            for bug_id, fix in sorted(regression_fixes.items())
+            if bug_id in statuses
+        ],
+        "verified_fixes": [
+            fix
+            for _, fix in sorted(pending_fixes.items())
+            if fix["bug_id"] in covered
+        ],
+        "not_reproduced": [
+            {"bug_id": bug_id, "status": status.value}
+            for bug_id, status in sorted(open_candidates.items())
+            if bug_id in covered
+        ],
+    }
+
+
+async def _covered_bugs(
+    db: AsyncSession, evaluation_id: int, bug_ids: Set[int]
+) -> Set[int]:
+    """Bugs previously hit by a test case whose name ran in this evaluation."""
+    if not bug_ids:
+        return set()
+    executed_result = await db.execute(
+        select(TestCase.name)
+        .where(
+            TestCase.evaluation_id == evaluation_id,
+            TestCase.status.in_(EXECUTED_CASE_STATUSES),
+        )
+        .distinct()
+    )
+    executed = set(executed_result.scalars().all())
+    if not executed:
+        return set()
+    hits = await db.execute(
+        select(BugOccurrence.bug_id)
+        .join(TestCase, TestCase.id == BugOccurrence.test_case_id)
+        .where(BugOccurrence.bug_id.in_(bug_ids), TestCase.name.in_(executed))
+        .distinct()
+    )
+    return set(hits.scalars().all())
+
+
+async def apply_evaluation_regressions(
+    db: AsyncSession, evaluation_id: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Run `analyze_evaluation` and act on it: regressed bugs that were closed
+    or pending verification are REOPENED, verified fixes record the
+    evaluation (and close bugs pending verification). The report is stored
+    under `results["regressions"]` on the evaluation.
+    """
+    report = await analyze_evaluation(db, evaluation_id)
+    if report is None:
+        return None
+
+    regressed = {item["bug_id"] for item in report["regressions"]}
+    verified = {item["fix_id"]: item["bug_id"] for item in report["verified_fixes"]}
+    bug_ids = regressed | set(verified.values())
+    bugs: Dict[int, Bug] = {}
+    if bug_ids:
+        result = await db.execute(select(Bug).where(Bug.id.in_(bug_ids)))
+        bugs = {bug.id: bug for bug in result.scalars().all()}
+        for bug_id in regressed:
+            bug = bugs.get(bug_id)
+            if bug is not None and bug.status in FIXED_STATUSES:
+                bug.status = BugStatus.REOPENED
+    if verified:
+        result = await db.execute(select(BugFix).where(BugFix.id.in_(verified)))
+        for fix in result.scalars().all():
+            fix.verified_by_evaluation_id = evaluation_id
+            bug = bugs.get(fix.bug_id)
+            if bug is not None and bug.status == BugStatus.PENDING_VERIFICATION:
+                bug.status = BugStatus.CLOSED
+
+    evaluation = await db.get(Evaluation, evaluation_id)
+    results = dict(evaluation.results or {})
+    results["regressions"] = {
+        **report,
+        "analyzed_at": report["analyzed_at"].isoformat(),
+    }
+    evaluation.results = results
+    await db.commit()
+    logger.info(
+        "Evaluation %s: %s regression(s), %s verified fix(es), %s not reproduced",
+        evaluation_id,
+        len(report["regressions"]),
+        len(report["verified_fixes"]),
+        len(report["not_reproduced"]),
+    )
+    return report
+
+
+async def analyze_when_settled(
+    db: AsyncSession, evaluation_id: int
+) -> Optional[Dict[str, Any]]:
+    """
+    Apply the regression analysis once an evaluation is COMPLETED and none
+    of its triage jobs are still pending, so every bug it hit is recorded.
+    Called after both events; errors are logged, not raised.
+    """
+    try:
+        evaluation = await db.get(Evaluation, evaluation_id)
+        if not evaluation or evaluation.status != EvaluationStatus.COMPLETED:
+            return None
+        outstanding = await db.scalar(
+            select(BugTriageJob.id)
+            .join(TestCase, TestCase.id == BugTriageJob.test_case_id)
+            .where(
+                TestCase.evaluation_id == evaluation_id,
+                BugTriageJob.status.in_(
+                    (TriageJobStatus.PENDING, TriageJobStatus.RUNNING)
+                ),
+            )
+            .limit(1)
+        )
+        if outstanding is not None:
+            return None
+        return await apply_evaluation_regressions(db, evaluation_id)
+    except Exception:  # noqa: BLE001
+        await db.rollback()
+        logger.exception("Regression analysis failed for evaluation %s", evaluation_id)
+        return None
@@ -0,0 +1,197 @@
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple, Type
+
+from sqlalchemy import Float, Select, cast, exists, func, or_, select
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql.elements import ColumnElement
+
+from app_evaluation_agent.storage.models import (
+    App,
+    AppVersion,
+    Evaluation,
+    TestCase,
+    TestCaseStatus,
+    test_case_dependencies,
+)
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+IN_FLIGHT_STATUSES = (TestCaseStatus.ASSIGNED, TestCaseStatus.IN_PROGRESS)
+
+
+def executor_affinity_clause(
+    executor_id: str, now: Optional[datetime] = None
+) -> ColumnElement:
+    """
+    Used with `[scheduling] executor_affinity`: a pending case pre-assigned
+    to another executor is open to `executor_id` only once it has been
+    pending for `affinity_fallback_seconds`. Legacy rows may store the
+    assignment as a stringified JSON list.
+    """
+    escaped = (
+        executor_id.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    )
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(
+        seconds=settings.scheduling.affinity_fallback_seconds
+    )
+    return or_(
+        TestCase.assigned_executor_id.is_(None),
+        TestCase.assigned_executor_id == executor_id,
+        TestCase.assigned_executor_id.like(f'%"{escaped}"%', escape="\\"),
+        func.coalesce(TestCase.updated_at, TestCase.created_at) < cutoff,
+    )
+
+
+def prerequisites_met_clause() -> ColumnElement:
+    """
+    A case is ready once every case it depends on has COMPLETED. Cases with
+    no dependencies are always ready, so independent cases fan out to as
+    many executors as are polling.
+    """
+    prerequisite = aliased(TestCase)
+    return ~exists().where(
+        test_case_dependencies.c.test_case_id == TestCase.id,
+        prerequisite.id == test_case_dependencies.c.depends_on_id,
+        prerequisite.status != TestCaseStatus.COMPLETED,
+    )
+
+
+@dataclass
+class QueuedEvaluation:
+    """In-memory view of an evaluation used by the ready queue."""
+
+    evaluation_id: int
+    app_id: Optional[int]
+    priority: int
+    created_at: float
+    last_dispatched_at: Optional[float] = None
+    share: float = 0.0
+
+
+class SchedulingPolicy(ABC):
+    """
+    Decides which pending test case `/testcases/next` hands out.
+
+    Policies contribute ORDER BY terms (and any joins they need) to the
+    candidate query used when the ready queue is off. That query sorts the
+    pending cases on every poll, so large backlogs should be served from the
+    ready queue, where `queue_rank` expresses the same ordering
+    (services/ready_queue.py).
+    """
+
+    name: str = ""
+
+    def candidate_query(self, executor_id: str) -> Select:
+        stmt = (
+            select(TestCase)
+            .join(Evaluation, Evaluation.id == TestCase.evaluation_id)
+            .where(TestCase.status == TestCaseStatus.PENDING)
+            .where(prerequisites_met_clause())
+        )
+        if settings.scheduling.executor_affinity:
+            stmt = stmt.where(executor_affinity_clause(executor_id))
+        stmt = self.apply_ordering(stmt)
+        return stmt.order_by(TestCase.execution_order, TestCase.id).limit(1)
+
+    @abstractmethod
+    def apply_ordering(self, stmt: Select) -> Select:
+        """Add this policy's ORDER BY terms (and joins) to the candidate query."""
+
+    @abstractmethod
+    def queue_rank(self, evaluation: QueuedEvaluation) -> Tuple:
+        """Sort key of an evaluation in the ready queue; lower goes first."""
+
+
+class FifoPolicy(SchedulingPolicy):
+    """Oldest evaluation first, then execution order within the evaluation."""
+
+    name = "fifo"
+
+    def apply_ordering(self, stmt: Select) -> Select:
+        return stmt.order_by(Evaluation.priority.desc(), Evaluation.created_at)
+
+    def queue_rank(self, evaluation: QueuedEvaluation) -> Tuple:
+        return (-evaluation.priority, evaluation.created_at)
+
+
+class RoundRobinPolicy(SchedulingPolicy):
+    """Rotate across evaluations: the one served least recently goes next."""
+
+    name = "round_robin"
+
+    def apply_ordering(self, stmt: Select) -> Select:
+        return stmt.order_by(
+            Evaluation.priority.desc(),
+            Evaluation.last_dispatched_at.asc().nulls_first(),
+            Evaluation.created_at,
+        )
+
+    def queue_rank(self, evaluation: QueuedEvaluation) -> Tuple:
+        last = evaluation.last_dispatched_at
+        return (
+            -evaluation.priority,
+            last is not None,
+            last or 0.0,
+            evaluation.created_at,
+        )
+
+
+class FairSharePolicy(SchedulingPolicy):
+    """
+    Weighted fair share per app: prefer the app with the fewest in-flight
+    cases relative to its scheduling_weight.
+    """
+
+    name = "fair_share"
+
+    def apply_ordering(self, stmt: Select) -> Select:
+        in_flight = (
+            select(
+                AppVersion.app_id.label("app_id"),
+                func.count(TestCase.id).label("in_flight"),
+            )
+            .select_from(TestCase)
+            .join(Evaluation, Evaluation.id == TestCase.evaluation_id)
+            .join(AppVersion, AppVersion.id == Evaluation.app_version_id)
+            .where(TestCase.status.in_(IN_FLIGHT_STATUSES))
+            .group_by(AppVersion.app_id)
+            .subquery()
+        )
+        share = cast(func.coalesce(in_flight.c.in_flight, 0), Float) / cast(
+            func.coalesce(func.nullif(App.scheduling_weight, 0), 1), Float
+        )
+        return (
+            stmt.join(AppVersion, AppVersion.id == Evaluation.app_version_id)
+            .join(App, App.id == AppVersion.app_id)
+            .outerjoin(in_flight, in_flight.c.app_id == App.id)
+            .order_by(Evaluation.priority.desc(), share, Evaluation.created_at)
+        )
+
+    def queue_rank(self, evaluation: QueuedEvaluation) -> Tuple:
+        return (-evaluation.priority, evaluation.share, evaluation.created_at)
+
+
+SCHEDULING_POLICIES: Dict[str, Type[SchedulingPolicy]] = {
+    policy.name: policy for policy in (FifoPolicy, RoundRobinPolicy, FairSharePolicy)
+}
+
+
+def get_scheduling_policy(name: str | None = None) -> SchedulingPolicy:
+    """
+    Resolve a policy by name, defaulting to the configured one.
+    Unknown names fall back to FIFO.
+    """
+    policy_name = (name or settings.scheduling.policy or FifoPolicy.name).lower()
+    policy_cls = SCHEDULING_POLICIES.get(policy_name)
+    if policy_cls is None:
+        logger.warning(
+            "Unknown scheduling policy %r; falling back to %s",
+            policy_name,
+            FifoPolicy.name,
+        )
+        policy_cls = FifoPolicy
+    return policy_cls()
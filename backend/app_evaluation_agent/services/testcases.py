@@ -1,27 +1,29 @@
 import logging
 from datetime import datetime, timezone
-from typing import Optional
+from typing import Optional, Sequence
 
-from sqlalchemy import select
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
 from app_evaluation_agent.realtime import notify_evaluation_status
-from app_evaluation_agent.schemas.bug import (
-    BugCreate,
-    BugOccurrenceCreate,
-    BugUpdate,
+from app_evaluation_agent.schemas.testcase import (
+    TestCaseBulkUpdateItem,
+    TestCaseCreate,
 )
-from app_evaluation_agent.services import bugs as bug_service
-from app_evaluation_agent.services.agents.bug_triage import BugTriageAgent
+from app_evaluation_agent.services import case_dependencies, live_events
 from app_evaluation_agent.services.evaluations import launch_summarization_for_plan
+from app_evaluation_agent.services.executors import executor_registry
+from app_evaluation_agent.services.ready_queue import ready_queue
+from app_evaluation_agent.services.triage import enqueue_triage
+from app_evaluation_agent.services.scheduling import get_scheduling_policy
 from app_evaluation_agent.storage.models import (
-    AppVersion,
     Evaluation,
     EvaluationStatus,
     TestCase,
     TestCaseStatus,
 )
+from app_evaluation_agent.utils.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -32,7 +34,13 @@ async def get_test_plan_by_id(db: AsyncSession, plan_id: int):
     """
     from app_evaluation_agent.storage.models import TestPlan  # local import
 
-    result = await db.execute(select(TestPlan).where(TestPlan.id == plan_id))
+    result = await db.execute(
+        select(TestPlan)
+        .where(TestPlan.id == plan_id)
+        .options(
+            selectinload(TestPlan.test_cases).selectinload(TestCase.prerequisites)
+        )
+    )
     return result.scalars().first()
 
 
@@ -45,9 +53,11 @@ async def create_test_case(
     input_data: Optional[dict] = None,
     execution_order: Optional[int] = None,
     assigned_executor_id: Optional[str] = None,
+    depends_on_ids: Optional[list[int]] = None,
 ) -> TestCase:
     """
     Create a new test case under the given plan/evaluation.
+    `depends_on_ids` gates dispatch until those cases have completed.
     """
     # Validate plan exists and matches evaluation
     from app_evaluation_agent.storage.models import TestPlan
@@ -59,6 +69,9 @@ async def create_test_case(
         raise ValueError(
             f"Plan {plan_id} belongs to evaluation {plan.evaluation_id}, not {evaluation_id}"
         )
+    prerequisite_ids = await case_dependencies.validate_dependencies(
+        db, plan_id, depends_on_ids or []
+    )
 
     case = TestCase(
         plan_id=plan_id,
@@ -71,8 +84,13 @@ async def create_test_case(
         assigned_executor_id=assigned_executor_id,
     )
     db.add(case)
+    await db.flush()
+    await case_dependencies.insert_edges(
+        db, [(case.id, dep_id) for dep_id in prerequisite_ids]
+    )
     await db.commit()
-    await db.refresh(case)
+    case = await _reload_case(db, case)
+    await ready_queue.track(db, case)
     logger.info(
         "Created test case %s under plan %s (evaluation %s)",
         case.id,
@@ -91,32 +109,50 @@ async def get_test_case(db: AsyncSession, case_id: int) -> Optional[TestCase]:
 
 
 async def next_test_case_for_executor(
-    db: AsyncSession, executor_id: str
+    db: AsyncSession, executor_id: str, policy: Optional[str] = None
 ) -> Optional[TestCase]:
     """
     Fetch the next pending test case for a given executor, mark it as ASSIGNED,
-    and return it. Pending cases are visible to all executors.
+    and return it. Pending cases are visible to all executors; with
+    `[scheduling] executor_affinity`, a case pre-assigned to another executor
+    only becomes visible after `affinity_fallback_seconds`.
+
+    The candidate is chosen by the configured scheduling policy
+    (see services/scheduling.py); `policy` overrides it by name. Once the
+    ready queue has been built it picks the candidate in memory and only the
+    claim touches the database. Cases committed by other processes (e.g. the
+    arq worker) reach the queue at its next resync, so a miss falls through
+    to the SQL path and, if that finds a case, schedules the resync.
     """
-    stmt = (
-        select(TestCase)
-        .join(Evaluation, Evaluation.id == TestCase.evaluation_id)
-        .where(TestCase.status == TestCaseStatus.PENDING)
-        # Prioritize older evaluations first, then execution order within each evaluation.
-        .order_by(Evaluation.created_at, TestCase.execution_order, TestCase.id)
-        .limit(1)
-    )
-
-    result = await db.execute(stmt)
-    case = result.scalars().first()
+    scheduling_policy = get_scheduling_policy(policy)
+
+    case = None
+    use_queue = ready_queue.active and settings.scheduling.ready_queue
+    if use_queue:
+        case_id = await ready_queue.claim(db, executor_id, scheduling_policy)
+        case = await db.get(TestCase, case_id) if case_id is not None else None
+    if case is None:
+        result = await db.execute(scheduling_policy.candidate_query(executor_id))
+        case = result.scalars().first()
+        if case:
+            case.status = TestCaseStatus.ASSIGNED
+            case.assigned_executor_id = executor_id
+            if use_queue:
+                ready_queue.request_resync()
 
     if case:
-        case.status = TestCaseStatus.ASSIGNED
-        case.assigned_executor_id = executor_id
+        await db.execute(
+            update(Evaluation)
+            .where(Evaluation.id == case.evaluation_id)
+            .values(last_dispatched_at=datetime.now(timezone.utc))
+        )
         await db.commit()
-        await db.refresh(case)
+        case = await _reload_case(db, case)
+        await executor_registry.record_assignment(executor_id, case.id)
         logger.debug("Assigned test case %s to executor %s", case.id, executor_id)
         return case
 
+    await executor_registry.record_poll(executor_id)
     logger.debug("No pending test case for executor %s", executor_id)
     return None
 
@@ -130,6 +166,7 @@ async def delete_test_case(db: AsyncSession, case_id: int) -> bool:
         return False
     await db.delete(case)
     await db.commit()
+    ready_queue.discard(case_id)
     logger.info("Deleted test case %s", case_id)
     return True
 
@@ -144,6 +181,7 @@ async def update_test_case(
     description: Optional[str] = None,
     input_data: Optional[dict] = None,
     execution_order: Optional[int] = None,
+    depends_on_ids: Optional[list[int]] = None,
 ) -> Optional[TestCase]:
     """
     Update a test case:
@@ -151,7 +189,9 @@ async def update_test_case(
         - result (payload)
         - assigned executor
         - name/description/input_data/execution_order
+        - prerequisites (depends_on_ids)
 
+    A FAILED case fails every pending case that depends on it.
     If this completes the entire plan, summarization is triggered.
     """
     case = await get_test_case(db, case_id)
@@ -160,27 +200,30 @@ async def update_test_case(
 
     evaluation = await db.get(Evaluation, case.evaluation_id)
     was_completed = evaluation and evaluation.status == EvaluationStatus.COMPLETED
+    previous_status = case.status
 
-    if status is not None:
-        case.status = status
-    if result_payload is not None:
-        case.result = result_payload
-    if assigned_executor_id is not None:
-        case.assigned_executor_id = assigned_executor_id
-    if name is not None:
-        case.name = name
-    if description is not None:
-        case.description = description
-    if input_data is not None:
-        case.input_data = input_data
-    if execution_order is not None:
-        case.execution_order = execution_order
+    _apply_case_changes(
+        case,
+        status=status,
+        result_payload=result_payload,
+        assigned_executor_id=assigned_executor_id,
+        name=name,
+        description=description,
+        input_data=input_data,
+        execution_order=execution_order,
+    )
+    if depends_on_ids is not None:
+        prerequisite_ids = await case_dependencies.validate_dependencies(
+            db, case.plan_id, depends_on_ids, case_id=case.id
+        )
+        await case_dependencies.replace_dependencies(db, case.id, prerequisite_ids)
 
     await db.commit()
-    await db.refresh(case)
+    case = await _reload_case(db, case)
+    await _propagate_status_changes(db, [(case, previous_status)])
 
     if result_payload is not None:
-        await _maybe_triage_bugs(db, case, result_payload)
+        await enqueue_triage(db, case.id, result_payload)
 
     if was_completed and evaluation:
         evaluation.status = EvaluationStatus.READY
@@ -198,103 +241,268 @@ async def update_test_case(
     return case
 
 
-async def _load_evaluation_for_triage(
-    db: AsyncSession, evaluation_id: int
-) -> Optional[Evaluation]:
-    stmt = (
-        select(Evaluation)
-        .where(Evaluation.id == evaluation_id)
-        .options(selectinload(Evaluation.app_version).selectinload(AppVersion.app))
+async def create_test_cases_bulk(
+    db: AsyncSession, payloads: Sequence[TestCaseCreate]
+) -> list[TestCase]:
+    """
+    Create many test cases in one transaction.
+
+    Plans and prerequisites are validated with one query each, rows are
+    inserted with a single executemany, and the result keeps input order.
+    `depends_on_ids` may only reference cases that already exist.
+    """
+    if not payloads:
+        return []
+    from app_evaluation_agent.storage.models import TestPlan
+
+    plan_ids = {payload.plan_id for payload in payloads}
+    result = await db.execute(
+        select(TestPlan.id, TestPlan.evaluation_id).where(TestPlan.id.in_(plan_ids))
     )
-    result = await db.execute(stmt)
-    return result.scalars().first()
+    plan_evaluations = {row[0]: row[1] for row in result.all()}
+
+    dep_ids = {dep_id for payload in payloads for dep_id in payload.depends_on_ids}
+    dep_plans: dict[int, int] = {}
+    failed_deps: set[int] = set()
+    if dep_ids:
+        result = await db.execute(
+            select(TestCase.id, TestCase.plan_id, TestCase.status).where(
+                TestCase.id.in_(dep_ids)
+            )
+        )
+        for dep_id, dep_plan, dep_status in result.all():
+            dep_plans[dep_id] = dep_plan
+            if dep_status == TestCaseStatus.FAILED:
+                failed_deps.add(dep_id)
+
+    for idx, payload in enumerate(payloads):
+        if payload.plan_id not in plan_evaluations:
+            raise ValueError(f"cases[{idx}]: Plan {payload.plan_id} not found")
+        if plan_evaluations[payload.plan_id] != payload.evaluation_id:
+            raise ValueError(
+                f"cases[{idx}]: Plan {payload.plan_id} belongs to evaluation "
+                f"{plan_evaluations[payload.plan_id]}, not {payload.evaluation_id}"
+            )
+        missing = [d for d in payload.depends_on_ids if d not in dep_plans]
+        if missing:
+            raise ValueError(
+                f"cases[{idx}]: Prerequisite test cases not found: {missing}"
+            )
+        foreign = [
+            d for d in payload.depends_on_ids if dep_plans[d] != payload.plan_id
+        ]
+        if foreign:
+            raise ValueError(
+                f"cases[{idx}]: Prerequisite test cases {foreign} do not belong "
+                f"to plan {payload.plan_id}"
+            )
+        failed = [d for d in payload.depends_on_ids if d in failed_deps]
+        if failed:
+            raise ValueError(
+                f"cases[{idx}]: Prerequisite test cases already failed: {failed}"
+            )
 
+    result = await db.execute(
+        insert(TestCase).returning(TestCase.id, sort_by_parameter_order=True),
+        [
+            {
+                "plan_id": payload.plan_id,
+                "evaluation_id": payload.evaluation_id,
+                "name": payload.name,
+                "description": payload.description,
+                "input_data": payload.input_data,
+                "status": TestCaseStatus.PENDING,
+                "execution_order": payload.execution_order,
+                "assigned_executor_id": payload.assigned_executor_id,
+            }
+            for payload in payloads
+        ],
+    )
+    case_ids = list(result.scalars().all())
+    await case_dependencies.insert_edges(
+        db,
+        [
+            (case_id, dep_id)
+            for case_id, payload in zip(case_ids, payloads)
+            for dep_id in dict.fromkeys(payload.depends_on_ids)
+        ],
+    )
+    await db.commit()
 
-async def _maybe_triage_bugs(
-    db: AsyncSession, case: TestCase, result_payload: dict
-) -> None:
-    if not isinstance(result_payload, dict):
-        return
+    cases = await _load_cases(db, case_ids)
+    ordered = [cases[case_id] for case_id in case_ids]
+    await ready_queue.track_many(db, ordered)
+    logger.info(
+        "Bulk created %s test cases across plans %s", len(ordered), sorted(plan_ids)
+    )
+    return ordered
 
-    evaluation = await _load_evaluation_for_triage(db, case.evaluation_id)
-    if not evaluation or not evaluation.app_version or not evaluation.app_version.app:
-        return
 
-    app = evaluation.app_version.app
-    case_status = getattr(case.status, "value", case.status)
-
-    evaluation_context = {
-        "evaluation_id": evaluation.id,
-        "execution_mode": evaluation.execution_mode,
-        "assigned_executor_id": evaluation.assigned_executor_id,
-        "app_id": app.id,
-        "app_name": app.name,
-        "app_version_id": evaluation.app_version_id,
-        "app_version": evaluation.app_version.version,
-        "high_level_goal": evaluation.high_level_goal,
-        "run_on_current_screen": evaluation.run_on_current_screen,
-    }
-
-    drafts = await BugTriageAgent.triage_test_case(
-        app_id=app.id,
-        case_name=case.name,
-        case_description=case.description,
-        case_status=str(case_status),
-        result_payload=result_payload,
-        evaluation_context=evaluation_context,
+async def update_test_cases_bulk(
+    db: AsyncSession, updates: Sequence[TestCaseBulkUpdateItem]
+) -> list[TestCase]:
+    """
+    Apply many test case updates in one transaction.
+
+    All cases are loaded with one query and flushed together; new
+    prerequisites are validated in memory against each plan's edges, loaded
+    once, and written with one DELETE and one INSERT. Bug triage runs
+    for every case that received a result; the READY/summarize check runs
+    once per affected plan instead of once per case.
+    """
+    if not updates:
+        return []
+    ids = [item.id for item in updates]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Each test case may appear only once in a bulk update")
+
+    cases = await _load_cases(db, ids)
+    missing = [case_id for case_id in ids if case_id not in cases]
+    if missing:
+        raise ValueError(f"Test cases not found: {missing}")
+
+    evaluation_ids = {case.evaluation_id for case in cases.values()}
+    result = await db.execute(
+        select(Evaluation).where(Evaluation.id.in_(evaluation_ids))
+    )
+    reopened = [
+        evaluation
+        for evaluation in result.scalars().all()
+        if evaluation.status == EvaluationStatus.COMPLETED
+    ]
+    previous = {case_id: case.status for case_id, case in cases.items()}
+    prerequisites = await case_dependencies.validate_dependency_updates(
+        db, [(cases[item.id], item.depends_on_ids) for item in updates]
     )
-    if not drafts:
-        return
 
-    for draft in drafts:
-        bug = await bug_service.get_bug_by_fingerprint(db, app.id, draft.fingerprint)
-        observed_at = draft.observed_at or datetime.now(timezone.utc)
+    for item in updates:
+        status = item.status
+        if isinstance(status, str):
+            status = TestCaseStatus(status)
+        _apply_case_changes(
+            cases[item.id],
+            status=status,
+            result_payload=item.result,
+            assigned_executor_id=item.assigned_executor_id,
+            name=item.name,
+            description=item.description,
+            input_data=item.input_data,
+            execution_order=item.execution_order,
+        )
+    await case_dependencies.replace_dependencies_many(
+        db,
+        {
+            item.id: prerequisite_ids
+            for item, prerequisite_ids in zip(updates, prerequisites)
+            if prerequisite_ids is not None
+        },
+    )
+    await db.commit()
 
-        if bug:
-            await bug_service.update_bug(
-                db,
-                bug.id,
-                BugUpdate(last_seen_at=observed_at),
-            )
-        else:
-            bug = await bug_service.create_bug(
-                db,
-                BugCreate(
-                    app_id=app.id,
-                    title=draft.title,
-                    description=draft.description,
-                    severity_level=draft.severity_level,
-                    priority=draft.priority,
-                    status=draft.status,
-                    discovered_version_id=evaluation.app_version_id,
-                    fingerprint=draft.fingerprint,
-                    environment=draft.environment,
-                    reproduction_steps=draft.reproduction_steps,
-                    first_seen_at=observed_at,
-                    last_seen_at=observed_at,
-                ),
+    cases = await _load_cases(db, ids)
+    await _propagate_status_changes(
+        db, [(cases[case_id], previous[case_id]) for case_id in ids]
+    )
+
+    for item in updates:
+        if item.result is not None:
+            await enqueue_triage(db, item.id, item.result)
+
+    for evaluation in reopened:
+        evaluation.status = EvaluationStatus.READY
+    if reopened:
+        await db.commit()
+        for evaluation in reopened:
+            await db.refresh(evaluation)
+            await notify_evaluation_status(evaluation)
+            logger.info(
+                "Evaluation %s moved to READY after bulk test case update.",
+                evaluation.id,
             )
 
-        await bug_service.create_bug_occurrence(
-            db,
-            bug.id,
-            BugOccurrenceCreate(
-                evaluation_id=evaluation.id,
-                test_case_id=case.id,
-                app_version_id=evaluation.app_version_id,
-                step_index=draft.step_index,
-                action=draft.action,
-                expected=draft.expected,
-                actual=draft.actual,
-                result_snapshot=draft.result_snapshot,
-                screenshot_uri=draft.screenshot_uri,
-                log_uri=draft.log_uri,
-                raw_model_coords=draft.raw_model_coords,
-                observed_at=observed_at,
-                executor_id=evaluation.assigned_executor_id
-                or case.assigned_executor_id,
-            ),
-        )
+    reopened_ids = {evaluation.id for evaluation in reopened}
+    finalized_plans: set[int] = set()
+    for case_id in ids:
+        case = cases[case_id]
+        if case.evaluation_id in reopened_ids or case.plan_id in finalized_plans:
+            continue
+        finalized_plans.add(case.plan_id)
+        await _maybe_finalize_plan(db, case)
+
+    logger.info("Bulk updated %s test cases", len(ids))
+    return [cases[case_id] for case_id in ids]
+
+
+async def _load_cases(db: AsyncSession, case_ids: Sequence[int]) -> dict[int, TestCase]:
+    """Load (or refresh) cases by ID together with their prerequisites."""
+    result = await db.execute(
+        select(TestCase)
+        .where(TestCase.id.in_(case_ids))
+        .options(selectinload(TestCase.prerequisites))
+        .execution_options(populate_existing=True)
+    )
+    return {case.id: case for case in result.scalars().all()}
+
+
+async def _reload_case(db: AsyncSession, case: TestCase) -> TestCase:
+    return (await _load_cases(db, [case.id]))[case.id]
+
+
+def _apply_case_changes(
+    case: TestCase,
+    status: Optional[TestCaseStatus] = None,
+    result_payload: Optional[dict] = None,
+    assigned_executor_id: Optional[str] = None,
+    name: Optional[str] = None,
+    description: Optional[str] = None,
+    input_data: Optional[dict] = None,
+    execution_order: Optional[int] = None,
+) -> None:
+    """Set the given fields on `case`. Does not commit."""
+    if status is not None:
+        case.status = status
+    if result_payload is not None:
+        case.result = result_payload
+    if assigned_executor_id is not None:
+        case.assigned_executor_id = assigned_executor_id
+    if name is not None:
+        case.name = name
+    if description is not None:
+        case.description = description
+    if input_data is not None:
+        case.input_data = input_data
+    if execution_order is not None:
+        case.execution_order = execution_order
+
+
+async def _propagate_status_changes(
+    db: AsyncSession, changes: list[tuple[TestCase, Optional[TestCaseStatus]]]
+) -> None:
+    """
+    After a commit: sync the ready queue and executor registry, and fail the
+    pending dependents of every case that just FAILED.
+    """
+    failed_ids = []
+    for case, previous_status in changes:
+        await ready_queue.on_status_change(db, case, previous_status)
+        if case.status == previous_status:
+            continue
+        if case.status in (TestCaseStatus.COMPLETED, TestCaseStatus.FAILED):
+            await executor_registry.release_case(case.id)
+        if case.status == TestCaseStatus.FAILED:
+            failed_ids.append(case.id)
+
+    await live_events.publish_test_case_changes(db, changes)
+
+    if failed_ids:
+        blocked = await case_dependencies.fail_blocked_dependents(db, failed_ids)
+        if blocked:
+            await db.commit()
+            for blocked_case in blocked:
+                ready_queue.discard(blocked_case.id)
+            await live_events.publish_test_case_changes(
+                db, [(case, TestCaseStatus.PENDING) for case in blocked]
+            )
 
 
 async def _maybe_finalize_plan(db: AsyncSession, case: TestCase) -> None:
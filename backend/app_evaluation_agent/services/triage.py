@@ -0,0 +1,396 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from hashlib import sha256
+from typing import Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services import live_events
+from app_evaluation_agent.services import regressions as regression_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft, BugTriageAgent
+from app_evaluation_agent.services.triage_gate import (
+    classify_result,
+    triage_cache_key,
+    triage_gate,
+)
+from app_evaluation_agent.storage.models import (
+    AppVersion,
+    BugTriageJob,
+    Evaluation,
+    TestCase,
+    TriageJobStatus,
+)
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+ARQ_TRIAGE_FUNCTION = "run_bug_triage_job"
+
+
+def result_hash(result_payload: dict) -> str:
+    serialized = json.dumps(
+        result_payload, ensure_ascii=True, sort_keys=True, default=str
+    )
+    return sha256(serialized.encode("utf-8")).hexdigest()
+
+
+async def enqueue_triage(
+    db: AsyncSession, test_case_id: int, result_payload: dict
+) -> Optional[BugTriageJob]:
+    """
+    Record a triage job for a test case result and hand it to the triage
+    queue. The same (test case, result) pair is only ever triaged once.
+    """
+    if not isinstance(result_payload, dict):
+        return None
+    digest = result_hash(result_payload)
+    existing = await _get_job(db, test_case_id, digest)
+    if existing:
+        logger.debug(
+            "Triage for test case %s result %s already queued as job %s",
+            test_case_id,
+            digest[:12],
+            existing.id,
+        )
+        return existing
+
+    job = BugTriageJob(
+        test_case_id=test_case_id,
+        result_hash=digest,
+        result_payload=result_payload,
+        status=TriageJobStatus.PENDING,
+    )
+    db.add(job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request queued the same result first.
+        await db.rollback()
+        return await _get_job(db, test_case_id, digest)
+    await db.refresh(job)
+    logger.info("Queued bug triage job %s for test case %s", job.id, test_case_id)
+    await triage_queue.submit(job.id)
+    return job
+
+
+async def _get_job(
+    db: AsyncSession, test_case_id: int, digest: str
+) -> Optional[BugTriageJob]:
+    result = await db.execute(
+        select(BugTriageJob).where(
+            BugTriageJob.test_case_id == test_case_id,
+            BugTriageJob.result_hash == digest,
+        )
+    )
+    return result.scalars().first()
+
+
+def _claimable(now: Optional[datetime] = None):
+    """
+    PENDING jobs, and RUNNING jobs whose lease expired: their runner has not
+    finished within `lease_seconds` of claiming them and is presumed dead.
+    """
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(
+        seconds=settings.triage.lease_seconds
+    )
+    return or_(
+        BugTriageJob.status == TriageJobStatus.PENDING,
+        and_(
+            BugTriageJob.status == TriageJobStatus.RUNNING,
+            func.coalesce(BugTriageJob.updated_at, BugTriageJob.created_at)
+            < cutoff,
+        ),
+    )
+
+
+async def run_triage_job(db: AsyncSession, job_id: int) -> Optional[BugTriageJob]:
+    """
+    Run one triage job. The job is claimed with a conditional UPDATE, so
+    when the same job is delivered twice only one runner gets it; the other
+    returns the job as it found it. On failure the job goes back to PENDING
+    until it has used `max_attempts`, then to FAILED. Bugs and occurrences
+    are committed in the same transaction that marks the job COMPLETED, so a
+    retry never sees a half-persisted run. Returns the job in its final state.
+    """
+    claimed = await db.execute(
+        update(BugTriageJob)
+        .where(BugTriageJob.id == job_id, _claimable())
+        .values(
+            status=TriageJobStatus.RUNNING,
+            attempts=BugTriageJob.attempts + 1,
+            updated_at=datetime.now(timezone.utc),
+        )
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    job = await db.get(BugTriageJob, job_id, populate_existing=True)
+    if job is None or claimed.rowcount != 1:
+        logger.debug("Bug triage job %s not claimable; skipping", job_id)
+        return job
+
+    evaluation_id = None
+    persisted = None
+    try:
+        case = await db.get(TestCase, job.test_case_id)
+        if case:
+            evaluation_id = case.evaluation_id
+            persisted = await _maybe_triage_bugs(db, case, job.result_payload)
+    except Exception as exc:  # noqa: BLE001
+        await db.rollback()
+        job = await db.get(BugTriageJob, job_id, populate_existing=True)
+        if not job:
+            return None
+        job.last_error = f"{type(exc).__name__}: {exc}"
+        job.status = (
+            TriageJobStatus.FAILED
+            if job.attempts >= settings.triage.max_attempts
+            else TriageJobStatus.PENDING
+        )
+        await db.commit()
+        logger.exception(
+            "Bug triage job %s failed (attempt %s/%s)",
+            job_id,
+            job.attempts,
+            settings.triage.max_attempts,
+        )
+        return job
+
+    job.status = TriageJobStatus.COMPLETED
+    job.last_error = None
+    await db.commit()
+    logger.info("Bug triage job %s completed", job_id)
+    if persisted is not None:
+        app_id, result = persisted
+        bug_service.track_created_bugs(app_id, result)
+        await live_events.publish_bugs(
+            app_id,
+            result.bug_ids.values(),
+            result.created_bug_ids,
+            result.occurrence_count,
+            evaluation_id=evaluation_id,
+            test_case_id=job.test_case_id,
+        )
+    if evaluation_id is not None:
+        await regression_service.analyze_when_settled(db, evaluation_id)
+    return job
+
+
+class TriageQueue:
+    """
+    Runs triage jobs off the request path.
+
+    With the "local" backend a fixed number of worker tasks drain an
+    in-process queue, which bounds concurrent LLM calls. With "arq" jobs are
+    enqueued on Redis for the arq worker. Either way the job row is the
+    durable record: PENDING jobs, and RUNNING jobs whose lease expired, are
+    resubmitted on startup.
+    """
+
+    def __init__(self) -> None:
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list[asyncio.Task] = []
+        self._queued: set[int] = set()
+        self._timers: set[asyncio.Task] = set()
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(
+        self,
+        session_factory: Callable[[], AsyncSession],
+        concurrency: Optional[int] = None,
+    ) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        workers = max(1, concurrency or settings.triage.concurrency)
+        self._workers = [
+            asyncio.create_task(self._work(session_factory)) for _ in range(workers)
+        ]
+        logger.info("Started %s bug triage workers", workers)
+
+    async def stop(self) -> None:
+        tasks = [*self._workers, *self._timers]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._workers = []
+        self._timers.clear()
+        self._queued.clear()
+        self._queue = None
+
+    async def join(self) -> None:
+        """Wait until every queued job (and scheduled retry) has run."""
+        while self._queue is not None and (self._timers or self._queued):
+            if self._timers:
+                await asyncio.gather(*list(self._timers), return_exceptions=True)
+            await self._queue.join()
+
+    async def submit(self, job_id: int, delay: float = 0.0, attempt: int = 0) -> None:
+        if settings.triage.backend == "arq":
+            await self._submit_arq(job_id, delay, attempt)
+            return
+        if self._queue is None:
+            logger.debug("Triage queue not running; job %s stays PENDING", job_id)
+            return
+        if job_id in self._queued:
+            return
+        self._queued.add(job_id)
+        if delay > 0:
+            timer = asyncio.create_task(self._put_later(job_id, delay))
+            self._timers.add(timer)
+            timer.add_done_callback(self._timers.discard)
+        else:
+            self._queue.put_nowait(job_id)
+
+    async def _put_later(self, job_id: int, delay: float) -> None:
+        await asyncio.sleep(delay)
+        if self._queue is not None:
+            self._queue.put_nowait(job_id)
+
+    async def _submit_arq(self, job_id: int, delay: float, attempt: int) -> None:
+        from app_evaluation_agent import worker
+
+        if worker.arq_pool is None:
+            logger.warning("arq pool unavailable; triage job %s stays PENDING", job_id)
+            return
+        await worker.arq_pool.enqueue_job(
+            ARQ_TRIAGE_FUNCTION,
+            job_id,
+            _job_id=f"bug-triage:{job_id}:{attempt}",
+            _defer_by=delay or None,
+        )
+
+    async def _work(self, session_factory: Callable[[], AsyncSession]) -> None:
+        assert self._queue is not None
+        while True:
+            job_id = await self._queue.get()
+            job = None
+            try:
+                async with session_factory() as db:
+                    job = await run_triage_job(db, job_id)
+            except Exception:  # noqa: BLE001
+                logger.exception("Bug triage worker crashed on job %s", job_id)
+            finally:
+                self._queued.discard(job_id)
+                self._queue.task_done()
+            if job is not None and job.status == TriageJobStatus.PENDING:
+                await self.submit(
+                    job_id,
+                    delay=job.attempts * settings.triage.retry_backoff_seconds,
+                    attempt=job.attempts,
+                )
+
+
+triage_queue = TriageQueue()
+
+
+async def resume_pending_triage(db: AsyncSession) -> int:
+    """
+    Resubmit jobs that were queued when the API stopped, or whose runner
+    died holding them (RUNNING past `lease_seconds`). Jobs another process
+    is still running are left alone.
+    """
+    result = await db.execute(
+        select(BugTriageJob.id, BugTriageJob.attempts)
+        .where(_claimable())
+        .order_by(BugTriageJob.id)
+    )
+    rows = result.all()
+    for job_id, attempts in rows:
+        await triage_queue.submit(job_id, attempt=attempts or 0)
+    if rows:
+        logger.info("Resumed %s bug triage jobs", len(rows))
+    return len(rows)
+
+
+async def _load_evaluation_for_triage(
+    db: AsyncSession, evaluation_id: int
+) -> Optional[Evaluation]:
+    stmt = (
+        select(Evaluation)
+        .where(Evaluation.id == evaluation_id)
+        .options(selectinload(Evaluation.app_version).selectinload(AppVersion.app))
+    )
+    result = await db.execute(stmt)
+    return result.scalars().first()
+
+
+async def _maybe_triage_bugs(
+    db: AsyncSession, case: TestCase, result_payload: dict
+) -> Optional[Tuple[int, bug_service.TriagePersistResult]]:
+    """Triage a case result; returns (app ID, what was persisted) if anything."""
+    if not isinstance(result_payload, dict):
+        return None
+
+    evaluation = await _load_evaluation_for_triage(db, case.evaluation_id)
+    if not evaluation or not evaluation.app_version or not evaluation.app_version.app:
+        return None
+
+    app = evaluation.app_version.app
+    case_status = str(getattr(case.status, "value", case.status))
+
+    skip_reason = classify_result(case_status, result_payload)
+    if skip_reason:
+        triage_gate.record_skip(skip_reason)
+        logger.debug("Skipping triage for test case %s: %s", case.id, skip_reason)
+        return None
+    cache_key = triage_cache_key(
+        app.id, case.name, case.description, case_status, result_payload
+    )
+    drafts = triage_gate.lookup(cache_key)
+    if drafts is None:
+        drafts = await _triage_with_llm(evaluation, case, case_status, result_payload)
+        if drafts is None:
+            # Not cached: the job is retried and the next attempt asks again.
+            raise RuntimeError("Bug triage produced no usable LLM output")
+        triage_gate.store(cache_key, drafts)
+    else:
+        logger.debug("Reusing cached triage outcome for test case %s", case.id)
+    if not drafts:
+        return None
+
+    result = await bug_service.persist_triage_drafts(
+        db,
+        app_id=app.id,
+        app_version_id=evaluation.app_version_id,
+        evaluation_id=evaluation.id,
+        test_case_id=case.id,
+        executor_id=evaluation.assigned_executor_id or case.assigned_executor_id,
+        drafts=drafts,
+    )
+    return app.id, result
+
+
+async def _triage_with_llm(
+    evaluation: Evaluation, case: TestCase, case_status: str, result_payload: dict
+) -> Optional[List[BugDraft]]:
+    app = evaluation.app_version.app
+
+    evaluation_context = {
+        "evaluation_id": evaluation.id,
+        "execution_mode": evaluation.execution_mode,
+        "assigned_executor_id": evaluation.assigned_executor_id,
+        "app_id": app.id,
+        "app_name": app.name,
+        "app_version_id": evaluation.app_version_id,
+        "app_version": evaluation.app_version.version,
+        "high_level_goal": evaluation.high_level_goal,
+        "run_on_current_screen": evaluation.run_on_current_screen,
+    }
+
+    return await BugTriageAgent.triage_test_case(
+        app_id=app.id,
+        case_name=case.name,
+        case_description=case.description,
+        case_status=case_status,
+        result_payload=result_payload,
+        evaluation_context=evaluation_context,
+    )
@@ -0,0 +1,160 @@
+import json
+import logging
+from collections import Counter, OrderedDict
+from dataclasses import replace
+from datetime import datetime, timezone
+from hashlib import sha256
+from typing import Any, Dict, List, Optional, Tuple
+
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.utils.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Top-level result keys that signal something went wrong when truthy.
+FAILURE_KEYS = (
+    "error",
+    "errors",
+    "exception",
+    "traceback",
+    "failure_type",
+    "failures",
+    "bugs",
+    "issues",
+    "crash",
+)
+# Top-level keys that carry an outcome string or flag.
+OUTCOME_KEYS = ("status", "outcome", "result", "success", "passed")
+FAILED_OUTCOMES = {"fail", "failed", "failure", "error", "errored", "crashed"}
+# failure_type values assigned by the backend rather than observed in the app.
+NON_PRODUCT_FAILURES = {"blocked_by_dependency"}
+
+SKIP_EMPTY_RESULT = "empty_result"
+SKIP_CLEAN_PASS = "clean_pass"
+SKIP_NON_PRODUCT_FAILURE = "non_product_failure"
+
+
+def _has_failure_signal(result_payload: Dict[str, Any]) -> bool:
+    if any(result_payload.get(key) for key in FAILURE_KEYS):
+        return True
+    for key in OUTCOME_KEYS:
+        value = result_payload.get(key)
+        if value is False:
+            return True
+        if isinstance(value, str) and value.strip().lower() in FAILED_OUTCOMES:
+            return True
+    return False
+
+
+def classify_result(case_status: str, result_payload: Dict[str, Any]) -> Optional[str]:
+    """
+    Rule-based pre-triage check. Returns the reason to skip the LLM call, or
+    None when the result needs a model to look at it.
+    """
+    if not result_payload:
+        return SKIP_EMPTY_RESULT
+    failure_type = result_payload.get("failure_type")
+    if (
+        isinstance(failure_type, str)
+        and failure_type.strip().lower() in NON_PRODUCT_FAILURES
+    ):
+        return SKIP_NON_PRODUCT_FAILURE
+    if (
+        settings.triage.skip_clean_passes
+        and case_status.upper() == "COMPLETED"
+        and not _has_failure_signal(result_payload)
+    ):
+        return SKIP_CLEAN_PASS
+    return None
+
+
+def triage_cache_key(
+    app_id: int,
+    case_name: str,
+    case_description: Optional[str],
+    case_status: str,
+    result_payload: Dict[str, Any],
+) -> str:
+    """Content hash of everything that shapes the drafts for one result."""
+    serialized = json.dumps(
+        {
+            "app_id": app_id,
+            "case_name": case_name or "",
+            "case_description": case_description or "",
+            "case_status": case_status.upper(),
+            "result": result_payload,
+        },
+        ensure_ascii=True,
+        sort_keys=True,
+        default=str,
+    )
+    return sha256(serialized.encode("utf-8")).hexdigest()
+
+
+class TriageGate:
+    """
+    Sits in front of BugTriageAgent: results that the rules can decide are
+    skipped, and results identical to one already triaged for the same app
+    and case reuse the earlier drafts from an LRU cache. Only successful
+    triage outcomes are stored; a failed or unparseable LLM answer is never
+    cached.
+
+    Counters are kept per process and exposed on
+    `GET /api/v1/bugs/triage/metrics`. With `[triage] backend = "arq"` the
+    gate runs in the arq worker, so the API process reports zeros; read the
+    worker's log lines (or run the local backend) for those numbers.
+    """
+
+    def __init__(self) -> None:
+        self._cache: "OrderedDict[str, Tuple[BugDraft, ...]]" = OrderedDict()
+        self._skipped: Counter = Counter()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def reset(self) -> None:
+        self._cache.clear()
+        self._skipped.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def record_skip(self, reason: str) -> None:
+        self._skipped[reason] += 1
+
+    def lookup(self, key: str) -> Optional[List[BugDraft]]:
+        cached = self._cache.get(key)
+        if cached is None:
+            self.cache_misses += 1
+            return None
+        self._cache.move_to_end(key)
+        self.cache_hits += 1
+        observed_at = datetime.now(timezone.utc)
+        return [replace(draft, observed_at=observed_at) for draft in cached]
+
+    def store(self, key: str, drafts: List[BugDraft]) -> None:
+        capacity = settings.triage.cache_size
+        if capacity <= 0:
+            return
+        self._cache[key] = tuple(drafts)
+        self._cache.move_to_end(key)
+        while len(self._cache) > capacity:
+            self._cache.popitem(last=False)
+
+    def metrics(self) -> Dict[str, Any]:
+        skipped = sum(self._skipped.values())
+        lookups = self.cache_hits + self.cache_misses
+        total = skipped + lookups
+        return {
+            "total": total,
+            "skipped": skipped,
+            "skipped_by_reason": dict(self._skipped),
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "cache_entries": len(self._cache),
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "llm_calls_avoided_rate": (
+                (skipped + self.cache_hits) / total if total else 0.0
+            ),
+        }
+
+
+triage_gate = TriageGate()
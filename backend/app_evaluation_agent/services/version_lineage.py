@@ -0,0 +1,239 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app_evaluation_agent.storage.models import App, AppVersion, app_version_lineage
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LineageNode:
+    id: int
+    version: str
+    previous_version_id: Optional[int]
+    release_date: Optional[datetime]
+    change_log: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+
+
+def _closure(
+    start: int, edges: Dict[int, Set[int]], memo: Dict[int, FrozenSet[int]]
+) -> FrozenSet[int]:
+    """Every node reachable from `start` along `edges`, memoized in `memo`."""
+    cached = memo.get(start)
+    if cached is not None:
+        return cached
+    found: Set[int] = set()
+    stack = list(edges.get(start, ()))
+    while stack:
+        node = stack.pop()
+        if node in found:
+            continue
+        found.add(node)
+        known = memo.get(node)
+        if known is not None:
+            # Already closed over: no need to walk that subtree again.
+            found |= known
+            continue
+        stack.extend(edges.get(node, ()))
+    closure = frozenset(found)
+    memo[start] = closure
+    return closure
+
+
+class _AppLineage:
+    """
+    One app's version DAG: nodes, parent and child edges, and ancestor and
+    descendant sets memoized per version.
+    """
+
+    def __init__(
+        self,
+        parents: Dict[int, Set[int]],
+        nodes: Optional[Dict[int, LineageNode]] = None,
+        revision: int = 0,
+    ) -> None:
+        self.revision = revision
+        self.nodes = nodes or {}
+        self.parents = parents
+        self.children: Dict[int, Set[int]] = {}
+        for child, previous_ids in parents.items():
+            for parent in previous_ids:
+                self.children.setdefault(parent, set()).add(child)
+        self._ancestors: Dict[int, FrozenSet[int]] = {}
+        self._descendants: Dict[int, FrozenSet[int]] = {}
+        self._cycle_nodes: Optional[List[int]] = None
+
+    def ancestors(self, version_id: int) -> FrozenSet[int]:
+        return _closure(version_id, self.parents, self._ancestors)
+
+    def descendants(self, version_id: int) -> FrozenSet[int]:
+        return _closure(version_id, self.children, self._descendants)
+
+    def would_create_cycle(self, version_id: int, previous_ids: Iterable[int]) -> bool:
+        """True if making `previous_ids` the parents of `version_id` closes a loop."""
+        below = self.descendants(version_id)
+        return any(
+            parent == version_id or parent in below for parent in previous_ids
+        )
+
+    def within_generations(self, version_id: int, generations: int) -> Set[int]:
+        """`version_id` plus up to `generations` levels of parents and children."""
+        found = {version_id}
+        for edges in (self.parents, self.children):
+            frontier = {version_id}
+            for _ in range(generations):
+                frontier = {
+                    nxt for node in frontier for nxt in edges.get(node, ())
+                } - found
+                if not frontier:
+                    break
+                found |= frontier
+        return found
+
+    def branch(self, version_id: int) -> FrozenSet[int]:
+        """`version_id`, everything it descends from and everything built on it."""
+        return self.ancestors(version_id) | self.descendants(version_id) | {version_id}
+
+    def cycle_nodes(self) -> List[int]:
+        """Versions at which a lineage cycle was detected."""
+        if self._cycle_nodes is None:
+            self._cycle_nodes = self._detect_cycles()
+        return self._cycle_nodes
+
+    def _detect_cycles(self) -> List[int]:
+        visited: Set[int] = set()
+        found: List[int] = []
+        for root in sorted(self.nodes):
+            if root in visited:
+                continue
+            # Iterative DFS; `path` holds the nodes on the current stack.
+            path: Set[int] = {root}
+            visited.add(root)
+            stack = [(root, iter(sorted(self.parents.get(root, ()))))]
+            while stack:
+                node, pending = stack[-1]
+                parent = next(pending, None)
+                if parent is None:
+                    stack.pop()
+                    path.discard(node)
+                    continue
+                if parent not in self.nodes:
+                    continue
+                if parent in path:
+                    found.append(parent)
+                    continue
+                if parent in visited:
+                    continue
+                visited.add(parent)
+                path.add(parent)
+                stack.append((parent, iter(sorted(self.parents.get(parent, ())))))
+        return found
+
+
+class LineageCache:
+    """
+    Per-app closure of the version lineage DAG.
+
+    An app's versions and edges are loaded with two queries on first use and
+    each version's ancestor/descendant set is computed once, so lineage
+    checks are set lookups. Every lineage write bumps `apps.lineage_revision`
+    (see `bump_revision`); each access compares it with the cached copy, so
+    writes made by other processes are picked up on the next read.
+    """
+
+    def __init__(self) -> None:
+        self._apps: Dict[int, _AppLineage] = {}
+
+    def clear(self) -> None:
+        self._apps.clear()
+
+    def invalidate(self, app_id: Optional[int] = None) -> None:
+        if app_id is None:
+            self._apps.clear()
+        else:
+            self._apps.pop(app_id, None)
+
+    @staticmethod
+    async def bump_revision(db: AsyncSession, app_id: int) -> None:
+        """Mark the app's lineage as changed; runs in the caller's transaction."""
+        await db.execute(
+            update(App)
+            .where(App.id == app_id)
+            .values(lineage_revision=App.lineage_revision + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def get(self, db: AsyncSession, app_id: int) -> _AppLineage:
+        revision = await db.scalar(
+            select(App.lineage_revision).where(App.id == app_id)
+        )
+        lineage = self._apps.get(app_id)
+        if lineage is not None and lineage.revision == revision:
+            return lineage
+
+        versions = await db.execute(
+            select(
+                AppVersion.id,
+                AppVersion.version,
+                AppVersion.previous_version_id,
+                AppVersion.release_date,
+                AppVersion.change_log,
+                AppVersion.created_at,
+                AppVersion.updated_at,
+            ).where(AppVersion.app_id == app_id)
+        )
+        nodes = {row[0]: LineageNode(*row) for row in versions.all()}
+        edges = await db.execute(
+            select(
+                app_version_lineage.c.app_version_id,
+                app_version_lineage.c.previous_version_id,
+            )
+            .join(AppVersion, AppVersion.id == app_version_lineage.c.app_version_id)
+            .where(AppVersion.app_id == app_id)
+        )
+        parents: Dict[int, Set[int]] = {}
+        for version_id, previous_id in edges.all():
+            parents.setdefault(version_id, set()).add(previous_id)
+
+        lineage = _AppLineage(parents, nodes, revision or 0)
+        self._apps[app_id] = lineage
+        logger.debug(
+            "Loaded lineage for app %s (%s versions, revision %s)",
+            app_id,
+            len(nodes),
+            revision,
+        )
+        return lineage
+
+    async def ancestors(
+        self, db: AsyncSession, app_id: int, version_id: int
+    ) -> FrozenSet[int]:
+        """Every version `version_id` descends from, excluding itself."""
+        return (await self.get(db, app_id)).ancestors(version_id)
+
+    async def descendants(
+        self, db: AsyncSession, app_id: int, version_id: int
+    ) -> FrozenSet[int]:
+        """Every version built on top of `version_id`, excluding itself."""
+        return (await self.get(db, app_id)).descendants(version_id)
+
+    async def is_ancestor(
+        self, db: AsyncSession, app_id: int, ancestor_id: int, version_id: int
+    ) -> bool:
+        return ancestor_id in await self.ancestors(db, app_id, version_id)
+
+    async def lineage_of(
+        self, db: AsyncSession, app_id: int, version_id: int
+    ) -> FrozenSet[int]:
+        """`version_id` together with its ancestors."""
+        return (await self.ancestors(db, app_id, version_id)) | {version_id}
+
+
+lineage_cache = LineageCache()
@@ -0,0 +1,165 @@
+import hashlib
+import os
+import re
+import uuid
+from pathlib import Path
+from typing import Optional, Union
+
+from app_evaluation_agent.utils.config import settings
+
+BlobData = Union[bytes, memoryview]
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+# S3 error codes meaning the object does not exist.
+_S3_MISSING = {"404", "NoSuchKey", "NotFound"}
+_SIGNATURES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF8", "image/gif"),
+    (b"BM", "image/bmp"),
+)
+
+
+def blob_digest(data: BlobData) -> str:
+    """Key of a blob: the hex SHA-256 of its content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_digest(value: object) -> bool:
+    return isinstance(value, str) and _DIGEST.fullmatch(value) is not None
+
+
+def _check_digest(digest: str) -> str:
+    if not is_digest(digest):
+        raise ValueError(f"Invalid blob digest: {digest!r}")
+    return digest
+
+
+def sniff_content_type(data: BlobData) -> Optional[str]:
+    """Image MIME type from the leading bytes, None if not recognized."""
+    head = bytes(data[:12])
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    return None
+
+
+class FilesystemBlobBackend:
+    """
+    Blobs as files under `root`, sharded by the first two bytes of the
+    digest (`root/ab/cd/abcd…`) so no directory grows too large.
+    """
+
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+
+    def path(self, digest: str) -> Path:
+        _check_digest(digest)
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def uri(self, digest: str) -> str:
+        return self.path(digest).resolve().as_uri()
+
+    def exists(self, digest: str) -> bool:
+        return self.path(digest).is_file()
+
+    def write(
+        self, digest: str, data: BlobData, content_type: Optional[str] = None
+    ) -> None:
+        path = self.path(digest)
+        if path.is_file():
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Written under a temporary name and renamed, so readers never see
+        # a partial blob and concurrent writers of the same digest are safe.
+        temporary = path.with_name(f".{digest}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(temporary, "wb") as handle:
+                handle.write(data)
+            os.replace(temporary, path)
+        finally:
+            temporary.unlink(missing_ok=True)
+
+    def read(self, digest: str) -> bytes:
+        return self.path(digest).read_bytes()
+
+    def delete(self, digest: str) -> None:
+        self.path(digest).unlink(missing_ok=True)
+
+
+class S3BlobBackend:
+    """Blobs as objects of an S3 bucket, keyed `prefix/ab/cd/abcd…`."""
+
+    def __init__(self, bucket: str, prefix: str = "", client=None) -> None:
+        if not bucket:
+            raise ValueError("[blobs] s3_bucket is required for the s3 backend")
+        if client is None:
+            try:
+                import boto3
+            except ImportError as exc:
+                raise RuntimeError("The s3 blob backend requires boto3") from exc
+            client = boto3.client("s3")
+        self.bucket = bucket
+        self.prefix = prefix
+        self._client = client
+
+    def key(self, digest: str) -> str:
+        _check_digest(digest)
+        return f"{self.prefix}{digest[:2]}/{digest[2:4]}/{digest}"
+
+    def uri(self, digest: str) -> str:
+        return f"s3://{self.bucket}/{self.key(digest)}"
+
+    def _missing(self, exc: Exception) -> bool:
+        code = getattr(exc, "response", {}).get("Error", {}).get("Code")
+        return code in _S3_MISSING
+
+    def exists(self, digest: str) -> bool:
+        try:
+            self._client.head_object(Bucket=self.bucket, Key=self.key(digest))
+        except self._client.exceptions.ClientError as exc:
+            if self._missing(exc):
+                return False
+            raise
+        return True
+
+    def write(
+        self, digest: str, data: BlobData, content_type: Optional[str] = None
+    ) -> None:
+        if self.exists(digest):
+            return
+        extra = {"ContentType": content_type} if content_type else {}
+        self._client.put_object(
+            Bucket=self.bucket, Key=self.key(digest), Body=bytes(data), **extra
+        )
+
+    def read(self, digest: str) -> bytes:
+        try:
+            response = self._client.get_object(Bucket=self.bucket, Key=self.key(digest))
+        except self._client.exceptions.ClientError as exc:
+            if self._missing(exc):
+                raise FileNotFoundError(self.uri(digest)) from exc
+            raise
+        return response["Body"].read()
+
+    def delete(self, digest: str) -> None:
+        self._client.delete_object(Bucket=self.bucket, Key=self.key(digest))
+
+
+BlobBackend = Union[FilesystemBlobBackend, S3BlobBackend]
+
+
+def backend_from_settings() -> BlobBackend:
+    config = settings.blobs
+    if config.backend == "filesystem":
+        # A relative root would depend on the directory the API starts in.
+        if not config.root or not Path(config.root).is_absolute():
+            raise ValueError(
+                "[blobs] root must be an absolute path for the filesystem backend"
+            )
+        return FilesystemBlobBackend(config.root)
+    if config.backend == "s3":
+        return S3BlobBackend(config.s3_bucket, config.s3_prefix)
+    raise ValueError(f"Unknown blob backend: {config.backend}")
@@ -5,6 +5,7 @@ from sqlalchemy import (
     String,
     DateTime,
     Enum,
+    Float,
     JSON,
     Boolean,
     ForeignKey,
@@ -44,6 +45,28 @@ Index(
     app_version_lineage.c.previous_version_id,
 )
 
+test_case_dependencies = Table(
+    "test_case_dependencies",
+    Base.metadata,
+    Column(
+        "test_case_id",
+        Integer,
+        ForeignKey("test_cases.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+    Column(
+        "depends_on_id",
+        Integer,
+        ForeignKey("test_cases.id", ondelete="CASCADE"),
+        primary_key=True,
+    ),
+)
+
+Index(
+    "ix_test_case_dependencies_depends_on_id",
+    test_case_dependencies.c.depends_on_id,
+)
+
 
 class EvaluationStatus(enum.Enum):
     PENDING = "PENDING"
@@ -84,6 +107,20 @@ class BugStatus(enum.Enum):
     REOPENED = "REOPENED"
 
 
+class TriageJobStatus(enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
+class PurgeJobStatus(enum.Enum):
+    PENDING = "PENDING"
+    RUNNING = "RUNNING"
+    COMPLETED = "COMPLETED"
+    FAILED = "FAILED"
+
+
 class BugSeverity(enum.Enum):
     P0 = "P0"
     P1 = "P1"
@@ -120,6 +157,10 @@ class Evaluation(Base):
     local_application_path = Column(String, nullable=True)
     high_level_goal = Column(String, nullable=True)
     run_on_current_screen = Column(Boolean, nullable=False, default=False)
+    # Higher priority evaluations are dispatched first under every scheduling policy.
+    priority = Column(Integer, nullable=False, default=0, server_default="0")
+    # Last time a test case of this evaluation was handed to an executor.
+    last_dispatched_at = Column(DateTime(timezone=True), nullable=True)
 
     # Relationships
     app_version = relationship("AppVersion", back_populates="evaluations")
@@ -168,6 +209,10 @@ class App(Base):
         nullable=False,
         default=AppType.DESKTOP_APP,
     )
+    # Relative share of executor capacity under the fair-share scheduling policy.
+    scheduling_weight = Column(Integer, nullable=False, default=1, server_default="1")
+    # Bumped on every version/lineage write; invalidates cached lineage closures.
+    lineage_revision = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -247,6 +292,9 @@ class TestPlan(Base):
 
 class TestCase(Base):
     __tablename__ = "test_cases"
+    __table_args__ = (
+        Index("ix_test_cases_status_evaluation_id", "status", "evaluation_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     plan_id = Column(Integer, ForeignKey("test_plans.id"), nullable=False, index=True)
@@ -274,12 +322,32 @@ class TestCase(Base):
     # Relationships
     plan = relationship("TestPlan", back_populates="test_cases")
     evaluation = relationship("Evaluation", back_populates="test_cases")
+    # Not loaded implicitly: queries that serialize `depends_on_ids` ask for
+    # it with selectinload(TestCase.prerequisites).
+    prerequisites = relationship(
+        "TestCase",
+        secondary=test_case_dependencies,
+        primaryjoin=id == test_case_dependencies.c.test_case_id,
+        secondaryjoin=id == test_case_dependencies.c.depends_on_id,
+        lazy="raise",
+        passive_deletes=True,
+    )
+
+    @property
+    def depends_on_ids(self) -> list[int]:
+        if not self.prerequisites:
+            return []
+        return sorted(case.id for case in self.prerequisites)
 
 
 class Bug(Base):
     __tablename__ = "bugs"
     __table_args__ = (
         UniqueConstraint("app_id", "fingerprint", name="uq_bugs_app_fingerprint"),
+        # Filtered, newest-first app listings with keyset pagination.
+        Index(
+            "ix_bugs_app_status_severity_id", "app_id", "status", "severity_level", "id"
+        ),
     )
 
     id = Column(Integer, primary_key=True, index=True)
@@ -313,6 +381,8 @@ class Bug(Base):
     reproduction_steps = Column(JSON, nullable=True)
     first_seen_at = Column(DateTime(timezone=True), nullable=True)
     last_seen_at = Column(DateTime(timezone=True), nullable=True)
+    # Maintained by services/bug_stats.py alongside every occurrence insert.
+    occurrence_count = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -335,29 +405,26 @@ class Bug(Base):
 class BugOccurrence(Base):
     __tablename__ = "bug_occurrences"
     __table_args__ = (
-        Index("ix_bug_occurrences_bug_id", "bug_id"),
+        Index("ix_bug_occurrences_bug_id_id", "bug_id", "id"),
         Index("ix_bug_occurrences_evaluation_id", "evaluation_id"),
         Index("ix_bug_occurrences_test_case_id", "test_case_id"),
         Index("ix_bug_occurrences_app_version_id", "app_version_id"),
+        Index("ix_bug_occurrences_screenshot_hash", "screenshot_hash"),
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    bug_id = Column(Integer, ForeignKey("bugs.id"), nullable=False, index=True)
-    evaluation_id = Column(
-        Integer, ForeignKey("evaluations.id"), nullable=True, index=True
-    )
-    test_case_id = Column(
-        Integer, ForeignKey("test_cases.id"), nullable=True, index=True
-    )
-    app_version_id = Column(
-        Integer, ForeignKey("app_versions.id"), nullable=True, index=True
-    )
+    bug_id = Column(Integer, ForeignKey("bugs.id"), nullable=False)
+    evaluation_id = Column(Integer, ForeignKey("evaluations.id"), nullable=True)
+    test_case_id = Column(Integer, ForeignKey("test_cases.id"), nullable=True)
+    app_version_id = Column(Integer, ForeignKey("app_versions.id"), nullable=True)
     step_index = Column(Integer, nullable=True)
     action = Column(JSON, nullable=True)
     expected = Column(Text, nullable=True)
     actual = Column(Text, nullable=True)
     result_snapshot = Column(JSON, nullable=True)
     screenshot_uri = Column(String, nullable=True)
+    # Screenshot kept in the blob store (see storage/blobs.py).
+    screenshot_hash = Column(String(64), ForeignKey("blobs.digest"), nullable=True)
     log_uri = Column(String, nullable=True)
     raw_model_coords = Column(JSON, nullable=True)
     observed_at = Column(DateTime(timezone=True), nullable=True)
@@ -371,6 +438,26 @@ class BugOccurrence(Base):
     app_version = relationship("AppVersion")
 
 
+class Blob(Base):
+    """
+    A stored blob (e.g. a screenshot), keyed by the SHA-256 of its content.
+    `ref_count` counts bug occurrences referencing it; unreferenced blobs are
+    deleted `[blobs] ttl_seconds` after `last_used_at`.
+    """
+
+    __tablename__ = "blobs"
+    __table_args__ = (
+        Index("ix_blobs_ref_count_last_used_at", "ref_count", "last_used_at"),
+    )
+
+    digest = Column(String(64), primary_key=True)
+    content_type = Column(String, nullable=True)
+    size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0, server_default="0")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_used_at = Column(DateTime(timezone=True), nullable=False)
+
+
 class BugFix(Base):
     __tablename__ = "bug_fixes"
     __table_args__ = (
@@ -382,9 +469,9 @@ class BugFix(Base):
     )
 
     id = Column(Integer, primary_key=True, index=True)
-    bug_id = Column(Integer, ForeignKey("bugs.id"), nullable=False, index=True)
+    bug_id = Column(Integer, ForeignKey("bugs.id"), nullable=False)
     fixed_in_version_id = Column(
-        Integer, ForeignKey("app_versions.id"), nullable=False, index=True
+        Integer, ForeignKey("app_versions.id"), nullable=False
     )
     verified_by_evaluation_id = Column(
         Integer, ForeignKey("evaluations.id"), nullable=True, index=True
@@ -395,3 +482,134 @@ class BugFix(Base):
     bug = relationship("Bug", back_populates="fixes")
     fixed_in_version = relationship("AppVersion")
     verified_by_evaluation = relationship("Evaluation")
+
+
+class BugVersionStats(Base):
+    """Occurrences of a bug in one app version (services/bug_stats.py)."""
+
+    __tablename__ = "bug_version_stats"
+    __table_args__ = (Index("ix_bug_version_stats_app_version_id", "app_version_id"),)
+
+    bug_id = Column(
+        Integer, ForeignKey("bugs.id", ondelete="CASCADE"), primary_key=True
+    )
+    app_version_id = Column(
+        Integer, ForeignKey("app_versions.id", ondelete="CASCADE"), primary_key=True
+    )
+    occurrence_count = Column(Integer, nullable=False, default=0, server_default="0")
+    first_seen_at = Column(DateTime(timezone=True), nullable=True)
+    last_seen_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class BugEvaluationStats(Base):
+    """
+    Occurrences of a bug in one evaluation. `is_new` marks bugs that the
+    evaluation discovered, as opposed to recurring ones.
+    """
+
+    __tablename__ = "bug_evaluation_stats"
+    __table_args__ = (Index("ix_bug_evaluation_stats_evaluation_id", "evaluation_id"),)
+
+    bug_id = Column(
+        Integer, ForeignKey("bugs.id", ondelete="CASCADE"), primary_key=True
+    )
+    evaluation_id = Column(
+        Integer, ForeignKey("evaluations.id", ondelete="CASCADE"), primary_key=True
+    )
+    is_new = Column(Boolean, nullable=False, default=False)
+    occurrence_count = Column(Integer, nullable=False, default=0, server_default="0")
+
+
+class BugTriageJob(Base):
+    """
+    A queued bug triage run for one test case result. Unique per
+    (test_case_id, result_hash) so re-sent results are triaged once.
+    """
+
+    __tablename__ = "bug_triage_jobs"
+    __table_args__ = (
+        UniqueConstraint(
+            "test_case_id", "result_hash", name="uq_bug_triage_jobs_case_result"
+        ),
+        Index("ix_bug_triage_jobs_status", "status"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    test_case_id = Column(
+        Integer, ForeignKey("test_cases.id", ondelete="CASCADE"), nullable=False
+    )
+    result_hash = Column(String(64), nullable=False)
+    result_payload = Column(JSON, nullable=False)
+    status = Column(
+        Enum(
+            TriageJobStatus,
+            name="triagejobstatus",
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+        ),
+        nullable=False,
+        default=TriageJobStatus.PENDING,
+        server_default=TriageJobStatus.PENDING.value,
+    )
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+    test_case = relationship("TestCase")
+
+
+class PurgeJob(Base):
+    """
+    A background delete of an app or app version and everything under it,
+    run in committed chunks by services/purge.py. Progress is
+    processed_items / total_items (evaluations, then bugs for an app).
+    """
+
+    __tablename__ = "purge_jobs"
+    __table_args__ = (Index("ix_purge_jobs_status", "status"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    # "app" or "app_version"; no FK so the job outlives its target.
+    target_type = Column(String, nullable=False)
+    target_id = Column(Integer, nullable=False)
+    app_id = Column(Integer, nullable=False)
+    status = Column(
+        Enum(
+            PurgeJobStatus,
+            name="purgejobstatus",
+            values_callable=lambda enum_cls: [e.value for e in enum_cls],
+        ),
+        nullable=False,
+        default=PurgeJobStatus.PENDING,
+        server_default=PurgeJobStatus.PENDING.value,
+    )
+    phase = Column(String, nullable=True)
+    total_items = Column(Integer, nullable=False, default=0, server_default="0")
+    processed_items = Column(Integer, nullable=False, default=0, server_default="0")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class Executor(Base):
+    """
+    Last persisted telemetry of a runner. The live view is kept in memory by
+    services/executors.py and flushed here periodically.
+    """
+
+    __tablename__ = "executors"
+
+    # The free-form executor_id runners already report.
+    id = Column(String, primary_key=True)
+    # Not a foreign key: telemetry must not fail to flush when a case is deleted.
+    current_test_case_id = Column(Integer, nullable=True)
+    steps_per_minute = Column(Float, nullable=True)
+    avg_analyze_latency_ms = Column(Float, nullable=True)
+    capture_width = Column(Integer, nullable=True)
+    capture_height = Column(Integer, nullable=True)
+    total_steps = Column(Integer, nullable=False, default=0, server_default="0")
+    info = Column(JSON, nullable=True)
+    first_seen_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_heartbeat_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
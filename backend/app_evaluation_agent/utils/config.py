@@ -2,6 +2,7 @@ import logging
 from functools import lru_cache
 
 import toml
+from pydantic import Field
 from pydantic_settings import BaseSettings
 
 logger = logging.getLogger(__name__)
@@ -22,11 +23,122 @@ class RedisSettings(BaseSettings):
     port: int
 
 
+class SchedulingSettings(BaseSettings):
+    # One of: fifo, round_robin, fair_share
+    policy: str = "fifo"
+    # Serve /testcases/next from an in-memory mirror of pending cases.
+    ready_queue: bool = True
+    # Rebuild the mirror from the database at most this often (seconds).
+    ready_queue_resync_seconds: float = 30.0
+    # Hand a pending case pre-assigned to an executor only to that executor.
+    # Other executors may take it once it has been pending this long, so
+    # cases pinned to an offline executor do not starve. Off: every pending
+    # case goes to whichever executor polls first.
+    executor_affinity: bool = False
+    affinity_fallback_seconds: float = 60.0
+
+
+class ExecutorSettings(BaseSettings):
+    # An executor without a heartbeat for this long is reported as "stale" ...
+    stale_after_seconds: float = 30.0
+    # ... and as "offline" after this long.
+    offline_after_seconds: float = 120.0
+    # How often in-memory telemetry is written to the executors table.
+    flush_interval_seconds: float = 15.0
+
+
+class TriageSettings(BaseSettings):
+    # "local" runs triage in an in-process worker pool; "arq" enqueues it on
+    # the Redis-backed arq worker.
+    backend: str = "local"
+    # Maximum triage jobs running at once (local backend).
+    concurrency: int = 2
+    max_attempts: int = 3
+    # Delay before retry n is n * retry_backoff_seconds.
+    retry_backoff_seconds: float = 5.0
+    # A RUNNING job not finished this long after it was claimed is presumed
+    # abandoned (its runner died) and may be claimed again.
+    lease_seconds: float = 600.0
+    # Drafts whose fingerprint is new are folded into an existing bug of the
+    # same app when their estimated Jaccard similarity over title/expected/
+    # actual is at least this high. 0 disables near-duplicate matching.
+    similarity_threshold: float = 0.6
+    # MinHash signature length and LSH band count (num_perm % bands == 0).
+    similarity_num_perm: int = 64
+    similarity_bands: int = 16
+    # Apps whose similarity index is kept in memory (least recently used are
+    # evicted and rebuilt on their next triage).
+    similarity_max_apps: int = 256
+    # Skip the LLM for COMPLETED cases whose result carries no failure signal.
+    skip_clean_passes: bool = True
+    # Triage outcomes kept per (app, case, result) content hash; 0 disables.
+    cache_size: int = 2048
+
+
+class PurgeSettings(BaseSettings):
+    # Evaluations (or bugs) deleted per committed chunk when purging an app
+    # or app version; smaller chunks hold locks for less time.
+    batch_size: int = 200
+
+
+class RealtimeSettings(BaseSettings):
+    # "local" delivers status and telemetry events within one process; "redis"
+    # fans them out over Redis pub/sub so every API worker (and the arq
+    # worker) reaches every connected client.
+    backend: str = "local"
+    redis_channel: str = "app_evaluation_agent:realtime"
+    # Payloads buffered per subscriber before the oldest (or a superseded
+    # one) is dropped, and how long one send may take before the
+    # subscriber is disconnected.
+    send_queue_size: int = 64
+    send_timeout_seconds: float = 10.0
+    # Recent events kept per evaluation and channel for `since=<seq>`
+    # replay. With `journal_stream` they are also kept in capped Redis
+    # streams (expiring after `journal_ttl_seconds`), so replays work
+    # across API workers and restarts.
+    journal_size: int = 256
+    journal_stream: bool = False
+    journal_ttl_seconds: int = 86400
+    # Status changes of one evaluation notified within this window are
+    # merged into one event carrying the latest status (0 disables).
+    status_debounce_seconds: float = 0.05
+
+
+class VisionSettings(BaseSettings):
+    # Test cases whose last screenshot is kept so runners can upload the next
+    # one as changed tiles only (LRU). Each entry holds one decoded frame.
+    frame_cache_size: int = 16
+
+
+class BlobSettings(BaseSettings):
+    # "filesystem" keeps blobs under `root` (sharded by hash prefix; an
+    # absolute path, required); "s3" keeps them in `s3_bucket` under
+    # `s3_prefix` (requires boto3).
+    backend: str = "filesystem"
+    root: str = ""
+    s3_bucket: str = ""
+    s3_prefix: str = "blobs/"
+    # Keep the screenshots sent to /vision/analyze, keyed by content hash.
+    # Off until a store is configured.
+    store_screenshots: bool = False
+    # Blobs no bug occurrence references are deleted this long after their
+    # last use; the sweep runs every `sweep_interval_seconds`.
+    ttl_seconds: int = 7 * 86400
+    sweep_interval_seconds: float = 3600.0
+
+
 class Settings(BaseSettings):
     database: DBSettings
     redis: RedisSettings
     llm: LLMSettings
     vllm: LLMSettings
+    scheduling: SchedulingSettings = Field(default_factory=SchedulingSettings)
+    executors: ExecutorSettings = Field(default_factory=ExecutorSettings)
+    triage: TriageSettings = Field(default_factory=TriageSettings)
+    purge: PurgeSettings = Field(default_factory=PurgeSettings)
+    realtime: RealtimeSettings = Field(default_factory=RealtimeSettings)
+    vision: VisionSettings = Field(default_factory=VisionSettings)
+    blobs: BlobSettings = Field(default_factory=BlobSettings)
 
 
 @lru_cache()
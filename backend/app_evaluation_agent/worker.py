@@ -12,7 +12,10 @@ from app_evaluation_agent.storage.models import (
     EvaluationStatus,
     AppType,
 )
-from app_evaluation_agent.realtime import notify_evaluation_status
+from app_evaluation_agent.realtime import (
+    evaluation_status_broadcaster,
+    notify_evaluation_status,
+)
 from sqlalchemy.orm import selectinload
 
 logger = logging.getLogger(__name__)
@@ -90,7 +93,37 @@ async def run_evaluation_task(ctx, evaluation_id: int):
     return f"Evaluation {evaluation_id} processed."
 
 
+async def run_bug_triage_job(ctx, job_id: int):
+    """
+    Run a queued bug triage job (see services/triage.py) and re-enqueue it
+    with backoff when it fails but has attempts left.
+    """
+    from app_evaluation_agent.services.triage import (
+        ARQ_TRIAGE_FUNCTION,
+        run_triage_job,
+    )
+    from app_evaluation_agent.storage.models import TriageJobStatus
+
+    async with AsyncSessionLocal() as db:
+        job = await run_triage_job(db, job_id)
+
+    if job is not None and job.status == TriageJobStatus.PENDING:
+        await ctx["redis"].enqueue_job(
+            ARQ_TRIAGE_FUNCTION,
+            job_id,
+            _job_id=f"bug-triage:{job_id}:{job.attempts}",
+            _defer_by=job.attempts * settings.triage.retry_backoff_seconds,
+        )
+    return f"Bug triage job {job_id}: {getattr(job, 'status', None)}"
+
+
+async def shutdown(ctx):
+    # Close the realtime Redis connection used to publish status changes.
+    await evaluation_status_broadcaster.stop()
+
+
 # ARQ Worker Settings
 class WorkerSettings:
-    functions = [run_evaluation_task]
+    functions = [run_evaluation_task, run_bug_triage_job]
+    on_shutdown = shutdown
     redis_settings = RedisSettings(host=settings.redis.host, port=settings.redis.port)
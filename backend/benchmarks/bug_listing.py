@@ -0,0 +1,196 @@
+"""
+Benchmark bug and occurrence listing: OFFSET vs keyset pages.
+
+Seeds a throwaway database with a large app and walks deep pages both ways.
+Run from the backend directory:
+
+    python -m benchmarks.bug_listing --bugs 20000 --occurrences 200000
+
+By default a temporary SQLite file is used; pass --database-url (async URL,
+e.g. postgresql+asyncpg://...) to measure against a scratch Postgres. The
+target database must be empty: tables are created and dropped.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Awaitable, Callable
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Bug,
+    BugOccurrence,
+    BugSeverity,
+    BugStatus,
+)
+
+BATCH_SIZE = 5000
+
+
+async def seed(db: AsyncSession, bugs: int, occurrences: int) -> tuple[int, int]:
+    app = App(name="Benchmark", app_type=AppType.DESKTOP_APP)
+    db.add(app)
+    await db.flush()
+    versions = [AppVersion(app_id=app.id, version=f"1.{idx}") for idx in range(10)]
+    db.add_all(versions)
+    await db.flush()
+    version_ids = [version.id for version in versions]
+
+    rng = random.Random(42)
+    severities = list(BugSeverity)
+    statuses = list(BugStatus)
+    for start in range(0, bugs, BATCH_SIZE):
+        await db.execute(
+            insert(Bug),
+            [
+                {
+                    "app_id": app.id,
+                    "title": f"Bug {idx}",
+                    "severity_level": rng.choice(severities),
+                    "status": rng.choice(statuses),
+                    "fingerprint": f"bench-{idx}",
+                }
+                for idx in range(start, min(start + BATCH_SIZE, bugs))
+            ],
+        )
+    # Bug IDs are dense because the table starts empty.
+    for start in range(0, occurrences, BATCH_SIZE):
+        await db.execute(
+            insert(BugOccurrence),
+            [
+                {
+                    # Heavy-tailed: bug 1 gets the most occurrences.
+                    "bug_id": (int(rng.paretovariate(1.2)) - 1) % bugs + 1,
+                    "app_version_id": rng.choice(version_ids),
+                    "step_index": idx % 20,
+                }
+                for idx in range(start, min(start + BATCH_SIZE, occurrences))
+            ],
+        )
+    await db.commit()
+    return app.id, version_ids[0]
+
+
+async def timed(label: str, fn: Callable[[], Awaitable[int]], repeat: int) -> None:
+    samples = []
+    rows = 0
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = await fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    print(f"{label:<48} {samples[len(samples) // 2]:>9.2f} ms  ({rows} rows)")
+
+
+async def walk(
+    db: AsyncSession,
+    list_page: Callable[..., Awaitable[list]],
+    limit: int,
+    pages: int,
+    keyset: bool,
+) -> int:
+    """Fetch up to `pages` consecutive pages; returns the rows fetched."""
+    before_id, rows = None, 0
+    for number in range(pages):
+        if keyset:
+            page = await list_page(limit=limit, before_id=before_id)
+            before_id = bug_service.next_cursor(page, limit)
+        else:
+            page = await list_page(limit=limit, offset=number * limit)
+        rows += len(page)
+        # Like one request per page: do not let the identity map grow.
+        db.expunge_all()
+        if len(page) < limit:
+            break
+    return rows
+
+
+async def run(args: argparse.Namespace) -> None:
+    url = args.database_url
+    tmpdir = None
+    if url is None:
+        tmpdir = tempfile.mkdtemp(prefix="bug-listing-")
+        url = f"sqlite+aiosqlite:///{os.path.join(tmpdir, 'bench.db')}"
+
+    engine = create_async_engine(url, future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    try:
+        async with session_factory() as db:
+            started = time.perf_counter()
+            app_id, version_id = await seed(db, args.bugs, args.occurrences)
+            print(
+                f"Seeded {args.bugs} bugs / {args.occurrences} occurrences "
+                f"in {time.perf_counter() - started:.1f}s on {engine.dialect.name}\n"
+            )
+
+            def bugs_page(**kwargs):
+                return bug_service.list_bugs_for_app(db, app_id, **kwargs)
+
+            def version_bugs_page(**kwargs):
+                return bug_service.list_bugs_for_app(
+                    db, app_id, app_version_id=version_id, **kwargs
+                )
+
+            def occurrences_page(**kwargs):
+                return bug_service.list_bug_occurrences(db, 1, **kwargs)
+
+            limit, pages = args.limit, args.pages
+            for label, fn in (
+                ("all bugs, OFFSET", lambda: walk(db, bugs_page, limit, pages, False)),
+                ("all bugs, keyset", lambda: walk(db, bugs_page, limit, pages, True)),
+                (
+                    "bugs seen in one version, OFFSET",
+                    lambda: walk(db, version_bugs_page, limit, pages, False),
+                ),
+                (
+                    "bugs seen in one version, keyset",
+                    lambda: walk(db, version_bugs_page, limit, pages, True),
+                ),
+                (
+                    "occurrences of hottest bug, OFFSET",
+                    lambda: walk(db, occurrences_page, limit, pages, False),
+                ),
+                (
+                    "occurrences of hottest bug, keyset",
+                    lambda: walk(db, occurrences_page, limit, pages, True),
+                ),
+            ):
+                await timed(f"{label} ({pages} x {limit})", fn, args.repeat)
+    finally:
+        if tmpdir:
+            await engine.dispose()
+            shutil.rmtree(tmpdir, ignore_errors=True)
+        else:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.drop_all)
+            await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--bugs", type=int, default=20000)
+    parser.add_argument("--occurrences", type=int, default=200000)
+    parser.add_argument("--limit", type=int, default=bug_service.MAX_PAGE_SIZE)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import asyncio
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from PIL import Image
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.schemas.bug import BugOccurrenceCreate
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services.blob_store import blob_store
+from app_evaluation_agent.storage.blobs import (
+    FilesystemBlobBackend,
+    backend_from_settings,
+    blob_digest,
+)
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    Base,
+    Blob,
+    Bug,
+    BugSeverity,
+    BugStatus,
+)
+from app_evaluation_agent.utils.config import settings
+
+
+@pytest_asyncio.fixture
+async def db_session(monkeypatch, tmp_path) -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    monkeypatch.setattr(blob_store, "_backend", FilesystemBlobBackend(tmp_path))
+    monkeypatch.setattr(blob_store, "ttl_seconds", 60)
+    blob_store.clear()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    blob_store.clear()
+    await engine.dispose()
+
+
+def _png(color) -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (16, 16), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def _bug(db: AsyncSession) -> Bug:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db.add(app)
+    await db.flush()
+    bug = Bug(
+        app_id=app.id,
+        title="Login button does nothing",
+        severity_level=BugSeverity.P1,
+        status=BugStatus.NEW,
+    )
+    db.add(bug)
+    await db.commit()
+    return bug
+
+
+async def _ref_count(db: AsyncSession, digest: str) -> int:
+    return await db.scalar(select(Blob.ref_count).where(Blob.digest == digest))
+
+
+@pytest.mark.asyncio
+async def test_put_stores_each_content_once_in_sharded_directories(
+    db_session, tmp_path
+):
+    data = _png((255, 0, 0))
+    digest = await blob_store.put(db_session, data)
+    assert await blob_store.put(db_session, memoryview(data)) == digest
+    await db_session.commit()
+
+    assert digest == blob_digest(data)
+    assert (tmp_path / digest[:2] / digest[2:4] / digest).read_bytes() == data
+    assert len([path for path in tmp_path.rglob("*") if path.is_file()]) == 1
+    assert await db_session.scalar(select(func.count()).select_from(Blob)) == 1
+    assert await blob_store.open(db_session, digest) == (data, "image/png")
+    assert await blob_store.open(db_session, "../../etc/passwd") is None
+
+
+@pytest.mark.asyncio
+async def test_occurrences_keep_screenshots_alive_until_released(
+    db_session, tmp_path
+):
+    bug_id = (await _bug(db_session)).id
+    evidence = await blob_store.put(db_session, _png((0, 255, 0)))
+    step = await blob_store.put(db_session, _png((0, 0, 255)))
+    await db_session.commit()
+
+    with pytest.raises(ValueError, match="Screenshot not found"):
+        await bug_service.create_bug_occurrence(
+            db_session, bug_id, BugOccurrenceCreate(screenshot_hash="0" * 64)
+        )
+    await db_session.rollback()
+    for _ in range(2):
+        await bug_service.create_bug_occurrence(
+            db_session, bug_id, BugOccurrenceCreate(screenshot_hash=evidence)
+        )
+    assert await _ref_count(db_session, evidence) == 2
+
+    later = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert await blob_store.sweep(db_session, now=later) == 1
+    assert await blob_store.open(db_session, step) is None
+    assert not blob_store.backend.exists(step)
+    assert blob_store.backend.exists(evidence)
+
+    assert await bug_service.delete_bug(db_session, bug_id)
+    assert await _ref_count(db_session, evidence) == 0
+    # Releasing restarts the TTL.
+    assert await blob_store.sweep(db_session) == 0
+    assert await blob_store.sweep(db_session, now=later) == 1
+    assert not blob_store.backend.exists(evidence)
+
+
+@pytest.mark.asyncio
+async def test_put_racing_a_sweep_never_leaves_a_row_without_content(
+    db_session, monkeypatch
+):
+    data = _png((9, 9, 9))
+    digest = await blob_store.put(db_session, data)
+    await db_session.commit()
+    loop = asyncio.get_running_loop()
+    backend = blob_store.backend
+    delete = backend.delete
+
+    async def put_again():
+        await blob_store.put(db_session, data)
+        await db_session.commit()
+
+    def racing_delete(target):
+        # The row is already deleted; a runner sends the same frame again.
+        asyncio.run_coroutine_threadsafe(put_again(), loop).result()
+        delete(target)
+
+    monkeypatch.setattr(backend, "delete", racing_delete)
+    later = datetime.now(timezone.utc) + timedelta(seconds=120)
+    assert await blob_store.sweep(db_session, now=later) == 1
+    assert await blob_store.known(db_session, [digest]) == set()
+
+    monkeypatch.setattr(backend, "delete", delete)
+    assert await blob_store.put(db_session, data) == digest
+    await db_session.commit()
+    assert await blob_store.open(db_session, digest) == (data, "image/png")
+
+
+def test_filesystem_backend_requires_an_absolute_root(monkeypatch, tmp_path):
+    monkeypatch.setattr(settings.blobs, "backend", "filesystem")
+    for root in ("", "data/blobs"):
+        monkeypatch.setattr(settings.blobs, "root", root)
+        with pytest.raises(ValueError, match="absolute path"):
+            backend_from_settings()
+
+    monkeypatch.setattr(settings.blobs, "root", str(tmp_path))
+    assert backend_from_settings().root == tmp_path
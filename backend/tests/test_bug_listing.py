@@ -0,0 +1,110 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Bug,
+    BugOccurrence,
+    BugSeverity,
+    BugStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+async def _seed(db_session: AsyncSession, bugs: int) -> tuple[App, AppVersion]:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    for idx in range(bugs):
+        bug = Bug(
+            app_id=app.id,
+            title=f"Bug {idx}",
+            severity_level=BugSeverity.P1 if idx % 2 else BugSeverity.P2,
+            status=BugStatus.NEW,
+        )
+        db_session.add(bug)
+        await db_session.flush()
+        # Every other bug was seen three times in this version.
+        for _ in range(3 if idx % 2 else 1):
+            db_session.add(
+                BugOccurrence(
+                    bug_id=bug.id,
+                    app_version_id=app_version.id if idx % 2 else None,
+                )
+            )
+    await db_session.commit()
+    return app, app_version
+
+
+@pytest.mark.asyncio
+async def test_keyset_pages_cover_every_bug_once(db_session: AsyncSession):
+    app, _ = await _seed(db_session, bugs=7)
+
+    seen, before_id = [], None
+    while True:
+        page = await bug_service.list_bugs_for_app(
+            db_session, app.id, limit=3, before_id=before_id
+        )
+        seen.extend(bug.id for bug in page)
+        before_id = bug_service.next_cursor(page, 3)
+        if before_id is None:
+            break
+
+    assert seen == sorted(seen, reverse=True)
+    assert len(seen) == len(set(seen)) == 7
+
+
+@pytest.mark.asyncio
+async def test_occurrence_filters_return_each_bug_once(db_session: AsyncSession):
+    app, app_version = await _seed(db_session, bugs=6)
+
+    bugs = await bug_service.list_bugs_for_app(
+        db_session, app.id, app_version_id=app_version.id, severity_level="P1"
+    )
+
+    assert len(bugs) == 3
+    assert len({bug.id for bug in bugs}) == 3
+
+
+@pytest.mark.asyncio
+async def test_occurrence_keyset_pagination(db_session: AsyncSession):
+    app, _ = await _seed(db_session, bugs=2)
+    bug = (await bug_service.list_bugs_for_app(db_session, app.id))[0]
+
+    first = await bug_service.list_bug_occurrences(db_session, bug.id, limit=2)
+    cursor = bug_service.next_cursor(first, 2)
+    rest = await bug_service.list_bug_occurrences(
+        db_session, bug.id, limit=2, before_id=cursor
+    )
+
+    assert [o.id for o in first + rest] == sorted(
+        (o.id for o in first + rest), reverse=True
+    )
+    assert len(first) == 2 and len(rest) == 1
+    assert bug_service.next_cursor(rest, 2) is None
@@ -0,0 +1,189 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.schemas.app_version import AppVersionCreate
+from app_evaluation_agent.services import apps as app_service
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services import regressions as regression_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.services.version_lineage import _AppLineage, lineage_cache
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    Base,
+    Bug,
+    BugFix,
+    BugStatus,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    lineage_cache.clear()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    lineage_cache.clear()
+    await engine.dispose()
+
+
+def _draft(fingerprint: str) -> BugDraft:
+    return BugDraft(
+        title=f"Bug {fingerprint}",
+        description=None,
+        severity_level="P1",
+        priority=None,
+        status="NEW",
+        fingerprint=fingerprint,
+        environment=None,
+        reproduction_steps=None,
+        expected=None,
+        actual=None,
+        action=None,
+        result_snapshot=None,
+        screenshot_uri=None,
+        log_uri=None,
+        raw_model_coords=None,
+        step_index=None,
+        observed_at=datetime.now(timezone.utc),
+    )
+
+
+async def _evaluation(db_session: AsyncSession, version_id: int, case_names):
+    evaluation = Evaluation(
+        app_version_id=version_id,
+        status=EvaluationStatus.COMPLETED,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.flush()
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.flush()
+    cases = {
+        name: TestCase(
+            plan_id=plan.id,
+            evaluation_id=evaluation.id,
+            name=name,
+            status=TestCaseStatus.COMPLETED,
+        )
+        for name in case_names
+    }
+    db_session.add_all(cases.values())
+    await db_session.commit()
+    return evaluation, cases
+
+
+async def _observe(db_session, app, evaluation, case, fingerprints):
+    await bug_service.persist_triage_drafts(
+        db_session,
+        app_id=app.id,
+        app_version_id=evaluation.app_version_id,
+        evaluation_id=evaluation.id,
+        test_case_id=case.id,
+        executor_id=None,
+        drafts=[_draft(fingerprint) for fingerprint in fingerprints],
+    )
+    await db_session.commit()
+
+
+def test_ancestor_closure_handles_diamonds_and_cycles():
+    lineage = _AppLineage({2: {1}, 3: {1}, 4: {2, 3}, 5: {6}, 6: {5}})
+
+    assert lineage.ancestors(4) == {1, 2, 3}
+    assert lineage.ancestors(2) == {1}
+    assert lineage.ancestors(1) == frozenset()
+    assert lineage.ancestors(5) == {5, 6}
+
+
+@pytest.mark.asyncio
+async def test_regressions_follow_the_version_lineage(db_session: AsyncSession):
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+
+    async def version(name, *parents):
+        return await app_service.create_app_version(
+            db_session,
+            app.id,
+            AppVersionCreate(
+                app_id=app.id, version=name, previous_version_ids=list(parents) or None
+            ),
+        )
+
+    base = await version("1.0")
+    main = await version("2.0", base.id)
+    branch = await version("1.0.1", base.id)
+
+    old_eval, old_cases = await _evaluation(db_session, base.id, ["Login", "Save"])
+    await _observe(db_session, app, old_eval, old_cases["Login"], ["regressed"])
+    await _observe(db_session, app, old_eval, old_cases["Save"], ["verified"])
+    await _observe(db_session, app, old_eval, old_cases["Login"], ["still-open"])
+    await _observe(db_session, app, old_eval, old_cases["Save"], ["branch-only"])
+
+    bugs = {
+        bug.fingerprint: bug
+        for bug in (await db_session.scalars(select(Bug))).all()
+    }
+    bugs["regressed"].status = BugStatus.CLOSED
+    bugs["verified"].status = BugStatus.PENDING_VERIFICATION
+    bugs["branch-only"].status = BugStatus.CLOSED
+    db_session.add_all(
+        [
+            BugFix(bug_id=bugs["regressed"].id, fixed_in_version_id=base.id),
+            BugFix(bug_id=bugs["verified"].id, fixed_in_version_id=base.id),
+            BugFix(bug_id=bugs["branch-only"].id, fixed_in_version_id=branch.id),
+        ]
+    )
+    await db_session.commit()
+
+    new_eval, new_cases = await _evaluation(db_session, main.id, ["Login", "Save"])
+    await _observe(
+        db_session, app, new_eval, new_cases["Login"], ["regressed", "branch-only"]
+    )
+
+    report = await regression_service.apply_evaluation_regressions(
+        db_session, new_eval.id
+    )
+
+    assert [item["bug_id"] for item in report["regressions"]] == [
+        bugs["regressed"].id
+    ]
+    assert report["regressions"][0]["previous_status"] == "CLOSED"
+    assert [item["bug_id"] for item in report["verified_fixes"]] == [
+        bugs["verified"].id
+    ]
+    assert [item["bug_id"] for item in report["not_reproduced"]] == [
+        bugs["still-open"].id
+    ]
+
+    for bug in bugs.values():
+        await db_session.refresh(bug)
+    assert bugs["regressed"].status == BugStatus.REOPENED
+    assert bugs["verified"].status == BugStatus.CLOSED
+    assert bugs["branch-only"].status == BugStatus.CLOSED
+    fix = await db_session.scalar(
+        select(BugFix).where(BugFix.bug_id == bugs["verified"].id)
+    )
+    assert fix.verified_by_evaluation_id == new_eval.id
+    await db_session.refresh(new_eval)
+    assert new_eval.results["regressions"]["evaluation_id"] == new_eval.id
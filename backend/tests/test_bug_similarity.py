@@ -0,0 +1,228 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.schemas.bug import BugCreate, BugOccurrenceCreate
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.services.bug_similarity import (
+    BugSimilarityIndex,
+    bug_similarity_index,
+    estimate_similarity,
+)
+from app_evaluation_agent.storage.models import App, AppType, Base, Bug, BugOccurrence
+from app_evaluation_agent.utils.config import settings
+
+SAVE_BUG = (
+    "Save button does nothing",
+    "Document is saved to disk",
+    "Nothing happens after clicking Save",
+)
+SAVE_BUG_PARAPHRASE = (
+    "Save button does nothing when clicked",
+    "Document is saved to disk",
+    "Nothing happens after clicking the Save button",
+)
+EXPORT_BUG = (
+    "Export to PDF crashes",
+    "PDF file is written",
+    "Application crashes with an access violation",
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    bug_similarity_index.clear()
+    await engine.dispose()
+
+
+async def _create_app(db_session: AsyncSession) -> App:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+    return app
+
+
+def _draft(fingerprint: str, texts) -> BugDraft:
+    title, expected, actual = texts
+    return BugDraft(
+        title=title,
+        description=None,
+        severity_level="P1",
+        priority=None,
+        status="NEW",
+        fingerprint=fingerprint,
+        environment=None,
+        reproduction_steps=None,
+        expected=expected,
+        actual=actual,
+        action=None,
+        result_snapshot=None,
+        screenshot_uri=None,
+        log_uri=None,
+        raw_model_coords=None,
+        step_index=None,
+        observed_at=datetime.now(timezone.utc),
+    )
+
+
+async def _persist(db: AsyncSession, app_id: int, drafts):
+    result = await bug_service.persist_triage_drafts(
+        db,
+        app_id=app_id,
+        app_version_id=None,
+        evaluation_id=None,
+        test_case_id=None,
+        executor_id=None,
+        drafts=drafts,
+    )
+    await db.commit()
+    return result
+
+
+def test_signatures_are_stable_and_track_similarity():
+    index = BugSimilarityIndex(num_perm=64, bands=16)
+    other = BugSimilarityIndex(num_perm=64, bands=16)
+
+    save = index.signature_for(*SAVE_BUG)
+    assert save == other.signature_for(*SAVE_BUG)
+    assert estimate_similarity(save, index.signature_for(*SAVE_BUG_PARAPHRASE)) > 0.6
+    assert estimate_similarity(save, index.signature_for(*EXPORT_BUG)) < 0.2
+
+
+@pytest.mark.asyncio
+async def test_paraphrased_draft_is_folded_into_existing_bug(
+    db_session: AsyncSession,
+):
+    app = await _create_app(db_session)
+    first = await _persist(db_session, app.id, [_draft("fp-save", SAVE_BUG)])
+
+    result = await _persist(
+        db_session,
+        app.id,
+        [
+            _draft("fp-save-paraphrase", SAVE_BUG_PARAPHRASE),
+            _draft("fp-export", EXPORT_BUG),
+        ],
+    )
+
+    assert result.bug_ids["fp-save"] == first.bug_ids["fp-save"]
+    assert "fp-save-paraphrase" not in result.bug_ids
+    assert result.created_bug_ids == {result.bug_ids["fp-export"]}
+    assert await db_session.scalar(select(func.count(Bug.id))) == 2
+    assert await db_session.scalar(select(func.count(BugOccurrence.id))) == 3
+
+
+@pytest.mark.asyncio
+async def test_paraphrases_within_one_run_collapse(db_session: AsyncSession):
+    app = await _create_app(db_session)
+
+    result = await _persist(
+        db_session,
+        app.id,
+        [_draft("fp-a", SAVE_BUG), _draft("fp-b", SAVE_BUG_PARAPHRASE)],
+    )
+
+    assert list(result.bug_ids) == ["fp-a"]
+    assert result.occurrence_count == 2
+
+
+@pytest.mark.asyncio
+async def test_index_follows_bug_create_and_delete(db_session: AsyncSession):
+    app = await _create_app(db_session)
+    await bug_similarity_index.sync(db_session, app.id)
+    bug = await bug_service.create_bug(
+        db_session,
+        BugCreate(app_id=app.id, title="Export to PDF crashes", fingerprint="manual"),
+    )
+
+    signature = bug_similarity_index.signature_for("Export to PDF crashes")
+    match = bug_similarity_index.match(app.id, signature, 0.9)
+    assert match is not None and match[:2] == (bug.id, "manual")
+
+    await bug_service.delete_bug(db_session, bug.id)
+    assert bug_similarity_index.match(app.id, signature, 0.9) is None
+
+
+@pytest.mark.asyncio
+async def test_first_occurrence_indexes_expected_and_actual(db_session: AsyncSession):
+    app = await _create_app(db_session)
+    await bug_similarity_index.sync(db_session, app.id)
+    title, expected, actual = SAVE_BUG
+    bug = await bug_service.create_bug(
+        db_session, BugCreate(app_id=app.id, title=title, fingerprint="manual")
+    )
+    await bug_service.create_bug_occurrence(
+        db_session, bug.id, BugOccurrenceCreate(expected=expected, actual=actual)
+    )
+
+    # Same texts the database sync would index for this bug.
+    signature = bug_similarity_index.signature_for(*SAVE_BUG)
+    assert bug_similarity_index.match(app.id, signature, 1.0)[:2] == (
+        bug.id,
+        "manual",
+    )
+
+
+@pytest.mark.asyncio
+async def test_bug_deleted_elsewhere_does_not_absorb_drafts(
+    db_session: AsyncSession,
+):
+    app = await _create_app(db_session)
+    await _persist(db_session, app.id, [_draft("fp-save", SAVE_BUG)])
+    await bug_similarity_index.sync(db_session, app.id)
+
+    # Another process deletes the bug; this one's index still has it.
+    await db_session.execute(delete(BugOccurrence))
+    await db_session.execute(delete(Bug))
+    await db_session.commit()
+
+    result = await _persist(
+        db_session, app.id, [_draft("fp-save-paraphrase", SAVE_BUG_PARAPHRASE)]
+    )
+    assert list(result.bug_ids) == ["fp-save-paraphrase"]
+    assert result.created_bug_ids == {result.bug_ids["fp-save-paraphrase"]}
+
+
+@pytest.mark.asyncio
+async def test_index_keeps_only_recent_apps(db_session: AsyncSession):
+    index = BugSimilarityIndex(num_perm=64, bands=16, max_apps=1)
+    first = await _create_app(db_session)
+    second = App(name="Other", app_type=AppType.DESKTOP_APP)
+    db_session.add(second)
+    await db_session.commit()
+    await _persist(db_session, first.id, [_draft("fp-save", SAVE_BUG)])
+    signature = index.signature_for(*SAVE_BUG)
+
+    await index.sync(db_session, first.id)
+    assert index.match(first.id, signature, 0.9) is not None
+    await index.sync(db_session, second.id)
+    assert index.match(first.id, signature, 0.9) is None
+
+
+@pytest.mark.asyncio
+async def test_threshold_zero_disables_folding(db_session: AsyncSession, monkeypatch):
+    monkeypatch.setattr(settings.triage, "similarity_threshold", 0)
+    app = await _create_app(db_session)
+    await _persist(db_session, app.id, [_draft("fp-save", SAVE_BUG)])
+
+    await _persist(
+        db_session, app.id, [_draft("fp-save-paraphrase", SAVE_BUG_PARAPHRASE)]
+    )
+
+    assert await db_session.scalar(select(func.count(Bug.id))) == 2
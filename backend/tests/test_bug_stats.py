@@ -0,0 +1,173 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.schemas.bug import BugOccurrenceCreate
+from app_evaluation_agent.services import bug_stats
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Bug,
+    BugVersionStats,
+    Evaluation,
+    EvaluationStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+def _draft(fingerprint: str, observed_at: datetime) -> BugDraft:
+    return BugDraft(
+        title=f"Bug {fingerprint}",
+        description=None,
+        severity_level="P1",
+        priority=None,
+        status="NEW",
+        fingerprint=fingerprint,
+        environment=None,
+        reproduction_steps=None,
+        expected=None,
+        actual=None,
+        action=None,
+        result_snapshot=None,
+        screenshot_uri=None,
+        log_uri=None,
+        raw_model_coords=None,
+        step_index=None,
+        observed_at=observed_at,
+    )
+
+
+async def _seed(db_session: AsyncSession):
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    versions = [AppVersion(app_id=app.id, version=v) for v in ("1.0.0", "1.1.0")]
+    db_session.add_all(versions)
+    await db_session.commit()
+
+    evaluations = [
+        Evaluation(
+            app_version_id=version.id,
+            status=EvaluationStatus.IN_PROGRESS,
+            execution_mode="local",
+        )
+        for version in versions
+    ]
+    db_session.add_all(evaluations)
+    await db_session.commit()
+    return app, versions, evaluations
+
+
+async def _persist(db_session, app, evaluation, drafts):
+    result = await bug_service.persist_triage_drafts(
+        db_session,
+        app_id=app.id,
+        app_version_id=evaluation.app_version_id,
+        evaluation_id=evaluation.id,
+        test_case_id=None,
+        executor_id=None,
+        drafts=drafts,
+    )
+    await db_session.commit()
+    return result
+
+
+async def _bug(db_session: AsyncSession, fingerprint: str) -> Bug:
+    return await db_session.scalar(
+        select(Bug)
+        .where(Bug.fingerprint == fingerprint)
+        .execution_options(populate_existing=True)
+    )
+
+
+@pytest.mark.asyncio
+async def test_triage_updates_counters_and_stats(db_session: AsyncSession):
+    app, versions, evaluations = await _seed(db_session)
+    now = datetime.now(timezone.utc)
+
+    await _persist(
+        db_session,
+        app,
+        evaluations[0],
+        [_draft("crash", now - timedelta(hours=2)), _draft("hang", now)],
+    )
+    await _persist(db_session, app, evaluations[1], [_draft("crash", now)])
+
+    crash = await _bug(db_session, "crash")
+    hang = await _bug(db_session, "hang")
+    assert (crash.occurrence_count, hang.occurrence_count) == (2, 1)
+
+    rows = (
+        await db_session.scalars(
+            select(BugVersionStats).where(BugVersionStats.bug_id == crash.id)
+        )
+    ).all()
+    assert sorted(row.app_version_id for row in rows) == [v.id for v in versions]
+
+    stats = await bug_stats.get_app_bug_stats(db_session, app.id)
+    assert stats["total_bugs"] == 2
+    assert stats["total_occurrences"] == 3
+    assert stats["by_status"] == {"NEW": 2}
+    per_evaluation = {e["evaluation_id"]: e for e in stats["evaluations"]}
+    first, second = (per_evaluation[e.id] for e in evaluations)
+    assert (first["new_bugs"], first["recurring_bugs"]) == (2, 0)
+    assert (second["new_bugs"], second["recurring_bugs"]) == (0, 1)
+    assert [v["bug_count"] for v in stats["versions"]] == [2, 1]
+
+
+@pytest.mark.asyncio
+async def test_manual_occurrence_updates_counters(db_session: AsyncSession):
+    app, versions, evaluations = await _seed(db_session)
+    await _persist(
+        db_session, app, evaluations[0], [_draft("crash", datetime.now(timezone.utc))]
+    )
+    crash = await _bug(db_session, "crash")
+
+    await bug_service.create_bug_occurrence(
+        db_session,
+        crash.id,
+        BugOccurrenceCreate(
+            evaluation_id=evaluations[1].id, app_version_id=versions[1].id
+        ),
+    )
+
+    crash = await _bug(db_session, "crash")
+    assert crash.occurrence_count == 2
+    stats = await bug_stats.get_app_bug_stats(db_session, app.id)
+    assert stats["total_occurrences"] == 2
+    assert {e["evaluation_id"]: e["recurring_bugs"] for e in stats["evaluations"]} == {
+        evaluations[0].id: 0,
+        evaluations[1].id: 1,
+    }
+
+
+def test_unsupported_dialect_is_rejected():
+    bug_stats.check_upsert_support("sqlite")
+    bug_stats.check_upsert_support("postgresql")
+    with pytest.raises(ValueError, match="Upserts are not supported on mysql"):
+        bug_stats.check_upsert_support("mysql")
@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    Base,
+    Bug,
+    BugOccurrence,
+    BugSeverity,
+    BugStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def session_factory(tmp_path):
+    # A file database so separate sessions really use separate connections.
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'bugs.db'}", future=True
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(session_factory) -> AsyncSession:
+    async with session_factory() as session:
+        yield session
+
+
+async def _create_app(db_session: AsyncSession) -> App:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+    return app
+
+
+def _draft(fingerprint: str, observed_at: datetime) -> BugDraft:
+    return BugDraft(
+        title=f"Bug {fingerprint}",
+        description=None,
+        severity_level="P1",
+        priority=None,
+        status="NEW",
+        fingerprint=fingerprint,
+        environment=None,
+        reproduction_steps=None,
+        expected=None,
+        actual=None,
+        action=None,
+        result_snapshot=None,
+        screenshot_uri=None,
+        log_uri=None,
+        raw_model_coords=None,
+        step_index=None,
+        observed_at=observed_at,
+    )
+
+
+async def _persist(
+    db: AsyncSession, app_id: int, drafts
+) -> bug_service.TriagePersistResult:
+    return await bug_service.persist_triage_drafts(
+        db,
+        app_id=app_id,
+        app_version_id=None,
+        evaluation_id=None,
+        test_case_id=None,
+        executor_id="worker-1",
+        drafts=drafts,
+    )
+
+
+@pytest.mark.asyncio
+async def test_persist_upserts_bugs_and_records_every_occurrence(
+    db_session: AsyncSession,
+):
+    app = await _create_app(db_session)
+    earlier = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    later = earlier + timedelta(hours=1)
+    existing = Bug(
+        app_id=app.id,
+        title="Known bug",
+        severity_level=BugSeverity.P2,
+        status=BugStatus.NEW,
+        fingerprint="known",
+        first_seen_at=earlier,
+        last_seen_at=earlier,
+    )
+    db_session.add(existing)
+    await db_session.commit()
+
+    result = await _persist(
+        db_session,
+        app.id,
+        [_draft("known", later), _draft("fresh", earlier), _draft("fresh", later)],
+    )
+    await db_session.commit()
+
+    assert set(result.bug_ids) == {"known", "fresh"}
+    assert result.bug_ids["known"] == existing.id
+    assert result.created_bug_ids == {result.bug_ids["fresh"]}
+    assert result.occurrence_count == 3
+
+    bugs = {
+        bug.fingerprint: bug
+        for bug in (await db_session.execute(select(Bug))).scalars().all()
+    }
+    await db_session.refresh(existing)
+    assert len(bugs) == 2
+    assert existing.title == "Known bug"
+    assert existing.last_seen_at.replace(tzinfo=timezone.utc) == later
+    assert bugs["fresh"].last_seen_at.replace(tzinfo=timezone.utc) == later
+    assert await db_session.scalar(select(func.count(BugOccurrence.id))) == 3
+
+
+@pytest.mark.asyncio
+async def test_persist_never_moves_last_seen_backwards(db_session: AsyncSession):
+    app = await _create_app(db_session)
+    now = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    await _persist(db_session, app.id, [_draft("flaky", now)])
+    await db_session.commit()
+    await _persist(db_session, app.id, [_draft("flaky", now - timedelta(days=1))])
+    await db_session.commit()
+
+    bug = (await db_session.execute(select(Bug))).scalars().one()
+    assert bug.last_seen_at.replace(tzinfo=timezone.utc) == now
+
+
+@pytest.mark.asyncio
+async def test_concurrent_persists_converge_on_one_bug(
+    session_factory, db_session: AsyncSession
+):
+    app = await _create_app(db_session)
+    now = datetime.now(timezone.utc)
+
+    async def _run():
+        async with session_factory() as db:
+            result = await _persist(db, app.id, [_draft("race", now)])
+            await db.commit()
+            return result
+
+    first, second = await asyncio.gather(_run(), _run())
+
+    assert first.bug_ids == second.bug_ids
+    assert len(first.created_bug_ids | second.created_bug_ids) == 1
+    # Only the run whose insert won reports the bug as new.
+    assert sorted(len(r.created_bug_ids) for r in (first, second)) == [0, 1]
+    assert await db_session.scalar(select(func.count(Bug.id))) == 1
+    assert await db_session.scalar(select(func.count(BugOccurrence.id))) == 2
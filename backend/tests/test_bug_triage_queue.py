@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.services import triage as triage_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft, BugTriageAgent
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.services.triage_gate import triage_gate
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Bug,
+    BugOccurrence,
+    BugTriageJob,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+    TriageJobStatus,
+)
+from app_evaluation_agent.utils.config import settings
+
+FAILED_RESULT = {"status": "failed", "error": "Save button does nothing"}
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    triage_gate.reset()
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    await triage_service.triage_queue.stop()
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def db_session(session_factory) -> AsyncSession:
+    async with session_factory() as session:
+        yield session
+
+
+async def _create_case(db_session: AsyncSession) -> TestCase:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.IN_PROGRESS,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+
+    case = TestCase(
+        plan_id=plan.id,
+        evaluation_id=evaluation.id,
+        name="Save document",
+        status=TestCaseStatus.IN_PROGRESS,
+    )
+    db_session.add(case)
+    await db_session.commit()
+    await db_session.refresh(case)
+    return case
+
+
+def _draft() -> BugDraft:
+    return BugDraft(
+        title="Save button does nothing",
+        description=None,
+        severity_level="P1",
+        priority=None,
+        status="NEW",
+        fingerprint="save-button",
+        environment=None,
+        reproduction_steps=None,
+        expected="Document saved",
+        actual="Nothing happens",
+        action=None,
+        result_snapshot=None,
+        screenshot_uri=None,
+        log_uri=None,
+        raw_model_coords=None,
+        step_index=2,
+        observed_at=datetime.now(timezone.utc),
+    )
+
+
+@pytest.mark.asyncio
+async def test_case_update_queues_triage_once_per_result(
+    db_session: AsyncSession, monkeypatch
+):
+    case = await _create_case(db_session)
+    calls = []
+
+    async def _triage(**kwargs):
+        calls.append(kwargs)
+        return []
+
+    monkeypatch.setattr(BugTriageAgent, "triage_test_case", _triage)
+
+    for _ in range(2):
+        await testcase_service.update_test_case(
+            db_session, case.id, result_payload=dict(FAILED_RESULT)
+        )
+
+    jobs = (await db_session.execute(select(BugTriageJob))).scalars().all()
+    assert len(jobs) == 1
+    assert jobs[0].status == TriageJobStatus.PENDING
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_triage_job_retries_then_fails(db_session: AsyncSession, monkeypatch):
+    case = await _create_case(db_session)
+
+    async def _boom(**kwargs):
+        raise RuntimeError("LLM unavailable")
+
+    monkeypatch.setattr(BugTriageAgent, "triage_test_case", _boom)
+    monkeypatch.setattr(settings.triage, "max_attempts", 2)
+    job = await triage_service.enqueue_triage(db_session, case.id, FAILED_RESULT)
+
+    job = await triage_service.run_triage_job(db_session, job.id)
+    assert (job.status, job.attempts) == (TriageJobStatus.PENDING, 1)
+    job = await triage_service.run_triage_job(db_session, job.id)
+    assert (job.status, job.attempts) == (TriageJobStatus.FAILED, 2)
+    assert "LLM unavailable" in job.last_error
+
+
+@pytest.mark.asyncio
+async def test_running_job_is_only_reclaimed_after_its_lease(
+    db_session: AsyncSession, monkeypatch
+):
+    case = await _create_case(db_session)
+    calls = []
+
+    async def _triage(**kwargs):
+        calls.append(kwargs)
+        return []
+
+    monkeypatch.setattr(BugTriageAgent, "triage_test_case", _triage)
+    job = await triage_service.enqueue_triage(db_session, case.id, FAILED_RESULT)
+
+    async def _running_since(seconds_ago: float) -> None:
+        await db_session.execute(
+            update(BugTriageJob)
+            .where(BugTriageJob.id == job.id)
+            .values(
+                status=TriageJobStatus.RUNNING,
+                updated_at=datetime.now(timezone.utc) - timedelta(seconds=seconds_ago),
+            )
+        )
+        await db_session.commit()
+
+    # Another runner holds the job: a duplicate delivery must not run it.
+    await _running_since(0)
+    job = await triage_service.run_triage_job(db_session, job.id)
+    assert (job.status, job.attempts) == (TriageJobStatus.RUNNING, 0)
+    assert await triage_service.resume_pending_triage(db_session) == 0
+    assert calls == []
+
+    # That runner died: once the lease expires the job is picked up again.
+    await _running_since(settings.triage.lease_seconds + 60)
+    assert await triage_service.resume_pending_triage(db_session) == 1
+    job = await triage_service.run_triage_job(db_session, job.id)
+    assert (job.status, job.attempts) == (TriageJobStatus.COMPLETED, 1)
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_local_queue_runs_jobs_off_the_request_path(
+    session_factory, db_session: AsyncSession, monkeypatch
+):
+    case = await _create_case(db_session)
+
+    async def _triage(**kwargs):
+        return [_draft()]
+
+    monkeypatch.setattr(BugTriageAgent, "triage_test_case", _triage)
+    triage_service.triage_queue.start(session_factory, concurrency=2)
+
+    job = await triage_service.enqueue_triage(db_session, case.id, FAILED_RESULT)
+    await triage_service.triage_queue.join()
+
+    await db_session.refresh(job)
+    assert job.status == TriageJobStatus.COMPLETED
+    assert await db_session.scalar(select(func.count(Bug.id))) == 1
+    assert await db_session.scalar(select(func.count(BugOccurrence.id))) == 1
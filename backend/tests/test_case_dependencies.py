@@ -0,0 +1,153 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+async def _create_plan(db_session: AsyncSession) -> TestPlan:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.READY,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+    return plan
+
+
+async def _create_case(db_session, plan, order, depends_on_ids=None):
+    return await testcase_service.create_test_case(
+        db_session,
+        plan_id=plan.id,
+        evaluation_id=plan.evaluation_id,
+        name=f"Case {order}",
+        execution_order=order,
+        depends_on_ids=depends_on_ids,
+    )
+
+
+@pytest.mark.asyncio
+async def test_dependent_case_waits_for_prerequisite(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    login = await _create_case(db_session, plan, 1)
+    checkout = await _create_case(db_session, plan, 2, depends_on_ids=[login.id])
+    assert checkout.depends_on_ids == [login.id]
+
+    first = await testcase_service.next_test_case_for_executor(db_session, "w1")
+    assert first.id == login.id
+    assert await testcase_service.next_test_case_for_executor(db_session, "w2") is None
+
+    await testcase_service.update_test_case(
+        db_session, login.id, status=TestCaseStatus.COMPLETED
+    )
+    second = await testcase_service.next_test_case_for_executor(db_session, "w2")
+    assert second.id == checkout.id
+
+
+@pytest.mark.asyncio
+async def test_independent_cases_dispatch_in_parallel(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    login = await _create_case(db_session, plan, 1)
+    await _create_case(db_session, plan, 2, depends_on_ids=[login.id])
+    search = await _create_case(db_session, plan, 3)
+
+    picked = [
+        await testcase_service.next_test_case_for_executor(db_session, f"w{idx}")
+        for idx in range(3)
+    ]
+
+    assert [case.id if case else None for case in picked] == [
+        login.id,
+        search.id,
+        None,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_prerequisite_fails_dependents(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    login = await _create_case(db_session, plan, 1)
+    checkout = await _create_case(db_session, plan, 2, depends_on_ids=[login.id])
+    receipt = await _create_case(db_session, plan, 3, depends_on_ids=[checkout.id])
+
+    await testcase_service.update_test_case(
+        db_session, login.id, status=TestCaseStatus.FAILED
+    )
+
+    for case in (checkout, receipt):
+        await db_session.refresh(case)
+        assert case.status == TestCaseStatus.FAILED
+        assert case.result["failure_type"] == "blocked_by_dependency"
+    assert receipt.result["blocked_by"] == checkout.id
+
+
+@pytest.mark.asyncio
+async def test_failed_prerequisite_is_rejected(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    login = await _create_case(db_session, plan, 1)
+    search = await _create_case(db_session, plan, 2)
+    await testcase_service.update_test_case(
+        db_session, login.id, status=TestCaseStatus.FAILED
+    )
+
+    with pytest.raises(ValueError, match="already failed"):
+        await _create_case(db_session, plan, 3, depends_on_ids=[login.id])
+    with pytest.raises(ValueError, match="already failed"):
+        await testcase_service.update_test_case(
+            db_session, search.id, depends_on_ids=[login.id]
+        )
+
+
+@pytest.mark.asyncio
+async def test_dependency_cycle_is_rejected(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    first = await _create_case(db_session, plan, 1)
+    second = await _create_case(db_session, plan, 2, depends_on_ids=[first.id])
+
+    with pytest.raises(ValueError, match="cycle"):
+        await testcase_service.update_test_case(
+            db_session, first.id, depends_on_ids=[second.id]
+        )
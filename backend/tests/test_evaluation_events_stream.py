@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app_evaluation_agent.api.v1 import evaluations as evaluations_api
+from app_evaluation_agent.realtime import EvaluationStatusBroadcaster
+from app_evaluation_agent.storage.models import EvaluationStatus
+
+
+@pytest.fixture
+def database(monkeypatch) -> dict:
+    """Evaluation statuses the stream reads on connect, by evaluation ID."""
+    statuses = {}
+
+    async def load_status(evaluation_id):
+        return statuses.get(evaluation_id)
+
+    monkeypatch.setattr(evaluations_api, "_load_status", load_status)
+    return statuses
+
+
+@pytest_asyncio.fixture
+async def broadcaster(monkeypatch, database) -> EvaluationStatusBroadcaster:
+    broadcaster = EvaluationStatusBroadcaster()
+    monkeypatch.setattr(
+        evaluations_api, "evaluation_status_broadcaster", broadcaster
+    )
+    original = broadcaster.publish_status
+
+    async def publish_status(evaluation_id, status, *args, **kwargs):
+        # Statuses are committed before they are published.
+        database[evaluation_id] = status.value
+        return await original(evaluation_id, status, *args, **kwargs)
+
+    monkeypatch.setattr(broadcaster, "publish_status", publish_status)
+    yield broadcaster
+    await broadcaster.stop()
+
+
+async def _open(evaluation_id: int, **params):
+    params.setdefault("keepalive_seconds", 15.0)
+    params.setdefault("max_seconds", 5)
+    params.setdefault("last_event_id", None)
+    response = await evaluations_api.stream_evaluation_events(
+        evaluation_id=evaluation_id, **params
+    )
+    return response.body_iterator
+
+
+@pytest.mark.asyncio
+async def test_stream_pushes_changes_and_closes_on_completed(broadcaster):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)
+    events = await _open(1)
+
+    assert await anext(events) == "id: 1\nevent: status\ndata: IN_PROGRESS\n\n"
+    pending = asyncio.ensure_future(anext(events))
+    await asyncio.sleep(0)
+    await broadcaster.publish_status(1, EvaluationStatus.COMPLETED)
+    assert await pending == "id: 2\nevent: status\ndata: COMPLETED\n\n"
+    with pytest.raises(StopAsyncIteration):
+        await anext(events)
+    assert broadcaster._subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_stream_resumes_from_last_event_id(broadcaster):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)
+    events = await _open(1, last_event_id="1", keepalive_seconds=0.01)
+
+    # Already seen: the stream only keeps the connection alive.
+    assert await anext(events) == ": keep-alive\n\n"
+    await broadcaster.publish_status(1, EvaluationStatus.FAILED)
+    chunks = [chunk async for chunk in events]
+    assert chunks[-1] == "id: 2\nevent: status\ndata: FAILED\n\n"
+    assert all(chunk == ": keep-alive\n\n" for chunk in chunks[:-1])
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_current_status_when_client_is_behind(broadcaster):
+    for status in (EvaluationStatus.IN_PROGRESS, EvaluationStatus.COMPLETED):
+        await broadcaster.publish_status(1, status)
+    events = await _open(1, last_event_id="1")
+
+    assert [chunk async for chunk in events] == [
+        "id: 2\nevent: status\ndata: COMPLETED\n\n"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_since_accepts_a_journal_cursor(broadcaster):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)
+    await broadcaster.publish_scoped("analyze.step", {"type": "step"}, evaluation_id=1)
+
+    # A cursor taken from any journaled event covers the status before it...
+    events = await _open(1, since=2, keepalive_seconds=0.01)
+    assert await anext(events) == ": keep-alive\n\n"
+    await events.aclose()
+
+    # ...but one the journal never issued does not.
+    events = await _open(1, since=9)
+    assert await anext(events) == "id: 1\nevent: status\ndata: IN_PROGRESS\n\n"
+    await events.aclose()
+
+
+@pytest.mark.asyncio
+async def test_stream_prefers_the_database_over_a_stale_cache(
+    broadcaster, database
+):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)
+    # The COMPLETED event never reached this process.
+    database[1] = EvaluationStatus.COMPLETED.value
+
+    events = await _open(1, last_event_id="1")
+
+    assert [chunk async for chunk in events] == [
+        "id: 0\nevent: status\ndata: COMPLETED\n\n"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_stream_of_deleted_evaluation_is_not_served_from_cache(
+    broadcaster, database
+):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)
+    del database[1]
+
+    events = await _open(1)
+
+    assert [chunk async for chunk in events] == [
+        "event: error\ndata: Evaluation not found\n\n"
+    ]
+    assert broadcaster.latest_status(1) is None
@@ -0,0 +1,177 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import executors as executors_module
+from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.services.executors import (
+    STEP_WINDOW_SECONDS,
+    ExecutorRegistry,
+    executor_registry,
+)
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    Executor,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    executor_registry.clear()
+    await engine.dispose()
+
+
+async def _create_pending_case(db_session: AsyncSession) -> TestCase:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.READY,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+
+    case = TestCase(
+        plan_id=plan.id,
+        evaluation_id=evaluation.id,
+        name="Case",
+        status=TestCaseStatus.PENDING,
+        execution_order=1,
+    )
+    db_session.add(case)
+    await db_session.commit()
+    await db_session.refresh(case)
+    return case
+
+
+@pytest.mark.asyncio
+async def test_registry_tracks_assignment_steps_and_release(db_session: AsyncSession):
+    case = await _create_pending_case(db_session)
+
+    await testcase_service.next_test_case_for_executor(db_session, "runner-1")
+    state = executor_registry.get("runner-1")
+    assert state.status == "online"
+    assert state.current_test_case_id == case.id
+    assert executor_registry.executor_for_case(case.id) == "runner-1"
+
+    await executor_registry.record_step(
+        "runner-1", analyze_latency_ms=100, image_size=(1920, 1080)
+    )
+    await executor_registry.record_step("runner-1", analyze_latency_ms=200)
+    assert state.total_steps == 2
+    assert state.steps_per_minute == 2
+    assert state.avg_analyze_latency_ms == pytest.approx(120)
+    assert (state.capture_width, state.capture_height) == (1920, 1080)
+
+    await testcase_service.update_test_case(
+        db_session, case.id, status=TestCaseStatus.COMPLETED
+    )
+    assert state.current_test_case_id is None
+
+
+@pytest.mark.asyncio
+async def test_registry_reports_stale_and_offline_executors(db_session: AsyncSession):
+    state = await executor_registry.heartbeat("runner-1")
+    assert [s.executor_id for s in executor_registry.list_executors("online")] == [
+        "runner-1"
+    ]
+
+    state.last_heartbeat_at = datetime.now(timezone.utc) - timedelta(seconds=60)
+    assert state.status == "stale"
+    state.last_heartbeat_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    assert state.status == "offline"
+
+
+@pytest.mark.asyncio
+async def test_registry_flush_round_trips_through_database(db_session: AsyncSession):
+    await executor_registry.heartbeat(
+        "runner-1", capture_width=1280, capture_height=720, info={"os": "linux"}
+    )
+    await executor_registry.record_step("runner-1", analyze_latency_ms=50)
+
+    assert await executor_registry.flush(db_session) == 1
+    assert await executor_registry.flush(db_session) == 0
+
+    restored = ExecutorRegistry()
+    await restored.load(db_session)
+    state = restored.get("runner-1")
+    assert state.capture_width == 1280
+    assert state.total_steps == 1
+    assert state.info == {"os": "linux"}
+    assert state.steps_per_minute == 1
+
+
+@pytest.mark.asyncio
+async def test_reloaded_rate_decays_once_the_executor_is_idle(
+    db_session: AsyncSession, monkeypatch
+):
+    await executor_registry.record_step("runner-1", analyze_latency_ms=50)
+    await executor_registry.flush(db_session)
+
+    restored = ExecutorRegistry()
+    await restored.load(db_session)
+    state = restored.get("runner-1")
+    assert state.steps_per_minute == 1
+
+    later = time.monotonic() + STEP_WINDOW_SECONDS + 1
+    monkeypatch.setattr(executors_module.time, "monotonic", lambda: later)
+    assert state.steps_per_minute == 0
+    assert state.persisted_steps_per_minute is None
+
+
+@pytest.mark.asyncio
+async def test_flushes_from_several_workers_merge(db_session: AsyncSession):
+    first, second = ExecutorRegistry(), ExecutorRegistry()
+    for _ in range(3):
+        await first.record_step("runner-1", analyze_latency_ms=50)
+    await second.record_step("runner-1", analyze_latency_ms=80, test_case_id=7)
+    # The first worker's view is older than the second's.
+    first.get("runner-1").last_heartbeat_at -= timedelta(seconds=5)
+
+    await second.flush(db_session)
+    await first.flush(db_session)
+    await first.record_step("runner-1", analyze_latency_ms=50)
+    first.get("runner-1").last_heartbeat_at -= timedelta(seconds=5)
+    await first.flush(db_session)
+
+    row = await db_session.get(Executor, "runner-1", populate_existing=True)
+    assert row.total_steps == 5
+    assert row.current_test_case_id == 7
+    assert row.avg_analyze_latency_ms == 80
@@ -0,0 +1,106 @@
+import io
+import json
+import struct
+
+import pytest
+from PIL import Image, ImageDraw
+
+from app_evaluation_agent.services.frame_cache import (
+    FrameCache,
+    StaleFrameError,
+    frame_digest,
+    tile_boxes,
+    tile_hash,
+)
+
+TILE = 64
+
+
+def _png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _hashes(image: Image.Image) -> list[bytes]:
+    return [
+        tile_hash(image.crop(box))
+        for box in tile_boxes(image.width, image.height, TILE)
+    ]
+
+
+def make_delta(previous: Image.Image, current: Image.Image) -> bytes:
+    """What a runner sends: the tiles of `current` that differ from `previous`."""
+    tiles, blobs = [], []
+    old, new = _hashes(previous), _hashes(current)
+    boxes = tile_boxes(current.width, current.height, TILE)
+    for index, (before, after) in enumerate(zip(old, new)):
+        if before != after:
+            blob = _png(current.crop(boxes[index]))
+            tiles.append({"index": index, "length": len(blob), "hash": after.hex()})
+            blobs.append(blob)
+    manifest = json.dumps(
+        {
+            "base": frame_digest(old),
+            "width": current.width,
+            "height": current.height,
+            "tile_size": TILE,
+            "tiles": tiles,
+        }
+    ).encode()
+    return struct.pack(">I", len(manifest)) + manifest + b"".join(blobs)
+
+
+def _frames() -> tuple[Image.Image, Image.Image]:
+    first = Image.new("RGB", (300, 200), (240, 240, 240))
+    second = first.copy()
+    ImageDraw.Draw(second).rectangle((70, 70, 120, 100), fill=(20, 90, 200))
+    return first, second
+
+
+def test_delta_rebuilds_the_frame_and_chains():
+    cache = FrameCache(capacity=2)
+    first, second = _frames()
+    cache.store(7, _png(first))
+
+    delta = make_delta(first, second)
+    with Image.open(io.BytesIO(cache.apply_delta(7, delta))) as rebuilt:
+        assert rebuilt.convert("RGB").tobytes() == second.tobytes()
+    assert len(delta) < len(_png(second))
+
+    # The rebuilt frame is the base of the next delta.
+    third = second.copy()
+    ImageDraw.Draw(third).text((200, 150), "ok", fill=(0, 0, 0))
+    with Image.open(io.BytesIO(cache.apply_delta(7, make_delta(second, third)))) as img:
+        assert img.convert("RGB").tobytes() == third.tobytes()
+
+
+def test_delta_against_another_frame_is_stale():
+    cache = FrameCache(capacity=2)
+    first, second = _frames()
+
+    with pytest.raises(StaleFrameError):
+        cache.apply_delta(7, make_delta(first, second))
+
+    cache.store(7, _png(second))
+    with pytest.raises(StaleFrameError):
+        cache.apply_delta(7, make_delta(first, second))
+
+    # Evicted once two newer cases were seen.
+    cache.store(8, _png(first))
+    cache.store(9, _png(first))
+    with pytest.raises(StaleFrameError):
+        cache.apply_delta(7, make_delta(second, first))
+
+
+def test_corrupt_delta_is_rejected():
+    cache = FrameCache(capacity=2)
+    first, second = _frames()
+    cache.store(7, _png(first))
+    delta = bytearray(make_delta(first, second))
+    delta[-30] ^= 0xFF
+
+    with pytest.raises(ValueError):
+        cache.apply_delta(7, bytes(delta))
+    with pytest.raises(ValueError):
+        cache.apply_delta(7, b"\x00\x00\x00\x10{}")
@@ -0,0 +1,148 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.realtime import (
+    CHANNEL_BUGS,
+    CHANNEL_TEST_CASE_STATUS,
+    EvaluationStatusBroadcaster,
+    StreamSubscriber,
+    scoped_topic,
+)
+from app_evaluation_agent.services import live_events
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def broadcaster(monkeypatch) -> EvaluationStatusBroadcaster:
+    broadcaster = EvaluationStatusBroadcaster()
+    monkeypatch.setattr(live_events, "evaluation_status_broadcaster", broadcaster)
+    live_events.scope_cache.clear()
+    yield broadcaster
+    live_events.scope_cache.clear()
+    await broadcaster.stop()
+
+
+async def _received(subscriber: StreamSubscriber) -> dict:
+    return await asyncio.wait_for(subscriber.queue.get(), 1.0)
+
+
+@pytest.mark.asyncio
+async def test_scoped_event_reaches_evaluation_and_app_subscribers_once(
+    broadcaster,
+):
+    per_evaluation, per_app, both = (
+        StreamSubscriber(),
+        StreamSubscriber(),
+        StreamSubscriber(),
+    )
+    other_app = StreamSubscriber()
+    await broadcaster.subscribe_channel(
+        per_evaluation, scoped_topic(CHANNEL_BUGS, evaluation_id=5)
+    )
+    await broadcaster.subscribe_channel(per_app, scoped_topic(CHANNEL_BUGS, app_id=2))
+    await broadcaster.subscribe_channel(both, scoped_topic(CHANNEL_BUGS, app_id=2))
+    await broadcaster.subscribe_channel(
+        both, scoped_topic(CHANNEL_BUGS, evaluation_id=5)
+    )
+    await broadcaster.subscribe_channel(other_app, scoped_topic(CHANNEL_BUGS, app_id=3))
+
+    await live_events.publish_bugs(
+        2, [11, 12, 11], new_bug_ids=[12], occurrence_count=3, evaluation_id=5
+    )
+
+    for subscriber in (per_evaluation, per_app, both):
+        payload = await _received(subscriber)
+        assert payload["channel"] == CHANNEL_BUGS
+        assert payload["bug_ids"] == [11, 12]
+        assert payload["new_bug_ids"] == [12]
+        assert payload["evaluation_id"] == 5
+        assert payload["app_id"] == 2
+    await asyncio.sleep(0)
+    assert both.queue.empty()
+    assert other_app.queue.empty()
+
+
+@pytest.mark.asyncio
+async def test_test_case_changes_publish_only_real_transitions(
+    db_session: AsyncSession, broadcaster
+):
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.flush()
+    version = AppVersion(app_id=app.id, version="1.0")
+    db_session.add(version)
+    await db_session.flush()
+    evaluation = Evaluation(
+        app_version_id=version.id,
+        status=EvaluationStatus.IN_PROGRESS,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.flush()
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.flush()
+    running = TestCase(
+        plan_id=plan.id,
+        evaluation_id=evaluation.id,
+        name="Login",
+        status=TestCaseStatus.IN_PROGRESS,
+    )
+    unchanged = TestCase(
+        plan_id=plan.id,
+        evaluation_id=evaluation.id,
+        name="Logout",
+        status=TestCaseStatus.PENDING,
+    )
+    db_session.add_all([running, unchanged])
+    await db_session.commit()
+
+    subscriber = StreamSubscriber()
+    await broadcaster.subscribe_channel(
+        subscriber, scoped_topic(CHANNEL_TEST_CASE_STATUS, app_id=app.id)
+    )
+
+    await live_events.publish_test_case_changes(
+        db_session,
+        [(running, TestCaseStatus.PENDING), (unchanged, TestCaseStatus.PENDING)],
+    )
+
+    payload = await _received(subscriber)
+    assert payload["test_case_id"] == running.id
+    assert payload["status"] == "IN_PROGRESS"
+    assert payload["previous_status"] == "PENDING"
+    assert payload["evaluation_id"] == evaluation.id
+    assert subscriber.queue.empty()
+    assert live_events.scope_cache.cached_case_scope(running.id) == (
+        evaluation.id,
+        app.id,
+    )
@@ -1,8 +1,12 @@
+from datetime import datetime, timedelta, timezone
+
 import pytest
 import pytest_asyncio
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
 from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.utils.config import settings
 from app_evaluation_agent.storage.models import (
     Base,
     App,
@@ -49,6 +53,12 @@ async def db_session() -> AsyncSession:
     await engine.dispose()
 
 
+@pytest.fixture
+def affinity(monkeypatch):
+    monkeypatch.setattr(settings.scheduling, "executor_affinity", True)
+    monkeypatch.setattr(settings.scheduling, "affinity_fallback_seconds", 60.0)
+
+
 @pytest.mark.asyncio
 async def test_next_test_case_assigns_unassigned_case(db_session: AsyncSession):
     executor_id = "worker-1"
@@ -93,7 +103,9 @@ async def test_next_test_case_assigns_unassigned_case(db_session: AsyncSession):
 
 
 @pytest.mark.asyncio
-async def test_next_test_case_respects_existing_assignment(db_session: AsyncSession):
+async def test_next_test_case_respects_existing_assignment(
+    db_session: AsyncSession, affinity
+):
     executor_id = "worker-1"
     other_executor = "worker-2"
 
@@ -149,7 +161,7 @@ async def test_next_test_case_respects_existing_assignment(db_session: AsyncSess
 
 @pytest.mark.asyncio
 async def test_next_test_case_handles_stringified_list_assignment(
-    db_session: AsyncSession,
+    db_session: AsyncSession, affinity
 ):
     executor_id = "worker-1"
 
@@ -190,3 +202,65 @@ async def test_next_test_case_handles_stringified_list_assignment(
     assert fetched is not None
     assert fetched.id == case.id
     assert fetched.assigned_executor_id == executor_id
+
+
+async def _pinned_case(db_session: AsyncSession, executor_id: str) -> TestCase:
+    app_version = await _create_app_version(db_session)
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.READY,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    case = TestCase(
+        plan_id=plan.id,
+        evaluation_id=evaluation.id,
+        name="Pinned",
+        status=TestCaseStatus.PENDING,
+        execution_order=1,
+        assigned_executor_id=executor_id,
+    )
+    db_session.add(case)
+    await db_session.commit()
+    return case
+
+
+@pytest.mark.asyncio
+async def test_pre_assignment_is_ignored_without_affinity(db_session: AsyncSession):
+    case = await _pinned_case(db_session, "worker-2")
+
+    fetched = await testcase_service.next_test_case_for_executor(
+        db_session, "worker-1"
+    )
+
+    assert fetched is not None
+    assert fetched.id == case.id
+
+
+@pytest.mark.asyncio
+async def test_pinned_case_falls_back_to_any_executor(
+    db_session: AsyncSession, affinity
+):
+    case = await _pinned_case(db_session, "worker-2")
+    assert (
+        await testcase_service.next_test_case_for_executor(db_session, "worker-1")
+        is None
+    )
+
+    # worker-2 never came to claim it.
+    await db_session.execute(
+        update(TestCase)
+        .where(TestCase.id == case.id)
+        .values(updated_at=datetime.now(timezone.utc) - timedelta(minutes=5))
+    )
+    await db_session.commit()
+    fetched = await testcase_service.next_test_case_for_executor(
+        db_session, "worker-1"
+    )
+
+    assert fetched is not None
+    assert fetched.id == case.id
@@ -0,0 +1,211 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.schemas.app_version import AppVersionCreate
+from app_evaluation_agent.services import apps as app_service
+from app_evaluation_agent.services import bugs as bug_service
+from app_evaluation_agent.services import purge as purge_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.services.version_lineage import lineage_cache
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Bug,
+    BugFix,
+    BugOccurrence,
+    BugVersionStats,
+    Evaluation,
+    EvaluationStatus,
+    PurgeJob,
+    PurgeJobStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    lineage_cache.clear()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    lineage_cache.clear()
+    await engine.dispose()
+
+
+def _draft(fingerprint: str) -> BugDraft:
+    return BugDraft(
+        title=f"Bug {fingerprint}",
+        description=None,
+        severity_level="P1",
+        priority=None,
+        status="NEW",
+        fingerprint=fingerprint,
+        environment=None,
+        reproduction_steps=None,
+        expected=None,
+        actual=None,
+        action=None,
+        result_snapshot=None,
+        screenshot_uri=None,
+        log_uri=None,
+        raw_model_coords=None,
+        step_index=None,
+        observed_at=datetime.now(timezone.utc),
+    )
+
+
+async def _app_with_versions(db_session: AsyncSession):
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+
+    async def version(name, *parents):
+        return await app_service.create_app_version(
+            db_session,
+            app.id,
+            AppVersionCreate(
+                app_id=app.id, version=name, previous_version_ids=list(parents) or None
+            ),
+        )
+
+    base = await version("1.0")
+    middle = await version("1.1", base.id)
+    tip = await version("1.2", middle.id)
+    return app, base, middle, tip
+
+
+async def _evaluation_with_bug(db_session, app, version_id, fingerprint):
+    evaluation = Evaluation(
+        app_version_id=version_id,
+        status=EvaluationStatus.COMPLETED,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.flush()
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.flush()
+    case = TestCase(
+        plan_id=plan.id,
+        evaluation_id=evaluation.id,
+        name="Login",
+        status=TestCaseStatus.COMPLETED,
+    )
+    db_session.add(case)
+    await db_session.commit()
+    await bug_service.persist_triage_drafts(
+        db_session,
+        app_id=app.id,
+        app_version_id=version_id,
+        evaluation_id=evaluation.id,
+        test_case_id=case.id,
+        executor_id=None,
+        drafts=[_draft(fingerprint)],
+    )
+    await db_session.commit()
+    return evaluation
+
+
+async def _count(db_session, model) -> int:
+    return await db_session.scalar(select(func.count()).select_from(model))
+
+
+@pytest.mark.asyncio
+async def test_version_purge_repoints_children_and_detaches_bugs(
+    db_session: AsyncSession,
+):
+    app, base, middle, tip = await _app_with_versions(db_session)
+    await _evaluation_with_bug(db_session, app, base.id, "kept")
+    await _evaluation_with_bug(db_session, app, middle.id, "crash")
+    bug = await db_session.scalar(select(Bug).where(Bug.fingerprint == "crash"))
+    db_session.add(BugFix(bug_id=bug.id, fixed_in_version_id=middle.id))
+    await db_session.commit()
+
+    deleted = await app_service.delete_app_version(db_session, app.id, middle.id)
+
+    assert deleted is True
+    assert await db_session.get(AppVersion, middle.id) is None
+    tip = await db_session.get(AppVersion, tip.id, populate_existing=True)
+    assert tip.previous_version_id is None
+    assert await _count(db_session, Evaluation) == 1
+    assert await _count(db_session, TestCase) == 1
+    assert await _count(db_session, BugFix) == 0
+    assert await _count(db_session, BugVersionStats) == 1
+
+    # The bug outlives the version; its occurrence just loses the links.
+    bug = await db_session.get(Bug, bug.id, populate_existing=True)
+    assert bug.occurrence_count == 1
+    occurrence = await db_session.scalar(
+        select(BugOccurrence).where(BugOccurrence.bug_id == bug.id)
+    )
+    assert occurrence.app_version_id is None
+    assert occurrence.evaluation_id is None
+    assert occurrence.test_case_id is None
+
+
+@pytest.mark.asyncio
+async def test_app_purge_runs_in_batches(db_session: AsyncSession):
+    app, base, middle, tip = await _app_with_versions(db_session)
+    for index, version in enumerate((base, middle, tip)):
+        await _evaluation_with_bug(db_session, app, version.id, f"bug-{index}")
+
+    phases = [
+        phase
+        async for phase, _ in purge_service.purge_in_chunks(
+            db_session, purge_service.TARGET_APP, app.id, app.id, batch_size=2
+        )
+    ]
+
+    assert phases == [
+        purge_service.PHASE_EVALUATIONS,
+        purge_service.PHASE_EVALUATIONS,
+        purge_service.PHASE_BUGS,
+        purge_service.PHASE_BUGS,
+        purge_service.PHASE_FINALIZE,
+    ]
+    for model in (App, AppVersion, Evaluation, TestPlan, TestCase, Bug):
+        assert await _count(db_session, model) == 0
+    assert await _count(db_session, BugOccurrence) == 0
+
+
+@pytest.mark.asyncio
+async def test_purge_job_records_progress(db_session: AsyncSession):
+    app, base, middle, tip = await _app_with_versions(db_session)
+    await _evaluation_with_bug(db_session, app, tip.id, "crash")
+    job = PurgeJob(
+        target_type=purge_service.TARGET_APP,
+        target_id=app.id,
+        app_id=app.id,
+        total_items=await purge_service.count_items(
+            db_session, purge_service.TARGET_APP, app.id
+        ),
+    )
+    db_session.add(job)
+    await db_session.commit()
+    assert job.total_items == 2
+
+    job = await purge_service.run_purge_job(db_session, job.id)
+
+    assert job.status == PurgeJobStatus.COMPLETED
+    assert job.phase == purge_service.PHASE_FINALIZE
+    assert job.processed_items == 2
+    assert job.finished_at is not None
+    assert await db_session.get(App, app.id) is None
@@ -0,0 +1,276 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import ready_queue as ready_queue_module
+from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.services.ready_queue import ready_queue
+from app_evaluation_agent.services.scheduling import get_scheduling_policy
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+from app_evaluation_agent.utils.config import settings
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    ready_queue.clear()
+    await engine.dispose()
+
+
+async def _create_plan(
+    db_session: AsyncSession, created_at: datetime, app_name: str = "App"
+) -> TestPlan:
+    app = App(name=app_name, app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.READY,
+        execution_mode="local",
+        created_at=created_at,
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+    return plan
+
+
+async def _create_case(db_session, plan, order, depends_on_ids=None):
+    return await testcase_service.create_test_case(
+        db_session,
+        plan_id=plan.id,
+        evaluation_id=plan.evaluation_id,
+        name=f"Case {order}",
+        execution_order=order,
+        depends_on_ids=depends_on_ids,
+    )
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_serves_cases_and_releases_dependents(
+    db_session: AsyncSession,
+):
+    now = datetime.now(timezone.utc)
+    older = await _create_plan(db_session, now - timedelta(1), "Older")
+    newer = await _create_plan(db_session, now, "Newer")
+    login = await _create_case(db_session, older, 1)
+    checkout = await _create_case(db_session, older, 2, depends_on_ids=[login.id])
+    other = await _create_case(db_session, newer, 1)
+
+    await ready_queue.rebuild(db_session)
+    assert len(ready_queue) == 2
+
+    first = await testcase_service.next_test_case_for_executor(db_session, "w1")
+    second = await testcase_service.next_test_case_for_executor(db_session, "w2")
+    assert (first.id, second.id) == (login.id, other.id)
+    assert first.status == TestCaseStatus.ASSIGNED
+    assert await testcase_service.next_test_case_for_executor(db_session, "w3") is None
+
+    await testcase_service.update_test_case(
+        db_session, login.id, status=TestCaseStatus.COMPLETED
+    )
+    third = await testcase_service.next_test_case_for_executor(db_session, "w3")
+    assert third.id == checkout.id
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_tracks_cases_created_after_rebuild(
+    db_session: AsyncSession,
+):
+    plan = await _create_plan(db_session, datetime.now(timezone.utc))
+    await ready_queue.rebuild(db_session)
+
+    case = await _create_case(db_session, plan, 1)
+
+    picked = await testcase_service.next_test_case_for_executor(db_session, "w1")
+    assert picked.id == case.id
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_skips_cases_claimed_elsewhere(db_session: AsyncSession):
+    plan = await _create_plan(db_session, datetime.now(timezone.utc))
+    first = await _create_case(db_session, plan, 1)
+    second = await _create_case(db_session, plan, 2)
+    await ready_queue.rebuild(db_session)
+
+    # Another API process claims the first case behind the queue's back.
+    await db_session.execute(
+        update(TestCase)
+        .where(TestCase.id == first.id)
+        .values(status=TestCaseStatus.ASSIGNED, assigned_executor_id="other")
+    )
+    await db_session.commit()
+
+    picked = await testcase_service.next_test_case_for_executor(db_session, "w1")
+    assert picked.id == second.id
+    assert await testcase_service.next_test_case_for_executor(db_session, "w2") is None
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_honours_round_robin(db_session: AsyncSession):
+    now = datetime.now(timezone.utc)
+    first = await _create_plan(db_session, now - timedelta(1), "First")
+    second = await _create_plan(db_session, now, "Second")
+    for order in (1, 2):
+        await _create_case(db_session, first, order)
+        await _create_case(db_session, second, order)
+    await ready_queue.rebuild(db_session)
+
+    picked = [
+        await testcase_service.next_test_case_for_executor(
+            db_session, f"w{idx}", policy="round_robin"
+        )
+        for idx in range(4)
+    ]
+
+    assert [case.evaluation_id for case in picked] == [
+        first.evaluation_id,
+        second.evaluation_id,
+        first.evaluation_id,
+        second.evaluation_id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_pins_cases_until_the_fallback(
+    db_session: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr(settings.scheduling, "executor_affinity", True)
+    monkeypatch.setattr(settings.scheduling, "affinity_fallback_seconds", 60.0)
+    plan = await _create_plan(db_session, datetime.now(timezone.utc))
+    for order in (1, 2):
+        await testcase_service.create_test_case(
+            db_session,
+            plan_id=plan.id,
+            evaluation_id=plan.evaluation_id,
+            name=f"Case {order}",
+            execution_order=order,
+            assigned_executor_id="w2",
+        )
+    await ready_queue.rebuild(db_session)
+
+    assert await testcase_service.next_test_case_for_executor(db_session, "w1") is None
+    picked = await testcase_service.next_test_case_for_executor(db_session, "w2")
+    assert picked.name == "Case 1"
+
+    # w2 went away; once the pin lapses anyone may run its case.
+    later = ready_queue_module.time.time() + 120
+    monkeypatch.setattr(ready_queue_module.time, "time", lambda: later)
+    picked = await testcase_service.next_test_case_for_executor(db_session, "w1")
+    assert picked.name == "Case 2"
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_honours_fair_share(db_session: AsyncSession):
+    now = datetime.now(timezone.utc)
+    first = await _create_plan(db_session, now - timedelta(1), "First")
+    second = await _create_plan(db_session, now, "Second")
+    for order in (1, 2):
+        await _create_case(db_session, first, order)
+        await _create_case(db_session, second, order)
+    await ready_queue.rebuild(db_session)
+
+    async def pick(executor_id):
+        return await testcase_service.next_test_case_for_executor(
+            db_session, executor_id, policy="fair_share"
+        )
+
+    a1 = await pick("w1")
+    b1 = await pick("w2")
+    assert (a1.evaluation_id, b1.evaluation_id) == (
+        first.evaluation_id,
+        second.evaluation_id,
+    )
+
+    # The second app drops below the first one's in-flight share.
+    await testcase_service.update_test_case(
+        db_session, b1.id, status=TestCaseStatus.COMPLETED
+    )
+    assert (await pick("w3")).evaluation_id == second.evaluation_id
+    assert (await pick("w4")).evaluation_id == first.evaluation_id
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_miss_falls_through_to_sql(db_session: AsyncSession):
+    plan = await _create_plan(db_session, datetime.now(timezone.utc))
+    await ready_queue.rebuild(db_session)
+
+    # Inserted by another process (e.g. the arq worker's planner).
+    case = TestCase(
+        plan_id=plan.id,
+        evaluation_id=plan.evaluation_id,
+        name="Generated",
+        status=TestCaseStatus.PENDING,
+        execution_order=1,
+    )
+    db_session.add(case)
+    await db_session.commit()
+
+    picked = await testcase_service.next_test_case_for_executor(db_session, "w1")
+    assert picked.id == case.id
+    assert picked.status == TestCaseStatus.ASSIGNED
+    assert await testcase_service.next_test_case_for_executor(db_session, "w2") is None
+
+
+@pytest.mark.asyncio
+async def test_ready_queue_keeps_cases_that_failed_a_claim(
+    db_session: AsyncSession, monkeypatch
+):
+    monkeypatch.setattr(settings.scheduling, "executor_affinity", True)
+    monkeypatch.setattr(settings.scheduling, "affinity_fallback_seconds", 60.0)
+    plan = await _create_plan(db_session, datetime.now(timezone.utc))
+    case = await testcase_service.create_test_case(
+        db_session,
+        plan_id=plan.id,
+        evaluation_id=plan.evaluation_id,
+        name="Case 1",
+        execution_order=1,
+        assigned_executor_id="w1",
+    )
+    await ready_queue.rebuild(db_session)
+
+    # Another process re-pins the case to w2 behind the queue's back.
+    await db_session.execute(
+        update(TestCase).where(TestCase.id == case.id).values(assigned_executor_id="w2")
+    )
+    await db_session.commit()
+    policy = get_scheduling_policy(None)
+
+    assert await ready_queue.claim(db_session, "w1", policy) is None
+    # Still served right away, not only after the next resync.
+    assert await ready_queue.claim(db_session, "w2", policy) == case.id
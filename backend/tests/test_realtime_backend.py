@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+
+from app_evaluation_agent.realtime import (
+    CHANNEL_EXECUTOR_TELEMETRY,
+    EvaluationStatusBroadcaster,
+    RedisBroadcastBackend,
+    StreamSubscriber,
+)
+from app_evaluation_agent.storage.models import EvaluationStatus
+
+
+class _FakePubSub:
+    def __init__(self, server: "_FakeRedis") -> None:
+        self._server = server
+        self._queue: asyncio.Queue = asyncio.Queue()
+
+    async def subscribe(self, channel: str) -> None:
+        self._server.subscribers.setdefault(channel, []).append(self._queue)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def aclose(self) -> None:
+        for queues in self._server.subscribers.values():
+            if self._queue in queues:
+                queues.remove(self._queue)
+
+
+class _FakeRedis:
+    """Just enough of redis.asyncio.Redis for pub/sub between 'processes'."""
+
+    def __init__(self) -> None:
+        self.subscribers: dict[str, list[asyncio.Queue]] = {}
+        self.down = False
+
+    async def publish(self, channel: str, data: str) -> int:
+        if self.down:
+            raise ConnectionError("redis is down")
+        queues = self.subscribers.get(channel, [])
+        for queue in queues:
+            queue.put_nowait({"type": "message", "data": data})
+        return len(queues)
+
+    def pubsub(self) -> _FakePubSub:
+        return _FakePubSub(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+async def _process(redis: _FakeRedis, listen: bool = True):
+    backend = RedisBroadcastBackend("realtime", client=redis)
+    broadcaster = EvaluationStatusBroadcaster(backend)
+    if listen:
+        await broadcaster.start()
+        assert await backend.wait_until_subscribed(1.0)
+    return broadcaster
+
+
+async def _received(subscriber: StreamSubscriber) -> dict:
+    return await asyncio.wait_for(subscriber.queue.get(), 1.0)
+
+
+@pytest.mark.asyncio
+async def test_status_published_in_one_process_reaches_the_others():
+    redis = _FakeRedis()
+    api_a, api_b = await _process(redis), await _process(redis)
+    worker = await _process(redis, listen=False)
+    subscriber_a, subscriber_b = StreamSubscriber(), StreamSubscriber()
+    await api_a.subscribe(subscriber_a, 7)
+    await api_b.subscribe(subscriber_b, 7)
+    try:
+        await worker.publish_status(7, EvaluationStatus.IN_PROGRESS)
+
+        for subscriber, broadcaster in ((subscriber_a, api_a), (subscriber_b, api_b)):
+            payload = await _received(subscriber)
+            assert payload["status"] == "IN_PROGRESS"
+            assert payload["seq"] == 1
+            assert broadcaster.latest_status(7)["status"] == "IN_PROGRESS"
+        # Delivered once: the publisher's own copy comes back from Redis.
+        await api_a.publish_status(7, EvaluationStatus.COMPLETED)
+        assert (await _received(subscriber_a))["seq"] == 2
+        assert (await _received(subscriber_a))["type"] == "close"
+        assert subscriber_a.queue.empty()
+    finally:
+        await api_a.stop()
+        await api_b.stop()
+
+
+@pytest.mark.asyncio
+async def test_channels_fan_out_and_fall_back_to_local_delivery():
+    redis = _FakeRedis()
+    api = await _process(redis)
+    subscriber = StreamSubscriber()
+    await api.subscribe_channel(subscriber, CHANNEL_EXECUTOR_TELEMETRY)
+    try:
+        await api.publish_channel(CHANNEL_EXECUTOR_TELEMETRY, {"type": "executor"})
+        assert await _received(subscriber) == {
+            "channel": CHANNEL_EXECUTOR_TELEMETRY,
+            "type": "executor",
+        }
+
+        redis.down = True
+        await api.publish_channel(CHANNEL_EXECUTOR_TELEMETRY, {"type": "executor"})
+        assert (await _received(subscriber))["type"] == "executor"
+        assert subscriber.queue.empty()
+    finally:
+        await api.stop()
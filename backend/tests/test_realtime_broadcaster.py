@@ -0,0 +1,161 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from app_evaluation_agent.realtime import (
+    CHANNEL_EXECUTOR_TELEMETRY,
+    EvaluationStatusBroadcaster,
+)
+from app_evaluation_agent.storage.models import EvaluationStatus
+
+
+class _Socket:
+    """Records what the broadcaster sends; `gate` can hold sends back."""
+
+    def __init__(self, gate: asyncio.Event | None = None, fail: bool = False):
+        self.sent: list[dict] = []
+        self.gate = gate
+        self.fail = fail
+
+    async def send_json(self, payload: dict) -> None:
+        if self.fail:
+            raise RuntimeError("connection closed")
+        if self.gate is not None:
+            await self.gate.wait()
+        self.sent.append(payload)
+
+
+@pytest_asyncio.fixture
+async def broadcaster() -> EvaluationStatusBroadcaster:
+    broadcaster = EvaluationStatusBroadcaster(send_queue_size=2)
+    yield broadcaster
+    await broadcaster.stop()
+
+
+async def _settle() -> None:
+    for _ in range(20):
+        await asyncio.sleep(0)
+
+
+@pytest.mark.asyncio
+async def test_slow_subscriber_does_not_hold_up_others(broadcaster):
+    gate = asyncio.Event()
+    slow, fast = _Socket(gate), _Socket()
+    await broadcaster.subscribe(slow, 1)
+    await broadcaster.subscribe(fast, 1)
+
+    for status in (
+        EvaluationStatus.GENERATING,
+        EvaluationStatus.READY,
+        EvaluationStatus.IN_PROGRESS,
+        EvaluationStatus.SUMMARIZING,
+    ):
+        await asyncio.wait_for(broadcaster.publish_status(1, status), 0.5)
+        await _settle()
+
+    assert [payload["status"] for payload in fast.sent] == [
+        "GENERATING",
+        "READY",
+        "IN_PROGRESS",
+        "SUMMARIZING",
+    ]
+    assert slow.sent == []
+
+    gate.set()
+    await _settle()
+    # GENERATING was already being sent; the queued statuses were coalesced
+    # down to the latest one.
+    assert [payload["status"] for payload in slow.sent] == [
+        "GENERATING",
+        "SUMMARIZING",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_full_queue_drops_oldest_unrelated_payload(broadcaster):
+    gate = asyncio.Event()
+    socket = _Socket(gate)
+    await broadcaster.subscribe_channel(socket, CHANNEL_EXECUTOR_TELEMETRY)
+
+    for index in range(4):
+        await broadcaster.publish_channel(
+            CHANNEL_EXECUTOR_TELEMETRY, {"type": "snapshot", "index": index}
+        )
+        await _settle()
+    gate.set()
+    await _settle()
+
+    assert [payload["index"] for payload in socket.sent] == [0, 2, 3]
+
+
+@pytest.mark.asyncio
+async def test_remove_uses_reverse_index_and_drops_failed_sockets(broadcaster):
+    socket, broken = _Socket(), _Socket(fail=True)
+    await broadcaster.subscribe(socket, 1)
+    await broadcaster.subscribe(socket, 2)
+    await broadcaster.subscribe_channel(socket, CHANNEL_EXECUTOR_TELEMETRY)
+    await broadcaster.subscribe(broken, 1)
+
+    await broadcaster.publish_status(1, EvaluationStatus.READY)
+    await _settle()
+    assert socket.sent[0]["status"] == "READY"
+    assert set(broadcaster._subscriptions[1]) == {broadcaster._connections[socket]}
+    assert broken not in broadcaster._connections
+
+    await broadcaster.remove(socket)
+    assert broadcaster._connections == {}
+    assert broadcaster._subscriptions == {}
+    assert broadcaster._channel_subscriptions == {}
+
+
+@pytest.mark.asyncio
+async def test_notify_status_merges_bursts_and_never_delays_terminal():
+    broadcaster = EvaluationStatusBroadcaster(status_debounce_seconds=0.05)
+    socket = _Socket()
+    await broadcaster.subscribe(socket, 1)
+    try:
+        for status in (
+            EvaluationStatus.GENERATING,
+            EvaluationStatus.READY,
+            EvaluationStatus.IN_PROGRESS,
+        ):
+            await broadcaster.notify_status(1, status)
+        await _settle()
+        assert socket.sent == []
+
+        await asyncio.sleep(0.08)
+        await _settle()
+        assert [payload["status"] for payload in socket.sent] == ["IN_PROGRESS"]
+
+        await broadcaster.notify_status(1, EvaluationStatus.SUMMARIZING)
+        await broadcaster.notify_status(1, EvaluationStatus.COMPLETED)
+        await _settle()
+        assert [payload["type"] for payload in socket.sent[1:]] == ["status", "close"]
+        assert socket.sent[1]["status"] == "COMPLETED"
+    finally:
+        await broadcaster.stop()
+
+
+@pytest.mark.asyncio
+async def test_max_rate_holds_back_intermediate_statuses(broadcaster):
+    socket = _Socket()
+    await broadcaster.subscribe(socket, 1, max_rate=20)
+
+    for status in (
+        EvaluationStatus.READY,
+        EvaluationStatus.IN_PROGRESS,
+        EvaluationStatus.SUMMARIZING,
+    ):
+        await broadcaster.publish_status(1, status)
+    await _settle()
+    assert [payload["status"] for payload in socket.sent] == ["READY"]
+
+    await asyncio.sleep(0.08)
+    await _settle()
+    assert [payload["status"] for payload in socket.sent] == ["READY", "SUMMARIZING"]
+
+    # Terminal statuses skip the limit.
+    await broadcaster.publish_status(1, EvaluationStatus.COMPLETED)
+    await _settle()
+    assert socket.sent[2]["status"] == "COMPLETED"
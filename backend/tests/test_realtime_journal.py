@@ -0,0 +1,304 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from fastapi import WebSocketDisconnect
+
+from app_evaluation_agent.api.v1 import events as events_api
+from app_evaluation_agent.realtime import (
+    CHANNEL_ANALYZE_STEP,
+    EvaluationStatusBroadcaster,
+    EventJournal,
+    RedisJournalStream,
+    StreamSubscriber,
+)
+from app_evaluation_agent.storage.models import EvaluationStatus
+
+
+class _Socket:
+    """Feeds JSON messages to the events endpoint and collects its frames."""
+
+    def __init__(self, *messages: dict) -> None:
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait(message)
+        self.sent: list[dict] = []
+        self.senders: list[asyncio.Task] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive_json(self) -> dict:
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect(1000)
+        return message
+
+    async def send_json(self, payload: dict) -> None:
+        self.sent.append(payload)
+        self.senders.append(asyncio.current_task())
+
+
+class _FakePipeline:
+    def __init__(self, redis: "_FakeRedis") -> None:
+        self._redis = redis
+        self._calls = []
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        self._calls.append(lambda: self._redis.xadd(key, fields, maxlen))
+
+    def expire(self, key, seconds):
+        self._calls.append(lambda: self._redis.expire(key, seconds))
+
+    async def execute(self):
+        return [await call() for call in self._calls]
+
+
+class _FakeRedis:
+    """Counters and capped streams, as used by RedisJournalStream."""
+
+    def __init__(self) -> None:
+        self.values: dict[str, int] = {}
+        self.streams: dict[str, list] = {}
+        self.ttls: dict[str, int] = {}
+
+    async def incr(self, key: str) -> int:
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+    async def get(self, key: str):
+        value = self.values.get(key)
+        return None if value is None else str(value).encode()
+
+    async def xadd(self, key, fields, maxlen=None):
+        entries = self.streams.setdefault(key, [])
+        encoded = {key.encode(): value.encode() for key, value in fields.items()}
+        entries.append((f"{len(entries)}-0".encode(), encoded))
+        if maxlen is not None:
+            del entries[:-maxlen]
+
+    async def xrange(self, key):
+        return list(self.streams.get(key, []))
+
+    async def expire(self, key, seconds):
+        self.ttls[key] = seconds
+
+    def pipeline(self, transaction=True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+    async def aclose(self) -> None:
+        pass
+
+
+@pytest_asyncio.fixture
+async def broadcaster() -> EvaluationStatusBroadcaster:
+    broadcaster = EvaluationStatusBroadcaster(journal=EventJournal(size=3))
+    yield broadcaster
+    await broadcaster.stop()
+
+
+async def _drain(subscriber: StreamSubscriber) -> list[dict]:
+    for _ in range(20):
+        await asyncio.sleep(0)
+    payloads = []
+    while not subscriber.queue.empty():
+        payloads.append(subscriber.queue.get_nowait())
+    return payloads
+
+
+async def _step(broadcaster, index: int) -> None:
+    await broadcaster.publish_scoped(
+        CHANNEL_ANALYZE_STEP, {"type": "step", "step_index": index}, evaluation_id=1
+    )
+
+
+@pytest.mark.asyncio
+async def test_subscribe_since_replays_missed_events_of_the_channel(broadcaster):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)  # seq 1
+    await _step(broadcaster, 0)  # seq 2
+    await _step(broadcaster, 1)  # seq 3
+    await broadcaster.publish_status(1, EvaluationStatus.COMPLETED)  # seq 4
+
+    steps, statuses = StreamSubscriber(), StreamSubscriber()
+    assert await broadcaster.subscribe_scoped(
+        steps, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=2
+    )
+    assert await broadcaster.subscribe(statuses, 1, since=1)
+
+    assert [(p["seq"], p["step_index"]) for p in await _drain(steps)] == [(3, 1)]
+    replayed = await _drain(statuses)
+    assert [p["type"] for p in replayed] == ["status", "close"]
+    assert replayed[0]["seq"] == 4
+    assert broadcaster.last_seq(1) == 4
+
+
+async def _first_frames(broadcaster, monkeypatch, message: dict) -> list[dict]:
+    monkeypatch.setattr(events_api, "evaluation_status_broadcaster", broadcaster)
+    socket = _Socket(message)
+    session = asyncio.create_task(events_api.events_websocket(socket))
+    for _ in range(20):
+        await asyncio.sleep(0)
+    socket.incoming.put_nowait(None)
+    await asyncio.wait_for(session, 5)
+    # A direct send from the handler could overtake the queued frames.
+    assert session not in socket.senders
+    return socket.sent
+
+
+@pytest.mark.asyncio
+async def test_subscribe_ack_comes_before_the_replay(broadcaster, monkeypatch):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)  # seq 1
+    await broadcaster.publish_status(1, EvaluationStatus.SUMMARIZING)  # seq 2
+    await _step(broadcaster, 0)  # seq 3
+    await _step(broadcaster, 1)  # seq 4
+
+    statuses = await _first_frames(
+        broadcaster,
+        monkeypatch,
+        {
+            "action": "subscribe",
+            "channel": "evaluation.status",
+            "evaluation_id": 1,
+            "since": 1,
+        },
+    )
+    assert [(p["type"], p.get("seq")) for p in statuses] == [
+        ("subscribed", None),
+        ("status", 2),
+    ]
+    steps = await _first_frames(
+        broadcaster,
+        monkeypatch,
+        {
+            "action": "subscribe",
+            "channel": CHANNEL_ANALYZE_STEP,
+            "evaluation_id": 1,
+            "since": 3,
+        },
+    )
+    assert [(p["type"], p.get("seq")) for p in steps] == [
+        ("subscribed", None),
+        ("step", 4),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_subscribe_ack_comes_before_the_resync(broadcaster, monkeypatch):
+    for index in range(5):
+        await _step(broadcaster, index)
+
+    # Only seq 3..5 are kept.
+    frames = await _first_frames(
+        broadcaster,
+        monkeypatch,
+        {
+            "action": "subscribe",
+            "channel": CHANNEL_ANALYZE_STEP,
+            "evaluation_id": 1,
+            "since": 1,
+        },
+    )
+    assert [p["type"] for p in frames] == ["subscribed", "resync"]
+    assert frames[1]["since"] == 1
+
+
+@pytest.mark.asyncio
+async def test_subscribe_since_reports_gaps(broadcaster):
+    for index in range(5):
+        await _step(broadcaster, index)
+    subscriber = StreamSubscriber()
+
+    # Only seq 3..5 are kept.
+    assert not await broadcaster.subscribe_scoped(
+        subscriber, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=1
+    )
+    assert await broadcaster.subscribe_scoped(
+        subscriber, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=2
+    )
+    # A cursor from before a restart: numbering starts over.
+    assert not await broadcaster.subscribe(subscriber, 1, since=9)
+    # Nothing journaled per app.
+    assert not await broadcaster.subscribe_scoped(
+        subscriber, CHANNEL_ANALYZE_STEP, app_id=7, since=0
+    )
+    assert [p["step_index"] for p in await _drain(subscriber)] == [2, 3, 4]
+
+
+@pytest.mark.asyncio
+async def test_busy_channel_does_not_evict_other_channels(broadcaster):
+    await broadcaster.publish_status(1, EvaluationStatus.IN_PROGRESS)  # seq 1
+    await broadcaster.publish_status(1, EvaluationStatus.SUMMARIZING)  # seq 2
+    for index in range(10):  # seq 3..12
+        await _step(broadcaster, index)
+
+    statuses, steps = StreamSubscriber(), StreamSubscriber()
+    assert await broadcaster.subscribe(statuses, 1, since=1)
+    assert [p["seq"] for p in await _drain(statuses)] == [2]
+    # The steps themselves are bounded: only seq 10..12 are kept.
+    assert not await broadcaster.subscribe_scoped(
+        steps, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=8
+    )
+    assert await broadcaster.subscribe_scoped(
+        steps, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=9
+    )
+    assert [p["step_index"] for p in await _drain(steps)] == [7, 8, 9]
+
+
+@pytest.mark.asyncio
+async def test_redis_streams_are_bounded_per_channel():
+    redis = _FakeRedis()
+
+    def process() -> EvaluationStatusBroadcaster:
+        store = RedisJournalStream("journal", size=3, ttl_seconds=60, client=redis)
+        return EvaluationStatusBroadcaster(journal=EventJournal(size=3, store=store))
+
+    worker, api = process(), process()
+    try:
+        await worker.publish_status(1, EvaluationStatus.IN_PROGRESS)  # seq 1
+        await worker.publish_status(1, EvaluationStatus.SUMMARIZING)  # seq 2
+        for index in range(10):  # seq 3..12
+            await _step(worker, index)
+
+        statuses, steps = StreamSubscriber(), StreamSubscriber()
+        assert await api.subscribe(statuses, 1, since=1)
+        assert [p["seq"] for p in await _drain(statuses)] == [2]
+        assert not await api.subscribe_scoped(
+            steps, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=8
+        )
+        assert await api.subscribe_scoped(
+            steps, CHANNEL_ANALYZE_STEP, evaluation_id=1, since=9
+        )
+        assert [p["step_index"] for p in await _drain(steps)] == [7, 8, 9]
+    finally:
+        await worker.stop()
+        await api.stop()
+
+
+@pytest.mark.asyncio
+async def test_redis_stream_numbers_events_and_replays_across_processes():
+    redis = _FakeRedis()
+
+    def process() -> EvaluationStatusBroadcaster:
+        store = RedisJournalStream("journal", size=10, ttl_seconds=60, client=redis)
+        return EvaluationStatusBroadcaster(journal=EventJournal(size=10, store=store))
+
+    worker, api = process(), process()
+    try:
+        await worker.publish_status(1, EvaluationStatus.IN_PROGRESS)
+        await _step(worker, 0)
+        await worker.publish_status(1, EvaluationStatus.SUMMARIZING)
+
+        # The API process saw none of it; the stream has it all.
+        subscriber = StreamSubscriber()
+        assert await api.subscribe(subscriber, 1, since=1)
+        replayed = await _drain(subscriber)
+        assert [(p["seq"], p["status"]) for p in replayed] == [(3, "SUMMARIZING")]
+        assert redis.ttls["journal:1:events:evaluation.status"] == 60
+        assert redis.ttls["journal:1:events:analyze.step"] == 60
+
+        await api.publish_status(1, EvaluationStatus.COMPLETED)
+        assert (await _drain(subscriber))[0]["seq"] == 4
+    finally:
+        await worker.stop()
+        await api.stop()
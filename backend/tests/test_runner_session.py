@@ -0,0 +1,199 @@
+import asyncio
+import io
+import json
+
+import pytest
+import pytest_asyncio
+from PIL import Image
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.api.v1 import runner as runner_api
+from app_evaluation_agent.api.v1 import vision as vision_api
+from app_evaluation_agent.schemas.agent import ToolCall, VisionAnalysisResponse
+from app_evaluation_agent.services import blob_store as blob_store_module
+from app_evaluation_agent.services import live_events
+from app_evaluation_agent.services.ready_queue import ready_queue
+from app_evaluation_agent.storage.blobs import FilesystemBlobBackend, blob_digest
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+from app_evaluation_agent.utils.config import settings
+
+
+class _Socket:
+    """Feeds frames to the runner endpoint and collects its responses."""
+
+    def __init__(self) -> None:
+        self.incoming: asyncio.Queue = asyncio.Queue()
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        pass
+
+    async def receive(self) -> dict:
+        return await self.incoming.get()
+
+    async def send_json(self, payload: dict) -> None:
+        self.sent.append(payload)
+
+    def request(self, request_id, op, params=None, image: bytes | None = None):
+        frame = {"id": request_id, "op": op, "params": params or {}}
+        if image is not None:
+            frame["image"] = True
+        self.frame(text=json.dumps(frame))
+        if image is not None:
+            self.frame(bytes=image)
+
+    def frame(self, **data) -> None:
+        self.incoming.put_nowait({"type": "websocket.receive", **data})
+
+    def close(self) -> None:
+        self.incoming.put_nowait({"type": "websocket.disconnect", "code": 1000})
+
+
+@pytest_asyncio.fixture
+async def session_factory(monkeypatch, tmp_path):
+    # One shared in-memory database for every session the endpoint opens.
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:",
+        future=True,
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    monkeypatch.setattr(runner_api, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(live_events, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(blob_store_module, "AsyncSessionLocal", factory)
+    monkeypatch.setattr(
+        blob_store_module.blob_store, "_backend", FilesystemBlobBackend(tmp_path)
+    )
+    monkeypatch.setattr(settings.blobs, "store_screenshots", True)
+    ready_queue.clear()
+    live_events.scope_cache.clear()
+    blob_store_module.blob_store.clear()
+    yield factory
+    ready_queue.clear()
+    live_events.scope_cache.clear()
+    blob_store_module.blob_store.clear()
+    await engine.dispose()
+
+
+async def _seed(factory) -> tuple[int, int]:
+    async with factory() as db:
+        app = App(name="App", app_type=AppType.DESKTOP_APP)
+        db.add(app)
+        await db.flush()
+        version = AppVersion(app_id=app.id, version="1.0")
+        db.add(version)
+        await db.flush()
+        evaluation = Evaluation(
+            app_version_id=version.id,
+            status=EvaluationStatus.READY,
+            execution_mode="local",
+        )
+        db.add(evaluation)
+        await db.flush()
+        plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+        db.add(plan)
+        await db.flush()
+        case = TestCase(
+            plan_id=plan.id,
+            evaluation_id=evaluation.id,
+            name="Login",
+            status=TestCaseStatus.PENDING,
+            execution_order=1,
+        )
+        db.add(case)
+        await db.commit()
+        return evaluation.id, case.id
+
+
+async def _run(socket: _Socket, expected: int, executor_id: str = "runner-1"):
+    session = asyncio.create_task(runner_api.runner_websocket(socket, executor_id))
+    for _ in range(500):
+        if len(socket.sent) >= expected:
+            break
+        await asyncio.sleep(0.01)
+    # Disconnecting cancels whatever is still in flight.
+    socket.close()
+    await asyncio.wait_for(session, 5)
+    return {response["id"]: response for response in socket.sent}
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 30)).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.mark.asyncio
+async def test_runner_session_serves_the_step_loop(session_factory, monkeypatch):
+    evaluation_id, case_id = await _seed(session_factory)
+    seen = {}
+
+    async def fake_analyze(context, image_bytes, image_size):
+        seen["image_size"] = image_size
+        return VisionAnalysisResponse(
+            thought="click login",
+            action=ToolCall(tool_name="click", parameters={"x": 1, "y": 2}),
+        )
+
+    monkeypatch.setattr(
+        vision_api.AnalyzerAgent, "process_context_and_image", fake_analyze
+    )
+
+    socket = _Socket()
+    socket.request(1, "next")
+    responses = await _run(socket, 1)
+    assert responses[1]["ok"] is True
+    assert responses[1]["result"]["id"] == case_id
+
+    socket = _Socket()
+    context = {
+        "high_level_goal": "Log in",
+        "test_case_id": case_id,
+        "test_case_description": "Log in with valid credentials",
+    }
+    screenshot = _png()
+    socket.request("a", "analyze", {"context": context}, image=screenshot)
+    socket.request("u", "update_test_case", {"case_id": case_id, "status": "COMPLETED"})
+    socket.request("e", "get_evaluation", {"evaluation_id": evaluation_id})
+    responses = await _run(socket, 3)
+
+    assert responses["a"]["result"]["action"]["tool_name"] == "click"
+    assert seen["image_size"] == (40, 30)
+    assert responses["a"]["result"]["screenshot_hash"] == blob_digest(screenshot)
+    assert responses["u"]["result"]["status"] == "COMPLETED"
+    assert responses["e"]["ok"] is True
+    assert responses["e"]["result"]["id"] == evaluation_id
+
+
+@pytest.mark.asyncio
+async def test_runner_session_reports_errors_per_request(session_factory):
+    socket = _Socket()
+    socket.request(1, "update_test_case", {"case_id": 999, "status": "COMPLETED"})
+    socket.request(2, "launch_missiles")
+    socket.request(3, "analyze", {"context": {"high_level_goal": "x"}})
+    socket.request(4, "ping")
+    socket.frame(bytes=b"stray")
+    responses = await _run(socket, 5)
+
+    assert responses[1]["status"] == 404
+    assert responses[2]["error"] == "Unknown op: launch_missiles"
+    assert responses[3]["status"] == 400
+    assert responses[4]["result"] == "pong"
+    assert responses[None]["error"] == "Unexpected binary frame"
@@ -0,0 +1,172 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+async def _create_app_version(
+    db_session: AsyncSession, name: str, weight: int = 1
+) -> AppVersion:
+    app = App(name=name, app_type=AppType.DESKTOP_APP, scheduling_weight=weight)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+    return app_version
+
+
+async def _create_evaluation(
+    db_session: AsyncSession,
+    app_version: AppVersion,
+    created_at: datetime,
+    pending: int,
+    in_flight: int = 0,
+    priority: int = 0,
+) -> Evaluation:
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.READY,
+        execution_mode="local",
+        priority=priority,
+        created_at=created_at,
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+
+    statuses = [TestCaseStatus.IN_PROGRESS] * in_flight + [
+        TestCaseStatus.PENDING
+    ] * pending
+    for idx, status in enumerate(statuses, start=1):
+        db_session.add(
+            TestCase(
+                plan_id=plan.id,
+                evaluation_id=evaluation.id,
+                name=f"Eval {evaluation.id} case {idx}",
+                status=status,
+                execution_order=idx,
+            )
+        )
+    await db_session.commit()
+    return evaluation
+
+
+@pytest.mark.asyncio
+async def test_fifo_drains_oldest_evaluation_first(db_session: AsyncSession):
+    app_version = await _create_app_version(db_session, "App")
+    now = datetime.now(timezone.utc)
+    old = await _create_evaluation(db_session, app_version, now - timedelta(1), 3)
+    await _create_evaluation(db_session, app_version, now, 3)
+
+    picked = [
+        await testcase_service.next_test_case_for_executor(
+            db_session, "worker-1", policy="fifo"
+        )
+        for _ in range(3)
+    ]
+
+    assert [case.evaluation_id for case in picked] == [old.id] * 3
+
+
+@pytest.mark.asyncio
+async def test_priority_overrides_creation_order(db_session: AsyncSession):
+    app_version = await _create_app_version(db_session, "App")
+    now = datetime.now(timezone.utc)
+    await _create_evaluation(db_session, app_version, now - timedelta(1), 3)
+    urgent = await _create_evaluation(db_session, app_version, now, 1, priority=5)
+
+    case = await testcase_service.next_test_case_for_executor(
+        db_session, "worker-1", policy="fifo"
+    )
+
+    assert case.evaluation_id == urgent.id
+
+
+@pytest.mark.asyncio
+async def test_round_robin_alternates_between_evaluations(db_session: AsyncSession):
+    app_version = await _create_app_version(db_session, "App")
+    now = datetime.now(timezone.utc)
+    first = await _create_evaluation(db_session, app_version, now - timedelta(1), 3)
+    second = await _create_evaluation(db_session, app_version, now, 3)
+
+    picked = [
+        await testcase_service.next_test_case_for_executor(
+            db_session, f"worker-{idx}", policy="round_robin"
+        )
+        for idx in range(4)
+    ]
+
+    assert [case.evaluation_id for case in picked] == [
+        first.id,
+        second.id,
+        first.id,
+        second.id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_fair_share_prefers_app_below_its_weighted_share(
+    db_session: AsyncSession,
+):
+    busy_version = await _create_app_version(db_session, "Busy", weight=2)
+    idle_version = await _create_app_version(db_session, "Idle")
+    now = datetime.now(timezone.utc)
+    await _create_evaluation(
+        db_session, busy_version, now - timedelta(1), 3, in_flight=1
+    )
+    idle = await _create_evaluation(db_session, idle_version, now, 3, in_flight=1)
+
+    # Busy: 1 in flight / weight 2 = 0.5; Idle: 1 / 1 = 1.0
+    case = await testcase_service.next_test_case_for_executor(
+        db_session, "worker-1", policy="fair_share"
+    )
+    assert case.evaluation_id != idle.id
+
+    # Busy now has 2 / 2 = 1.0 which ties with Idle; the older evaluation wins,
+    # and a third Busy case pushes it above Idle's share.
+    await testcase_service.next_test_case_for_executor(
+        db_session, "worker-2", policy="fair_share"
+    )
+    case = await testcase_service.next_test_case_for_executor(
+        db_session, "worker-3", policy="fair_share"
+    )
+    assert case.evaluation_id == idle.id
@@ -0,0 +1,205 @@
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.schemas.testcase import (
+    TestCaseBulkUpdateItem,
+    TestCaseCreate,
+)
+from app_evaluation_agent.services import testcases as testcase_service
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    await engine.dispose()
+
+
+async def _create_plan(db_session: AsyncSession, name: str = "App") -> TestPlan:
+    app = App(name=name, app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.READY,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+    return plan
+
+
+def _payload(plan: TestPlan, order: int, **kwargs) -> TestCaseCreate:
+    return TestCaseCreate(
+        plan_id=plan.id,
+        evaluation_id=plan.evaluation_id,
+        name=f"Case {order}",
+        execution_order=order,
+        **kwargs,
+    )
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_inserts_cases_in_input_order(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    login = await testcase_service.create_test_case(
+        db_session,
+        plan_id=plan.id,
+        evaluation_id=plan.evaluation_id,
+        name="Login",
+    )
+
+    cases = await testcase_service.create_test_cases_bulk(
+        db_session,
+        [_payload(plan, order, depends_on_ids=[login.id]) for order in (3, 1, 2)],
+    )
+
+    assert [case.name for case in cases] == ["Case 3", "Case 1", "Case 2"]
+    assert all(case.status == TestCaseStatus.PENDING for case in cases)
+    assert all(case.depends_on_ids == [login.id] for case in cases)
+
+
+@pytest.mark.asyncio
+async def test_bulk_create_is_all_or_nothing(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    other = await _create_plan(db_session, "Other")
+
+    with pytest.raises(ValueError, match=r"cases\[1\]"):
+        await testcase_service.create_test_cases_bulk(
+            db_session,
+            [
+                _payload(plan, 1),
+                TestCaseCreate(
+                    plan_id=plan.id, evaluation_id=other.evaluation_id, name="Bad"
+                ),
+            ],
+        )
+
+    count = await db_session.scalar(select(func.count(TestCase.id)))
+    assert count == 0
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_finalizes_each_plan_once(
+    db_session: AsyncSession, monkeypatch
+):
+    plan = await _create_plan(db_session)
+    cases = await testcase_service.create_test_cases_bulk(
+        db_session, [_payload(plan, order) for order in range(1, 4)]
+    )
+    launched = []
+    monkeypatch.setattr(
+        testcase_service,
+        "launch_summarization_for_plan",
+        lambda evaluation_id, plan_id: launched.append((evaluation_id, plan_id)),
+    )
+
+    updated = await testcase_service.update_test_cases_bulk(
+        db_session,
+        [
+            TestCaseBulkUpdateItem(id=case.id, status=TestCaseStatus.COMPLETED)
+            for case in cases
+        ],
+    )
+
+    assert all(case.status == TestCaseStatus.COMPLETED for case in updated)
+    assert launched == [(plan.evaluation_id, plan.id)]
+    evaluation = await db_session.get(Evaluation, plan.evaluation_id)
+    assert evaluation.status == EvaluationStatus.SUMMARIZING
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_rejects_unknown_and_duplicate_ids(
+    db_session: AsyncSession,
+):
+    plan = await _create_plan(db_session)
+    case = await testcase_service.create_test_case(
+        db_session, plan_id=plan.id, evaluation_id=plan.evaluation_id, name="Case"
+    )
+
+    with pytest.raises(ValueError, match="not found"):
+        await testcase_service.update_test_cases_bulk(
+            db_session, [TestCaseBulkUpdateItem(id=case.id + 100, name="x")]
+        )
+    with pytest.raises(ValueError, match="only once"):
+        await testcase_service.update_test_cases_bulk(
+            db_session,
+            [
+                TestCaseBulkUpdateItem(id=case.id, name="x"),
+                TestCaseBulkUpdateItem(id=case.id, name="y"),
+            ],
+        )
+
+
+@pytest.mark.asyncio
+async def test_bulk_update_checks_dependencies_in_order(db_session: AsyncSession):
+    plan = await _create_plan(db_session)
+    first, second, third = await testcase_service.create_test_cases_bulk(
+        db_session, [_payload(plan, order) for order in range(1, 4)]
+    )
+
+    updated = await testcase_service.update_test_cases_bulk(
+        db_session,
+        [
+            TestCaseBulkUpdateItem(id=second.id, depends_on_ids=[first.id]),
+            TestCaseBulkUpdateItem(id=third.id, depends_on_ids=[second.id, first.id]),
+        ],
+    )
+    assert [case.depends_on_ids for case in updated] == [
+        [first.id],
+        sorted([first.id, second.id]),
+    ]
+
+    with pytest.raises(ValueError, match=r"updates\[1\]: .*cycle"):
+        await testcase_service.update_test_cases_bulk(
+            db_session,
+            [
+                TestCaseBulkUpdateItem(id=second.id, name="Checkout"),
+                TestCaseBulkUpdateItem(id=first.id, depends_on_ids=[third.id]),
+            ],
+        )
+    # Each change sees the ones before it: once third no longer depends on
+    # first, first may depend on third.
+    updated = await testcase_service.update_test_cases_bulk(
+        db_session,
+        [
+            TestCaseBulkUpdateItem(id=third.id, depends_on_ids=[]),
+            TestCaseBulkUpdateItem(id=first.id, depends_on_ids=[third.id]),
+        ],
+    )
+    assert [case.depends_on_ids for case in updated] == [[], [third.id]]
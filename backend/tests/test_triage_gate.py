@@ -0,0 +1,200 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.services import triage as triage_service
+from app_evaluation_agent.services.agents.bug_triage import BugDraft, BugTriageAgent
+from app_evaluation_agent.services.bug_similarity import bug_similarity_index
+from app_evaluation_agent.services.triage_gate import (
+    SKIP_CLEAN_PASS,
+    SKIP_EMPTY_RESULT,
+    SKIP_NON_PRODUCT_FAILURE,
+    classify_result,
+    triage_gate,
+)
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    AppVersion,
+    Base,
+    BugOccurrence,
+    Evaluation,
+    EvaluationStatus,
+    TestCase,
+    TestCaseStatus,
+    TestPlan,
+    TestPlanStatus,
+    TriageJobStatus,
+)
+
+FAILED_RESULT = {"status": "failed", "error": "Save button does nothing"}
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    bug_similarity_index.clear()
+    triage_gate.reset()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    triage_gate.reset()
+    await engine.dispose()
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    calls = []
+
+    async def _triage(**kwargs):
+        calls.append(kwargs)
+        return [
+            BugDraft(
+                title="Save button does nothing",
+                description=None,
+                severity_level="P1",
+                priority=None,
+                status="NEW",
+                fingerprint="save-button",
+                environment=None,
+                reproduction_steps=None,
+                expected=None,
+                actual=None,
+                action=None,
+                result_snapshot=None,
+                screenshot_uri=None,
+                log_uri=None,
+                raw_model_coords=None,
+                step_index=None,
+                observed_at=datetime.now(timezone.utc),
+            )
+        ]
+
+    monkeypatch.setattr(BugTriageAgent, "triage_test_case", _triage)
+    return calls
+
+
+async def _create_cases(
+    db_session: AsyncSession, status: TestCaseStatus, count: int = 1
+) -> list[TestCase]:
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+    await db_session.refresh(app)
+
+    app_version = AppVersion(app_id=app.id, version="1.0.0")
+    db_session.add(app_version)
+    await db_session.commit()
+    await db_session.refresh(app_version)
+
+    evaluation = Evaluation(
+        app_version_id=app_version.id,
+        status=EvaluationStatus.IN_PROGRESS,
+        execution_mode="local",
+    )
+    db_session.add(evaluation)
+    await db_session.commit()
+    await db_session.refresh(evaluation)
+
+    plan = TestPlan(evaluation_id=evaluation.id, status=TestPlanStatus.READY)
+    db_session.add(plan)
+    await db_session.commit()
+    await db_session.refresh(plan)
+
+    cases = [
+        TestCase(
+            plan_id=plan.id,
+            evaluation_id=evaluation.id,
+            name="Save document",
+            status=status,
+        )
+        for _ in range(count)
+    ]
+    db_session.add_all(cases)
+    await db_session.commit()
+    return cases
+
+
+async def _run(db_session: AsyncSession, case: TestCase, result: dict):
+    return await _run_case(db_session, case.id, result)
+
+
+async def _run_case(db_session: AsyncSession, case_id: int, result: dict):
+    job = await triage_service.enqueue_triage(db_session, case_id, result)
+    return await triage_service.run_triage_job(db_session, job.id)
+
+
+def test_classify_result_rules():
+    assert classify_result("COMPLETED", {}) == SKIP_EMPTY_RESULT
+    assert classify_result("COMPLETED", {"summary": "Saved"}) == SKIP_CLEAN_PASS
+    assert (
+        classify_result("FAILED", {"failure_type": "blocked_by_dependency"})
+        == SKIP_NON_PRODUCT_FAILURE
+    )
+    assert classify_result("COMPLETED", {"summary": "Saved", "error": "x"}) is None
+    assert classify_result("COMPLETED", {"status": "failed"}) is None
+    assert classify_result("COMPLETED", {"success": False}) is None
+    assert classify_result("FAILED", {"summary": "Saved"}) is None
+
+
+@pytest.mark.asyncio
+async def test_clean_pass_skips_the_model(db_session: AsyncSession, llm_calls):
+    (case,) = await _create_cases(db_session, TestCaseStatus.COMPLETED)
+
+    job = await _run(db_session, case, {"summary": "Document saved"})
+
+    assert job.status == TriageJobStatus.COMPLETED
+    assert llm_calls == []
+    assert triage_gate.metrics()["skipped_by_reason"] == {SKIP_CLEAN_PASS: 1}
+
+
+@pytest.mark.asyncio
+async def test_identical_result_reuses_cached_outcome(
+    db_session: AsyncSession, llm_calls
+):
+    cases = await _create_cases(db_session, TestCaseStatus.FAILED, count=2)
+
+    for case in cases:
+        await _run(db_session, case, dict(FAILED_RESULT))
+
+    assert len(llm_calls) == 1
+    assert await db_session.scalar(select(func.count(BugOccurrence.id))) == 2
+    metrics = triage_gate.metrics()
+    assert (metrics["cache_hits"], metrics["cache_misses"]) == (1, 1)
+    assert metrics["cache_hit_rate"] == 0.5
+    assert metrics["llm_calls_avoided_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_unusable_model_output_is_not_cached(
+    db_session: AsyncSession, llm_calls, monkeypatch
+):
+    cases = await _create_cases(db_session, TestCaseStatus.FAILED, count=2)
+    # The failed run rolls back, which expires the loaded cases.
+    case_ids = [case.id for case in cases]
+    failing_calls = []
+
+    async def _unparseable(**kwargs):
+        failing_calls.append(kwargs)
+        return None
+
+    with monkeypatch.context() as patch:
+        patch.setattr(BugTriageAgent, "triage_test_case", _unparseable)
+        job = await _run_case(db_session, case_ids[0], dict(FAILED_RESULT))
+
+    assert len(failing_calls) == 1
+    assert job.status in (TriageJobStatus.PENDING, TriageJobStatus.FAILED)
+    assert "no usable LLM output" in job.last_error
+
+    await _run_case(db_session, case_ids[1], dict(FAILED_RESULT))
+    assert len(llm_calls) == 1
+    assert triage_gate.metrics()["cache_hits"] == 0
@@ -0,0 +1,255 @@
+import pytest
+import pytest_asyncio
+from fastapi import Response
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import StaticPool
+
+pytest.importorskip("aiosqlite")
+
+from app_evaluation_agent.api.v1 import apps as apps_api
+from app_evaluation_agent.schemas.app_version import (
+    AppVersionCreate,
+    AppVersionUpdate,
+)
+from app_evaluation_agent.schemas.evaluation import EvaluationCreate
+from app_evaluation_agent.services import apps as app_service
+from app_evaluation_agent.services import evaluations as evaluation_service
+from app_evaluation_agent.services.version_lineage import _AppLineage, lineage_cache
+from app_evaluation_agent.storage.models import (
+    App,
+    AppType,
+    Base,
+    app_version_lineage,
+)
+
+
+@pytest_asyncio.fixture
+async def db_session() -> AsyncSession:
+    engine = create_async_engine("sqlite+aiosqlite:///:memory:", future=True)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    lineage_cache.clear()
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_factory() as session:
+        yield session
+
+    lineage_cache.clear()
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        "sqlite+aiosqlite:///:memory:", future=True, poolclass=StaticPool
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    lineage_cache.clear()
+    yield async_sessionmaker(bind=engine, expire_on_commit=False)
+
+    lineage_cache.clear()
+    await engine.dispose()
+
+
+async def _app_with_versions(db_session: AsyncSession):
+    """1.0 -> 1.1 -> 2.0 and 1.0 -> 1.0.1 -> 2.0 (a merge)."""
+    app = App(name="App", app_type=AppType.DESKTOP_APP)
+    db_session.add(app)
+    await db_session.commit()
+
+    async def version(name, *parents):
+        return await app_service.create_app_version(
+            db_session,
+            app.id,
+            AppVersionCreate(
+                app_id=app.id,
+                version=name,
+                previous_version_ids=list(parents) or None,
+            ),
+        )
+
+    base = await version("1.0")
+    minor = await version("1.1", base.id)
+    patch = await version("1.0.1", base.id)
+    merged = await version("2.0", minor.id, patch.id)
+    return app, base, minor, patch, merged
+
+
+def test_descendants_and_cycle_checks():
+    lineage = _AppLineage({2: {1}, 3: {1}, 4: {2, 3}})
+
+    assert lineage.descendants(1) == {2, 3, 4}
+    assert lineage.descendants(4) == frozenset()
+    assert lineage.would_create_cycle(1, [4])
+    assert lineage.would_create_cycle(2, [2])
+    assert not lineage.would_create_cycle(3, [2])
+
+
+@pytest.mark.asyncio
+async def test_graph_export_from_cache(db_session: AsyncSession):
+    app, base, minor, patch, merged = await _app_with_versions(db_session)
+
+    graph = await app_service.list_app_versions_graph(db_session, app.id)
+
+    assert [node.id for node in graph.nodes] == [base.id, minor.id, patch.id, merged.id]
+    assert graph.nodes[-1].previous_version_ids == [minor.id, patch.id]
+    assert {(edge.from_id, edge.to_id) for edge in graph.edges} == {
+        (base.id, minor.id),
+        (base.id, patch.id),
+        (minor.id, merged.id),
+        (patch.id, merged.id),
+    }
+    assert graph.warnings == []
+    assert await lineage_cache.ancestors(db_session, app.id, merged.id) == {
+        base.id,
+        minor.id,
+        patch.id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_update_rejects_cycles_and_refreshes_cache(db_session: AsyncSession):
+    app, base, minor, patch, merged = await _app_with_versions(db_session)
+    assert await lineage_cache.descendants(db_session, app.id, patch.id) == {
+        merged.id
+    }
+
+    with pytest.raises(ValueError, match="cycle"):
+        await app_service.update_app_version(
+            db_session,
+            app.id,
+            base.id,
+            AppVersionUpdate(previous_version_ids=[merged.id]),
+        )
+
+    await app_service.update_app_version(
+        db_session, app.id, patch.id, AppVersionUpdate(previous_version_ids=[minor.id])
+    )
+
+    assert await lineage_cache.descendants(db_session, app.id, minor.id) == {
+        patch.id,
+        merged.id,
+    }
+
+
+@pytest.mark.asyncio
+async def test_cache_reloads_after_writes_elsewhere(db_session: AsyncSession):
+    app, base, minor, patch, merged = await _app_with_versions(db_session)
+    assert not await lineage_cache.is_ancestor(db_session, app.id, minor.id, patch.id)
+
+    # Another process adds an edge and bumps the revision.
+    await db_session.execute(
+        insert(app_version_lineage).values(
+            app_version_id=patch.id, previous_version_id=minor.id
+        )
+    )
+    await lineage_cache.bump_revision(db_session, app.id)
+    await db_session.commit()
+
+    assert await lineage_cache.is_ancestor(db_session, app.id, minor.id, patch.id)
+
+
+@pytest.mark.asyncio
+async def test_versions_created_by_evaluations_refresh_cache(
+    db_session: AsyncSession,
+):
+    app, *_ = await _app_with_versions(db_session)
+    graph = await app_service.list_app_versions_graph(db_session, app.id)
+    assert graph.total_nodes == 4
+
+    created = await evaluation_service._get_or_create_app_version(
+        db_session, app, "3.0", app_path=None, app_url=None
+    )
+
+    graph = await app_service.list_app_versions_graph(db_session, app.id)
+    assert created.id in {node.id for node in graph.nodes}
+
+
+@pytest.mark.asyncio
+async def test_graph_etag_changes_when_an_evaluation_adds_a_version(
+    session_factory,
+):
+    async def graph_etag(app_id: int) -> str:
+        # One session per request, as the API does.
+        async with session_factory() as db:
+            response = Response()
+            await apps_api.get_app_versions_graph(
+                app_id,
+                response,
+                around=None,
+                generations=2,
+                branch=None,
+                since=None,
+                format="full",
+                if_none_match=None,
+                db=db,
+            )
+            return response.headers["ETag"]
+
+    async with session_factory() as db:
+        app, *_ = await _app_with_versions(db)
+    before = await graph_etag(app.id)
+    assert await graph_etag(app.id) == before
+
+    async with session_factory() as db:
+        await evaluation_service.create_evaluation(
+            db,
+            EvaluationCreate(
+                app_id=app.id, app_version="3.0", executor_ids=["worker-1"]
+            ),
+        )
+
+    assert await graph_etag(app.id) != before
+
+
+@pytest.mark.asyncio
+async def test_graph_windows(db_session: AsyncSession):
+    app, base, minor, patch, merged = await _app_with_versions(db_session)
+    hotfix = await app_service.create_app_version(
+        db_session,
+        app.id,
+        AppVersionCreate(
+            app_id=app.id, version="1.1.1", previous_version_ids=[minor.id]
+        ),
+    )
+
+    around = await app_service.list_app_versions_graph(
+        db_session, app.id, around_version_id=merged.id, generations=1
+    )
+    assert [node.id for node in around.nodes] == [minor.id, patch.id, merged.id]
+    assert {(edge.from_id, edge.to_id) for edge in around.edges} == {
+        (minor.id, merged.id),
+        (patch.id, merged.id),
+    }
+    assert around.total_nodes == 5
+
+    branch = await app_service.list_app_versions_graph(
+        db_session, app.id, branch_version_id=patch.id, compact=True
+    )
+    assert [node.id for node in branch.nodes] == [base.id, patch.id, merged.id]
+    assert branch.edges == [(base.id, patch.id), (patch.id, merged.id)]
+    assert hotfix.id not in {node.id for node in branch.nodes}
+
+    with pytest.raises(ValueError):
+        await app_service.list_app_versions_graph(
+            db_session, app.id, around_version_id=10_000
+        )
+
+
+def test_graph_etag_depends_on_revision_and_window():
+    etag = app_service.versions_graph_etag(3, around_version_id=7, generations=2)
+
+    assert etag == app_service.versions_graph_etag(
+        3, around_version_id=7, generations=2
+    )
+    for other in (
+        app_service.versions_graph_etag(4, around_version_id=7, generations=2),
+        app_service.versions_graph_etag(3, around_version_id=7, generations=3),
+    ):
+        assert etag != other
+    assert etag != app_service.versions_graph_etag(
+        3, around_version_id=7, generations=2, compact=True
+    )
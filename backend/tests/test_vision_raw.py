@@ -0,0 +1,140 @@
+import io
+import json
+import struct
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app_evaluation_agent.api.v1 import vision as vision_api
+from app_evaluation_agent.schemas.agent import ToolCall, VisionAnalysisResponse
+from app_evaluation_agent.services.frame_cache import (
+    frame_cache,
+    frame_digest,
+    tile_boxes,
+    tile_hash,
+)
+
+CONTEXT = {
+    "high_level_goal": "Log in",
+    "test_case_id": 1,
+    "test_case_description": "Log in with valid credentials",
+}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    calls = []
+
+    async def fake_analyze(context, image_bytes, image_size):
+        calls.append((context, bytes(image_bytes or b""), image_size))
+        return VisionAnalysisResponse(
+            thought="click", action=ToolCall(tool_name="click", parameters={})
+        )
+
+    async def no_event(*args, **kwargs):
+        pass
+
+    async def no_store(data):
+        return None
+
+    monkeypatch.setattr(
+        vision_api.AnalyzerAgent, "process_context_and_image", fake_analyze
+    )
+    monkeypatch.setattr(vision_api.live_events, "publish_analyze_step", no_event)
+    monkeypatch.setattr(vision_api.blob_store, "store_screenshot", no_store)
+    app = FastAPI()
+    app.include_router(vision_api.router, prefix="/api/v1/vision")
+    frame_cache.clear()
+    with TestClient(app) as client:
+        client.calls = calls
+        yield client
+    frame_cache.clear()
+
+
+def _jpeg() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (1280, 720), (200, 10, 10)).save(buffer, format="JPEG")
+    return buffer.getvalue()
+
+
+def test_raw_body_with_context_header(client):
+    image = _jpeg()
+    response = client.post(
+        "/api/v1/vision/analyze/raw",
+        content=image,
+        headers={"Content-Type": "image/jpeg", "X-Agent-Context": json.dumps(CONTEXT)},
+    )
+
+    assert response.status_code == 200
+    context, received, size = client.calls[0]
+    assert context.test_case_id == 1
+    assert received == image
+    assert size == (1280, 720)
+
+
+def test_length_prefixed_frame(client):
+    image = _jpeg()
+    context = json.dumps({**CONTEXT, "scratchpad": "é"}).encode()
+    response = client.post(
+        "/api/v1/vision/analyze/raw",
+        content=struct.pack(">I", len(context)) + context + image,
+        headers={"Content-Type": vision_api.RAW_FRAME_MEDIA_TYPE},
+    )
+
+    assert response.status_code == 200
+    context, received, size = client.calls[0]
+    assert context.scratchpad == "é"
+    assert received == image
+    assert size == (1280, 720)
+
+
+def test_malformed_raw_requests_are_rejected(client):
+    url = "/api/v1/vision/analyze/raw"
+    frame = {"Content-Type": vision_api.RAW_FRAME_MEDIA_TYPE}
+
+    assert client.post(url, content=_jpeg()).status_code == 400
+    truncated = b"\x00\x00\x01\x00{}"
+    assert client.post(url, content=truncated, headers=frame).status_code == 400
+    assert (
+        client.post(
+            url,
+            content=b"not an image",
+            headers={"X-Agent-Context": json.dumps(CONTEXT)},
+        ).status_code
+        == 400
+    )
+    assert client.calls == []
+
+
+def test_delta_frames_build_on_the_previous_upload(client):
+    url = "/api/v1/vision/analyze/raw"
+    headers = {"X-Agent-Context": json.dumps(CONTEXT), "X-Frame-Encoding": "delta"}
+    image = _jpeg()
+    with Image.open(io.BytesIO(image)) as img:
+        pixels = img.convert("RGB")
+    hashes = [tile_hash(pixels.crop(box)) for box in tile_boxes(1280, 720, 256)]
+    manifest = json.dumps(
+        {
+            "base": frame_digest(hashes),
+            "width": 1280,
+            "height": 720,
+            "tile_size": 256,
+            "tiles": [],
+        }
+    ).encode()
+    delta = struct.pack(">I", len(manifest)) + manifest
+
+    # No previous frame yet: the runner has to send a full one.
+    assert client.post(url, content=delta, headers=headers).status_code == 409
+
+    client.post(url, content=image, headers={"X-Agent-Context": json.dumps(CONTEXT)})
+    response = client.post(url, content=delta, headers=headers)
+
+    assert response.status_code == 200
+    _, received, size = client.calls[-1]
+    assert size == (1280, 720)
+    with Image.open(io.BytesIO(received)) as rebuilt:
+        assert rebuilt.format == "PNG"
+        assert rebuilt.convert("RGB").tobytes() == pixels.tobytes()